@@ -0,0 +1,103 @@
+"""sensor_samples hypertable + sensor_samples_hourly continuous aggregate
+
+Revision ID: 20261017_0001
+Revises: 20260125_0002
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0001"
+down_revision = "20260125_0002"
+branch_labels = None
+depends_on = None
+
+
+def _has_timescaledb() -> bool:
+    bind = op.get_bind()
+    return bool(bind.execute(sa.text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")).scalar())
+
+
+def upgrade() -> None:
+    # PostgreSQL sans TimescaleDB : les stats restent calculées sur sensor_samples
+    if not _has_timescaledb():
+        return
+
+    # Hypertable : toute contrainte unique doit inclure la colonne de partitionnement
+    op.drop_constraint("sensor_samples_pkey", "sensor_samples", type_="primary")
+    op.create_primary_key("sensor_samples_pkey", "sensor_samples", ["id", "timestamp"])
+    op.drop_index("ix_sensor_samples_sample_id", table_name="sensor_samples")
+    op.create_index(
+        "ux_sensor_samples_sample_id_timestamp",
+        "sensor_samples",
+        ["sample_id", "timestamp"],
+        unique=True,
+    )
+    op.execute(
+        """
+        SELECT create_hypertable(
+            'sensor_samples', 'timestamp',
+            chunk_time_interval => INTERVAL '7 days',
+            migrate_data => TRUE,
+            if_not_exists => TRUE
+        )
+        """
+    )
+
+    # Sommes + compteurs (fusionnables avec la queue non matérialisée)
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW IF NOT EXISTS sensor_samples_hourly
+        WITH (timescaledb.continuous, timescaledb.materialized_only = true) AS
+        SELECT
+            time_bucket('1 hour', s.timestamp) AS bucket,
+            s.device_id,
+            COUNT(*) AS sample_count,
+            COUNT(*) FILTER (WHERE s.fusion_final_grade = 'A+') AS count_a_plus,
+            COUNT(*) FILTER (WHERE s.fusion_final_grade = 'A') AS count_a,
+            COUNT(*) FILTER (WHERE s.fusion_final_grade = 'B') AS count_b,
+            COUNT(*) FILTER (WHERE s.fusion_final_grade = 'C') AS count_c,
+            COUNT(*) FILTER (WHERE s.fusion_final_grade = 'REJECT') AS count_reject,
+            COUNT(*) FILTER (WHERE s.fusion_final_grade <> 'REJECT') AS compliant_count,
+            SUM(s.fusion_final_score) AS sum_quality_score,
+            COUNT(s.fusion_final_score) AS n_quality_score,
+            SUM(s.vl53l8ch_volume_mm3) AS sum_volume_mm3,
+            COUNT(s.vl53l8ch_volume_mm3) AS n_volume_mm3,
+            SUM(s.as7341_freshness_index) AS sum_freshness_index,
+            COUNT(s.as7341_freshness_index) AS n_freshness_index
+        FROM sensor_samples s
+        GROUP BY bucket, s.device_id
+        WITH NO DATA
+        """
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sensor_samples_hourly_device_bucket "
+        "ON sensor_samples_hourly (device_id, bucket DESC)"
+    )
+    op.execute(
+        """
+        SELECT add_continuous_aggregate_policy('sensor_samples_hourly',
+            start_offset => INTERVAL '3 days',
+            end_offset => INTERVAL '1 hour',
+            schedule_interval => INTERVAL '15 minutes',
+            if_not_exists => TRUE
+        )
+        """
+    )
+
+    # Matérialisation de l'historique (CALL interdit dans une transaction)
+    with op.get_context().autocommit_block():
+        op.execute("CALL refresh_continuous_aggregate('sensor_samples_hourly', NULL, NOW() - INTERVAL '1 hour')")
+
+
+def downgrade() -> None:
+    if not _has_timescaledb():
+        return
+
+    op.execute("SELECT remove_continuous_aggregate_policy('sensor_samples_hourly', if_exists => TRUE)")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS sensor_samples_hourly")
+    # L'hypertable est conservée (pas de conversion inverse dans TimescaleDB)
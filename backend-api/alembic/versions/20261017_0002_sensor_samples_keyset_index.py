@@ -0,0 +1,29 @@
+"""sensor_samples (timestamp, sample_id) index for keyset pagination
+
+Revision ID: 20261017_0002
+Revises: 20261017_0001
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0002"
+down_revision = "20261017_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GET /api/sqal/samples : ORDER BY timestamp DESC, sample_id DESC + curseur (timestamp, sample_id)
+    op.create_index(
+        "idx_sensor_samples_timestamp_sample_id",
+        "sensor_samples",
+        ["timestamp", "sample_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_sensor_samples_timestamp_sample_id", table_name="sensor_samples")
@@ -0,0 +1,52 @@
+"""blockchain_checkpoints table + blockchain (timestamp, index) keyset index
+
+Revision ID: 20261017_0003
+Revises: 20261017_0002
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0003"
+down_revision = "20261017_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Checkpoints signés de app.blockchain.verification.ChainVerifier
+    op.create_table(
+        "blockchain_checkpoints",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("hauteur", sa.BigInteger(), nullable=False),
+        sa.Column("dernier_timestamp", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("dernier_index", sa.Integer(), nullable=False),
+        sa.Column("dernier_hash", sa.String(length=64), nullable=False),
+        sa.Column("hash_cumul", sa.String(length=64), nullable=False),
+        sa.Column("signature", sa.String(length=64), nullable=False),
+        sa.Column("complet", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+        sa.Column("blocs_verifies", sa.BigInteger(), nullable=False),
+        sa.Column("duree_s", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("NOW()")),
+    )
+
+    # Parcours de la chaîne par curseur (timestamp, index) ; table créée hors Alembic
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('public.blockchain') IS NOT NULL THEN
+                CREATE INDEX IF NOT EXISTS idx_blockchain_timestamp_index ON blockchain (timestamp, index);
+            END IF;
+        END $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_blockchain_timestamp_index")
+    op.drop_table("blockchain_checkpoints")
@@ -0,0 +1,60 @@
+"""blockchain_merkle_batches table + blockchain merkle_batch_id / merkle_proof
+
+Revision ID: 20261017_0004
+Revises: 20261017_0003
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0004"
+down_revision = "20261017_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Lots signés du mode batch (BLOCKCHAIN_BATCH_WINDOW_MS) : une signature RSA par racine
+    op.create_table(
+        "blockchain_merkle_batches",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("gaveur_id", sa.Integer(), nullable=False),
+        sa.Column("merkle_root", sa.String(length=64), nullable=False),
+        sa.Column("signature", sa.Text(), nullable=False),
+        sa.Column("nb_blocs", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("NOW()")),
+    )
+    op.create_index("ix_blockchain_merkle_batches_root", "blockchain_merkle_batches", ["merkle_root"])
+
+    # Preuve d'inclusion par bloc ; table blockchain créée hors Alembic
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('public.blockchain') IS NOT NULL THEN
+                ALTER TABLE blockchain ADD COLUMN IF NOT EXISTS merkle_batch_id BIGINT;
+                ALTER TABLE blockchain ADD COLUMN IF NOT EXISTS merkle_proof JSONB;
+            END IF;
+        END $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('public.blockchain') IS NOT NULL THEN
+                ALTER TABLE blockchain DROP COLUMN IF EXISTS merkle_proof;
+                ALTER TABLE blockchain DROP COLUMN IF EXISTS merkle_batch_id;
+            END IF;
+        END $$;
+        """
+    )
+    op.drop_index("ix_blockchain_merkle_batches_root", table_name="blockchain_merkle_batches")
+    op.drop_table("blockchain_merkle_batches")
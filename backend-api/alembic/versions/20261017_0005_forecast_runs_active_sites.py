@@ -0,0 +1,80 @@
+"""forecast_runs + forecast_active_sites (version de prévision active par site)
+
+Revision ID: 20261017_0005
+Revises: 20261017_0004
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0005"
+down_revision = "20261017_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Versions des prévisions Prophet/ETS (app.services.production_forecast_store) ;
+    # la table a pu être créée au runtime avant cette révision
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS forecast_runs (
+            modele_version VARCHAR(20) PRIMARY KEY,
+            horizon_jours INTEGER NOT NULL,
+            sites TEXT[],
+            methodes JSONB,
+            created_at TIMESTAMPTZ DEFAULT NOW()
+        );
+        """
+    )
+
+    # Version active par site : un ré-entraînement d'un seul site ne masque pas les autres
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS forecast_active_sites (
+            site_code VARCHAR(2) PRIMARY KEY,
+            modele_version VARCHAR(20) NOT NULL REFERENCES forecast_runs(modele_version),
+            activated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+        """
+    )
+
+    # Reprise de l'ancienne version active globale (forecast_runs.is_active)
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = 'forecast_runs' AND column_name = 'is_active'
+            ) THEN
+                INSERT INTO forecast_active_sites (site_code, modele_version)
+                SELECT UNNEST(sites), modele_version FROM forecast_runs WHERE is_active
+                ON CONFLICT (site_code) DO NOTHING;
+                ALTER TABLE forecast_runs DROP COLUMN is_active;
+            END IF;
+        END $$;
+        """
+    )
+
+    # Lecture (version, site, date) ; previsions_production créée hors Alembic
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('public.previsions_production') IS NOT NULL THEN
+                CREATE INDEX IF NOT EXISTS idx_prev_version_date
+                    ON previsions_production (modele_version, date_prevision);
+            END IF;
+        END $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_prev_version_date")
+    op.execute("DROP TABLE IF EXISTS forecast_active_sites")
+    op.execute("DROP TABLE IF EXISTS forecast_runs")
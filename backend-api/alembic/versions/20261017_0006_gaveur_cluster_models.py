@@ -0,0 +1,62 @@
+"""gaveur_cluster_models table + gaveurs_clusters.distance_centroide
+
+Revision ID: 20261017_0006
+Revises: 20261017_0005
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0006"
+down_revision = "20261017_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Modèles K-Means par site (app.services.gaveur_cluster_store) ;
+    # la table a pu être créée au runtime avant cette révision
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS gaveur_cluster_models (
+            site_code VARCHAR(10) NOT NULL,
+            modele_version VARCHAR(50) NOT NULL,
+            state JSONB NOT NULL,
+            baseline_distance DOUBLE PRECISION,
+            n_gaveurs INTEGER,
+            is_active BOOLEAN NOT NULL DEFAULT false,
+            assigned_until TIMESTAMPTZ,
+            created_at TIMESTAMPTZ DEFAULT NOW(),
+            PRIMARY KEY (site_code, modele_version)
+        );
+        """
+    )
+
+    # Distance au centre (suivi de dérive) ; gaveurs_clusters créée hors Alembic
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('public.gaveurs_clusters') IS NOT NULL THEN
+                ALTER TABLE gaveurs_clusters ADD COLUMN IF NOT EXISTS distance_centroide DOUBLE PRECISION;
+            END IF;
+        END $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('public.gaveurs_clusters') IS NOT NULL THEN
+                ALTER TABLE gaveurs_clusters DROP COLUMN IF EXISTS distance_centroide;
+            END IF;
+        END $$;
+        """
+    )
+    op.execute("DROP TABLE IF EXISTS gaveur_cluster_models")
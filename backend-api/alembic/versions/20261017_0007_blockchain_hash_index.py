@@ -0,0 +1,36 @@
+"""blockchain (hash_actuel) index : recherche du prédécesseur d'un bloc
+
+Revision ID: 20261017_0007
+Revises: 20261017_0006
+Create Date: 2026-10-17
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0007"
+down_revision = "20261017_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Chaînage vérifié par hash_precedent → hash_actuel (chaînes des workers entrelacées) ;
+    # table créée hors Alembic, index déjà présent si init.sql a été utilisé
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('public.blockchain') IS NOT NULL THEN
+                CREATE INDEX IF NOT EXISTS idx_blockchain_hash ON blockchain (hash_actuel);
+            END IF;
+        END $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    # Index du schéma d'origine (init.sql) : conservé
+    pass
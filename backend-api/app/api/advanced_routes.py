@@ -9,10 +9,9 @@ from datetime import datetime
 import asyncpg
 
 from app.ml.anomaly_detection import get_anomaly_detection
-from app.ml.analytics_engine import get_analytics_engine
-from app.ml.computer_vision import get_computer_vision_engine
-from app.ml.voice_assistant import get_voice_assistant
-from app.ml.multiobjective_optimization import get_multiobjective_optimizer
+from app.core import lazy_modules
+from app.services.inference_executor import InferenceSaturated
+from app.routers.inference import saturated_exception
 
 router = APIRouter()
 
@@ -24,6 +23,27 @@ async def get_db_pool() -> asyncpg.Pool:
     return db_pool
 
 
+# Piles ML lourdes (Prophet, TensorFlow, Whisper, DEAP) importées à la première requête
+async def get_analytics_engine(pool: asyncpg.Pool):
+    module = await lazy_modules.analytics_engine.aget()
+    return module.get_analytics_engine(pool)
+
+
+async def get_computer_vision_engine(pool: asyncpg.Pool):
+    module = await lazy_modules.computer_vision.aget()
+    return module.get_computer_vision_engine(pool)
+
+
+async def get_voice_assistant(pool: asyncpg.Pool):
+    module = await lazy_modules.voice_assistant.aget()
+    return module.get_voice_assistant(pool)
+
+
+async def get_multiobjective_optimizer(pool: asyncpg.Pool):
+    module = await lazy_modules.multiobjective_optimization.aget()
+    return module.get_multiobjective_optimizer(pool)
+
+
 # ============================================
 # ROUTES - ANOMALY DETECTION & ALERTES
 # ============================================
@@ -51,6 +71,25 @@ async def check_all_alerts(
     }
 
 
+@router.post("/api/alertes/sweep")
+async def sweep_alertes(
+    lot_id: Optional[int] = None,
+    gaveur_id: Optional[int] = None,
+    dispatch: bool = True,
+    pool: asyncpg.Pool = Depends(get_db_pool)
+):
+    """
+    Vérifie les alertes de tous les canards en gavage (optionnellement d'un lot / gaveur)
+    """
+    anomaly_engine = get_anomaly_detection(pool)
+
+    return await anomaly_engine.sweep_alertes(
+        lot_id=lot_id,
+        gaveur_id=gaveur_id,
+        dispatch=dispatch
+    )
+
+
 @router.get("/api/alertes/dashboard/{gaveur_id}")
 async def get_alertes_dashboard(
     gaveur_id: int,
@@ -141,7 +180,7 @@ async def get_performance_metrics(
     pool: asyncpg.Pool = Depends(get_db_pool)
 ):
     """Métriques de performance complètes d'un canard"""
-    analytics_engine = get_analytics_engine(pool)
+    analytics_engine = await get_analytics_engine(pool)
 
     try:
         metrics = await analytics_engine.calculate_performance_metrics(canard_id)
@@ -157,7 +196,7 @@ async def predict_courbe_prophet(
     pool: asyncpg.Pool = Depends(get_db_pool)
 ):
     """Prédictions Prophet (Facebook AI)"""
-    analytics_engine = get_analytics_engine(pool)
+    analytics_engine = await get_analytics_engine(pool)
 
     try:
         predictions = await analytics_engine.predict_courbe_poids_prophet(
@@ -175,7 +214,7 @@ async def compare_genetiques(
     pool: asyncpg.Pool = Depends(get_db_pool)
 ):
     """Comparaison des performances par génétique"""
-    analytics_engine = get_analytics_engine(pool)
+    analytics_engine = await get_analytics_engine(pool)
 
     comparaison = await analytics_engine.compare_genetiques(gaveur_id)
     return comparaison
@@ -187,7 +226,7 @@ async def analyze_correlation_temperature(
     pool: asyncpg.Pool = Depends(get_db_pool)
 ):
     """Analyse corrélation température <-> gain de poids"""
-    analytics_engine = get_analytics_engine(pool)
+    analytics_engine = await get_analytics_engine(pool)
 
     correlation = await analytics_engine.analyze_correlation_temperature_poids(canard_id)
     return correlation
@@ -199,7 +238,7 @@ async def detect_patterns_gavage(
     pool: asyncpg.Pool = Depends(get_db_pool)
 ):
     """Détecte les patterns de gavage (best practices)"""
-    analytics_engine = get_analytics_engine(pool)
+    analytics_engine = await get_analytics_engine(pool)
 
     patterns = await analytics_engine.detect_patterns_gavage(gaveur_id)
     return patterns
@@ -211,7 +250,7 @@ async def get_weekly_report(
     pool: asyncpg.Pool = Depends(get_db_pool)
 ):
     """Rapport hebdomadaire complet"""
-    analytics_engine = get_analytics_engine(pool)
+    analytics_engine = await get_analytics_engine(pool)
 
     rapport = await analytics_engine.generate_weekly_report(gaveur_id)
     return rapport
@@ -291,7 +330,7 @@ async def detect_poids_vision(
     """
     Détection automatique du poids par vision par ordinateur (CNN)
     """
-    vision_engine = get_computer_vision_engine(pool)
+    vision_engine = await get_computer_vision_engine(pool)
     result = await vision_engine.predict_weight(image_base64, genetique)
     return result
 
@@ -306,7 +345,7 @@ async def train_vision_model(
     """
     Entraîne le modèle CNN de détection de poids
     """
-    vision_engine = get_computer_vision_engine(pool)
+    vision_engine = await get_computer_vision_engine(pool)
     result = await vision_engine.train_model(
         genetique=genetique,
         epochs=epochs,
@@ -323,7 +362,7 @@ async def evaluate_vision_model(
     """
     Évalue le modèle CNN sur un ensemble de test
     """
-    vision_engine = get_computer_vision_engine(pool)
+    vision_engine = await get_computer_vision_engine(pool)
     result = await vision_engine.evaluate_model(genetique)
     return result
 
@@ -337,8 +376,11 @@ async def parse_voice_command(
     """
     Parse une commande vocale pour saisie automatique (Whisper)
     """
-    voice_assistant = get_voice_assistant(pool)
-    result = await voice_assistant.process_voice_command(audio_base64, language)
+    voice_assistant = await get_voice_assistant(pool)
+    try:
+        result = await voice_assistant.process_voice_command(audio_base64, language)
+    except InferenceSaturated as e:
+        raise saturated_exception(e)
     return result
 
 
@@ -347,7 +389,7 @@ async def get_supported_commands(pool: asyncpg.Pool = Depends(get_db_pool)):
     """
     Liste des commandes vocales supportées
     """
-    voice_assistant = get_voice_assistant(pool)
+    voice_assistant = await get_voice_assistant(pool)
     commands = voice_assistant.get_supported_commands()
     return {"supported_commands": commands}
 
@@ -360,7 +402,7 @@ async def get_voice_statistics(
     """
     Statistiques d'utilisation de la saisie vocale
     """
-    voice_assistant = get_voice_assistant(pool)
+    voice_assistant = await get_voice_assistant(pool)
     stats = await voice_assistant.get_voice_statistics(gaveur_id)
     return stats
 
@@ -380,7 +422,7 @@ async def optimize_multi_objective(
     - Maximiser rapidité
     - Maximiser satisfaction consommateur
     """
-    optimizer = get_multiobjective_optimizer(pool)
+    optimizer = await get_multiobjective_optimizer(pool)
     result = await optimizer.optimize(
         genetique=genetique,
         population_size=population_size,
@@ -397,7 +439,7 @@ async def get_ai_suggestions(
     """
     Suggestions intelligentes de l'IA basées sur les données
     """
-    analytics_engine = get_analytics_engine(pool)
+    analytics_engine = await get_analytics_engine(pool)
 
     # Analyser les patterns
     patterns = await analytics_engine.detect_patterns_gavage(gaveur_id)
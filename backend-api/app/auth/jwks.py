@@ -0,0 +1,205 @@
+"""
+Keycloak Signing Keys (JWKS) Provider & Verified Token Cache
+
+This module provides:
+- JWKSKeyProvider: fetches the realm JWKS once with an async HTTP client,
+  caches keys by `kid`, refreshes them in the background and refetches on
+  an unknown `kid` (key rotation), with a minimum interval between fetches
+- VerifiedTokenCache: bounded LRU of already-verified token payloads keyed
+  by SHA-256 of the token, each entry kept until the token's `exp`
+
+Nothing here blocks the event loop: the previous path called
+`keycloak_openid.public_key()` (synchronous HTTP) on every request.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+try:
+    from app.core.logging_config import get_logger
+    logger = get_logger("auth")
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+JWKS_REFRESH_S = float(os.getenv("JWKS_REFRESH_S", "3600"))
+JWKS_MIN_REFETCH_S = float(os.getenv("JWKS_MIN_REFETCH_S", "30"))
+JWKS_HTTP_TIMEOUT_S = float(os.getenv("JWKS_HTTP_TIMEOUT_S", "5"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class UnknownSigningKey(Exception):
+    """Token `kid` not found in the realm JWKS, even after a refetch"""
+
+
+class JWKSKeyProvider:
+    """
+    Realm signing keys cached by `kid`
+
+    Usage:
+        provider = JWKSKeyProvider(jwks_url)
+        await provider.start()            # optional: warm-up + background refresh
+        key = await provider.get_key(kid)  # JWK dict, accepted by jose.jwt.decode
+        await provider.stop()
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        refresh_interval: float = JWKS_REFRESH_S,
+        min_refetch_interval: float = JWKS_MIN_REFETCH_S,
+        timeout: float = JWKS_HTTP_TIMEOUT_S,
+    ):
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+        self.fetches = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def start(self):
+        """Fetch keys now and keep them fresh in the background"""
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"JWKS warm-up failed ({self.jwks_url}): {e}")
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving the cached keys; retried at the next tick or on unknown kid
+                logger.warning(f"JWKS background refresh failed: {e}")
+
+    async def refresh(self):
+        """Fetch the JWKS and replace the cached keys"""
+        async with self._lock:
+            await self._fetch()
+
+    async def _fetch(self):
+        response = await self._get_client().get(self.jwks_url)
+        response.raise_for_status()
+        keys = {
+            key["kid"]: key
+            for key in response.json().get("keys", [])
+            if key.get("kid") and key.get("use", "sig") == "sig"
+        }
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        self.fetches += 1
+        logger.info(f"JWKS loaded: {len(keys)} signing key(s) from {self.jwks_url}")
+
+    async def get_key(self, kid: str) -> Dict[str, Any]:
+        """
+        Signing key for `kid`
+
+        An unknown `kid` triggers one refetch (concurrent callers share it),
+        at most every `min_refetch_interval` seconds so forged `kid` values
+        cannot hammer Keycloak.
+
+        Raises:
+            UnknownSigningKey: `kid` still unknown after refetch
+        """
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        async with self._lock:
+            key = self._keys.get(kid)
+            if key is not None:
+                return key
+            recently = self._fetched_at is not None and (
+                time.monotonic() - self._fetched_at < self.min_refetch_interval
+            )
+            if not recently:
+                await self._fetch()
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise UnknownSigningKey(f"Unknown signing key kid={kid}")
+        return key
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified token payloads, valid until the token's `exp`
+
+    Keys are SHA-256 digests: raw tokens are never kept in memory.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        if self.max_size <= 0:
+            return None
+        digest = self._digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, payload = entry
+        if time.time() >= expires_at:
+            del self._entries[digest]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(digest)
+        self.hits += 1
+        return payload
+
+    def set(self, token: str, payload: Dict[str, Any]):
+        exp = payload.get("exp")
+        # No exp (VERIFY_TOKEN_EXPIRATION=false): never cached
+        if self.max_size <= 0 or not exp:
+            return
+        digest = self._digest(token)
+        self._entries[digest] = (float(exp), payload)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
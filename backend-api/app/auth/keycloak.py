@@ -7,6 +7,8 @@ This module provides:
 - Custom user attributes extraction (gaveur_id, site_id)
 - Audit logging for all authentication events
 - Token expiration, signature, and issuer verification
+- Signing keys from the realm JWKS, cached by kid (app/auth/jwks.py)
+- Verified token cache until exp (dashboard polling skips RS256 re-verification)
 """
 
 from fastapi import Depends, HTTPException, status, Request
@@ -17,6 +19,8 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime, timezone
 import os
 
+from app.auth.jwks import JWKSKeyProvider, VerifiedTokenCache
+
 # Use centralized logging configuration
 try:
     from app.core.logging_config import get_logger
@@ -38,6 +42,7 @@ VERIFY_TOKEN_EXPIRATION = os.getenv("VERIFY_TOKEN_EXPIRATION", "true").lower() =
 VERIFY_TOKEN_SIGNATURE = os.getenv("VERIFY_TOKEN_SIGNATURE", "true").lower() == "true"
 VERIFY_TOKEN_ISSUER = os.getenv("VERIFY_TOKEN_ISSUER", "true").lower() == "true"
 EXPECTED_ISSUER = f"{KEYCLOAK_URL}/realms/{KEYCLOAK_REALM}"
+KEYCLOAK_JWKS_URL = os.getenv("KEYCLOAK_JWKS_URL") or f"{EXPECTED_ISSUER}/protocol/openid-connect/certs"
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
@@ -50,6 +55,10 @@ keycloak_openid = KeycloakOpenID(
     client_secret_key=KEYCLOAK_CLIENT_SECRET
 )
 
+# Realm signing keys (started/stopped in the app lifespan) and verified tokens
+jwks_provider = JWKSKeyProvider(KEYCLOAK_JWKS_URL)
+verified_tokens = VerifiedTokenCache()
+
 
 def _log_auth_event(event_type: str, username: Optional[str], success: bool, details: str = ""):
     """
@@ -136,6 +145,44 @@ def _extract_custom_attributes(payload: Dict[str, Any]) -> Dict[str, Any]:
     return attributes
 
 
+async def decode_keycloak_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a Keycloak access token and return its payload
+
+    - Cached payload returned directly while the token is not expired
+    - Otherwise: signing key from the JWKS cache (by kid), RS256 signature,
+      then claims (exp, nbf, iss); the payload is cached until exp
+
+    Raises:
+        JWTError: Invalid token or signature
+        UnknownSigningKey: kid not in the realm JWKS
+        HTTPException: Claims verification failed
+    """
+    payload = verified_tokens.get(token)
+    if payload is not None:
+        return payload
+
+    key: Any = ""
+    if VERIFY_TOKEN_SIGNATURE:
+        kid = jwt.get_unverified_header(token).get("kid")
+        if not kid:
+            raise JWTError("Token header missing key id (kid)")
+        key = await jwks_provider.get_key(kid)
+
+    decode_options = {
+        "verify_signature": VERIFY_TOKEN_SIGNATURE,
+        "verify_aud": False,  # Keycloak tokens may not have aud claim
+        "verify_exp": VERIFY_TOKEN_EXPIRATION,
+    }
+    payload = jwt.decode(token, key, algorithms=["RS256"], options=decode_options)
+
+    # Verify additional claims
+    _verify_token_claims(payload)
+
+    verified_tokens.set(token, payload)
+    return payload
+
+
 async def get_current_user(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[Dict]:
     """
     Validate JWT token and return user information
@@ -166,25 +213,8 @@ async def get_current_user(token: Optional[str] = Depends(oauth2_scheme)) -> Opt
     )
 
     try:
-        # Get public key from Keycloak
-        KEYCLOAK_PUBLIC_KEY = f"-----BEGIN PUBLIC KEY-----\n{keycloak_openid.public_key()}\n-----END PUBLIC KEY-----"
-
-        # Decode and validate token signature
-        decode_options = {
-            "verify_signature": VERIFY_TOKEN_SIGNATURE,
-            "verify_aud": False,  # Keycloak tokens may not have aud claim
-            "verify_exp": VERIFY_TOKEN_EXPIRATION,
-        }
-
-        payload = jwt.decode(
-            token,
-            KEYCLOAK_PUBLIC_KEY,
-            algorithms=["RS256"],
-            options=decode_options
-        )
-
-        # Verify additional claims
-        _verify_token_claims(payload)
+        # Signature (cached JWKS key) + claims, or cached verified payload
+        payload = await decode_keycloak_token(token)
 
         username: str = payload.get("preferred_username")
         if username is None:
@@ -108,22 +108,10 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             # Validate token (this will raise HTTPException if invalid)
             try:
                 # Import here to avoid circular dependency
-                from app.auth.keycloak import keycloak_openid, _verify_token_claims, _extract_custom_attributes
-                from jose import jwt, JWTError
-
-                # Get public key
-                KEYCLOAK_PUBLIC_KEY = f"-----BEGIN PUBLIC KEY-----\n{keycloak_openid.public_key()}\n-----END PUBLIC KEY-----"
-
-                # Decode token
-                payload = jwt.decode(
-                    token,
-                    KEYCLOAK_PUBLIC_KEY,
-                    algorithms=["RS256"],
-                    options={"verify_aud": False}
-                )
+                from app.auth.keycloak import decode_keycloak_token, _extract_custom_attributes
 
-                # Verify claims
-                _verify_token_claims(payload)
+                # Signature (cached JWKS key) + claims, or cached verified payload
+                payload = await decode_keycloak_token(token)
 
                 username = payload.get("preferred_username")
 
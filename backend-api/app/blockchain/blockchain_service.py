@@ -1,15 +1,41 @@
+import asyncio
 import hashlib
 import json
+import os
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import asyncpg
 from Crypto.PublicKey import RSA
 from Crypto.Signature import pkcs1_15
 from Crypto.Hash import SHA256
 import logging
 
+from app.blockchain.merkle import construire_arbre, signer_racine, verifier_preuve, verifier_signature_racine
+
 logger = logging.getLogger(__name__)
 
+# Mode batch : événements regroupés par fenêtre, une signature RSA par racine Merkle (0 = désactivé)
+BLOCKCHAIN_BATCH_WINDOW_MS = float(os.getenv("BLOCKCHAIN_BATCH_WINDOW_MS", "0"))
+BLOCKCHAIN_BATCH_MAX = int(os.getenv("BLOCKCHAIN_BATCH_MAX", "500"))
+
+
+def calculer_hash_contenu(contenu: Dict) -> str:
+    """SHA-256 du contenu d'un bloc (JSON trié, hors hash/signature)"""
+    contenu_str = json.dumps(contenu, sort_keys=True)
+    return hashlib.sha256(contenu_str.encode()).hexdigest()
+
+
+def _preuve_merkle(record) -> Optional[Dict]:
+    """Preuve d'inclusion d'un bloc signé par lot (None si signé individuellement)"""
+    if record["merkle_batch_id"] is None:
+        return None
+    proof = record["merkle_proof"]
+    return {
+        "batch_id": record["merkle_batch_id"],
+        "root": record["merkle_root"],
+        "proof": json.loads(proof) if isinstance(proof, str) else proof
+    }
+
 
 class Block:
     """
@@ -37,6 +63,11 @@ class Block:
         self.hash_precedent = hash_precedent
         self.hash_actuel = self.calculer_hash()
         self.signature_numerique = ""
+        
+        # Mode batch : signature portée par la racine du lot Merkle
+        self.merkle_root: Optional[str] = None
+        self.merkle_proof: Optional[List[List[str]]] = None
+        self.merkle_signature: Optional[str] = None
     
     def calculer_hash(self) -> str:
         """Calcule le hash SHA-256 du bloc"""
@@ -51,8 +82,7 @@ class Block:
             "hash_precedent": self.hash_precedent
         }
         
-        contenu_str = json.dumps(contenu, sort_keys=True)
-        return hashlib.sha256(contenu_str.encode()).hexdigest()
+        return calculer_hash_contenu(contenu)
     
     def signer_bloc(self, cle_privee: RSA.RsaKey):
         """Signe le bloc avec la clé privée"""
@@ -61,7 +91,12 @@ class Block:
         self.signature_numerique = signature.hex()
     
     def verifier_signature(self, cle_publique: RSA.RsaKey) -> bool:
-        """Vérifie la signature du bloc"""
+        """Vérifie la signature du bloc (ou sa preuve Merkle + la signature de la racine)"""
+        if self.merkle_root is not None:
+            return (
+                verifier_preuve(self.hash_actuel, self.merkle_proof, self.merkle_root)
+                and verifier_signature_racine(self.merkle_root, self.merkle_signature, cle_publique)
+            )
         try:
             h = SHA256.new(self.hash_actuel.encode())
             signature_bytes = bytes.fromhex(self.signature_numerique)
@@ -82,7 +117,9 @@ class Block:
             "donnees": self.donnees,
             "hash_precedent": self.hash_precedent,
             "hash_actuel": self.hash_actuel,
-            "signature_numerique": self.signature_numerique
+            "signature_numerique": self.signature_numerique,
+            "merkle_root": self.merkle_root,
+            "merkle_proof": self.merkle_proof
         }
 
 
@@ -92,11 +129,25 @@ class GaveursBlockchain:
     De la naissance du canard jusqu'à l'abattoir
     """
     
-    def __init__(self, db_pool: asyncpg.Pool):
+    def __init__(
+        self,
+        db_pool: asyncpg.Pool,
+        batch_window_ms: float = BLOCKCHAIN_BATCH_WINDOW_MS,
+        batch_max: int = BLOCKCHAIN_BATCH_MAX
+    ):
         self.db_pool = db_pool
         self.chaine: List[Block] = []
         self.cles_gaveurs: Dict[int, Dict] = {}  # {gaveur_id: {public, private}}
         self.initialise = False
+        self.hauteur_verifiee = 0  # Blocs de self.chaine déjà vérifiés
+        
+        # Mode batch (batch_window_ms > 0) : blocs en attente de signature Merkle
+        self.batch_window_s = batch_window_ms / 1000
+        self.batch_max = batch_max
+        self._en_attente: List[Tuple[Block, asyncio.Future]] = []
+        self._vidage: Optional[asyncio.Task] = None
+        self._lots_en_cours: set = set()
+        self.lots_enregistres = 0
     
     async def initialiser_blockchain(self, gaveur_id: int, canard_ids: List[int]):
         """
@@ -234,12 +285,7 @@ class GaveursBlockchain:
             hash_precedent=self.chaine[-1].hash_actuel
         )
         
-        if gaveur_id not in self.cles_gaveurs:
-            await self._generer_cles_gaveur(gaveur_id)
-        
-        bloc.signer_bloc(self.cles_gaveurs[gaveur_id]["private"])
-        self.chaine.append(bloc)
-        await self._sauvegarder_bloc(bloc)
+        await self._enregistrer_bloc(bloc)
         
         logger.info(f"Bloc gavage ajouté: canard {canard_id}, index {bloc.index}")
         return bloc
@@ -266,9 +312,7 @@ class GaveursBlockchain:
             hash_precedent=self.chaine[-1].hash_actuel
         )
         
-        bloc.signer_bloc(self.cles_gaveurs[gaveur_id]["private"])
-        self.chaine.append(bloc)
-        await self._sauvegarder_bloc(bloc)
+        await self._enregistrer_bloc(bloc)
         
         return bloc
     
@@ -294,13 +338,144 @@ class GaveursBlockchain:
             hash_precedent=self.chaine[-1].hash_actuel
         )
         
-        bloc.signer_bloc(self.cles_gaveurs[gaveur_id]["private"])
-        self.chaine.append(bloc)
-        await self._sauvegarder_bloc(bloc)
+        await self._enregistrer_bloc(bloc)
         
         logger.info(f"Événement abattage enregistré: canard {canard_id}")
         return bloc
     
+    async def _enregistrer_bloc(self, bloc: Block):
+        """
+        Ajoute le bloc à la chaîne, le signe et le persiste
+
+        En mode batch, le bloc rejoint le lot en cours : la coroutine rend la
+        main quand le lot (racine signée + blocs) est enregistré.
+        """
+        self.chaine.append(bloc)
+        
+        if bloc.gaveur_id not in self.cles_gaveurs:
+            await self._generer_cles_gaveur(bloc.gaveur_id)
+        
+        if self.batch_window_s <= 0:
+            bloc.signer_bloc(self.cles_gaveurs[bloc.gaveur_id]["private"])
+            await self._sauvegarder_bloc(bloc)
+            return
+        
+        enregistre = asyncio.get_running_loop().create_future()
+        self._en_attente.append((bloc, enregistre))
+        if len(self._en_attente) >= self.batch_max:
+            await self.vider()
+        elif self._vidage is None:
+            self._vidage = asyncio.create_task(self._vider_apres_fenetre())
+        await enregistre
+    
+    async def _vider_apres_fenetre(self):
+        await asyncio.sleep(self.batch_window_s)
+        self._vidage = None
+        await self.vider()
+    
+    async def vider(self):
+        """Signe et enregistre le lot en attente (fin de fenêtre, lot plein, arrêt)"""
+        lot, self._en_attente = self._en_attente, []
+        if self._vidage is not None and self._vidage is not asyncio.current_task():
+            self._vidage.cancel()
+        self._vidage = None
+        if not lot:
+            return
+        
+        # Indépendant de l'appelant : son annulation ne doit pas abandonner le lot des autres
+        tache = asyncio.create_task(self._signer_et_sauvegarder_lot(lot))
+        self._lots_en_cours.add(tache)
+        tache.add_done_callback(self._lots_en_cours.discard)
+        await asyncio.shield(tache)
+    
+    async def _signer_et_sauvegarder_lot(self, lot: List[Tuple[Block, asyncio.Future]]):
+        try:
+            # Un arbre par gaveur : la racine est signée avec sa clé
+            par_gaveur: Dict[int, List[Block]] = {}
+            for bloc, _ in lot:
+                par_gaveur.setdefault(bloc.gaveur_id, []).append(bloc)
+            
+            for gaveur_id, blocs in par_gaveur.items():
+                racine, preuves = construire_arbre([b.hash_actuel for b in blocs])
+                signature = signer_racine(racine, self.cles_gaveurs[gaveur_id]["private"])
+                for bloc, preuve in zip(blocs, preuves):
+                    bloc.merkle_root = racine
+                    bloc.merkle_proof = preuve
+                    bloc.merkle_signature = signature
+            
+            await self._sauvegarder_lot(par_gaveur)
+        except Exception as e:
+            logger.error(f"Erreur enregistrement lot blockchain ({len(lot)} blocs): {e}")
+            for _, enregistre in lot:
+                if not enregistre.done():
+                    enregistre.set_exception(e)
+            return
+        
+        for _, enregistre in lot:
+            if not enregistre.done():
+                enregistre.set_result(None)
+        self.lots_enregistres += 1
+        logger.debug(f"Lot blockchain enregistré: {len(lot)} blocs, {len(par_gaveur)} racine(s) signée(s)")
+    
+    async def _sauvegarder_lot(self, par_gaveur: Dict[int, List[Block]]):
+        """Racines Merkle puis blocs du lot : deux INSERT multi-lignes, une transaction"""
+        racines_query = """
+        INSERT INTO blockchain_merkle_batches (gaveur_id, merkle_root, signature, nb_blocs)
+        SELECT * FROM unnest($1::int[], $2::varchar[], $3::text[], $4::int[])
+        RETURNING id, merkle_root
+        """
+        
+        blocs_query = """
+        INSERT INTO blockchain (
+            index,
+            timestamp,
+            type_evenement,
+            canard_id,
+            gaveur_id,
+            abattoir_id,
+            donnees,
+            hash_precedent,
+            hash_actuel,
+            signature_numerique,
+            merkle_batch_id,
+            merkle_proof
+        )
+        SELECT i, t, e, c, g, a, d::jsonb, hp, ha, '', m, p::jsonb
+        FROM unnest(
+            $1::int[], $2::timestamptz[], $3::varchar[], $4::int[], $5::int[], $6::int[],
+            $7::text[], $8::varchar[], $9::varchar[], $10::bigint[], $11::text[]
+        ) AS u(i, t, e, c, g, a, d, hp, ha, m, p)
+        """
+        
+        lots = list(par_gaveur.items())
+        blocs = sorted((b for _, bs in lots for b in bs), key=lambda b: b.index)
+        
+        async with self.db_pool.acquire() as conn:
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    racines_query,
+                    [gaveur_id for gaveur_id, _ in lots],
+                    [bs[0].merkle_root for _, bs in lots],
+                    [bs[0].merkle_signature for _, bs in lots],
+                    [len(bs) for _, bs in lots]
+                )
+                batch_ids = {row["merkle_root"]: row["id"] for row in rows}
+                
+                await conn.execute(
+                    blocs_query,
+                    [b.index for b in blocs],
+                    [b.timestamp for b in blocs],
+                    [b.type_evenement for b in blocs],
+                    [b.canard_id for b in blocs],
+                    [b.gaveur_id for b in blocs],
+                    [b.abattoir_id for b in blocs],
+                    [json.dumps(b.donnees) for b in blocs],
+                    [b.hash_precedent for b in blocs],
+                    [b.hash_actuel for b in blocs],
+                    [batch_ids[b.merkle_root] for b in blocs],
+                    [json.dumps(b.merkle_proof) for b in blocs]
+                )
+    
     async def _sauvegarder_bloc(self, bloc: Block):
         """Sauvegarde un bloc dans TimescaleDB"""
         query = """
@@ -333,19 +508,28 @@ class GaveursBlockchain:
                 bloc.signature_numerique
             )
     
-    async def verifier_integrite_chaine(self) -> Dict:
+    async def verifier_integrite_chaine(self, complet: bool = False) -> Dict:
         """
-        Vérifie l'intégrité de toute la blockchain
-        
+        Vérifie l'intégrité de la blockchain en mémoire
+
+        Incrémentale : seuls les blocs ajoutés depuis la dernière vérification
+        réussie sont contrôlés (chaînage raccordé au dernier bloc vérifié).
+        La chaîne persistée et ses checkpoints sont vérifiés par
+        app.blockchain.verification.ChainVerifier.
+
+        Args:
+            complet: Revérifier toute la chaîne
+
         Returns:
             Dict avec résultat de vérification
         """
         if not self.chaine:
-            return {"valide": True, "erreurs": [], "blocs_verifies": 0}
+            return {"valide": True, "erreurs": [], "blocs_verifies": 0, "nouveaux_blocs_verifies": 0}
         
         erreurs = []
+        debut = 1 if complet else max(1, self.hauteur_verifiee)
         
-        for i in range(1, len(self.chaine)):
+        for i in range(debut, len(self.chaine)):
             bloc_actuel = self.chaine[i]
             bloc_precedent = self.chaine[i-1]
             
@@ -363,36 +547,56 @@ class GaveursBlockchain:
                 if not bloc_actuel.verifier_signature(self.cles_gaveurs[gaveur_id]["public"]):
                     erreurs.append(f"Bloc {i}: Signature invalide")
         
+        if not erreurs:
+            self.hauteur_verifiee = len(self.chaine)
+        
         return {
             "valide": len(erreurs) == 0,
             "erreurs": erreurs,
-            "blocs_verifies": len(self.chaine)
+            "blocs_verifies": len(self.chaine),
+            "nouveaux_blocs_verifies": max(0, len(self.chaine) - debut)
         }
     
-    async def get_historique_canard(self, canard_id: int) -> List[Dict]:
+    async def get_historique_canard(
+        self,
+        canard_id: int,
+        index_min: Optional[int] = None,
+        index_max: Optional[int] = None
+    ) -> List[Dict]:
         """
-        Récupère tout l'historique blockchain d'un canard
+        Récupère l'historique blockchain d'un canard
+        
+        Args:
+            canard_id: ID du canard
+            index_min: Premier index inclus (None = depuis le début)
+            index_max: Dernier index inclus (None = jusqu'au dernier bloc)
         
         Returns:
-            Liste chronologique de tous les événements
+            Liste chronologique des événements
         """
         query = """
         SELECT 
-            index,
-            timestamp,
-            type_evenement,
-            donnees,
-            hash_actuel,
-            signature_numerique,
-            gaveur_id,
-            abattoir_id
-        FROM blockchain
-        WHERE canard_id = $1
-        ORDER BY index ASC
+            b.index,
+            b.timestamp,
+            b.type_evenement,
+            b.donnees,
+            b.hash_actuel,
+            b.signature_numerique,
+            b.gaveur_id,
+            b.abattoir_id,
+            b.merkle_batch_id,
+            b.merkle_proof,
+            m.merkle_root
+        FROM blockchain b
+        LEFT JOIN blockchain_merkle_batches m ON m.id = b.merkle_batch_id
+        WHERE b.canard_id = $1
+          AND ($2::int IS NULL OR b.index >= $2)
+          AND ($3::int IS NULL OR b.index <= $3)
+        ORDER BY b.index ASC
         """
         
         async with self.db_pool.acquire() as conn:
-            records = await conn.fetch(query, canard_id)
+            records = await conn.fetch(query, canard_id, index_min, index_max)
         
         historique = []
         for record in records:
@@ -403,7 +607,8 @@ class GaveursBlockchain:
                 "donnees": json.loads(record["donnees"]),
                 "hash": record["hash_actuel"],
                 "gaveur_id": record["gaveur_id"],
-                "abattoir_id": record["abattoir_id"]
+                "abattoir_id": record["abattoir_id"],
+                "merkle": _preuve_merkle(record)
             })
         
         return historique
@@ -460,6 +665,8 @@ class GaveursBlockchain:
             "abattoir": abattage["donnees"] if abattage else None,
             "date_abattage": abattage["timestamp"] if abattage else None,
             "blockchain_hashes": [h["hash"] for h in historique],
+            # Événements signés par lot : preuve d'inclusion dans la racine signée
+            "preuves_merkle": {h["hash"]: h["merkle"] for h in historique if h["merkle"]},
             "verification_blockchain": "Authentique - Vérifiable sur blockchain",
             "date_generation_certificat": datetime.utcnow().isoformat()
         }
@@ -505,12 +712,7 @@ class GaveursBlockchain:
             hash_precedent=self.chaine[-1].hash_actuel if self.chaine else "0"
         )
 
-        if gaveur_id not in self.cles_gaveurs:
-            await self._generer_cles_gaveur(gaveur_id)
-
-        bloc.signer_bloc(self.cles_gaveurs[gaveur_id]["private"])
-        self.chaine.append(bloc)
-        await self._sauvegarder_bloc(bloc)
+        await self._enregistrer_bloc(bloc)
 
         logger.info(f"Bloc SQAL ajouté: lot {lot_id}, index {bloc.index}, hash {bloc.hash_actuel[:16]}...")
         return bloc
@@ -557,12 +759,7 @@ class GaveursBlockchain:
             hash_precedent=self.chaine[-1].hash_actuel if self.chaine else "0"
         )
 
-        if gaveur_id not in self.cles_gaveurs:
-            await self._generer_cles_gaveur(gaveur_id)
-
-        bloc.signer_bloc(self.cles_gaveurs[gaveur_id]["private"])
-        self.chaine.append(bloc)
-        await self._sauvegarder_bloc(bloc)
+        await self._enregistrer_bloc(bloc)
 
         logger.info(f"Bloc produit consommateur ajouté: {product_id}, hash {bloc.hash_actuel[:16]}...")
         return bloc
@@ -582,18 +779,22 @@ class GaveursBlockchain:
                 bloc = await conn.fetchrow(
                     """
                     SELECT
-                        index,
-                        timestamp,
-                        type_evenement,
-                        canard_id,
-                        gaveur_id,
-                        abattoir_id,
-                        donnees,
-                        hash_actuel,
-                        hash_precedent,
-                        signature_numerique
-                    FROM blockchain
-                    WHERE hash_actuel = $1
+                        b.index,
+                        b.timestamp,
+                        b.type_evenement,
+                        b.canard_id,
+                        b.gaveur_id,
+                        b.abattoir_id,
+                        b.donnees,
+                        b.hash_actuel,
+                        b.hash_precedent,
+                        b.signature_numerique,
+                        b.merkle_batch_id,
+                        b.merkle_proof,
+                        m.merkle_root
+                    FROM blockchain b
+                    LEFT JOIN blockchain_merkle_batches m ON m.id = b.merkle_batch_id
+                    WHERE b.hash_actuel = $1
                     """,
                     blockchain_hash
                 )
@@ -625,8 +826,7 @@ class GaveursBlockchain:
                     "hash_precedent": bloc["hash_precedent"]
                 }
 
-                contenu_str = json.dumps(contenu, sort_keys=True)
-                hash_recalcule = hashlib.sha256(contenu_str.encode()).hexdigest()
+                hash_recalcule = calculer_hash_contenu(contenu)
 
                 if hash_recalcule != bloc["hash_actuel"]:
                     return {
@@ -635,11 +835,21 @@ class GaveursBlockchain:
                         "data": None
                     }
 
+                # Bloc signé par lot : il doit appartenir à la racine Merkle enregistrée
+                preuve = _preuve_merkle(bloc)
+                if preuve and not verifier_preuve(bloc["hash_actuel"], preuve["proof"], preuve["root"]):
+                    return {
+                        "valid": False,
+                        "error": "Preuve Merkle invalide - bloc absent du lot signé",
+                        "data": None
+                    }
+
                 return {
                     "valid": True,
                     "timestamp": bloc["timestamp"].isoformat(),
                     "type_evenement": bloc["type_evenement"],
                     "data": donnees,
+                    "merkle": preuve,
                     "verified_at": datetime.utcnow().isoformat()
                 }
 
@@ -0,0 +1,80 @@
+"""
+Arbres de Merkle des lots de blocs (mode batch, BLOCKCHAIN_BATCH_WINDOW_MS)
+
+Les blocs d'un même gaveur arrivés dans la fenêtre forment un lot : seule la
+racine de l'arbre est signée (RSA), chaque bloc garde sa preuve d'inclusion.
+
+- feuille = sha256(0x00 || hash_actuel), nœud = sha256(0x01 || gauche || droite)
+  (préfixes distincts : une feuille ne peut pas se faire passer pour un nœud)
+- un nœud sans frère remonte tel quel au niveau supérieur
+- preuve = [[côté, hash], ...] de la feuille vers la racine, côté "G" si le
+  frère est à gauche, "D" s'il est à droite
+"""
+
+import hashlib
+from typing import List, Sequence, Tuple
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Signature import pkcs1_15
+
+Preuve = List[List[str]]
+
+
+def _feuille(hash_bloc: str) -> str:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(hash_bloc)).hexdigest()
+
+
+def _noeud(gauche: str, droite: str) -> str:
+    return hashlib.sha256(b"\x01" + bytes.fromhex(gauche) + bytes.fromhex(droite)).hexdigest()
+
+
+def construire_arbre(hashes: Sequence[str]) -> Tuple[str, List[Preuve]]:
+    """Racine et preuve d'inclusion de chaque hash (dans l'ordre reçu)"""
+    if not hashes:
+        raise ValueError("Lot Merkle vide")
+
+    niveau = [_feuille(h) for h in hashes]
+    positions = list(range(len(hashes)))
+    preuves: List[Preuve] = [[] for _ in hashes]
+
+    while len(niveau) > 1:
+        for f, pos in enumerate(positions):
+            frere = pos ^ 1
+            if frere < len(niveau):
+                preuves[f].append(["G" if frere < pos else "D", niveau[frere]])
+            positions[f] = pos // 2
+        niveau = [
+            _noeud(niveau[i], niveau[i + 1]) if i + 1 < len(niveau) else niveau[i]
+            for i in range(0, len(niveau), 2)
+        ]
+
+    return niveau[0], preuves
+
+
+def racine_depuis_preuve(hash_bloc: str, preuve: Preuve) -> str:
+    h = _feuille(hash_bloc)
+    for cote, frere in preuve:
+        h = _noeud(frere, h) if cote == "G" else _noeud(h, frere)
+    return h
+
+
+def verifier_preuve(hash_bloc: str, preuve: Preuve, racine: str) -> bool:
+    """Le bloc appartient-il au lot de racine donnée ?"""
+    try:
+        return racine_depuis_preuve(hash_bloc, preuve) == racine
+    except (ValueError, TypeError):
+        return False
+
+
+def signer_racine(racine: str, cle_privee: RSA.RsaKey) -> str:
+    """Signature RSA de la racine (même schéma que Block.signer_bloc)"""
+    return pkcs1_15.new(cle_privee).sign(SHA256.new(racine.encode())).hex()
+
+
+def verifier_signature_racine(racine: str, signature: str, cle_publique: RSA.RsaKey) -> bool:
+    try:
+        pkcs1_15.new(cle_publique).verify(SHA256.new(racine.encode()), bytes.fromhex(signature))
+        return True
+    except (ValueError, TypeError):
+        return False
@@ -0,0 +1,535 @@
+"""
+Vérification incrémentale de la blockchain persistée (table blockchain)
+
+GaveursBlockchain.verifier_integrite_chaine ne voit que la chaîne en mémoire
+du processus. Ici, la chaîne est relue depuis TimescaleDB, dans l'ordre
+d'insertion (timestamp, index) :
+- hash SHA-256 recalculé, signature RSA vérifiée (clé publique du gaveur)
+- chaînage : le bloc désigné par hash_precedent doit exister dans la table
+  (recherche par hash_actuel, index idx_blockchain_hash). Chaque worker
+  uvicorn a sa propre chaîne en mémoire : les chaînes sont entrelacées dans
+  la table et le bloc précédent en (timestamp, index) n'est pas forcément
+  le prédécesseur. Un bloc à hash_precedent "0" ouvre un nouveau segment
+  (genesis d'un worker, recréé au redémarrage du service)
+
+Checkpoints (table blockchain_checkpoints) : hauteur vérifiée, dernier bloc
+et hash cumulé (sha256(hash_cumul + hash_actuel) de bloc en bloc), signés
+HMAC-SHA256 (BLOCKCHAIN_CHECKPOINT_SECRET, obligatoire : sans secret, aucun
+checkpoint n'est écrit ni pris en compte). Une vérification incrémentale
+reprend après le dernier checkpoint valide et ne relit que les blocs
+ajoutés depuis ; un audit complet (complet=True) repart du début et
+contrôle au passage que le hash cumulé retombe sur celui du checkpoint.
+Le timestamp d'un bloc est fixé avant son INSERT : un bloc peut être validé
+après des blocs plus récents (autre worker, fenêtre du mode batch). Chaque
+passe s'arrête donc aux blocs plus vieux que BLOCKCHAIN_VERIFY_COMMIT_LAG_S
+secondes, pour qu'aucun bloc n'arrive ensuite sous un checkpoint.
+
+Blocs signés par lot (mode batch) : preuve d'inclusion recalculée jusqu'à la
+racine, signature RSA de la racine vérifiée une fois par lot.
+
+Audit complet : lots de BLOCKCHAIN_VERIFY_BATCH blocs vérifiés dans un pool
+de BLOCKCHAIN_VERIFY_WORKERS processus (0 = thread), lecture et vérification
+en pipeline, nombre de lots en vol borné. Dans un enfant daemon (worker
+Celery prefork), qui ne peut pas créer de processus, le pool est un pool de
+threads de même taille.
+
+Usage:
+    verifier = get_chain_verifier(db_pool)
+    result = await verifier.verifier()               # depuis le dernier checkpoint
+    result = await verifier.verifier(complet=True)   # audit complet
+    result = await verifier.verifier_canard(42, index_min=100, index_max=250)
+"""
+
+import asyncio
+import collections
+import hashlib
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from Crypto.Signature import pkcs1_15
+
+from app.blockchain.blockchain_service import calculer_hash_contenu
+from app.blockchain.merkle import verifier_preuve
+
+logger = logging.getLogger(__name__)
+
+BLOCKCHAIN_VERIFY_WORKERS = int(os.getenv("BLOCKCHAIN_VERIFY_WORKERS", "0"))
+BLOCKCHAIN_VERIFY_BATCH = int(os.getenv("BLOCKCHAIN_VERIFY_BATCH", "5000"))
+# Délai max entre le timestamp d'un bloc et son COMMIT (fenêtre batch + signature comprises)
+BLOCKCHAIN_VERIFY_COMMIT_LAG_S = float(os.getenv("BLOCKCHAIN_VERIFY_COMMIT_LAG_S", "300"))
+BLOCKCHAIN_CHECKPOINT_SECRET = os.getenv("BLOCKCHAIN_CHECKPOINT_SECRET", "")
+
+# Erreurs détaillées renvoyées (le total reste compté)
+MAX_ERREURS = 100
+HASH_CUMUL_INITIAL = "0" * 64
+
+BLOCK_COLUMNS = """
+    b.index, b.timestamp, b.type_evenement, b.canard_id, b.gaveur_id, b.abattoir_id,
+    b.donnees, b.hash_precedent, b.hash_actuel, b.signature_numerique,
+    b.merkle_proof, m.merkle_root, m.signature AS merkle_signature
+"""
+
+# Prédécesseur d'un bloc, quelle que soit la chaîne (worker) qui l'a écrit
+PREDECESSEUR_JOIN = """
+LEFT JOIN LATERAL (
+    SELECT hash_actuel
+    FROM blockchain p
+    WHERE p.hash_actuel = b.hash_precedent
+    LIMIT 1
+) p ON true
+"""
+
+# Pagination par clé (timestamp, index) : pas de transaction longue sur la chaîne ;
+# blocs de moins de $4 secondes exclus (encore susceptibles d'être précédés d'un COMMIT tardif)
+BLOCKS_PAGE_QUERY = f"""
+SELECT {BLOCK_COLUMNS}, p.hash_actuel AS hash_predecesseur
+FROM blockchain b
+LEFT JOIN blockchain_merkle_batches m ON m.id = b.merkle_batch_id
+{PREDECESSEUR_JOIN}
+WHERE ($1::timestamptz IS NULL OR (b.timestamp, b.index) > ($1::timestamptz, $2::int))
+  AND b.timestamp <= NOW() - make_interval(secs => $4)
+ORDER BY b.timestamp, b.index
+LIMIT $3
+"""
+
+BLOCK_HASH_QUERY = """
+SELECT hash_actuel FROM blockchain WHERE timestamp = $1 AND index = $2
+"""
+
+# Blocs d'un canard (même filtre que get_historique_canard) + hash de leur
+# prédécesseur, pour vérifier le chaînage sans tout relire
+CANARD_BLOCKS_QUERY = f"""
+SELECT {BLOCK_COLUMNS}, p.hash_actuel AS hash_predecesseur
+FROM blockchain b
+LEFT JOIN blockchain_merkle_batches m ON m.id = b.merkle_batch_id
+{PREDECESSEUR_JOIN}
+WHERE b.canard_id = $1
+  AND ($2::int IS NULL OR b.index >= $2)
+  AND ($3::int IS NULL OR b.index <= $3)
+ORDER BY b.timestamp, b.index
+"""
+
+PUBLIC_KEYS_QUERY = """
+SELECT id, cle_publique_blockchain
+FROM gaveurs
+WHERE id = ANY($1::int[]) AND cle_publique_blockchain IS NOT NULL
+"""
+
+LATEST_CHECKPOINT_QUERY = """
+SELECT id, hauteur, dernier_timestamp, dernier_index, dernier_hash, hash_cumul, signature, created_at
+FROM blockchain_checkpoints
+ORDER BY id DESC
+LIMIT 1
+"""
+
+INSERT_CHECKPOINT_QUERY = """
+INSERT INTO blockchain_checkpoints (
+    hauteur, dernier_timestamp, dernier_index, dernier_hash, hash_cumul,
+    signature, complet, blocs_verifies, duree_s
+) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+RETURNING id, created_at
+"""
+
+# (index, timestamp iso, type, canard, gaveur, abattoir, donnees json, hash_precedent, hash_actuel,
+#  signature, preuve Merkle json | None, racine Merkle | None, signature de la racine | None)
+LigneBloc = Tuple[int, str, str, int, int, Optional[int], str, str, str, str,
+                  Optional[str], Optional[str], Optional[str]]
+
+
+# ============================================================================
+# Côté processus worker (fonctions picklables)
+# ============================================================================
+
+_cles_importees: Dict[str, RSA.RsaKey] = {}
+
+
+def _cle_publique(pem: str) -> RSA.RsaKey:
+    cle = _cles_importees.get(pem)
+    if cle is None:
+        cle = _cles_importees[pem] = RSA.import_key(pem)
+    return cle
+
+
+def _raccorde(hash_precedent: str, hash_predecesseur: Optional[str]) -> bool:
+    return hash_precedent == "0" or hash_precedent == hash_predecesseur
+
+
+def verifier_lot(
+    lignes: Sequence[LigneBloc],
+    cles_pem: Dict[int, str],
+    predecesseurs: Sequence[Optional[str]],
+) -> Dict[str, Any]:
+    """
+    Vérifie hash, signature et chaînage d'un lot de blocs
+
+    predecesseurs[i] : hash_actuel du bloc désigné par le hash_precedent du
+    bloc i (None s'il n'existe pas dans la table).
+    """
+    erreurs: List[Tuple[int, str]] = []
+    sans_cle = 0
+    racines_verifiees: Dict[str, bool] = {}
+
+    for i, (index, timestamp, type_evenement, canard_id, gaveur_id, abattoir_id,
+            donnees, hash_precedent, hash_actuel, signature,
+            merkle_proof, merkle_root, merkle_signature) in enumerate(lignes):
+        contenu = {
+            "index": index,
+            "timestamp": timestamp,
+            "type_evenement": type_evenement,
+            "canard_id": canard_id,
+            "gaveur_id": gaveur_id,
+            "abattoir_id": abattoir_id,
+            "donnees": json.loads(donnees),
+            "hash_precedent": hash_precedent,
+        }
+        if calculer_hash_contenu(contenu) != hash_actuel:
+            erreurs.append((index, "Hash actuel invalide"))
+
+        if not _raccorde(hash_precedent, predecesseurs[i]):
+            erreurs.append((index, "Chaînage rompu"))
+
+        if merkle_root is not None:
+            if not verifier_preuve(hash_actuel, json.loads(merkle_proof), merkle_root):
+                erreurs.append((index, "Preuve Merkle invalide"))
+            # La racine porte la signature : une seule vérification RSA par lot
+            signature, hash_signe = merkle_signature, merkle_root
+        else:
+            hash_signe = hash_actuel
+
+        pem = cles_pem.get(gaveur_id)
+        if pem is None:
+            sans_cle += 1
+            continue
+        if merkle_root is not None and merkle_root in racines_verifiees:
+            if not racines_verifiees[merkle_root]:
+                erreurs.append((index, "Signature racine Merkle invalide"))
+            continue
+        try:
+            pkcs1_15.new(_cle_publique(pem)).verify(SHA256.new(hash_signe.encode()), bytes.fromhex(signature))
+            valide = True
+        except (ValueError, TypeError):
+            valide = False
+        if merkle_root is not None:
+            racines_verifiees[merkle_root] = valide
+        if not valide:
+            erreurs.append((index, "Signature racine Merkle invalide" if merkle_root is not None else "Signature invalide"))
+
+    return {"erreurs": erreurs, "sans_cle": sans_cle}
+
+
+# ============================================================================
+# Côté service
+# ============================================================================
+
+def _ligne(record) -> LigneBloc:
+    """Enregistrement asyncpg → tuple picklable (timestamp comme à la création du bloc)"""
+    ts = record["timestamp"]
+    donnees = record["donnees"]
+    proof = record["merkle_proof"]
+    return (
+        record["index"],
+        ts.replace(tzinfo=None).isoformat() if ts.tzinfo else ts.isoformat(),
+        record["type_evenement"],
+        record["canard_id"],
+        record["gaveur_id"],
+        record["abattoir_id"],
+        donnees if isinstance(donnees, str) else json.dumps(donnees),
+        record["hash_precedent"],
+        record["hash_actuel"],
+        record["signature_numerique"],
+        proof if proof is None or isinstance(proof, str) else json.dumps(proof),
+        record["merkle_root"],
+        record["merkle_signature"],
+    )
+
+
+def hash_cumule(hash_cumul: str, hash_actuel: str) -> str:
+    return hashlib.sha256((hash_cumul + hash_actuel).encode()).hexdigest()
+
+
+class ChainVerifier:
+    """Vérification de la chaîne persistée par checkpoints signés"""
+
+    def __init__(
+        self,
+        db_pool: asyncpg.Pool,
+        workers: int = BLOCKCHAIN_VERIFY_WORKERS,
+        batch_size: int = BLOCKCHAIN_VERIFY_BATCH,
+        secret: str = BLOCKCHAIN_CHECKPOINT_SECRET,
+        commit_lag_s: float = BLOCKCHAIN_VERIFY_COMMIT_LAG_S,
+    ):
+        self.db_pool = db_pool
+        self.workers = workers
+        self.batch_size = batch_size
+        self.commit_lag_s = commit_lag_s
+        self._secret = secret.encode() if secret else None
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if multiprocessing.current_process().daemon:
+                logger.warning(
+                    f"⚠️ Processus daemon (worker Celery prefork) : vérification blockchain "
+                    f"dans {self.workers} thread(s) au lieu de processus"
+                )
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"🔐 Blockchain verification pool started ({self.workers} process(es))")
+        return self._executor
+
+    async def shutdown(self):
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, lambda: executor.shutdown(cancel_futures=True))
+
+    async def _verifier_lot(self, lignes, cles_pem, predecesseurs) -> Dict[str, Any]:
+        if self.workers > 0:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), verifier_lot, lignes, cles_pem, predecesseurs
+            )
+        return await asyncio.to_thread(verifier_lot, lignes, cles_pem, predecesseurs)
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+
+    def signer_checkpoint(
+        self, hauteur: int, dernier_timestamp: datetime, dernier_index: int, dernier_hash: str, hash_cumul: str
+    ) -> str:
+        message = f"{hauteur}|{dernier_timestamp.isoformat()}|{dernier_index}|{dernier_hash}|{hash_cumul}"
+        return hmac.new(self._secret, message.encode(), hashlib.sha256).hexdigest()
+
+    async def dernier_checkpoint(self, conn) -> Optional[Dict[str, Any]]:
+        """Dernier checkpoint, None si absent, sans secret ou si sa signature ne correspond pas"""
+        if self._secret is None:
+            return None
+        row = await conn.fetchrow(LATEST_CHECKPOINT_QUERY)
+        if row is None:
+            return None
+        attendue = self.signer_checkpoint(
+            row["hauteur"], row["dernier_timestamp"], row["dernier_index"], row["dernier_hash"], row["hash_cumul"]
+        )
+        if not hmac.compare_digest(attendue, row["signature"]):
+            logger.warning(f"⚠️ Checkpoint blockchain {row['id']} : signature invalide, ignoré")
+            return None
+        return dict(row)
+
+    # ------------------------------------------------------------------
+    # Vérification
+    # ------------------------------------------------------------------
+
+    async def _cles(self, conn, gaveur_ids, cles_pem: Dict[int, Optional[str]]) -> Dict[int, str]:
+        manquants = [g for g in gaveur_ids if g not in cles_pem]
+        if manquants:
+            for g in manquants:
+                cles_pem[g] = None
+            for row in await conn.fetch(PUBLIC_KEYS_QUERY, manquants):
+                cles_pem[row["id"]] = row["cle_publique_blockchain"]
+        return {g: pem for g, pem in cles_pem.items() if pem is not None}
+
+    async def verifier(self, complet: bool = False) -> Dict[str, Any]:
+        """
+        Vérifie la chaîne persistée
+
+        Args:
+            complet: Audit complet depuis le premier bloc (sinon reprise au
+                dernier checkpoint valide)
+
+        Returns:
+            Dict valide / erreurs / blocs_verifies (+ checkpoint enregistré)
+        """
+        started = time.perf_counter()
+        erreurs: List[str] = []
+        nb_erreurs = 0
+        sans_cle = 0
+        segments = 0
+        if self._secret is None:
+            logger.error(
+                "❌ BLOCKCHAIN_CHECKPOINT_SECRET non défini : checkpoints ni lus ni écrits, "
+                "vérification complète à chaque passe"
+            )
+
+        def erreur(message: str):
+            nonlocal nb_erreurs
+            nb_erreurs += 1
+            if len(erreurs) < MAX_ERREURS:
+                erreurs.append(message)
+
+        async with self.db_pool.acquire() as conn:
+            checkpoint = await self.dernier_checkpoint(conn)
+            reprise = checkpoint is not None and not complet
+
+            if reprise:
+                # Le bloc d'ancrage doit toujours exister avec le même hash
+                ancrage = await conn.fetchval(
+                    BLOCK_HASH_QUERY, checkpoint["dernier_timestamp"], checkpoint["dernier_index"]
+                )
+                if ancrage != checkpoint["dernier_hash"]:
+                    erreur(f"Bloc {checkpoint['dernier_index']}: bloc d'ancrage du checkpoint modifié ou supprimé")
+                    return self._resultat(
+                        erreurs, nb_erreurs, checkpoint["hauteur"], 0, 0, sans_cle, None, reprise, complet, started
+                    )
+                hauteur = checkpoint["hauteur"]
+                hash_cumul = checkpoint["hash_cumul"]
+                dernier = (checkpoint["dernier_timestamp"], checkpoint["dernier_index"], checkpoint["dernier_hash"])
+            else:
+                hauteur = 0
+                hash_cumul = HASH_CUMUL_INITIAL
+                dernier = None
+            hauteur_depart = hauteur
+
+            cles_pem: Dict[int, Optional[str]] = {}
+            en_vol = collections.deque()
+            max_en_vol = max(1, self.workers) * 2
+
+            try:
+                while True:
+                    records = await conn.fetch(
+                        BLOCKS_PAGE_QUERY,
+                        dernier[0] if dernier else None,
+                        dernier[1] if dernier else None,
+                        self.batch_size,
+                        self.commit_lag_s,
+                    )
+                    if not records:
+                        break
+
+                    lignes = [_ligne(r) for r in records]
+                    predecesseurs = [r["hash_predecesseur"] for r in records]
+                    cles = await self._cles(conn, {r["gaveur_id"] for r in records}, cles_pem)
+                    en_vol.append(asyncio.ensure_future(self._verifier_lot(lignes, cles, predecesseurs)))
+
+                    for r in records:
+                        if r["hash_precedent"] == "0":
+                            segments += 1
+                        hash_cumul = hash_cumule(hash_cumul, r["hash_actuel"])
+                        hauteur += 1
+                        if complet and checkpoint is not None and hauteur == checkpoint["hauteur"] \
+                                and hash_cumul != checkpoint["hash_cumul"]:
+                            erreur(f"Bloc {r['index']}: historique différent du checkpoint {checkpoint['id']}")
+                    last = records[-1]
+                    dernier = (last["timestamp"], last["index"], last["hash_actuel"])
+
+                    while len(en_vol) >= max_en_vol:
+                        sans_cle += self._collecter(await en_vol.popleft(), erreur)
+                    if len(records) < self.batch_size:
+                        break
+
+                while en_vol:
+                    sans_cle += self._collecter(await en_vol.popleft(), erreur)
+            finally:
+                # Erreur en cours d'audit : ne pas laisser de lots orphelins
+                for future in en_vol:
+                    future.cancel()
+                if en_vol:
+                    await asyncio.gather(*en_vol, return_exceptions=True)
+
+            if complet and checkpoint is not None and hauteur < checkpoint["hauteur"]:
+                erreur(f"Chaîne plus courte ({hauteur}) que le checkpoint {checkpoint['id']} ({checkpoint['hauteur']})")
+
+            nouveau_checkpoint = None
+            if self._secret is not None and nb_erreurs == 0 and dernier is not None \
+                    and (hauteur > hauteur_depart or checkpoint is None):
+                duree_s = time.perf_counter() - started
+                row = await conn.fetchrow(
+                    INSERT_CHECKPOINT_QUERY,
+                    hauteur, dernier[0], dernier[1], dernier[2], hash_cumul,
+                    self.signer_checkpoint(hauteur, dernier[0], dernier[1], dernier[2], hash_cumul),
+                    complet, hauteur - hauteur_depart, duree_s,
+                )
+                nouveau_checkpoint = {"id": row["id"], "hauteur": hauteur, "hash_cumul": hash_cumul}
+
+        result = self._resultat(
+            erreurs, nb_erreurs, hauteur, hauteur - hauteur_depart, segments, sans_cle,
+            nouveau_checkpoint, reprise, complet, started
+        )
+        logger.info(
+            f"{'✅' if result['valide'] else '❌'} Blockchain {'audit complet' if complet else 'vérification'}: "
+            f"{result['nouveaux_blocs_verifies']} bloc(s) en {result['duree_s']:.2f}s, {nb_erreurs} erreur(s)"
+        )
+        return result
+
+    @staticmethod
+    def _collecter(resultat_lot: Dict[str, Any], erreur) -> int:
+        for index, message in resultat_lot["erreurs"]:
+            erreur(f"Bloc {index}: {message}")
+        return resultat_lot["sans_cle"]
+
+    @staticmethod
+    def _resultat(erreurs, nb_erreurs, hauteur, nouveaux, segments, sans_cle, checkpoint, reprise, complet, started):
+        return {
+            "valide": nb_erreurs == 0,
+            "erreurs": erreurs,
+            "nb_erreurs": nb_erreurs,
+            "blocs_verifies": hauteur,
+            "nouveaux_blocs_verifies": nouveaux,
+            "segments": segments,
+            "signatures_non_verifiables": sans_cle,
+            "depuis_checkpoint": reprise,
+            "complet": complet,
+            "checkpoint": checkpoint,
+            "duree_s": round(time.perf_counter() - started, 3),
+        }
+
+    async def verifier_canard(
+        self,
+        canard_id: int,
+        index_min: Optional[int] = None,
+        index_max: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Vérifie l'historique d'un canard (plage d'index de get_historique_canard)
+
+        Chaque bloc est contrôlé (hash, signature) et raccordé à son
+        prédécesseur (hash_precedent), sans relire le reste de la chaîne.
+        """
+        async with self.db_pool.acquire() as conn:
+            records = await conn.fetch(CANARD_BLOCKS_QUERY, canard_id, index_min, index_max)
+            cles = await self._cles(conn, {r["gaveur_id"] for r in records}, {})
+            checkpoint = await self.dernier_checkpoint(conn)
+
+        resultat_lot = await self._verifier_lot(
+            [_ligne(r) for r in records], cles, [r["hash_predecesseur"] for r in records]
+        )
+        erreurs = [f"Bloc {index}: {message}" for index, message in resultat_lot["erreurs"]]
+
+        couvert = bool(records) and checkpoint is not None and all(
+            (r["timestamp"], r["index"]) <= (checkpoint["dernier_timestamp"], checkpoint["dernier_index"])
+            for r in records
+        )
+        return {
+            "canard_id": canard_id,
+            "index_min": index_min,
+            "index_max": index_max,
+            "valide": not erreurs,
+            "erreurs": erreurs[:MAX_ERREURS],
+            "blocs_verifies": len(records),
+            "signatures_non_verifiables": resultat_lot["sans_cle"],
+            "couvert_par_checkpoint": couvert,
+        }
+
+
+# Instance globale
+chain_verifier: Optional[ChainVerifier] = None
+
+
+def get_chain_verifier(db_pool: asyncpg.Pool) -> ChainVerifier:
+    """Obtenir le vérificateur de la chaîne persistée"""
+    global chain_verifier
+    if chain_verifier is None:
+        chain_verifier = ChainVerifier(db_pool)
+    return chain_verifier
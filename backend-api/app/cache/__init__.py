@@ -3,6 +3,6 @@ Cache module for API responses
 Sprint 6B - Optimisations Backend
 """
 
-from .simple_cache import SimpleCache, get_cache, cache_response
+from .simple_cache import SimpleCache, get_cache, cache_response, invalidate_lot
 
-__all__ = ['SimpleCache', 'get_cache', 'cache_response']
+__all__ = ['SimpleCache', 'get_cache', 'cache_response', 'invalidate_lot']
@@ -4,12 +4,29 @@ Sprint 6B - Optimisations Backend
 
 Cache LRU (Least Recently Used) avec TTL (Time To Live)
 
+- OrderedDict : get/set/éviction en O(1), get rafraîchit la récence
+- Tas d'expiration paresseux : les entrées expirées sont purgées au fil des
+  set() sans parcourir tout le cache
+- Limite optionnelle en octets (taille estimée des valeurs)
+- Singleflight : un seul calcul par clé manquante, les autres requêtes
+  attendent le même résultat (évite la ruée sur une courbe théorique)
+- Tags : invalidation de toutes les entrées d'un lot_id
+
+Ce cache sert aussi de L1 (par process) au CacheManager Redis
+(app/core/cache.py) : quand celui-ci est initialisé, cache_response et
+invalidate_lot passent par les deux niveaux.
+
 Auteur: Claude Sonnet 4.5
 Date: 11 Janvier 2026
 """
 
+import asyncio
+import heapq
+import inspect
+import sys
 import time
-from typing import Any, Optional, Dict, Tuple
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
 from functools import wraps
 import hashlib
 import json
@@ -17,6 +34,33 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Types d'arguments sérialisés directement dans la clé (sans json + md5)
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """Estimation (octets) de l'empreinte mémoire d'une valeur JSON-like"""
+    size = sys.getsizeof(value)
+    if _depth > 16:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth + 1)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expiry", "size", "tags")
+
+    def __init__(self, value: Any, expiry: float, size: int, tags: Tuple[str, ...]):
+        self.value = value
+        self.expiry = expiry
+        self.size = size
+        self.tags = tags
+
 
 class SimpleCache:
     """
@@ -24,72 +68,213 @@ class SimpleCache:
 
     Features:
     - TTL configurable par clé
-    - Max size pour éviter memory leak
-    - Métriques (hits/misses)
+    - Max size (entrées) et max bytes (optionnel) pour éviter memory leak
+    - Invalidation par tag (ex: "lot_id:42")
+    - get_or_compute avec singleflight
+    - Métriques (hits/misses/évictions)
     """
 
-    def __init__(self, max_size: int = 1000, default_ttl: int = 3600):
+    def __init__(self, max_size: int = 1000, default_ttl: int = 3600, max_bytes: Optional[int] = None):
         """
         Args:
             max_size: Nombre maximum d'entrées (défaut: 1000)
             default_ttl: TTL par défaut en secondes (défaut: 1h)
+            max_bytes: Taille maximale estimée des valeurs (None = pas de limite)
         """
         self.max_size = max_size
         self.default_ttl = default_ttl
-        self.cache: Dict[str, Tuple[Any, float]] = {}
+        self.max_bytes = max_bytes
+        self.cache: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.total_bytes = 0
+
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._tags: Dict[str, Set[str]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Incrémenté à chaque invalidation : un calcul lancé avant n'est pas mis en cache
+        self._invalidation_generation = 0
+
         self.hits = 0
         self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.singleflight_waits = 0
 
     def _make_key(self, *args, **kwargs) -> str:
         """Génère une clé de cache depuis les arguments"""
+        # Cas courant (lot_id, site_code, ...) : clé lisible sans hash
+        if all(isinstance(a, _SCALAR_TYPES) for a in args) and all(
+            isinstance(v, _SCALAR_TYPES) for v in kwargs.values()
+        ):
+            return repr((args, sorted(kwargs.items())))
+
         key_data = {
             'args': args,
             'kwargs': kwargs
         }
-        key_str = json.dumps(key_data, sort_keys=True)
+        key_str = json.dumps(key_data, sort_keys=True, default=str)
         return hashlib.md5(key_str.encode()).hexdigest()
 
     def get(self, key: str) -> Optional[Any]:
-        """Récupère une valeur du cache"""
-        if key not in self.cache:
+        """Récupère une valeur du cache (et la marque comme récemment utilisée)"""
+        entry = self.cache.get(key)
+        if entry is None:
             self.misses += 1
             return None
 
-        value, expiry = self.cache[key]
-
         # Vérifier expiration
-        if time.time() > expiry:
-            del self.cache[key]
+        if time.monotonic() > entry.expiry:
+            self._remove(key)
+            self.expirations += 1
             self.misses += 1
             return None
 
+        self.cache.move_to_end(key)
         self.hits += 1
-        return value
+        return entry.value
 
-    def set(self, key: str, value: Any, ttl: Optional[int] = None):
-        """Ajoute une valeur au cache"""
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, tags: Iterable[str] = ()):
+        """
+        Ajoute une valeur au cache
+
+        Args:
+            key: Clé de cache
+            value: Valeur
+            ttl: TTL en secondes (None = défaut du cache)
+            tags: Tags d'invalidation (ex: "lot_id:42")
+        """
         # Appliquer TTL
         ttl = ttl if ttl is not None else self.default_ttl
-        expiry = time.time() + ttl
+        expiry = time.monotonic() + ttl
+        size = estimate_size(value) if self.max_bytes is not None else 0
 
-        # Si cache plein, supprimer entrée la plus ancienne (LRU)
-        if len(self.cache) >= self.max_size:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][1])
-            del self.cache[oldest_key]
-            logger.warning(f"Cache full, evicted key: {oldest_key}")
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.warning(f"Cache value too large ({size} bytes), not cached: {key}")
+            return
 
-        self.cache[key] = (value, expiry)
+        if key in self.cache:
+            self._remove(key)
+
+        tags = tuple(tags)
+        self.cache[key] = _Entry(value, expiry, size, tags)
+        self.total_bytes += size
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        heapq.heappush(self._expiry_heap, (expiry, key))
+
+        self._purge_expired()
+
+        # Si cache plein, supprimer les entrées les moins récemment utilisées
+        while len(self.cache) > self.max_size or (
+            self.max_bytes is not None and self.total_bytes > self.max_bytes
+        ):
+            oldest_key = next(iter(self.cache))
+            self._remove(oldest_key)
+            self.evictions += 1
+            logger.debug(f"Cache full, evicted key: {oldest_key}")
+
+    def _purge_expired(self):
+        """Purge les entrées expirées en tête du tas (les entrées périmées du tas sont ignorées)"""
+        now = time.monotonic()
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expiry, key = heapq.heappop(heap)
+            entry = self.cache.get(key)
+            if entry is not None and entry.expiry == expiry:
+                self._remove(key)
+                self.expirations += 1
+
+        # Le tas garde les anciennes échéances des clés réécrites : on le reconstruit s'il dérive
+        if len(heap) > 2 * self.max_size + 64:
+            self._expiry_heap = [(e.expiry, k) for k, e in self.cache.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _remove(self, key: str):
+        entry = self.cache.pop(key, None)
+        if entry is None:
+            return
+        self.total_bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
 
     def delete(self, key: str):
         """Supprime une clé du cache"""
-        if key in self.cache:
-            del self.cache[key]
+        self._remove(key)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """
+        Supprime toutes les entrées portant un tag
+
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        self._invalidation_generation += 1
+        keys = list(self._tags.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        if keys:
+            logger.debug(f"Cache invalidated tag {tag}: {len(keys)} entries")
+        return len(keys)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        Retourne la valeur en cache ou la calcule une seule fois (singleflight)
+
+        Les appels concurrents sur la même clé manquante attendent le calcul en
+        cours au lieu de relancer la requête. Une exception est propagée à tous
+        les appelants et rien n'est mis en cache.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.singleflight_waits += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._invalidation_generation
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Évite "exception never retrieved" si personne n'attendait
+            future.exception()
+            raise
+        else:
+            if value is not None and generation == self._invalidation_generation:
+                self.set(key, value, ttl=ttl, tags=tags)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
 
     def clear(self):
         """Vide le cache"""
+        self._invalidation_generation += 1
         self.cache.clear()
+        self._expiry_heap.clear()
+        self._tags.clear()
+        self.total_bytes = 0
         self.hits = 0
         self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.singleflight_waits = 0
         logger.info("Cache cleared")
 
     def get_stats(self) -> Dict:
@@ -100,17 +285,24 @@ class SimpleCache:
         return {
             'size': len(self.cache),
             'max_size': self.max_size,
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
             'hits': self.hits,
             'misses': self.misses,
             'hit_rate_pct': round(hit_rate, 2),
-            'total_requests': total
+            'total_requests': total,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'singleflight_waits': self.singleflight_waits,
+            'tags': len(self._tags)
         }
 
 
 # Instance globale du cache
 _cache_instance = SimpleCache(
     max_size=500,      # 500 courbes en cache max
-    default_ttl=1800   # 30 minutes par défaut
+    default_ttl=1800,  # 30 minutes par défaut
+    max_bytes=64 * 1024 * 1024  # ~64 Mo estimés
 )
 
 
@@ -119,41 +311,76 @@ def get_cache() -> SimpleCache:
     return _cache_instance
 
 
-def cache_response(ttl: Optional[int] = None, key_prefix: str = ""):
+def _get_tiered_cache():
+    """CacheManager L1+L2 si initialisé (import tardif : app.core.cache importe ce module)"""
+    try:
+        from app.core.cache import get_cache as get_tiered_cache
+    except ImportError:
+        return None
+    return get_tiered_cache()
+
+
+async def invalidate_lot(lot_id: Any) -> int:
+    """
+    Supprime toutes les réponses en cache d'un lot (courbe régénérée, validée, ...)
+
+    Avec Redis, l'invalidation est aussi propagée aux autres workers.
+
+    Returns:
+        Nombre d'entrées supprimées du cache local
+    """
+    tag = f"lot_id:{lot_id}"
+    count = get_cache().invalidate_tag(tag)
+    tiered = _get_tiered_cache()
+    if tiered is not None:
+        await tiered.invalidate_tag(tag)
+    return count
+
+
+# Paramètres jamais inclus dans la clé (objets FastAPI / connexions)
+_KEY_EXCLUDED_PARAMS = ("request", "conn", "db", "pool")
+
+
+def cache_response(ttl: Optional[int] = None, key_prefix: str = "", tag_params: Tuple[str, ...] = ("lot_id",)):
     """
     Décorateur pour cacher les réponses API
 
     Args:
         ttl: Durée de vie en secondes (None = défaut du cache)
         key_prefix: Préfixe pour la clé de cache
+        tag_params: Paramètres transformés en tags "<nom>:<valeur>" pour
+            l'invalidation (voir invalidate_lot)
 
     Example:
         @cache_response(ttl=600, key_prefix="courbe_theo")
         async def get_courbe_theorique(lot_id: int):
             ...
+
+        await invalidate_lot(lot_id)  # après régénération de la courbe
     """
     def decorator(func):
+        signature = inspect.signature(func)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
             cache = get_cache()
 
-            # Générer clé de cache
-            cache_key = f"{key_prefix}:{cache._make_key(*args, **kwargs)}"
-
-            # Vérifier cache
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache HIT: {key_prefix}")
-                return cached_value
-
-            # Cache miss - appeler fonction
-            logger.debug(f"Cache MISS: {key_prefix}")
-            result = await func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key_args = {k: v for k, v in bound.arguments.items() if k not in _KEY_EXCLUDED_PARAMS}
+            tags = [f"{name}:{key_args[name]}" for name in tag_params if key_args.get(name) is not None]
 
-            # Mettre en cache
-            cache.set(cache_key, result, ttl=ttl)
-
-            return result
+            # Générer clé de cache
+            cache_key = f"{key_prefix}:{cache._make_key(**key_args)}"
+
+            # L1 + Redis si disponible, sinon L1 seul
+            target = _get_tiered_cache() or cache
+            return await target.get_or_compute(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                tags=tags,
+            )
 
         return wrapper
     return decorator
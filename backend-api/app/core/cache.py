@@ -1,19 +1,57 @@
 """
 Redis Cache Manager for SQAL Backend
 Provides caching layer to reduce database load and improve response times
+
+Two tiers:
+- L1: per-process in-memory SimpleCache (app/cache/simple_cache.py)
+- L2: Redis, shared by every uvicorn worker
+
+Invalidations (delete, tag, pattern, device, all) are published on a Redis
+pub/sub channel so every worker also evicts its L1. Without Redis the cache
+degrades to L1 only.
 """
+import asyncio
+import fnmatch
 import json
 import logging
-from typing import Optional, Any, List, Dict
-from datetime import datetime, timedelta
+import os
+import time
+import uuid
+from decimal import Decimal
+from typing import Optional, Any, Awaitable, Callable, Iterable, List, Dict, Tuple
+from datetime import date, datetime, timedelta
 import redis.asyncio as redis
 
+from app.cache.simple_cache import SimpleCache, get_cache as get_l1_cache
+
+try:
+    from app.core.metrics import record_cache_operation
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "sqal:cache:invalidate")
+
+
+def _json_default(value: Any) -> Any:
+    """JSON encoder for values stored in L2 (same format FastAPI returns)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _namespace(key: str) -> str:
+    """Low-cardinality metric label: first key segment (device, dashboard, courbe_theo...)"""
+    return key.split(":", 1)[0]
+
 
 class CacheManager:
     """
-    Redis-based cache manager with automatic TTL and invalidation
+    Two-tier (L1 in-process + L2 Redis) cache manager with automatic TTL and invalidation
 
     Features:
     - Latest sample caching (10s TTL)
@@ -21,19 +59,36 @@ class CacheManager:
     - Historical stats caching (15min TTL)
     - Automatic serialization/deserialization
     - Connection pooling
+    - L1 eviction in every worker through Redis pub/sub
+    - L1-only degradation when Redis is unavailable
     """
 
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379",
+        l1: Optional[SimpleCache] = None,
+        l1_ttl: Optional[int] = None,
+    ):
         """
         Initialize cache manager
 
         Args:
             redis_url: Redis connection URL
+            l1: In-process cache (default: SimpleCache singleton)
+            l1_ttl: Max L1 TTL in seconds (CACHE_L1_TTL_S, default 30s). Bounds
+                staleness for L2 entries that expire or change without an
+                explicit invalidation.
         """
         self.redis_url = redis_url
         self.redis: Optional[redis.Redis] = None
         self._connected = False
 
+        self.l1 = l1 if l1 is not None else get_l1_cache()
+        self.l1_ttl = l1_ttl if l1_ttl is not None else int(os.getenv("CACHE_L1_TTL_S", "30"))
+        self.instance_id = uuid.uuid4().hex
+        self._pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+
     async def connect(self):
         """Establish Redis connection"""
         try:
@@ -49,13 +104,28 @@ class CacheManager:
             self._connected = True
             logger.info(f"✅ Redis connected: {self.redis_url}")
 
+            await self._start_invalidation_listener()
+
         except Exception as e:
             logger.error(f"❌ Redis connection failed: {e}")
-            logger.warning("⚠️ Running without cache - will use database directly")
+            logger.warning("⚠️ Running with in-process L1 cache only")
             self._connected = False
 
     async def disconnect(self):
         """Close Redis connection"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.close()
+            except Exception:
+                pass
+            self._pubsub = None
         if self.redis:
             await self.redis.close()
             self._connected = False
@@ -66,51 +136,230 @@ class CacheManager:
         return self._connected and self.redis is not None
 
     # ========================================================================
-    # LATEST SAMPLE CACHE (TTL: 10 seconds)
+    # TIERED GET / SET (L1 → L2)
     # ========================================================================
 
-    async def get_latest_sample(self) -> Optional[Dict[str, Any]]:
-        """
-        Get latest sensor sample from cache
+    def _record(self, tier: str, key: str, hit: bool, started: float):
+        if METRICS_AVAILABLE:
+            record_cache_operation("get", _namespace(key), hit, time.perf_counter() - started, tier=tier)
 
+    def _l1_ttl(self, ttl: Optional[int]) -> int:
+        return min(ttl, self.l1_ttl) if ttl is not None else self.l1_ttl
+
+    async def _get_l2(self, key: str) -> Tuple[Optional[Any], Optional[int]]:
+        """
         Returns:
-            Latest sample dict or None if not cached
+            (value, remaining TTL in seconds) — (None, None) on miss or Redis error
         """
         if not self._is_available():
-            return None
+            return None, None
 
+        started = time.perf_counter()
         try:
-            data = await self.redis.get("latest_sample")
-            if data:
-                logger.debug("✅ Cache HIT: latest_sample")
-                return json.loads(data)
-            else:
-                logger.debug("❌ Cache MISS: latest_sample")
-                return None
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.ttl(key)
+                data, remaining = await pipe.execute()
         except Exception as e:
             logger.error(f"Redis get error: {e}")
-            return None
+            return None, None
 
-    async def set_latest_sample(self, sample: Dict[str, Any], ttl: int = 10):
+        self._record("l2", key, data is not None, started)
+        if data is None:
+            logger.debug(f"❌ Cache MISS: {key}")
+            return None, None
+        logger.debug(f"✅ Cache HIT: {key}")
+        return json.loads(data), (remaining if remaining and remaining > 0 else None)
+
+    async def _set_l2(self, key: str, value: Any, ttl: int, tags: Iterable[str] = ()):
+        if not self._is_available():
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.setex(key, ttl, json.dumps(value, default=_json_default))
+                for tag in tags:
+                    pipe.sadd(f"tag:{tag}", key)
+                    pipe.expire(f"tag:{tag}", ttl)
+                await pipe.execute()
+            logger.debug(f"✅ Cache SET: {key} (TTL={ttl}s)")
+        except Exception as e:
+            logger.error(f"Redis set error: {e}")
+
+    async def get(self, key: str) -> Optional[Any]:
         """
-        Cache latest sensor sample
+        Get a value: L1 first, then Redis (L2 hits are promoted to L1)
+
+        Returns:
+            Cached value or None
+        """
+        started = time.perf_counter()
+        value = self.l1.get(key)
+        self._record("l1", key, value is not None, started)
+        if value is not None:
+            return value
+
+        value, remaining = await self._get_l2(key)
+        if value is not None:
+            self.l1.set(key, value, ttl=self._l1_ttl(remaining))
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int, tags: Iterable[str] = ()):
+        """
+        Set a value in both tiers
 
         Args:
-            sample: Sample dictionary
-            ttl: Time to live in seconds (default: 10s)
+            key: Cache key
+            value: JSON-serializable value
+            ttl: Time to live in seconds (L1 TTL is capped by l1_ttl)
+            tags: Invalidation tags (e.g. "lot_id:42")
         """
+        tags = tuple(tags)
+        self.l1.set(key, value, ttl=self._l1_ttl(ttl), tags=tags)
+        await self._set_l2(key, value, ttl, tags)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        L1 → L2 → loader, with singleflight on the L1 key (one computation per worker)
+        """
+        tags = tuple(tags)
+        ttl = ttl if ttl is not None else self.l1.default_ttl
+
+        started = time.perf_counter()
+        value = self.l1.get(key)
+        self._record("l1", key, value is not None, started)
+        if value is not None:
+            return value
+
+        async def load_through() -> Any:
+            cached, _ = await self._get_l2(key)
+            if cached is not None:
+                return cached
+            computed = await loader()
+            if computed is not None:
+                await self._set_l2(key, computed, ttl, tags)
+            return computed
+
+        return await self.l1.get_or_compute(key, load_through, ttl=self._l1_ttl(ttl), tags=tags)
+
+    # ========================================================================
+    # CROSS-WORKER L1 INVALIDATION (Redis pub/sub)
+    # ========================================================================
+
+    async def _start_invalidation_listener(self):
+        try:
+            self._pubsub = self.redis.pubsub()
+            await self._pubsub.subscribe(INVALIDATION_CHANNEL)
+            self._listener_task = asyncio.create_task(self._listen_invalidations())
+            logger.info(f"📡 Cache invalidation channel: {INVALIDATION_CHANNEL}")
+        except Exception as e:
+            logger.warning(f"⚠️ Cache invalidation listener not started: {e}")
+            self._pubsub = None
+
+    async def _listen_invalidations(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    self._apply_invalidation(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {e}")
+                await asyncio.sleep(1.0)
+
+    def _apply_invalidation(self, event: Dict[str, Any]) -> int:
+        """Evict L1 entries for an invalidation event (own events are already applied)"""
+        if event.get("origin") == self.instance_id:
+            return 0
+        return self._evict_l1(event)
+
+    def _evict_l1(self, event: Dict[str, Any]) -> int:
+        if event.get("all"):
+            count = len(self.l1.cache)
+            self.l1.clear()
+            return count
+
+        count = 0
+        for key in event.get("keys", ()):
+            if key in self.l1.cache:
+                self.l1.delete(key)
+                count += 1
+        for tag in event.get("tags", ()):
+            count += self.l1.invalidate_tag(tag)
+        pattern = event.get("pattern")
+        if pattern:
+            for key in [k for k in self.l1.cache if fnmatch.fnmatchcase(k, pattern)]:
+                self.l1.delete(key)
+                count += 1
+        return count
+
+    async def _invalidate(self, event: Dict[str, Any]):
+        """Apply locally, then broadcast to the other workers"""
+        self._evict_l1(event)
         if not self._is_available():
             return
-
         try:
-            await self.redis.setex(
-                "latest_sample",
-                ttl,
-                json.dumps(sample, default=str)  # default=str for datetime
-            )
-            logger.debug(f"✅ Cache SET: latest_sample (TTL={ttl}s)")
+            await self.redis.publish(INVALIDATION_CHANNEL, json.dumps({**event, "origin": self.instance_id}))
         except Exception as e:
-            logger.error(f"Redis set error: {e}")
+            logger.error(f"Redis publish error: {e}")
+
+    async def delete(self, *keys: str):
+        """Delete keys from both tiers in every worker"""
+        if not keys:
+            return
+        if self._is_available():
+            try:
+                await self.redis.delete(*keys)
+            except Exception as e:
+                logger.error(f"Redis delete error: {e}")
+        await self._invalidate({"keys": list(keys)})
+
+    async def invalidate_tag(self, tag: str):
+        """
+        Invalidate every entry carrying a tag (e.g. "lot_id:42") in both tiers
+
+        Args:
+            tag: Invalidation tag
+        """
+        if self._is_available():
+            try:
+                keys = await self.redis.smembers(f"tag:{tag}")
+                await self.redis.delete(f"tag:{tag}", *keys)
+                if keys:
+                    logger.info(f"🗑️ Cache cleared: {len(keys)} entries tagged {tag}")
+            except Exception as e:
+                logger.error(f"Redis invalidation error: {e}")
+        await self._invalidate({"tags": [tag]})
+
+    # ========================================================================
+    # LATEST SAMPLE CACHE (TTL: 10 seconds)
+    # ========================================================================
+
+    async def get_latest_sample(self) -> Optional[Dict[str, Any]]:
+        """
+        Get latest sensor sample from cache
+
+        Returns:
+            Latest sample dict or None if not cached
+        """
+        return await self.get("latest_sample")
+
+    async def set_latest_sample(self, sample: Dict[str, Any], ttl: int = 10):
+        """
+        Cache latest sensor sample
+
+        Args:
+            sample: Sample dictionary
+            ttl: Time to live in seconds (default: 10s)
+        """
+        await self.set("latest_sample", sample, ttl)
 
     # ========================================================================
     # DASHBOARD METRICS CACHE (TTL: 5 minutes)
@@ -123,20 +372,7 @@ class CacheManager:
         Returns:
             Metrics dict or None if not cached
         """
-        if not self._is_available():
-            return None
-
-        try:
-            data = await self.redis.get("dashboard:metrics")
-            if data:
-                logger.debug("✅ Cache HIT: dashboard:metrics")
-                return json.loads(data)
-            else:
-                logger.debug("❌ Cache MISS: dashboard:metrics")
-                return None
-        except Exception as e:
-            logger.error(f"Redis get error: {e}")
-            return None
+        return await self.get("dashboard:metrics")
 
     async def set_dashboard_metrics(self, metrics: Dict[str, Any], ttl: int = 300):
         """
@@ -146,18 +382,7 @@ class CacheManager:
             metrics: Metrics dictionary
             ttl: Time to live in seconds (default: 5min)
         """
-        if not self._is_available():
-            return
-
-        try:
-            await self.redis.setex(
-                "dashboard:metrics",
-                ttl,
-                json.dumps(metrics, default=str)
-            )
-            logger.debug(f"✅ Cache SET: dashboard:metrics (TTL={ttl}s)")
-        except Exception as e:
-            logger.error(f"Redis set error: {e}")
+        await self.set("dashboard:metrics", metrics, ttl)
 
     # ========================================================================
     # FOIE GRAS METRICS CACHE (TTL: 5 minutes)
@@ -165,33 +390,11 @@ class CacheManager:
 
     async def get_foie_gras_metrics(self) -> Optional[Dict[str, Any]]:
         """Get foie gras specific metrics from cache"""
-        if not self._is_available():
-            return None
-
-        try:
-            data = await self.redis.get("dashboard:foie_gras_metrics")
-            if data:
-                logger.debug("✅ Cache HIT: foie_gras_metrics")
-                return json.loads(data)
-            return None
-        except Exception as e:
-            logger.error(f"Redis get error: {e}")
-            return None
+        return await self.get("dashboard:foie_gras_metrics")
 
     async def set_foie_gras_metrics(self, metrics: Dict[str, Any], ttl: int = 300):
         """Cache foie gras metrics"""
-        if not self._is_available():
-            return
-
-        try:
-            await self.redis.setex(
-                "dashboard:foie_gras_metrics",
-                ttl,
-                json.dumps(metrics, default=str)
-            )
-            logger.debug(f"✅ Cache SET: foie_gras_metrics (TTL={ttl}s)")
-        except Exception as e:
-            logger.error(f"Redis set error: {e}")
+        await self.set("dashboard:foie_gras_metrics", metrics, ttl)
 
     # ========================================================================
     # DEVICE STATS CACHE (TTL: 15 minutes)
@@ -207,21 +410,7 @@ class CacheManager:
         Returns:
             Stats dict or None if not cached
         """
-        if not self._is_available():
-            return None
-
-        try:
-            key = f"device:{device_id}:stats"
-            data = await self.redis.get(key)
-            if data:
-                logger.debug(f"✅ Cache HIT: {key}")
-                return json.loads(data)
-            else:
-                logger.debug(f"❌ Cache MISS: {key}")
-                return None
-        except Exception as e:
-            logger.error(f"Redis get error: {e}")
-            return None
+        return await self.get(f"device:{device_id}:stats")
 
     async def set_device_stats(
         self,
@@ -237,19 +426,7 @@ class CacheManager:
             stats: Statistics dictionary
             ttl: Time to live in seconds (default: 15min)
         """
-        if not self._is_available():
-            return
-
-        try:
-            key = f"device:{device_id}:stats"
-            await self.redis.setex(
-                key,
-                ttl,
-                json.dumps(stats, default=str)
-            )
-            logger.debug(f"✅ Cache SET: {key} (TTL={ttl}s)")
-        except Exception as e:
-            logger.error(f"Redis set error: {e}")
+        await self.set(f"device:{device_id}:stats", stats, ttl)
 
     # ========================================================================
     # AGGREGATED DATA CACHE (TTL: 10 minutes)
@@ -257,19 +434,7 @@ class CacheManager:
 
     async def get_hourly_aggregates(self, device_id: str) -> Optional[List[Dict]]:
         """Get hourly aggregates from cache"""
-        if not self._is_available():
-            return None
-
-        try:
-            key = f"aggregates:hourly:{device_id}"
-            data = await self.redis.get(key)
-            if data:
-                logger.debug(f"✅ Cache HIT: {key}")
-                return json.loads(data)
-            return None
-        except Exception as e:
-            logger.error(f"Redis get error: {e}")
-            return None
+        return await self.get(f"aggregates:hourly:{device_id}")
 
     async def set_hourly_aggregates(
         self,
@@ -278,19 +443,7 @@ class CacheManager:
         ttl: int = 600
     ):
         """Cache hourly aggregates"""
-        if not self._is_available():
-            return
-
-        try:
-            key = f"aggregates:hourly:{device_id}"
-            await self.redis.setex(
-                key,
-                ttl,
-                json.dumps(aggregates, default=str)
-            )
-            logger.debug(f"✅ Cache SET: {key} (TTL={ttl}s)")
-        except Exception as e:
-            logger.error(f"Redis set error: {e}")
+        await self.set(f"aggregates:hourly:{device_id}", aggregates, ttl)
 
     # ========================================================================
     # CACHE INVALIDATION
@@ -298,14 +451,13 @@ class CacheManager:
 
     async def invalidate_all(self):
         """Invalidate all cache entries"""
-        if not self._is_available():
-            return
-
-        try:
-            await self.redis.flushdb()
-            logger.info("🗑️ Cache cleared: all entries")
-        except Exception as e:
-            logger.error(f"Redis flush error: {e}")
+        if self._is_available():
+            try:
+                await self.redis.flushdb()
+                logger.info("🗑️ Cache cleared: all entries")
+            except Exception as e:
+                logger.error(f"Redis flush error: {e}")
+        await self._invalidate({"all": True})
 
     async def invalidate_device(self, device_id: str):
         """
@@ -314,21 +466,7 @@ class CacheManager:
         Args:
             device_id: Device identifier
         """
-        if not self._is_available():
-            return
-
-        try:
-            # Find all keys for this device
-            pattern = f"device:{device_id}:*"
-            keys = []
-            async for key in self.redis.scan_iter(match=pattern):
-                keys.append(key)
-
-            if keys:
-                await self.redis.delete(*keys)
-                logger.info(f"🗑️ Cache cleared: {len(keys)} entries for device {device_id}")
-        except Exception as e:
-            logger.error(f"Redis invalidation error: {e}")
+        await self.invalidate_pattern(f"device:{device_id}:*")
 
     async def invalidate_pattern(self, pattern: str):
         """
@@ -337,19 +475,18 @@ class CacheManager:
         Args:
             pattern: Redis key pattern (e.g., "dashboard:*")
         """
-        if not self._is_available():
-            return
-
-        try:
-            keys = []
-            async for key in self.redis.scan_iter(match=pattern):
-                keys.append(key)
-
-            if keys:
-                await self.redis.delete(*keys)
-                logger.info(f"🗑️ Cache cleared: {len(keys)} entries matching {pattern}")
-        except Exception as e:
-            logger.error(f"Redis invalidation error: {e}")
+        if self._is_available():
+            try:
+                keys = []
+                async for key in self.redis.scan_iter(match=pattern):
+                    keys.append(key)
+
+                if keys:
+                    await self.redis.delete(*keys)
+                    logger.info(f"🗑️ Cache cleared: {len(keys)} entries matching {pattern}")
+            except Exception as e:
+                logger.error(f"Redis invalidation error: {e}")
+        await self._invalidate({"pattern": pattern})
 
     # ========================================================================
     # CACHE STATISTICS
@@ -365,7 +502,8 @@ class CacheManager:
         if not self._is_available():
             return {
                 "available": False,
-                "error": "Redis not connected"
+                "error": "Redis not connected",
+                "l1": self.l1.get_stats(),
             }
 
         try:
@@ -382,6 +520,7 @@ class CacheManager:
                 "hit_rate": self._calculate_hit_rate(info),
                 "evicted_keys": info.get('evicted_keys', 0),
                 "expired_keys": info.get('expired_keys', 0),
+                "l1": self.l1.get_stats(),
             }
         except Exception as e:
             logger.error(f"Redis stats error: {e}")
@@ -438,9 +577,15 @@ class CacheManager:
 # ============================================================================
 
 # Will be initialized in main.py lifespan
-cache: Optional[CacheManager] = None
+cache_manager: Optional[CacheManager] = None
+
+
+def set_cache_manager(manager: Optional[CacheManager]):
+    """Register the global cache instance (main.py lifespan)"""
+    global cache_manager
+    cache_manager = manager
 
 
 def get_cache() -> Optional[CacheManager]:
     """Get global cache instance"""
-    return cache
+    return cache_manager
@@ -0,0 +1,124 @@
+"""
+Shared asyncpg pool helpers for routers
+
+Routers borrow connections from app.state.db_pool (created in main.py lifespan)
+instead of opening one TCP + auth handshake per HTTP request:
+- pool_settings(): create_pool kwargs (sizes, statement cache) from env
+- pooled_connection(router): FastAPI dependency with a per-router acquire
+  timeout (503 when the pool stays saturated)
+- acquire_connection(): same, as an async context manager for code paths
+  without Depends
+
+Acquire wait, timeouts and pool saturation are exported via Prometheus.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import asyncpg
+from fastapi import HTTPException, Request
+
+try:
+    from app.core.metrics import record_db_pool_acquire, update_db_pool_metrics
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def pool_settings() -> Dict[str, Any]:
+    """
+    asyncpg.create_pool kwargs from environment
+
+    statement_cache_size caches prepared statements per pooled connection, so
+    repeated dashboard queries skip parse/plan. Set DB_STATEMENT_CACHE_SIZE=0
+    behind PgBouncer in transaction mode.
+    """
+    return {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "5")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "20")),
+        "statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024")),
+        "max_cached_statement_lifetime": int(os.getenv("DB_STATEMENT_CACHE_LIFETIME_S", "3600")),
+        "max_inactive_connection_lifetime": float(os.getenv("DB_POOL_MAX_INACTIVE_S", "300")),
+        "command_timeout": float(os.getenv("DB_COMMAND_TIMEOUT_S", "60")),
+    }
+
+
+def acquire_timeout_for(router: str, default: Optional[float] = None) -> float:
+    """Acquire timeout: DB_ACQUIRE_TIMEOUT_<ROUTER>_S, then DB_ACQUIRE_TIMEOUT_S (5s)"""
+    value = os.getenv(f"DB_ACQUIRE_TIMEOUT_{router.upper()}_S")
+    if value is None:
+        value = default if default is not None else os.getenv("DB_ACQUIRE_TIMEOUT_S", "5")
+    return float(value)
+
+
+def report_pool_metrics(pool: asyncpg.Pool):
+    """Publish size / idle / saturation gauges for the pool"""
+    if not METRICS_AVAILABLE:
+        return
+    try:
+        update_db_pool_metrics(pool.get_size(), pool.get_idle_size(), pool.get_max_size())
+    except Exception as e:
+        logger.debug(f"Pool metrics unavailable: {e}")
+
+
+@asynccontextmanager
+async def acquire_connection(pool: asyncpg.Pool, router: str, timeout: Optional[float] = None) -> AsyncIterator[asyncpg.Connection]:
+    """
+    Borrow a pooled connection
+
+    Raises:
+        HTTPException 503: pool saturated for longer than the acquire timeout
+    """
+    if pool is None:
+        raise HTTPException(status_code=503, detail="Base de données non initialisée")
+
+    timeout = timeout if timeout is not None else acquire_timeout_for(router)
+    started = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=timeout)
+    except asyncio.TimeoutError:
+        if METRICS_AVAILABLE:
+            record_db_pool_acquire(router, time.perf_counter() - started, timed_out=True)
+        report_pool_metrics(pool)
+        logger.warning(f"⚠️ Pool DB saturé ({router}): pas de connexion en {timeout}s")
+        raise HTTPException(
+            status_code=503,
+            detail="Base de données saturée, réessayez",
+            headers={"Retry-After": "1"},
+        )
+
+    if METRICS_AVAILABLE:
+        record_db_pool_acquire(router, time.perf_counter() - started, timed_out=False)
+    report_pool_metrics(pool)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+        report_pool_metrics(pool)
+
+
+def pooled_connection(router: str, timeout: Optional[float] = None) -> Callable:
+    """
+    FastAPI dependency yielding a connection from app.state.db_pool
+
+    Example:
+        get_db_connection = pooled_connection("euralis")
+
+        @router.get("/dashboard/kpis")
+        async def get_dashboard_kpis(conn = Depends(get_db_connection)):
+            ...
+    """
+    acquire_timeout = acquire_timeout_for(router, timeout)
+
+    async def dependency(request: Request) -> AsyncIterator[asyncpg.Connection]:
+        pool = getattr(request.app.state, "db_pool", None)
+        async with acquire_connection(pool, router, acquire_timeout) as conn:
+            yield conn
+
+    dependency.__name__ = f"get_{router}_db_connection"
+    return dependency
@@ -0,0 +1,111 @@
+"""
+Lazy loading for the heavy ML stacks
+
+app.api.advanced_routes used to import TensorFlow (computer_vision),
+Whisper/torch (voice_assistant), DEAP (multiobjective_optimization) and
+Prophet (analytics_engine) at module load, so every uvicorn worker and test
+process paid several seconds of imports for endpoints it might never serve.
+
+- LazyModule.aget(): first request imports the module in a worker thread
+  (the event loop keeps serving), later calls return it immediately
+- prewarm(): optional background import of the stacks after readiness
+  (ML_PREWARM=all or a comma list of stack names, ML_PREWARM_DELAY_S)
+
+Cold-start regressions are caught by tests/unit/test_lazy_modules.py, which
+runs `python -X importtime` on the API modules (see scripts/import_time_report.py).
+"""
+import asyncio
+import importlib
+import logging
+import os
+import threading
+import time
+from types import ModuleType
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyModule:
+    """Module imported on first use, once per process"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+        self.load_time_s: Optional[float] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def get(self) -> ModuleType:
+        """Import synchronously (Celery tasks, scripts, threads)"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.name)
+                    self.load_time_s = round(time.perf_counter() - started, 3)
+                    self._module = module
+                    logger.info(f"Lazy module {self.name} loaded in {self.load_time_s}s")
+        return self._module
+
+    async def aget(self) -> ModuleType:
+        """Import off the event loop on first call"""
+        if self._module is not None:
+            return self._module
+        return await asyncio.to_thread(self.get)
+
+
+# Heavy stacks behind app.api.advanced_routes
+ML_STACKS: Dict[str, LazyModule] = {
+    "analytics": LazyModule("app.ml.analytics_engine"),             # Prophet
+    "vision": LazyModule("app.ml.computer_vision"),                 # TensorFlow / Keras
+    "voice": LazyModule("app.ml.voice_assistant"),                  # Whisper / torch
+    "multiobjective": LazyModule("app.ml.multiobjective_optimization"),  # DEAP
+}
+
+analytics_engine = ML_STACKS["analytics"]
+computer_vision = ML_STACKS["vision"]
+voice_assistant = ML_STACKS["voice"]
+multiobjective_optimization = ML_STACKS["multiobjective"]
+
+
+def prewarm_names_from_env() -> List[str]:
+    """ML_PREWARM: '' / 'none' (default), 'all', or e.g. 'analytics,multiobjective'"""
+    value = os.getenv("ML_PREWARM", "").strip().lower()
+    if value in ("", "none", "false", "0"):
+        return []
+    if value == "all":
+        return list(ML_STACKS)
+    return [name.strip() for name in value.split(",") if name.strip() in ML_STACKS]
+
+
+async def prewarm(names: Optional[Iterable[str]] = None, delay_s: float = 0.0) -> Dict[str, Any]:
+    """
+    Import the given stacks one after another in a worker thread
+
+    Failures (missing optional dependency) are logged, not raised: the
+    endpoint will report them on first use as before.
+    """
+    if delay_s > 0:
+        await asyncio.sleep(delay_s)
+    results: Dict[str, Any] = {}
+    for name in (names if names is not None else ML_STACKS):
+        lazy = ML_STACKS[name]
+        try:
+            await lazy.aget()
+            results[name] = lazy.load_time_s
+        except Exception as e:
+            logger.warning(f"ML stack '{name}' prewarm failed: {e}")
+            results[name] = None
+    logger.info(f"ML stacks prewarmed: {results}")
+    return results
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        name: {"module": lazy.name, "loaded": lazy.loaded, "load_time_s": lazy.load_time_s}
+        for name, lazy in ML_STACKS.items()
+    }
@@ -85,14 +85,14 @@ http_response_size_bytes = Histogram(
 cache_hits_total = Counter(
     'cache_hits_total',
     'Total cache hits',
-    ['cache_key'],
+    ['cache_key', 'tier'],  # tier: l1 (in-process) / l2 (redis)
     registry=metrics_registry
 )
 
 cache_misses_total = Counter(
     'cache_misses_total',
     'Total cache misses',
-    ['cache_key'],
+    ['cache_key', 'tier'],
     registry=metrics_registry
 )
 
@@ -222,6 +222,27 @@ db_pool_available = Gauge(
     registry=metrics_registry
 )
 
+db_pool_saturation_ratio = Gauge(
+    'db_pool_saturation_ratio',
+    'Connections in use divided by pool max size',
+    registry=metrics_registry
+)
+
+db_pool_acquire_wait_seconds = Histogram(
+    'db_pool_acquire_wait_seconds',
+    'Time waiting for a pooled database connection',
+    ['router'],
+    buckets=[0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0],
+    registry=metrics_registry
+)
+
+db_pool_acquire_timeouts_total = Counter(
+    'db_pool_acquire_timeouts_total',
+    'Pool acquire attempts that timed out (503 returned)',
+    ['router'],
+    registry=metrics_registry
+)
+
 # ============================================================================
 # WebSocket Metrics
 # ============================================================================
@@ -247,6 +268,34 @@ websocket_errors_total = Counter(
     registry=metrics_registry
 )
 
+# Per-dashboard outbound queues (/ws/realtime/)
+realtime_outbox_queued_messages = Gauge(
+    'realtime_outbox_queued_messages',
+    'Messages waiting in dashboard outbound queues (all clients)',
+    registry=metrics_registry
+)
+
+realtime_outbox_dropped_total = Counter(
+    'realtime_outbox_dropped_total',
+    'Messages dropped from dashboard outbound queues',
+    ['policy', 'reason'],  # reason: oldest/coalesced/overflow_disconnect
+    registry=metrics_registry
+)
+
+realtime_outbox_send_latency_seconds = Histogram(
+    'realtime_outbox_send_latency_seconds',
+    'Time from enqueue to completed send for dashboard messages',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+    registry=metrics_registry
+)
+
+realtime_outbox_disconnects_total = Counter(
+    'realtime_outbox_disconnects_total',
+    'Dashboards disconnected by their outbound writer',
+    ['reason'],  # reason: timeout/error/overflow
+    registry=metrics_registry
+)
+
 # ============================================================================
 # Business Metrics
 # ============================================================================
@@ -409,7 +458,7 @@ def record_sample_analyzed(device_id: str, grade: str, quality_score: float, pro
     logger.debug(f"📊 Metrics recorded: device={device_id}, grade={grade}, score={quality_score:.3f}")
 
 
-def record_cache_operation(operation: str, cache_key: str, hit: bool, duration: float):
+def record_cache_operation(operation: str, cache_key: str, hit: bool, duration: float, tier: str = "l2"):
     """
     Record cache operation metrics
 
@@ -418,13 +467,14 @@ def record_cache_operation(operation: str, cache_key: str, hit: bool, duration:
         cache_key: Cache key name
         hit: Whether it was a cache hit (for get operations)
         duration: Operation duration in seconds
+        tier: Cache tier (l1 = in-process, l2 = redis)
     """
     # Record hit/miss
     if operation == "get":
         if hit:
-            cache_hits_total.labels(cache_key=cache_key).inc()
+            cache_hits_total.labels(cache_key=cache_key, tier=tier).inc()
         else:
-            cache_misses_total.labels(cache_key=cache_key).inc()
+            cache_misses_total.labels(cache_key=cache_key, tier=tier).inc()
 
     # Record duration
     cache_operation_duration_seconds.labels(operation=operation, cache_key=cache_key).observe(duration)
@@ -444,6 +494,36 @@ def record_db_operation(operation: str, status: str, duration: float, query_type
     db_query_duration_seconds.labels(query_type=query_type).observe(duration)
 
 
+def record_db_pool_acquire(router: str, wait: float, timed_out: bool):
+    """
+    Record a pool acquire attempt
+
+    Args:
+        router: Router name (euralis, courbes, ...)
+        wait: Time spent waiting for a connection in seconds
+        timed_out: Whether the acquire timed out
+    """
+    db_pool_acquire_wait_seconds.labels(router=router).observe(wait)
+    if timed_out:
+        db_pool_acquire_timeouts_total.labels(router=router).inc()
+
+
+def update_db_pool_metrics(size: int, idle: int, max_size: int):
+    """
+    Update pool size / availability / saturation gauges
+
+    Args:
+        size: Open connections in the pool
+        idle: Idle connections
+        max_size: Pool max size
+    """
+    in_use = size - idle
+    db_pool_size.set(size)
+    db_pool_available.set(idle + (max_size - size))
+    db_connections_active.set(in_use)
+    db_pool_saturation_ratio.set(in_use / max_size if max_size else 0)
+
+
 def update_websocket_connections(endpoint: str, delta: int):
     """
     Update WebSocket connection count
@@ -469,6 +549,47 @@ def record_websocket_message(endpoint: str, direction: str):
     websocket_messages_total.labels(endpoint=endpoint, direction=direction).inc()
 
 
+def record_outbox_depth_change(delta: int):
+    """
+    Update total queued dashboard messages
+
+    Args:
+        delta: Change in queue depth for one outbox
+    """
+    realtime_outbox_queued_messages.inc(delta)
+
+
+def record_outbox_dropped(policy: str, reason: str):
+    """
+    Record a message dropped by a dashboard outbound queue
+
+    Args:
+        policy: Overflow policy (drop_oldest/coalesce/disconnect)
+        reason: Drop reason (oldest/coalesced/overflow_disconnect)
+    """
+    realtime_outbox_dropped_total.labels(policy=policy, reason=reason).inc()
+
+
+def record_outbox_send_latency(duration: float):
+    """
+    Record enqueue-to-send latency for a dashboard message
+
+    Args:
+        duration: Latency in seconds
+    """
+    realtime_outbox_send_latency_seconds.observe(duration)
+
+
+def record_outbox_disconnect(reason: str):
+    """
+    Record a dashboard disconnected by its outbound writer
+
+    Args:
+        reason: timeout/error/overflow
+    """
+    realtime_outbox_disconnects_total.labels(reason=reason).inc()
+
+
 def update_business_metrics(device_id: str, stats: dict):
     """
     Update business-level metrics
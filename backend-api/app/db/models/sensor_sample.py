@@ -12,10 +12,11 @@ class SensorSample(Base):
     __tablename__ = "sensor_samples"
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    # Clé composite : sensor_samples est une hypertable partitionnée sur timestamp
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, index=True)
 
     device_id: Mapped[str] = mapped_column(String(100), index=True)
-    sample_id: Mapped[str] = mapped_column(String(100), unique=True)
+    sample_id: Mapped[str] = mapped_column(String(100))
     lot_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     vl53l8ch_distance_matrix: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
@@ -82,6 +83,8 @@ class SensorSample(Base):
 
     __table_args__ = (
         Index("idx_sensor_samples_device_timestamp", "device_id", "timestamp"),
+        Index("ux_sensor_samples_sample_id_timestamp", "sample_id", "timestamp", unique=True),
+        Index("idx_sensor_samples_timestamp_sample_id", "timestamp", "sample_id"),
         Index("idx_sensor_samples_grade_timestamp", "fusion_final_grade", "timestamp"),
         Index("idx_sensor_samples_score_timestamp", "fusion_final_score", "timestamp"),
     )
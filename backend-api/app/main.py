@@ -23,7 +23,7 @@ from prometheus_client import Counter, Histogram, generate_latest
 from fastapi import Response
 
 # Import des routers Euralis (supervision multi-sites), SQAL (contrôle qualité) et Consumer Feedback
-from app.routers import euralis, sqal, consumer_feedback, simulator_control, bug_tracking, lots, ml, auth as gaveur_auth, notifications, control_panel, tasks, courbes, voice, ocr
+from app.routers import euralis, sqal, consumer_feedback, simulator_control, bug_tracking, lots, ml, auth as gaveur_auth, notifications, control_panel, tasks, courbes, voice, ocr, inference
 # Import router Advanced Routes (Analytics + Alertes IA)
 from app.api import advanced_routes
 # Import router Auth (Keycloak authentication)
@@ -31,7 +31,7 @@ from app.api import auth_routes
 
 # Import Production-ready Core Modules (Phase 2)
 try:
-    from app.core.cache import CacheManager
+    from app.core.cache import CacheManager, set_cache_manager
     from app.core.health import health_manager, initialize_health_checks
     from app.core.graceful_shutdown import shutdown_handler, initialize_graceful_shutdown, GracefulShutdownMiddleware
     from app.core.metrics import initialize_metrics, prometheus_middleware
@@ -127,11 +127,11 @@ async def lifespan(app: FastAPI):
         logger.info("⏳ Connecting to TimescaleDB...")
         # Disable SSL for local development (Windows host -> Docker container)
         import ssl
+        from app.core.db_pool import pool_settings
         db_pool = await asyncpg.create_pool(
             database_url,
-            min_size=5,
-            max_size=20,
-            ssl=False  # Disable SSL for localhost connections
+            ssl=False,  # Disable SSL for localhost connections
+            **pool_settings()  # DB_POOL_MIN/MAX_SIZE, statement cache, timeouts
         )
         app.state.db_pool = db_pool  # Make pool available for routers
         logger.info("  ✅ TimescaleDB connection established")
@@ -155,7 +155,11 @@ async def lifespan(app: FastAPI):
             cache_manager = CacheManager(redis_url)
             await cache_manager.connect()
             app.state.cache = cache_manager
-            logger.info("  ✅ Redis cache connected")
+            set_cache_manager(cache_manager)
+            if cache_manager._is_available():
+                logger.info("  ✅ Redis cache connected (L1 + L2)")
+            else:
+                logger.warning("  ⚠️  Redis unavailable, cache running L1-only (per process)")
             try:
                 health_manager.mark_component_healthy("cache")
             except AttributeError:
@@ -188,9 +192,38 @@ async def lifespan(app: FastAPI):
         from app.services.sqal_service import sqal_service
         await sqal_service.init_pool(database_url, shared_pool=db_pool)
         logger.info("  ✅ SQAL service initialized")
+
+        from app.services.sqal_ingestion import sqal_ingestion_queue
+        await sqal_ingestion_queue.start()
+        logger.info("  ✅ SQAL ingestion queue started")
     except Exception as e:
         logger.error(f"  ❌ SQAL service initialization failed: {e}")
 
+    # Gavage temps réel : pipeline d'écriture par lots pour /ws/gavage
+    try:
+        from app.services.gavage_ingestion import gavage_ingestion_pipeline
+        gavage_ingestion_pipeline.set_db_pool(db_pool)
+        await gavage_ingestion_pipeline.start()
+        logger.info("  ✅ Gavage ingestion pipeline started")
+    except Exception as e:
+        logger.error(f"  ❌ Gavage ingestion pipeline failed to start: {e}")
+
+    # Euralis KPI snapshot (dashboard servi depuis la mémoire)
+    try:
+        from app.services.euralis_kpi_snapshot import euralis_kpi_snapshot
+        await euralis_kpi_snapshot.start(db_pool)
+        logger.info("  ✅ Euralis KPI snapshot started")
+    except Exception as e:
+        logger.error(f"  ❌ Euralis KPI snapshot failed to start: {e}")
+
+    # Keycloak signing keys (JWKS cache + background refresh)
+    try:
+        from app.auth.keycloak import jwks_provider
+        await jwks_provider.start()
+        logger.info("  ✅ Keycloak JWKS provider started")
+    except Exception as e:
+        logger.warning(f"  ⚠️  Keycloak JWKS provider not started: {e}")
+
     # Consumer Feedback service (using shared db_pool)
     try:
         from app.services.consumer_feedback_service import consumer_feedback_service
@@ -207,11 +240,38 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"  ❌ Lot Registry service initialization failed: {e}")
 
+    # Model registry (versions actives ai_models chargées une fois par worker)
+    try:
+        from app.services.model_registry import model_registry
+        await model_registry.start(db_pool)
+        logger.info(f"  ✅ Model registry started ({len(model_registry.versions())} active models)")
+    except Exception as e:
+        logger.error(f"  ❌ Model registry failed to start: {e}")
+
+    # PySR predictor warm-load (aucun chargement sur le chemin requête)
+    try:
+        from app.ml.pysr_predictor_numpy import get_pysr_predictor_numpy
+        predictor = await asyncio.to_thread(get_pysr_predictor_numpy)
+        logger.info(f"  ✅ PySR predictor warm-loaded ({predictor.model_version})")
+    except Exception as e:
+        logger.warning(f"  ⚠️  PySR predictor not warm-loaded: {e}")
+
     # Step 6: Mark as ready
     if CORE_MODULES_AVAILABLE:
         health_manager.mark_as_started()
         health_manager.mark_as_ready()
 
+    # Optional background import of the heavy ML stacks (TensorFlow, Whisper, DEAP, Prophet)
+    from app.core import lazy_modules
+    prewarm_names = lazy_modules.prewarm_names_from_env()
+    app.state.ml_prewarm_task = None
+    if prewarm_names:
+        app.state.ml_prewarm_task = asyncio.create_task(
+            lazy_modules.prewarm(prewarm_names, delay_s=float(os.getenv("ML_PREWARM_DELAY_S", "5"))),
+            name="ml-prewarm"
+        )
+        logger.info(f"  ⏳ ML stacks prewarm scheduled: {', '.join(prewarm_names)}")
+
     logger.info("=" * 80)
     logger.info("✅ GAVEURS BACKEND FULLY STARTED AND READY!")
     logger.info("=" * 80)
@@ -244,6 +304,9 @@ async def lifespan(app: FastAPI):
     if CORE_MODULES_AVAILABLE:
         health_manager.mark_as_shutting_down()
 
+    if getattr(app.state, "ml_prewarm_task", None) is not None:
+        app.state.ml_prewarm_task.cancel()
+
     # Execute graceful shutdown (if available)
     if CORE_MODULES_AVAILABLE:
         try:
@@ -252,6 +315,63 @@ async def lifespan(app: FastAPI):
             logger.error(f"Graceful shutdown error: {e}")
 
     # Close application services
+    try:
+        from app.services.sqal_ingestion import sqal_ingestion_queue
+        await sqal_ingestion_queue.stop()
+        logger.info("  🔴 SQAL ingestion queue drained")
+    except Exception as e:
+        logger.error(f"Error stopping SQAL ingestion queue: {e}")
+
+    try:
+        from app.websocket.gavage_consumer import gavage_consumer
+        from app.services.gavage_ingestion import gavage_ingestion_pipeline
+        await gavage_ingestion_pipeline.stop()
+        await gavage_consumer.drain_background()
+        logger.info("  🔴 Gavage ingestion pipeline drained")
+    except Exception as e:
+        logger.error(f"Error stopping gavage ingestion pipeline: {e}")
+
+    try:
+        from app.services.euralis_kpi_snapshot import euralis_kpi_snapshot
+        await euralis_kpi_snapshot.stop()
+        logger.info("  🔴 Euralis KPI snapshot stopped")
+    except Exception as e:
+        logger.error(f"Error stopping Euralis KPI snapshot: {e}")
+
+    try:
+        from app.services.model_registry import model_registry
+        await model_registry.stop()
+    except Exception as e:
+        logger.error(f"Error stopping model registry: {e}")
+
+    try:
+        from app.blockchain import blockchain_service
+        if blockchain_service.blockchain is not None:
+            await blockchain_service.blockchain.vider()
+    except Exception as e:
+        logger.error(f"Error flushing pending blockchain batch: {e}")
+
+    try:
+        from app.blockchain import verification
+        if verification.chain_verifier is not None:
+            await verification.chain_verifier.shutdown()
+    except Exception as e:
+        logger.error(f"Error stopping blockchain verification pool: {e}")
+
+    try:
+        from app.services.inference_executor import inference_executor
+        await inference_executor.shutdown()
+        logger.info("  🔴 Inference pool stopped")
+    except Exception as e:
+        logger.error(f"Error stopping inference pool: {e}")
+
+    try:
+        from app.auth.keycloak import jwks_provider
+        await jwks_provider.stop()
+        logger.info("  🔴 Keycloak JWKS provider stopped")
+    except Exception as e:
+        logger.error(f"Error stopping Keycloak JWKS provider: {e}")
+
     try:
         from app.services.sqal_service import sqal_service
         await sqal_service.close_pool()
@@ -277,6 +397,7 @@ async def lifespan(app: FastAPI):
     if cache_manager:
         try:
             await cache_manager.disconnect()
+            set_cache_manager(None)
             logger.info("  🔴 Redis cache disconnected")
         except Exception as e:
             logger.error(f"Error closing cache: {e}")
@@ -356,6 +477,7 @@ app.include_router(notifications.router)      # Notifications (Email, SMS, Web P
 app.include_router(courbes.router)            # PySR 3-Courbes Workflow (Théorique/Réelle/Correction) - SPRINT 3
 app.include_router(voice.router)              # Reconnaissance vocale et parsing commandes - SAISIE RAPIDE
 app.include_router(ocr.router)                # OCR extraction texte documents (bons livraison, fiches) - SAISIE RAPIDE
+app.include_router(inference.router)          # Jobs inférence asynchrones (Whisper/OCR hors boucle)
 app.include_router(euralis.router)            # Supervision multi-sites
 app.include_router(sqal.router)               # Contrôle qualité SQAL
 app.include_router(consumer_feedback.router)  # Feedback consommateur + QR Code
@@ -762,13 +884,20 @@ async def init_blockchain(init_data: BlockchainInit):
 
 
 @app.get("/api/blockchain/canard/{canard_id}/history")
-async def get_blockchain_history(canard_id: int):
-    """Historique blockchain complet d'un canard"""
+async def get_blockchain_history(canard_id: int, index_min: Optional[int] = None, index_max: Optional[int] = None):
+    """Historique blockchain d'un canard (plage d'index optionnelle)"""
     blockchain = get_blockchain(db_pool)
-    historique = await blockchain.get_historique_canard(canard_id)
+    historique = await blockchain.get_historique_canard(canard_id, index_min=index_min, index_max=index_max)
     return historique
 
 
+@app.get("/api/blockchain/canard/{canard_id}/verify")
+async def verify_blockchain_canard(canard_id: int, index_min: Optional[int] = None, index_max: Optional[int] = None):
+    """Vérifier l'historique blockchain d'un canard (hash, signatures, chaînage)"""
+    from app.blockchain.verification import get_chain_verifier
+    return await get_chain_verifier(db_pool).verifier_canard(canard_id, index_min=index_min, index_max=index_max)
+
+
 @app.get("/api/blockchain/canard/{canard_id}/certificat")
 async def get_certificat_tracabilite(canard_id: int):
     """Certificat de traçabilité pour le consommateur"""
@@ -782,11 +911,16 @@ async def get_certificat_tracabilite(canard_id: int):
 
 
 @app.get("/api/blockchain/verify")
-async def verify_blockchain():
-    """Vérifier l'intégrité de la blockchain"""
-    blockchain = get_blockchain(db_pool)
-    result = await blockchain.verifier_integrite_chaine()
-    return result
+async def verify_blockchain(complet: bool = False):
+    """
+    Vérifier l'intégrité de la blockchain persistée
+
+    Incrémentale depuis le dernier checkpoint ; complet=true relance un audit
+    complet (préférer la tâche Celery verify_blockchain_integrity pour les
+    grandes chaînes).
+    """
+    from app.blockchain.verification import get_chain_verifier
+    return await get_chain_verifier(db_pool).verifier(complet=complet)
 
 
 @app.get("/api/blockchain/lot/{lot_id}/history")
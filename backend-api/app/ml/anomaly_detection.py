@@ -1,49 +1,425 @@
+"""
+Moteur de détection d'anomalies et d'alertes canards
+
+Évaluation ensembliste : toutes les règles de seuils (perte de poids, gain
+faible, température, humidité, refus alimentaire) sont calculées pour tous
+les canards ciblés en une requête à fonctions de fenêtre sur gavage_data ;
+les anomalies ML sont scorées par un IsolationForest pré-entraîné par
+génétique (et non ré-entraîné par animal) ; les alertes sont insérées en
+une instruction et les SMS critiques regroupés par gaveur.
+
+Usage:
+    engine = get_anomaly_detection(pool)
+    stats = await engine.sweep_alertes()                  # tous les canards en gavage
+    alertes = await engine.check_all_alerts_canard(42, "+33600000000")
+"""
+
+import asyncio
+import os
+import time
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import asyncpg
 from datetime import datetime, timedelta
 import logging
-from prophet import Prophet
 
 from app.models.schemas import AlerteCreate, AlerteNiveauEnum, SMSNotification
 from app.services.sms_service import sms_service
 
 logger = logging.getLogger(__name__)
 
+ANOMALY_MODEL_MAX_AGE_H = float(os.getenv("ANOMALY_MODEL_MAX_AGE_H", "24"))
+ANOMALY_TRAINING_DAYS = int(os.getenv("ANOMALY_TRAINING_DAYS", "30"))
+ANOMALY_TRAINING_MAX_ROWS = int(os.getenv("ANOMALY_TRAINING_MAX_ROWS", "50000"))
+ANOMALY_CONTAMINATION = float(os.getenv("ANOMALY_CONTAMINATION", "0.1"))
+ALERT_LOOKBACK_DAYS = int(os.getenv("ALERT_LOOKBACK_DAYS", "7"))
+ALERT_SMS_CONCURRENCY = int(os.getenv("ALERT_SMS_CONCURRENCY", "10"))
+
+# Seuils d'alertes configurables
+SEUILS_DEFAUT = {
+    "perte_poids_critique": -150,  # grammes
+    "perte_poids_warning": -80,
+    "gain_poids_faible_critique": 30,  # < 30g/jour
+    "gain_poids_faible_warning": 50,
+    "temperature_min": 18.0,
+    "temperature_max": 25.0,
+    "temperature_critique_min": 15.0,
+    "temperature_critique_max": 28.0,
+    "humidite_min": 50.0,
+    "humidite_max": 75.0,
+    "refus_alimentaire_pct": 30.0,  # Si dose < 70% théorique
+    "mortalite_lot_pct": 5.0,  # Alerte si > 5% du lot
+}
+
+ML_FEATURES = [
+    "dose_matin", "dose_soir", "poids_matin", "poids_soir",
+    "temperature_stabule", "humidite_stabule", "gain_journalier"
+]
+
+# Canards ciblés : liste explicite ($2), sinon tous les canards en gavage,
+# filtrés par lot ($3) / gaveur ($4)
+_CIBLE_CTE = """
+    cible AS (
+        SELECT c.id AS canard_id, c.gaveur_id, c.genetique, gv.telephone
+        FROM canards c
+        LEFT JOIN gaveurs gv ON gv.id = c.gaveur_id
+        WHERE (($2::int[] IS NOT NULL AND c.id = ANY($2::int[]))
+               OR ($2::int[] IS NULL AND c.statut = 'en_gavage'))
+          AND ($3::int IS NULL OR c.lot_id = $3)
+          AND ($4::int IS NULL OR c.gaveur_id = $4)
+    )
+"""
+
+# Une ligne par canard : dernière mesure (variation, température, humidité),
+# gain moyen sur 3 jours, dernière mesure avec doses théoriques.
+# $1 = profondeur d'historique en jours (NULL = tout l'historique)
+ALERT_RULES_QUERY = f"""
+    WITH {_CIBLE_CTE},
+    mesures AS (
+        SELECT
+            g.canard_id,
+            g.poids_soir - g.poids_matin AS variation,
+            g.temperature_stabule,
+            g.humidite_stabule,
+            g.dose_matin + g.dose_soir AS dose_reelle_totale,
+            g.dose_theorique_matin + g.dose_theorique_soir AS dose_theo_totale,
+            row_number() OVER (PARTITION BY g.canard_id ORDER BY g.time DESC) AS rang,
+            row_number() OVER (
+                PARTITION BY g.canard_id
+                ORDER BY (g.dose_theorique_matin IS NOT NULL AND g.dose_theorique_soir IS NOT NULL) DESC,
+                         g.time DESC
+            ) AS rang_theo,
+            avg(g.poids_soir - g.poids_matin) FILTER (
+                WHERE g.time >= NOW() - INTERVAL '3 days'
+                  AND g.poids_matin IS NOT NULL AND g.poids_soir IS NOT NULL
+            ) OVER (PARTITION BY g.canard_id) AS gain_moyen
+        FROM gavage_data g
+        JOIN cible ON cible.canard_id = g.canard_id
+        WHERE $1::int IS NULL OR g.time >= NOW() - make_interval(days => $1::int)
+    )
+    SELECT
+        m.canard_id,
+        cible.gaveur_id,
+        cible.genetique,
+        cible.telephone,
+        max(m.variation) FILTER (WHERE m.rang = 1) AS variation,
+        max(m.temperature_stabule) FILTER (WHERE m.rang = 1) AS temperature,
+        max(m.humidite_stabule) FILTER (WHERE m.rang = 1) AS humidite,
+        max(m.gain_moyen) AS gain_moyen,
+        max(m.dose_reelle_totale) FILTER (WHERE m.rang_theo = 1 AND m.dose_theo_totale IS NOT NULL) AS dose_reelle_totale,
+        max(m.dose_theo_totale) FILTER (WHERE m.rang_theo = 1) AS dose_theo_totale
+    FROM mesures m
+    JOIN cible ON cible.canard_id = m.canard_id
+    GROUP BY m.canard_id, cible.gaveur_id, cible.genetique, cible.telephone
+"""
+
+# Mesures de la fenêtre ML ($1 jours) pour tous les canards ciblés
+ML_WINDOW_QUERY = f"""
+    WITH {_CIBLE_CTE}
+    SELECT
+        g.canard_id,
+        cible.genetique,
+        g.time,
+        g.dose_matin,
+        g.dose_soir,
+        g.poids_matin,
+        g.poids_soir,
+        g.temperature_stabule,
+        g.humidite_stabule,
+        g.poids_soir - g.poids_matin AS gain_journalier
+    FROM gavage_data g
+    JOIN cible ON cible.canard_id = g.canard_id
+    WHERE g.time >= NOW() - make_interval(days => $1::int)
+      AND g.poids_matin IS NOT NULL
+      AND g.poids_soir IS NOT NULL
+      AND g.humidite_stabule IS NOT NULL
+    ORDER BY g.canard_id, g.time ASC
+"""
+
+ML_TRAINING_QUERY = """
+    SELECT
+        g.dose_matin,
+        g.dose_soir,
+        g.poids_matin,
+        g.poids_soir,
+        g.temperature_stabule,
+        g.humidite_stabule,
+        g.poids_soir - g.poids_matin AS gain_journalier
+    FROM gavage_data g
+    JOIN canards c ON c.id = g.canard_id
+    WHERE c.genetique = $1
+      AND g.time >= NOW() - make_interval(days => $2::int)
+      AND g.poids_matin IS NOT NULL
+      AND g.poids_soir IS NOT NULL
+      AND g.humidite_stabule IS NOT NULL
+    ORDER BY g.time DESC
+    LIMIT $3
+"""
+
+INSERT_ALERTES_QUERY = """
+    INSERT INTO alertes (
+        time, canard_id, niveau, type_alerte, message,
+        valeur_mesuree, valeur_seuil, sms_envoye
+    )
+    SELECT NOW(), a.canard_id, a.niveau, a.type_alerte, a.message,
+           a.valeur_mesuree, a.valeur_seuil, false
+    FROM unnest($1::int[], $2::text[], $3::text[], $4::text[], $5::numeric[], $6::numeric[])
+        AS a(canard_id, niveau, type_alerte, message, valeur_mesuree, valeur_seuil)
+    RETURNING id, time
+"""
+
+
+# ============================================================================
+# Règles de seuils (partagées par le canard unitaire et le balayage)
+# ============================================================================
+
+def regle_perte_poids(variation, seuils: Dict) -> Optional[Dict]:
+    """Perte de poids anormale sur la dernière mesure"""
+    if variation is None:
+        return None
+
+    if variation <= seuils["perte_poids_critique"]:
+        return {
+            "type": "perte_poids_critique",
+            "niveau": AlerteNiveauEnum.CRITIQUE,
+            "message": f"🚨 PERTE DE POIDS CRITIQUE: {variation:.0f}g - INTERVENTION URGENTE",
+            "valeur_mesuree": float(variation),
+            "valeur_seuil": seuils["perte_poids_critique"]
+        }
+    elif variation <= seuils["perte_poids_warning"]:
+        return {
+            "type": "perte_poids_warning",
+            "niveau": AlerteNiveauEnum.IMPORTANT,
+            "message": f"⚠️ Perte de poids anormale: {variation:.0f}g - Surveiller",
+            "valeur_mesuree": float(variation),
+            "valeur_seuil": seuils["perte_poids_warning"]
+        }
+
+    return None
+
+
+def regle_gain_poids_faible(gain_moyen, seuils: Dict) -> Optional[Dict]:
+    """Gain de poids moyen sur 3 jours trop faible"""
+    if gain_moyen is None:
+        return None
+
+    if gain_moyen <= seuils["gain_poids_faible_critique"]:
+        return {
+            "type": "gain_poids_faible_critique",
+            "niveau": AlerteNiveauEnum.CRITIQUE,
+            "message": f"🚨 Gain de poids insuffisant: {gain_moyen:.0f}g/jour - Revoir stratégie",
+            "valeur_mesuree": float(gain_moyen),
+            "valeur_seuil": seuils["gain_poids_faible_critique"]
+        }
+    elif gain_moyen <= seuils["gain_poids_faible_warning"]:
+        return {
+            "type": "gain_poids_faible",
+            "niveau": AlerteNiveauEnum.IMPORTANT,
+            "message": f"⚠️ Gain de poids sous la moyenne: {gain_moyen:.0f}g/jour",
+            "valeur_mesuree": float(gain_moyen),
+            "valeur_seuil": seuils["gain_poids_faible_warning"]
+        }
+
+    return None
+
+
+def regle_temperature(temp, seuils: Dict) -> Optional[Dict]:
+    """Température stabule de la dernière mesure"""
+    if temp is None:
+        return None
+
+    if temp <= seuils["temperature_critique_min"] or temp >= seuils["temperature_critique_max"]:
+        return {
+            "type": "temperature_critique",
+            "niveau": AlerteNiveauEnum.CRITIQUE,
+            "message": f"🚨 TEMPÉRATURE CRITIQUE: {temp:.1f}°C - Corriger immédiatement",
+            "valeur_mesuree": float(temp),
+            "valeur_seuil": f"{seuils['temperature_critique_min']}-{seuils['temperature_critique_max']}"
+        }
+    elif temp <= seuils["temperature_min"] or temp >= seuils["temperature_max"]:
+        return {
+            "type": "temperature_hors_zone",
+            "niveau": AlerteNiveauEnum.IMPORTANT,
+            "message": f"⚠️ Température hors zone de confort: {temp:.1f}°C",
+            "valeur_mesuree": float(temp),
+            "valeur_seuil": f"{seuils['temperature_min']}-{seuils['temperature_max']}"
+        }
+
+    return None
+
+
+def regle_humidite(hum, seuils: Dict) -> Optional[Dict]:
+    """Humidité stabule de la dernière mesure"""
+    if hum is None:
+        return None
+
+    if hum <= seuils["humidite_min"] or hum >= seuils["humidite_max"]:
+        return {
+            "type": "humidite_hors_zone",
+            "niveau": AlerteNiveauEnum.IMPORTANT,
+            "message": f"⚠️ Humidité hors zone optimale: {hum:.0f}%",
+            "valeur_mesuree": float(hum),
+            "valeur_seuil": f"{seuils['humidite_min']}-{seuils['humidite_max']}"
+        }
+
+    return None
+
+
+def regle_refus_alimentaire(dose_reelle_totale, dose_theo_totale, seuils: Dict) -> Optional[Dict]:
+    """Refus alimentaire (dose réelle << théorique) sur la dernière mesure avec doses théoriques"""
+    if dose_theo_totale is None or dose_theo_totale == 0 or dose_reelle_totale is None:
+        return None
+
+    pct_reelle = (dose_reelle_totale / dose_theo_totale) * 100
+
+    if pct_reelle <= (100 - seuils["refus_alimentaire_pct"]):
+        return {
+            "type": "refus_alimentaire",
+            "niveau": AlerteNiveauEnum.CRITIQUE,
+            "message": f"🚨 REFUS ALIMENTAIRE: Seulement {pct_reelle:.0f}% de la dose théorique consommée",
+            "valeur_mesuree": float(pct_reelle),
+            "valeur_seuil": 100 - seuils["refus_alimentaire_pct"]
+        }
+
+    return None
+
+
+def evaluer_regles(mesures: Dict, seuils: Dict) -> List[Dict]:
+    """Toutes les règles de seuils pour une ligne de ALERT_RULES_QUERY"""
+    alertes = [
+        regle_perte_poids(mesures.get("variation"), seuils),
+        regle_gain_poids_faible(mesures.get("gain_moyen"), seuils),
+        regle_temperature(mesures.get("temperature"), seuils),
+        regle_humidite(mesures.get("humidite"), seuils),
+        regle_refus_alimentaire(mesures.get("dose_reelle_totale"), mesures.get("dose_theo_totale"), seuils),
+    ]
+    return [a for a in alertes if a is not None]
+
+
+def _seuil_numerique(valeur) -> Optional[float]:
+    """valeur_seuil est DECIMAL : les plages ('18.0-25.0') ne sont pas stockées"""
+    return float(valeur) if isinstance(valeur, (int, float)) else None
+
+
+# ============================================================================
+# Modèles ML par génétique
+# ============================================================================
+
+class GenetiqueAnomalyModels:
+    """IsolationForest + StandardScaler pré-entraînés, un couple par génétique"""
+
+    def __init__(
+        self,
+        max_age_h: float = ANOMALY_MODEL_MAX_AGE_H,
+        contamination: float = ANOMALY_CONTAMINATION,
+        min_rows: int = 20
+    ):
+        self.max_age_s = max_age_h * 3600
+        self.contamination = contamination
+        self.min_rows = min_rows
+        self._models: Dict[str, Tuple[Any, Any, float]] = {}  # (StandardScaler, IsolationForest, fitted_at)
+
+    def is_fresh(self, genetique: str) -> bool:
+        entry = self._models.get(genetique)
+        return entry is not None and time.time() - entry[2] < self.max_age_s
+
+    def fit(self, genetique: str, features: np.ndarray) -> bool:
+        """Entraîne le modèle d'une génétique (False si données insuffisantes)"""
+        if len(features) < self.min_rows:
+            return False
+        # scikit-learn importé au premier entraînement (hors démarrage de l'API)
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler().fit(features)
+        model = IsolationForest(contamination=self.contamination, random_state=42)
+        model.fit(scaler.transform(features))
+        self._models[genetique] = (scaler, model, time.time())
+        logger.info(f"🧠 Modèle anomalies '{genetique}' entraîné sur {len(features)} mesures")
+        return True
+
+    def has_model(self, genetique: str) -> bool:
+        return genetique in self._models
+
+    def score(self, genetique: str, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(prédictions -1/1, scores) pour un lot de mesures"""
+        scaler, model, _ = self._models[genetique]
+        scaled = scaler.transform(features)
+        return model.predict(scaled), model.score_samples(scaled)
+
 
 class AnomalyDetectionEngine:
     """
     Moteur de détection d'anomalies avec Machine Learning
     Détecte automatiquement les comportements anormaux des canards
     """
-    
+
     def __init__(self, db_pool: asyncpg.Pool):
         self.db_pool = db_pool
-        self.isolation_forest = IsolationForest(
-            contamination=0.1,  # 10% d'anomalies attendues
-            random_state=42
-        )
-        self.scaler = StandardScaler()
-        
+        self.models = GenetiqueAnomalyModels()
+
         # Seuils d'alertes configurables
-        self.seuils = {
-            "perte_poids_critique": -150,  # grammes
-            "perte_poids_warning": -80,
-            "gain_poids_faible_critique": 30,  # < 30g/jour
-            "gain_poids_faible_warning": 50,
-            "temperature_min": 18.0,
-            "temperature_max": 25.0,
-            "temperature_critique_min": 15.0,
-            "temperature_critique_max": 28.0,
-            "humidite_min": 50.0,
-            "humidite_max": 75.0,
-            "refus_alimentaire_pct": 30.0,  # Si dose < 70% théorique
-            "mortalite_lot_pct": 5.0,  # Alerte si > 5% du lot
+        self.seuils = dict(SEUILS_DEFAUT)
+
+    async def _ensure_models(self, conn, window_df: pd.DataFrame):
+        """Entraîne (une fois par génétique) les modèles absents ou périmés"""
+        for genetique, groupe in window_df.groupby("genetique"):
+            if self.models.is_fresh(genetique):
+                continue
+            records = await conn.fetch(ML_TRAINING_QUERY, genetique, ANOMALY_TRAINING_DAYS, ANOMALY_TRAINING_MAX_ROWS)
+            training = (
+                np.array([[float(r[f]) for f in ML_FEATURES] for r in records])
+                if records else groupe[ML_FEATURES].to_numpy(dtype=float)
+            )
+            fitted = await asyncio.to_thread(self.models.fit, genetique, training)
+            if not fitted and not self.models.has_model(genetique):
+                # Historique trop court : population de la fenêtre courante
+                await asyncio.to_thread(self.models.fit, genetique, groupe[ML_FEATURES].to_numpy(dtype=float))
+
+    def _score_window(self, window_df: pd.DataFrame) -> pd.DataFrame:
+        """Ajoute prediction / score à chaque mesure (un appel par génétique)"""
+        window_df = window_df.copy()
+        window_df["prediction"] = 1
+        window_df["score"] = 0.0
+        for genetique, groupe in window_df.groupby("genetique"):
+            if not self.models.has_model(genetique):
+                continue
+            predictions, scores = self.models.score(genetique, groupe[ML_FEATURES].to_numpy(dtype=float))
+            window_df.loc[groupe.index, "prediction"] = predictions
+            window_df.loc[groupe.index, "score"] = scores
+        return window_df
+
+    async def _fetch_ml_window(
+        self,
+        conn,
+        window_days: int,
+        canard_ids: Optional[List[int]],
+        lot_id: Optional[int],
+        gaveur_id: Optional[int]
+    ) -> pd.DataFrame:
+        records = await conn.fetch(ML_WINDOW_QUERY, window_days, canard_ids, lot_id, gaveur_id)
+        df = pd.DataFrame([dict(r) for r in records], columns=["canard_id", "genetique", "time"] + ML_FEATURES)
+        if df.empty:
+            return df
+        df[ML_FEATURES] = df[ML_FEATURES].astype(float)
+        # Au moins 3 mesures dans la fenêtre pour juger un canard
+        return df[df.groupby("canard_id")["canard_id"].transform("size") >= 3]
+
+    @staticmethod
+    def _anomalie_from_row(row) -> Dict:
+        return {
+            "time": row["time"],
+            "type": "anomalie_ml",
+            "score": float(row["score"]),
+            "valeurs": {
+                "dose_matin": float(row["dose_matin"]),
+                "dose_soir": float(row["dose_soir"]),
+                "gain_journalier": float(row["gain_journalier"]),
+                "temperature": float(row["temperature_stabule"])
+            }
         }
-    
+
     async def detect_anomalies_canard(
         self,
         canard_id: int,
@@ -51,315 +427,199 @@ class AnomalyDetectionEngine:
     ) -> List[Dict]:
         """
         Détecte les anomalies sur un canard avec ML
-        
+
+        Le modèle de la génétique du canard est entraîné une fois sur la
+        population, puis réutilisé.
+
         Args:
             canard_id: ID du canard
             window_days: Fenêtre de détection (jours)
-            
+
         Returns:
             Liste d'anomalies détectées
         """
-        # Récupérer les données récentes
-        query = """
-        SELECT 
-            time,
-            dose_matin,
-            dose_soir,
-            poids_matin,
-            poids_soir,
-            temperature_stabule,
-            humidite_stabule,
-            poids_soir - poids_matin as gain_journalier
-        FROM gavage_data
-        WHERE canard_id = $1
-          AND time >= NOW() - INTERVAL '$2 days'
-        ORDER BY time ASC
-        """
-        
         async with self.db_pool.acquire() as conn:
-            records = await conn.fetch(query, canard_id, window_days)
-        
-        if len(records) < 3:
-            return []  # Pas assez de données
-        
-        # Préparer les features
-        df = pd.DataFrame(records)
-        features = df[[
-            'dose_matin', 'dose_soir', 'poids_matin', 'poids_soir',
-            'temperature_stabule', 'humidite_stabule', 'gain_journalier'
-        ]].values
-        
-        # Normalisation
-        features_scaled = self.scaler.fit_transform(features)
-        
-        # Détection par Isolation Forest
-        predictions = self.isolation_forest.fit_predict(features_scaled)
-        anomaly_scores = self.isolation_forest.score_samples(features_scaled)
-        
-        # Identifier les anomalies
-        anomalies = []
-        for idx, (pred, score) in enumerate(zip(predictions, anomaly_scores)):
-            if pred == -1:  # Anomalie détectée
-                row = df.iloc[idx]
-                anomalies.append({
-                    "time": row['time'],
-                    "type": "anomalie_ml",
-                    "score": float(score),
-                    "valeurs": {
-                        "dose_matin": float(row['dose_matin']),
-                        "dose_soir": float(row['dose_soir']),
-                        "gain_journalier": float(row['gain_journalier']),
-                        "temperature": float(row['temperature_stabule'])
-                    }
-                })
-        
-        return anomalies
-    
-    async def check_all_alerts_canard(
+            window_df = await self._fetch_ml_window(conn, window_days, [canard_id], None, None)
+            if window_df.empty:
+                return []  # Pas assez de données
+            await self._ensure_models(conn, window_df)
+
+        scored = self._score_window(window_df)
+        return [self._anomalie_from_row(row) for _, row in scored[scored["prediction"] == -1].iterrows()]
+
+    async def evaluer_alertes(
         self,
-        canard_id: int,
-        gaveur_telephone: str
+        canard_ids: Optional[List[int]] = None,
+        lot_id: Optional[int] = None,
+        gaveur_id: Optional[int] = None,
+        window_days: int = 3,
+        lookback_days: Optional[int] = ALERT_LOOKBACK_DAYS
     ) -> List[Dict]:
         """
-        Vérifie TOUTES les alertes possibles pour un canard
-        
+        Évalue règles de seuils + anomalies ML pour un ensemble de canards
+
+        Deux requêtes au total, quel que soit le nombre de canards.
+
+        Args:
+            canard_ids: Canards explicites (défaut: tous les canards en gavage)
+            lot_id / gaveur_id: Filtres optionnels
+            window_days: Fenêtre ML (jours)
+            lookback_days: Historique lu pour les règles (None = tout)
+
         Returns:
-            Liste des alertes générées
+            Alertes (non enregistrées), chacune avec canard_id / gaveur_id / telephone
         """
-        alertes_generees = []
-        
-        # 1. Vérifier perte de poids
-        alerte_poids = await self._check_perte_poids(canard_id)
-        if alerte_poids:
-            alertes_generees.append(alerte_poids)
-            await self._envoyer_alerte(canard_id, alerte_poids, gaveur_telephone)
-        
-        # 2. Vérifier gain de poids faible
-        alerte_gain = await self._check_gain_poids_faible(canard_id)
-        if alerte_gain:
-            alertes_generees.append(alerte_gain)
-            await self._envoyer_alerte(canard_id, alerte_gain, gaveur_telephone)
-        
-        # 3. Vérifier température
-        alerte_temp = await self._check_temperature(canard_id)
-        if alerte_temp:
-            alertes_generees.append(alerte_temp)
-            await self._envoyer_alerte(canard_id, alerte_temp, gaveur_telephone)
-        
-        # 4. Vérifier humidité
-        alerte_hum = await self._check_humidite(canard_id)
-        if alerte_hum:
-            alertes_generees.append(alerte_hum)
-            await self._envoyer_alerte(canard_id, alerte_hum, gaveur_telephone)
-        
-        # 5. Vérifier refus alimentaire
-        alerte_refus = await self._check_refus_alimentaire(canard_id)
-        if alerte_refus:
-            alertes_generees.append(alerte_refus)
-            await self._envoyer_alerte(canard_id, alerte_refus, gaveur_telephone)
-        
-        # 6. Détection anomalies ML
-        anomalies_ml = await self.detect_anomalies_canard(canard_id)
-        if anomalies_ml:
-            for anomalie in anomalies_ml:
-                alerte_ml = {
+        async with self.db_pool.acquire() as conn:
+            regles_rows = await conn.fetch(ALERT_RULES_QUERY, lookback_days, canard_ids, lot_id, gaveur_id)
+            window_df = await self._fetch_ml_window(conn, window_days, canard_ids, lot_id, gaveur_id)
+            if not window_df.empty:
+                await self._ensure_models(conn, window_df)
+
+        alertes: List[Dict] = []
+        contexte: Dict[int, Dict[str, Any]] = {}
+        for row in regles_rows:
+            mesures = dict(row)
+            ctx = {"canard_id": mesures["canard_id"], "gaveur_id": mesures["gaveur_id"], "telephone": mesures["telephone"]}
+            contexte[mesures["canard_id"]] = ctx
+            alertes.extend({**ctx, **alerte} for alerte in evaluer_regles(mesures, self.seuils))
+
+        if not window_df.empty:
+            scored = self._score_window(window_df)
+            for _, row in scored[scored["prediction"] == -1].iterrows():
+                anomalie = self._anomalie_from_row(row)
+                ctx = contexte.get(int(row["canard_id"]), {"canard_id": int(row["canard_id"]), "gaveur_id": None, "telephone": None})
+                alertes.append({
+                    **ctx,
                     "type": "anomalie_comportement",
                     "niveau": AlerteNiveauEnum.IMPORTANT,
                     "message": f"Comportement anormal détecté par IA (score: {anomalie['score']:.2f})",
                     "valeur_mesuree": anomalie['score'],
                     "details": anomalie['valeurs']
-                }
-                alertes_generees.append(alerte_ml)
-                await self._envoyer_alerte(canard_id, alerte_ml, gaveur_telephone)
-        
-        return alertes_generees
-    
-    async def _check_perte_poids(self, canard_id: int) -> Optional[Dict]:
-        """Vérifie si perte de poids anormale"""
-        query = """
-        SELECT 
-            poids_soir - poids_matin as variation
-        FROM gavage_data
-        WHERE canard_id = $1
-        ORDER BY time DESC
-        LIMIT 1
+                })
+
+        return alertes
+
+    async def dispatch_alertes(self, alertes: List[Dict], telephone: Optional[str] = None) -> Dict[str, int]:
         """
-        
-        async with self.db_pool.acquire() as conn:
-            variation = await conn.fetchval(query, canard_id)
-        
-        if variation is None:
-            return None
-        
-        if variation <= self.seuils["perte_poids_critique"]:
-            return {
-                "type": "perte_poids_critique",
-                "niveau": AlerteNiveauEnum.CRITIQUE,
-                "message": f"🚨 PERTE DE POIDS CRITIQUE: {variation:.0f}g - INTERVENTION URGENTE",
-                "valeur_mesuree": float(variation),
-                "valeur_seuil": self.seuils["perte_poids_critique"]
-            }
-        elif variation <= self.seuils["perte_poids_warning"]:
-            return {
-                "type": "perte_poids_warning",
-                "niveau": AlerteNiveauEnum.IMPORTANT,
-                "message": f"⚠️ Perte de poids anormale: {variation:.0f}g - Surveiller",
-                "valeur_mesuree": float(variation),
-                "valeur_seuil": self.seuils["perte_poids_warning"]
-            }
-        
-        return None
-    
-    async def _check_gain_poids_faible(self, canard_id: int) -> Optional[Dict]:
-        """Vérifie si gain de poids trop faible"""
-        query = """
-        SELECT 
-            AVG(poids_soir - poids_matin) as gain_moyen
-        FROM gavage_data
-        WHERE canard_id = $1
-          AND time >= NOW() - INTERVAL '3 days'
-          AND poids_matin IS NOT NULL
-          AND poids_soir IS NOT NULL
+        Enregistre les alertes en une instruction, puis un SMS par gaveur
+        pour ses alertes critiques
+
+        Args:
+            alertes: Sortie de evaluer_alertes
+            telephone: Destinataire imposé (défaut: téléphone du gaveur)
         """
-        
+        if not alertes:
+            return {"alertes_enregistrees": 0, "sms_envoyes": 0}
+
         async with self.db_pool.acquire() as conn:
-            gain_moyen = await conn.fetchval(query, canard_id)
-        
-        if gain_moyen is None:
-            return None
-        
-        if gain_moyen <= self.seuils["gain_poids_faible_critique"]:
-            return {
-                "type": "gain_poids_faible_critique",
-                "niveau": AlerteNiveauEnum.CRITIQUE,
-                "message": f"🚨 Gain de poids insuffisant: {gain_moyen:.0f}g/jour - Revoir stratégie",
-                "valeur_mesuree": float(gain_moyen),
-                "valeur_seuil": self.seuils["gain_poids_faible_critique"]
-            }
-        elif gain_moyen <= self.seuils["gain_poids_faible_warning"]:
-            return {
-                "type": "gain_poids_faible",
-                "niveau": AlerteNiveauEnum.IMPORTANT,
-                "message": f"⚠️ Gain de poids sous la moyenne: {gain_moyen:.0f}g/jour",
-                "valeur_mesuree": float(gain_moyen),
-                "valeur_seuil": self.seuils["gain_poids_faible_warning"]
-            }
-        
-        return None
-    
-    async def _check_temperature(self, canard_id: int) -> Optional[Dict]:
-        """Vérifie la température stabule"""
-        query = """
-        SELECT temperature_stabule
-        FROM gavage_data
-        WHERE canard_id = $1
-        ORDER BY time DESC
-        LIMIT 1
+            inserted = await conn.fetch(
+                INSERT_ALERTES_QUERY,
+                [a["canard_id"] for a in alertes],
+                [AlerteNiveauEnum(a["niveau"]).value for a in alertes],
+                [a["type"] for a in alertes],
+                [a["message"] for a in alertes],
+                [a.get("valeur_mesuree") for a in alertes],
+                [_seuil_numerique(a.get("valeur_seuil")) for a in alertes],
+            )
+
+        # Alertes critiques regroupées par destinataire
+        par_telephone: Dict[str, List[int]] = {}
+        for idx, alerte in enumerate(alertes):
+            destinataire = telephone or alerte.get("telephone")
+            if alerte["niveau"] == AlerteNiveauEnum.CRITIQUE and destinataire:
+                par_telephone.setdefault(destinataire, []).append(idx)
+
+        semaphore = asyncio.Semaphore(ALERT_SMS_CONCURRENCY)
+
+        async def envoyer(destinataire: str, indices: List[int]) -> List[int]:
+            async with semaphore:
+                ok = await sms_service.send_alertes_critiques_groupees(
+                    destinataire,
+                    [(alertes[i]["canard_id"], alertes[i]["message"]) for i in indices]
+                )
+            return indices if ok else []
+
+        envoyes = await asyncio.gather(*(envoyer(tel, idx) for tel, idx in par_telephone.items()))
+        indices_sms = [i for indices in envoyes for i in indices]
+
+        # Marquer SMS envoyé (même horodatage pour tout le lot inséré)
+        if indices_sms:
+            async with self.db_pool.acquire() as conn:
+                await conn.execute(
+                    """
+                    UPDATE alertes
+                    SET sms_envoye = true, sms_envoye_le = NOW()
+                    WHERE id = ANY($1::int[]) AND time = $2
+                    """,
+                    [inserted[i]["id"] for i in indices_sms],
+                    inserted[0]["time"]
+                )
+
+        return {"alertes_enregistrees": len(inserted), "sms_envoyes": sum(1 for e in envoyes if e)}
+
+    async def check_all_alerts_canard(
+        self,
+        canard_id: int,
+        gaveur_telephone: str
+    ) -> List[Dict]:
         """
-        
-        async with self.db_pool.acquire() as conn:
-            temp = await conn.fetchval(query, canard_id)
-        
-        if temp is None:
-            return None
-        
-        if temp <= self.seuils["temperature_critique_min"] or temp >= self.seuils["temperature_critique_max"]:
-            return {
-                "type": "temperature_critique",
-                "niveau": AlerteNiveauEnum.CRITIQUE,
-                "message": f"🚨 TEMPÉRATURE CRITIQUE: {temp:.1f}°C - Corriger immédiatement",
-                "valeur_mesuree": float(temp),
-                "valeur_seuil": f"{self.seuils['temperature_critique_min']}-{self.seuils['temperature_critique_max']}"
-            }
-        elif temp <= self.seuils["temperature_min"] or temp >= self.seuils["temperature_max"]:
-            return {
-                "type": "temperature_hors_zone",
-                "niveau": AlerteNiveauEnum.IMPORTANT,
-                "message": f"⚠️ Température hors zone de confort: {temp:.1f}°C",
-                "valeur_mesuree": float(temp),
-                "valeur_seuil": f"{self.seuils['temperature_min']}-{self.seuils['temperature_max']}"
-            }
-        
-        return None
-    
-    async def _check_humidite(self, canard_id: int) -> Optional[Dict]:
-        """Vérifie l'humidité stabule"""
-        query = """
-        SELECT humidite_stabule
-        FROM gavage_data
-        WHERE canard_id = $1
-        ORDER BY time DESC
-        LIMIT 1
+        Vérifie TOUTES les alertes possibles pour un canard
+
+        Returns:
+            Liste des alertes générées
         """
-        
-        async with self.db_pool.acquire() as conn:
-            hum = await conn.fetchval(query, canard_id)
-        
-        if hum is None:
-            return None
-        
-        if hum <= self.seuils["humidite_min"] or hum >= self.seuils["humidite_max"]:
-            return {
-                "type": "humidite_hors_zone",
-                "niveau": AlerteNiveauEnum.IMPORTANT,
-                "message": f"⚠️ Humidité hors zone optimale: {hum:.0f}%",
-                "valeur_mesuree": float(hum),
-                "valeur_seuil": f"{self.seuils['humidite_min']}-{self.seuils['humidite_max']}"
-            }
-        
-        return None
-    
-    async def _check_refus_alimentaire(self, canard_id: int) -> Optional[Dict]:
-        """Vérifie si refus alimentaire (dose réelle << théorique)"""
-        query = """
-        SELECT 
-            dose_theorique_matin + dose_theorique_soir as dose_theo_totale,
-            dose_matin + dose_soir as dose_reelle_totale
-        FROM gavage_data
-        WHERE canard_id = $1
-          AND dose_theorique_matin IS NOT NULL
-          AND dose_theorique_soir IS NOT NULL
-        ORDER BY time DESC
-        LIMIT 1
+        alertes = await self.evaluer_alertes(canard_ids=[canard_id], lookback_days=None)
+        await self.dispatch_alertes(alertes, telephone=gaveur_telephone)
+        return alertes
+
+    async def sweep_alertes(
+        self,
+        lot_id: Optional[int] = None,
+        gaveur_id: Optional[int] = None,
+        dispatch: bool = True
+    ) -> Dict[str, Any]:
         """
-        
-        async with self.db_pool.acquire() as conn:
-            record = await conn.fetchrow(query, canard_id)
-        
-        if not record or record['dose_theo_totale'] == 0:
-            return None
-        
-        pct_reelle = (record['dose_reelle_totale'] / record['dose_theo_totale']) * 100
-        
-        if pct_reelle <= (100 - self.seuils["refus_alimentaire_pct"]):
-            return {
-                "type": "refus_alimentaire",
-                "niveau": AlerteNiveauEnum.CRITIQUE,
-                "message": f"🚨 REFUS ALIMENTAIRE: Seulement {pct_reelle:.0f}% de la dose théorique consommée",
-                "valeur_mesuree": float(pct_reelle),
-                "valeur_seuil": 100 - self.seuils["refus_alimentaire_pct"]
-            }
-        
-        return None
-    
+        Balayage de tous les canards en gavage (tâche nocturne)
+
+        Returns:
+            dict: canards en alerte, alertes par niveau, SMS envoyés, durée
+        """
+        started = time.perf_counter()
+        alertes = await self.evaluer_alertes(lot_id=lot_id, gaveur_id=gaveur_id)
+        envoi = await self.dispatch_alertes(alertes) if dispatch else {"alertes_enregistrees": 0, "sms_envoyes": 0}
+
+        par_niveau: Dict[str, int] = {}
+        for alerte in alertes:
+            niveau = AlerteNiveauEnum(alerte["niveau"]).value
+            par_niveau[niveau] = par_niveau.get(niveau, 0) + 1
+
+        return {
+            "canards_en_alerte": len({a["canard_id"] for a in alertes}),
+            "alertes": len(alertes),
+            "par_niveau": par_niveau,
+            "anomalies_ml": sum(1 for a in alertes if a["type"] == "anomalie_comportement"),
+            **envoi,
+            "duree_s": round(time.perf_counter() - started, 3)
+        }
+
     async def check_mortalite_lot(self, numero_lot: str, gaveur_telephone: str) -> Optional[Dict]:
         """Vérifie le taux de mortalité d'un lot"""
         query = """
-        SELECT 
+        SELECT
             COUNT(*) FILTER (WHERE statut = 'decede') as morts,
             COUNT(*) as total
         FROM canards
         WHERE numero_lot_canard = $1
         """
-        
+
         async with self.db_pool.acquire() as conn:
             record = await conn.fetchrow(query, numero_lot)
-        
+
         if record['total'] == 0:
             return None
-        
+
         taux_mortalite = (record['morts'] / record['total']) * 100
-        
+
         if taux_mortalite >= self.seuils["mortalite_lot_pct"]:
             alerte = {
                 "type": "mortalite_lot_elevee",
@@ -368,66 +628,18 @@ class AnomalyDetectionEngine:
                 "valeur_mesuree": float(taux_mortalite),
                 "valeur_seuil": self.seuils["mortalite_lot_pct"]
             }
-            
+
             # Envoyer SMS
             await sms_service.send_alerte_critique(
                 gaveur_telephone,
                 0,  # Pas de canard spécifique
                 alerte["message"]
             )
-            
+
             return alerte
-        
+
         return None
-    
-    async def _envoyer_alerte(
-        self,
-        canard_id: int,
-        alerte: Dict,
-        telephone: str
-    ):
-        """Enregistre et envoie une alerte"""
-        # Enregistrer dans DB
-        query = """
-        INSERT INTO alertes (
-            time, canard_id, niveau, type_alerte, message,
-            valeur_mesuree, valeur_seuil, sms_envoye
-        )
-        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-        """
-        
-        async with self.db_pool.acquire() as conn:
-            await conn.execute(
-                query,
-                datetime.utcnow(),
-                canard_id,
-                alerte["niveau"],
-                alerte["type"],
-                alerte["message"],
-                alerte.get("valeur_mesuree"),
-                alerte.get("valeur_seuil"),
-                False
-            )
-        
-        # Envoyer SMS si critique
-        if alerte["niveau"] == AlerteNiveauEnum.CRITIQUE:
-            await sms_service.send_alerte_critique(
-                telephone,
-                canard_id,
-                alerte["message"]
-            )
-            
-            # Marquer SMS envoyé
-            update_query = """
-            UPDATE alertes
-            SET sms_envoye = true
-            WHERE canard_id = $1
-              AND type_alerte = $2
-              AND time >= NOW() - INTERVAL '1 minute'
-            """
-            async with self.db_pool.acquire() as conn:
-                await conn.execute(update_query, canard_id, alerte["type"])
-    
+
     async def get_alertes_dashboard(self, gaveur_id: int) -> Dict:
         """Dashboard des alertes pour un gaveur"""
         query = """
@@ -12,7 +12,7 @@ from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 import pandas as pd
 import numpy as np
-from typing import Dict, List
+from typing import Any, Dict, List, Tuple
 
 
 class GaveurSegmentation:
@@ -32,6 +32,8 @@ class GaveurSegmentation:
             'Critique'
         ]
         self.feature_names = []
+        # Index du centre K-Means → rang de performance (0 = Excellent)
+        self.center_ranks: List[int] = []
 
     def segment_gaveurs(self, gaveurs_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -93,8 +95,16 @@ class GaveurSegmentation:
             for new_id, old_id in enumerate(cluster_order)
         }
 
+        self.center_ranks = [0] * self.n_clusters
+        for new_id, old_id in enumerate(cluster_order):
+            self.center_ranks[old_id] = new_id
+
         gaveurs_df['cluster'] = pd.Series(clusters).map(cluster_mapping).values
         gaveurs_df['cluster_id'] = clusters
+        gaveurs_df['cluster_rank'] = [self.center_ranks[c] for c in clusters]
+        gaveurs_df['distance_centroide'] = np.linalg.norm(
+            X_scaled - self.kmeans.cluster_centers_[clusters], axis=1
+        )
 
         print(f"   ✅ Segmentation terminée")
 
@@ -220,25 +230,76 @@ class GaveurSegmentation:
             Nom du cluster prédit
         """
 
+        rank, _ = self.assign_nearest([gaveur_metrics])[0]
+        return self.cluster_labels[rank]
+
+    def assign_nearest(self, gaveurs_metrics: List[Dict]) -> List[Tuple[int, float]]:
+        """
+        Affecter des gaveurs au centre le plus proche (sans ré-entraînement)
+
+        Args:
+            gaveurs_metrics: Liste de dicts avec les features du modèle
+
+        Returns:
+            [(rang du cluster, distance au centre normalisée)]
+        """
+
         if self.kmeans is None:
             raise ValueError("Modèle non entraîné")
 
-        # Créer vecteur de features
-        X = np.array([[
-            gaveur_metrics.get('itm_moyen', 0),
-            gaveur_metrics.get('sigma_moyen', 0),
-            gaveur_metrics.get('mortalite_moyenne', 0),
-            gaveur_metrics.get('nb_lots', 0),
-            gaveur_metrics.get('regularite', 0)
-        ]])
+        features = self.feature_names or [
+            'itm_moyen', 'sigma_moyen', 'mortalite_moyenne', 'nb_lots', 'regularite'
+        ]
+        X = np.array([
+            [float(m.get(f) or 0) for f in features]
+            for m in gaveurs_metrics
+        ])
 
-        # Normaliser
-        X_scaled = self.scaler.transform(X)
+        # Normaliser (équivalent scaler.transform, aussi pour un modèle rechargé)
+        X_scaled = (X - self.scaler.mean_) / self.scaler.scale_
+
+        distances = np.linalg.norm(
+            X_scaled[:, None, :] - self.kmeans.cluster_centers_[None, :, :], axis=2
+        )
+        nearest = distances.argmin(axis=1)
+
+        return [
+            (self.center_ranks[c], float(distances[i, c]))
+            for i, c in enumerate(nearest)
+        ]
 
-        # Prédire
-        cluster_id = self.kmeans.predict(X_scaled)[0]
+    def export_state(self) -> Dict[str, Any]:
+        """
+        État sérialisable JSON du modèle entraîné (persistance en base)
+
+        Returns:
+            Dict rechargeable via GaveurSegmentation.from_state()
+        """
+
+        if self.kmeans is None:
+            raise ValueError("Modèle non entraîné")
+
+        return {
+            'n_clusters': self.n_clusters,
+            'feature_names': list(self.feature_names),
+            'scaler_mean': self.scaler.mean_.tolist(),
+            'scaler_scale': self.scaler.scale_.tolist(),
+            'centers': self.kmeans.cluster_centers_.tolist(),
+            'center_ranks': list(self.center_ranks),
+        }
 
-        return self.cluster_labels[cluster_id]
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "GaveurSegmentation":
+        """Recharger un modèle exporté (affectation seulement, pas de ré-entraînement)"""
+
+        segmenter = cls(n_clusters=state['n_clusters'])
+        segmenter.feature_names = list(state['feature_names'])
+        segmenter.scaler.mean_ = np.asarray(state['scaler_mean'], dtype=float)
+        segmenter.scaler.scale_ = np.asarray(state['scaler_scale'], dtype=float)
+        segmenter.kmeans = KMeans(n_clusters=state['n_clusters'])
+        segmenter.kmeans.cluster_centers_ = np.asarray(state['centers'], dtype=float)
+        segmenter.center_ranks = list(state['center_ranks'])
+        return segmenter
 
     def get_cluster_centers(self) -> pd.DataFrame:
         """
@@ -288,6 +288,27 @@ class GaveurClusteringML:
             else:
                 return f"Niveau {cluster_ranked + 1}/{self.n_clusters}"
 
+    def to_artifact(self) -> Dict:
+        """Modèle entraîné sous forme sérialisable (fichier ou registre de modèles)"""
+        return {
+            'kmeans': self.kmeans,
+            'scaler': self.scaler,
+            'n_clusters': self.n_clusters,
+            'feature_names': self.feature_names,
+            'silhouette': self.silhouette,
+            'trained_at': datetime.utcnow().isoformat()
+        }
+
+    @classmethod
+    def from_artifact(cls, model_data: Dict) -> 'GaveurClusteringML':
+        """Instance depuis un artefact (to_artifact), sans I/O"""
+        instance = cls(n_clusters=model_data['n_clusters'])
+        instance.kmeans = model_data['kmeans']
+        instance.scaler = model_data['scaler']
+        instance.feature_names = model_data['feature_names']
+        instance.silhouette = model_data['silhouette']
+        return instance
+
     def save_model(self, filepath: str):
         """
         Sauvegarde le modèle entraîné
@@ -297,17 +318,8 @@ class GaveurClusteringML:
         """
         import pickle
 
-        model_data = {
-            'kmeans': self.kmeans,
-            'scaler': self.scaler,
-            'n_clusters': self.n_clusters,
-            'feature_names': self.feature_names,
-            'silhouette': self.silhouette,
-            'trained_at': datetime.utcnow().isoformat()
-        }
-
         with open(filepath, 'wb') as f:
-            pickle.dump(model_data, f)
+            pickle.dump(self.to_artifact(), f)
 
         logger.info(f"Modèle sauvegardé: {filepath}")
 
@@ -327,11 +339,7 @@ class GaveurClusteringML:
         with open(filepath, 'rb') as f:
             model_data = pickle.load(f)
 
-        instance = cls(n_clusters=model_data['n_clusters'])
-        instance.kmeans = model_data['kmeans']
-        instance.scaler = model_data['scaler']
-        instance.feature_names = model_data['feature_names']
-        instance.silhouette = model_data['silhouette']
+        instance = cls.from_artifact(model_data)
 
         logger.info(
             f"Modèle chargé: {filepath}, "
@@ -164,6 +164,14 @@ class MultiSiteSymbolicRegression:
 
         return max(10.0, min(20.0, itm))  # Borner entre 10 et 20 kg
 
+    def to_artifact(self) -> Dict:
+        """Modèles {(site, souche): model} sous forme sérialisable (registre de modèles)"""
+        return {'models': dict(self.models)}
+
+    def load_artifact(self, artifact: Dict):
+        """Charge un artefact (to_artifact) déjà en mémoire"""
+        self.models.update(artifact['models'])
+
     def save_models(self, path: str):
         """
         Sauvegarder les modèles
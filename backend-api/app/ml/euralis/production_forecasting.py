@@ -3,16 +3,30 @@
 Module: Prévisions de Production
 ================================================================================
 Description : Prévisions de production de foie gras par site
-Technologie : Prophet (Facebook)
+Technologie : Prophet (Facebook), ETS (Holt amorti) en repli
 Usage       : Prédire production à 7/30/90 jours
 ================================================================================
 """
 
-from prophet import Prophet
+import logging
+
 import pandas as pd
 import numpy as np
-from typing import Dict, Optional
-from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+from datetime import date, datetime, timedelta
+
+try:
+    from prophet import Prophet
+    PROPHET_AVAILABLE = True
+except ImportError:
+    Prophet = None
+    PROPHET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Historique minimal pour Prophet (saisonnalités) / pour ETS
+PROPHET_MIN_DAYS = 30
+ETS_MIN_DAYS = 14
 
 
 class ProductionForecaster:
@@ -44,6 +58,9 @@ class ProductionForecaster:
             Modèle Prophet entraîné
         """
 
+        if not PROPHET_AVAILABLE:
+            raise ImportError("prophet n'est pas installé")
+
         print(f"\n📊 Entraînement modèle Prophet pour site {site_code}")
         print(f"   Données: {len(historical_data)} jours")
 
@@ -249,6 +266,158 @@ class ProductionForecaster:
         }
 
 
+# ============================================================================
+# PIPELINE BATCH (Celery / recalcul à la demande)
+# ============================================================================
+
+def ets_forecast(values: Sequence[float], periods_days: int, damping: float = 0.9) -> Dict[str, np.ndarray]:
+    """
+    Lissage exponentiel de Holt à tendance amortie (ETS(A,Ad,N))
+
+    alpha/beta choisis par grille sur l'erreur à un pas ; intervalle 95%
+    depuis l'écart-type des résidus, élargi avec l'horizon.
+
+    Returns:
+        {"yhat", "lower", "upper"} (tableaux de longueur periods_days)
+    """
+    y = np.asarray(values, dtype=float)
+    if len(y) < ETS_MIN_DAYS:
+        raise ValueError(f"Pas assez de données pour ETS ({len(y)} jours)")
+
+    best = None
+    for alpha in (0.1, 0.2, 0.3, 0.5, 0.7):
+        for beta in (0.01, 0.05, 0.1, 0.2):
+            level, trend = y[0], y[1] - y[0]
+            sse = 0.0
+            residuals = np.empty(len(y) - 1)
+            for t in range(1, len(y)):
+                prediction = level + damping * trend
+                residuals[t - 1] = y[t] - prediction
+                sse += residuals[t - 1] ** 2
+                new_level = alpha * y[t] + (1 - alpha) * prediction
+                trend = beta * (new_level - level) + (1 - beta) * damping * trend
+                level = new_level
+            if best is None or sse < best[0]:
+                best = (sse, level, trend, residuals)
+
+    _, level, trend, residuals = best
+    steps = np.arange(1, periods_days + 1)
+    damped = np.cumsum(damping ** steps)
+    yhat = level + damped * trend
+    sigma = float(np.std(residuals)) * np.sqrt(steps)
+    return {
+        "yhat": np.clip(yhat, 0, None),
+        "lower": np.clip(yhat - 1.96 * sigma, 0, None),
+        "upper": np.clip(yhat + 1.96 * sigma, 0, None),
+    }
+
+
+def fit_site_forecast(
+    site_code: str,
+    dates: List[str],
+    values: List[float],
+    periods_days: int,
+    method: str = "auto",
+) -> Dict[str, Any]:
+    """
+    Entraîne et prédit un site (fonction de module : exécutable dans un process pool)
+
+    Args:
+        dates / values: Série journalière (ISO, kg) sans trou
+        method: "prophet", "ets" ou "auto" (Prophet si disponible et historique suffisant)
+
+    Returns:
+        {"site_code", "method", "n_obs", "rows": [{"date", "yhat", "lower", "upper"}]}
+    """
+    if method == "auto":
+        method = "prophet" if PROPHET_AVAILABLE and len(values) >= PROPHET_MIN_DAYS else "ets"
+
+    last_date = date.fromisoformat(dates[-1])
+    future_dates = [(last_date + timedelta(days=i)).isoformat() for i in range(1, periods_days + 1)]
+
+    if method == "prophet":
+        forecaster = ProductionForecaster()
+        with suppress_stdout():
+            forecaster.train_site_model(
+                site_code,
+                pd.DataFrame({"date": dates, "production_kg": values}),
+            )
+            result = forecaster.forecast(site_code, periods_days)
+        yhat = result["production_kg_prevu"].to_numpy()
+        lower = result["production_kg_min"].to_numpy()
+        upper = result["production_kg_max"].to_numpy()
+    else:
+        ets = ets_forecast(values, periods_days)
+        yhat, lower, upper = ets["yhat"], ets["lower"], ets["upper"]
+
+    return {
+        "site_code": site_code,
+        "method": method,
+        "n_obs": len(values),
+        "rows": [
+            {"date": d, "yhat": float(p), "lower": float(lo), "upper": float(hi)}
+            for d, p, lo, hi in zip(future_dates, yhat, lower, upper)
+        ],
+    }
+
+
+def fit_sites(
+    history: Dict[str, Dict[str, List]],
+    periods_days: int,
+    max_workers: Optional[int] = None,
+    method: str = "auto",
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Entraîne tous les sites en parallèle (un process par site)
+
+    Pool billiard (dépendance Celery) : contrairement à ProcessPoolExecutor,
+    il peut créer des process depuis un enfant daemon du worker prefork.
+    Repli séquentiel (journalisé) si le pool est indisponible.
+
+    Args:
+        history: {site_code: {"dates": [...], "values": [...]}}
+
+    Returns:
+        {site_code: résultat fit_site_forecast} (sites en échec ignorés)
+    """
+    jobs = {
+        site: (site, serie["dates"], serie["values"], periods_days, method)
+        for site, serie in history.items()
+        if len(serie["values"]) >= ETS_MIN_DAYS
+    }
+    results: Dict[str, Dict[str, Any]] = {}
+    failed = set()
+
+    workers = min(len(jobs), max_workers or len(jobs))
+    if workers > 1:
+        try:
+            from billiard.pool import Pool
+
+            pool = Pool(processes=workers)
+            try:
+                pending = {site: pool.apply_async(fit_site_forecast, args) for site, args in jobs.items()}
+                for site, async_result in pending.items():
+                    try:
+                        results[site] = async_result.get()
+                    except Exception as e:
+                        failed.add(site)
+                        logger.error(f"❌ Erreur prévisions site {site}: {e}")
+            finally:
+                pool.terminate()
+                pool.join()
+        except Exception as e:
+            logger.warning(f"⚠️ Process pool indisponible ({e}), entraînement séquentiel")
+
+    for site, args in jobs.items():
+        if site in results or site in failed:
+            continue
+        try:
+            results[site] = fit_site_forecast(*args)
+        except Exception as e:
+            logger.error(f"❌ Erreur prévisions site {site}: {e}")
+    return results
+
+
 # ============================================================================
 # UTILITAIRES
 # ============================================================================
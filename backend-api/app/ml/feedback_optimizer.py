@@ -653,28 +653,34 @@ class FeedbackOptimizer:
     # PERSISTENCE
     # ============================================================================
 
-    def save_model(self, filepath: str):
-        """Sauvegarde modèle entraîné"""
+    def to_artifact(self) -> Dict[str, Any]:
+        """Modèle entraîné sous forme sérialisable (fichier ou registre de modèles)"""
         if not self.trained:
             raise ValueError("Modèle non entraîné")
 
-        joblib.dump({
+        return {
             "model": self.satisfaction_model,
             "scaler": self.scaler,
             "feature_names": self.feature_names
-        }, filepath)
-
-        logger.info(f"✅ Modèle sauvegardé : {filepath}")
-
-    def load_model(self, filepath: str):
-        """Charge modèle pré-entraîné"""
-        data = joblib.load(filepath)
+        }
 
+    def load_artifact(self, data: Dict[str, Any]):
+        """Charge un artefact (to_artifact) déjà en mémoire"""
         self.satisfaction_model = data["model"]
         self.scaler = data["scaler"]
         self.feature_names = data["feature_names"]
         self.trained = True
 
+    def save_model(self, filepath: str):
+        """Sauvegarde modèle entraîné"""
+        joblib.dump(self.to_artifact(), filepath)
+
+        logger.info(f"✅ Modèle sauvegardé : {filepath}")
+
+    def load_model(self, filepath: str):
+        """Charge modèle pré-entraîné"""
+        self.load_artifact(joblib.load(filepath))
+
         logger.info(f"✅ Modèle chargé : {filepath}")
 
 
@@ -682,7 +688,20 @@ class FeedbackOptimizer:
 # HELPER FUNCTIONS
 # ============================================================================
 
+# Nom du modèle de satisfaction dans le registre de modèles (table ai_models)
+REGISTRY_MODEL_NAME = "feedback_satisfaction"
+
+
 async def get_feedback_optimizer(db_pool: asyncpg.Pool) -> FeedbackOptimizer:
-    """Factory function pour obtenir instance FeedbackOptimizer"""
+    """
+    Factory function pour obtenir instance FeedbackOptimizer
+
+    Reprend le modèle de satisfaction actif du registre (déjà en mémoire) s'il existe.
+    """
+    from app.services.model_registry import model_registry
+
     optimizer = FeedbackOptimizer(db_pool)
+    loaded = model_registry.get(REGISTRY_MODEL_NAME)
+    if loaded is not None:
+        optimizer.load_artifact(loaded.artifact)
     return optimizer
@@ -10,11 +10,22 @@ Objectifs simultanés:
 5. Maximiser satisfaction consommateur
 
 Uses NSGA-II (Non-dominated Sorting Genetic Algorithm II)
+
+Évaluation par lots: une génération entière est scorée en un appel NumPy
+(evaluate_population), avec un cache mémo des génomes déjà évalués et,
+pour des objectifs coûteux (modèles ML), une répartition optionnelle sur
+un pool de processus (eval_workers) ; pool de threads dans un enfant daemon
+(worker Celery prefork), qui ne peut pas créer de processus.
 """
 
 import numpy as np
 import asyncpg
-from typing import Dict, List, Optional, Tuple
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 import logging
 from dataclasses import dataclass
@@ -30,6 +41,69 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+MOO_EVAL_WORKERS = int(os.getenv("MOO_EVAL_WORKERS", "0"))
+MOO_MEMO_MAX = int(os.getenv("MOO_MEMO_MAX", "200000"))
+
+GENETIC_FACTORS = {
+    "Mulard": 1.0,
+    "Barbarie": 0.85,
+    "Pekin": 0.75
+}
+
+
+def evaluate_population(genomes: np.ndarray, genetique: str = "Mulard") -> np.ndarray:
+    """
+    Évalue une population entière sur les 5 objectifs (mêmes formules que
+    MultiObjectiveOptimizer.evaluate_individual, vectorisées)
+
+    Args:
+        genomes: (n, 6) [dose_matin, dose_soir, temp, humidite, duree, nb_repas]
+        genetique: Type génétique du canard
+
+    Returns:
+        np.ndarray: (n, 5) poids_foie, survie, efficacite_cout, rapidite, satisfaction
+    """
+    genomes = np.asarray(genomes, dtype=float).reshape(-1, 6)
+    dose_matin = genomes[:, 0]
+    dose_soir = genomes[:, 1]
+    temperature = genomes[:, 2]
+    humidite = genomes[:, 3]
+    duree = np.trunc(genomes[:, 4])
+
+    # 1. ITM (modèle empirique de _predict_itm)
+    dose_totale = (dose_matin + dose_soir) / 2 * duree * 2
+    temp_factor = 1.0 - np.abs(temperature - 21) * 0.02
+    humid_factor = 1.0 - np.abs(humidite - 65) * 0.005
+    itm_base = (dose_totale / 1000) * 0.015
+    poids_foie = np.clip(itm_base * temp_factor * humid_factor * GENETIC_FACTORS.get(genetique, 0.9), 10.0, 20.0)
+
+    # 2. Survie (_predict_survie)
+    mortalite = (
+        0.03
+        + 0.02 * ((dose_matin > 550) | (dose_soir > 550))
+        + 0.01 * ((temperature < 19) | (temperature > 23))
+        + 0.01 * (duree > 15)
+    )
+    survie = np.clip(1.0 - mortalite, 0.85, 0.99)
+
+    # 3. Efficacité coût (_calculate_cost)
+    cout_total = ((dose_matin + dose_soir) * duree) / 1000 * 0.30 + 2.0 * duree
+    efficacite_cout = np.divide(poids_foie, cout_total, out=np.zeros_like(poids_foie), where=cout_total > 0)
+
+    # 4. Rapidité
+    rapidite = np.divide(1.0, duree, out=np.zeros_like(duree), where=duree > 0)
+
+    # 5. Satisfaction (_predict_satisfaction)
+    satisfaction = np.where(
+        (poids_foie >= 15.0) & (poids_foie <= 17.0), 4.5,
+        np.where(((poids_foie >= 14.0) & (poids_foie < 15.0)) | ((poids_foie > 17.0) & (poids_foie <= 18.0)), 4.0, 3.5)
+    )
+    if genetique == "Mulard":
+        satisfaction = satisfaction + 0.3
+    satisfaction = np.minimum(5.0, satisfaction)
+
+    return np.column_stack([poids_foie, survie, efficacite_cout, rapidite, satisfaction])
+
 
 @dataclass
 class FeedingParameters:
@@ -64,7 +138,12 @@ class MultiObjectiveOptimizer:
     5. Génère une nouvelle population par crossover et mutation
     """
 
-    def __init__(self, db_pool: asyncpg.Pool):
+    def __init__(
+        self,
+        db_pool: asyncpg.Pool,
+        objective_fn: Callable[[np.ndarray, str], np.ndarray] = evaluate_population,
+        eval_workers: int = MOO_EVAL_WORKERS,
+    ):
         self.db_pool = db_pool
         self.toolbox = None
         self.population_size = 100
@@ -72,6 +151,13 @@ class MultiObjectiveOptimizer:
         self.crossover_prob = 0.8
         self.mutation_prob = 0.2
 
+        # Évaluation par lots: fonction (n, 6) → (n, 5), picklable si eval_workers > 0
+        self.objective_fn = objective_fn
+        self.eval_workers = eval_workers
+        self._memo: Dict[Tuple, Tuple[float, ...]] = {}
+        self.evaluations = 0
+        self.cache_hits = 0
+
         # Bounds pour les paramètres
         self.bounds = {
             "dose_matin": (200, 600),  # grammes
@@ -394,6 +480,62 @@ class MultiObjectiveOptimizer:
 
         return min(5.0, satisfaction_base)
 
+    @staticmethod
+    def _genome_key(individual: List[float], genetique: str) -> Tuple:
+        # duree et nb_repas n'interviennent que par leur partie entière
+        return (
+            genetique,
+            float(individual[0]), float(individual[1]), float(individual[2]), float(individual[3]),
+            int(individual[4]), int(individual[5])
+        )
+
+    async def _score_genomes(
+        self,
+        genomes: np.ndarray,
+        genetique: str,
+        executor: Optional[Executor] = None
+    ) -> np.ndarray:
+        """Score (n, 5) d'un lot de génomes, en process ou réparti sur le pool"""
+        if executor is None:
+            return self.objective_fn(genomes, genetique)
+
+        loop = asyncio.get_running_loop()
+        chunks = np.array_split(genomes, min(self.eval_workers, len(genomes)))
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, self.objective_fn, chunk, genetique) for chunk in chunks
+        ))
+        return np.vstack(results)
+
+    async def evaluate_batch(
+        self,
+        individuals: List,
+        genetique: str = "Mulard",
+        executor: Optional[Executor] = None
+    ) -> None:
+        """
+        Évalue une liste d'individus en un seul appel et affecte leur fitness
+
+        Les génomes déjà vus (cache mémo) ne sont pas ré-évalués.
+        """
+        keys = [self._genome_key(ind, genetique) for ind in individuals]
+
+        missing: Dict[Tuple, List[float]] = {}
+        for key, ind in zip(keys, individuals):
+            if key not in self._memo and key not in missing:
+                missing[key] = list(ind)
+        self.cache_hits += len(individuals) - len(missing)
+
+        if missing:
+            scores = await self._score_genomes(np.array(list(missing.values()), dtype=float), genetique, executor)
+            if len(self._memo) + len(missing) > MOO_MEMO_MAX:
+                self._memo.clear()
+            for key, row in zip(missing, scores):
+                self._memo[key] = tuple(float(v) for v in row)
+            self.evaluations += len(missing)
+
+        for key, ind in zip(keys, individuals):
+            ind.fitness.values = self._memo[key]
+
     async def optimize(
         self,
         genetique: str = "Mulard",
@@ -426,22 +568,43 @@ class MultiObjectiveOptimizer:
         self.population_size = population_size
         self.n_generations = n_generations
 
-        # Register evaluation function
-        async def evaluate_wrapper(individual):
-            return await self.evaluate_individual(individual, genetique)
+        self.evaluations = 0
+        self.cache_hits = 0
+        executor = self._make_executor() if self.eval_workers > 0 else None
+
+        try:
+            return await self._run_nsga2(genetique, population_size, n_generations, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def _make_executor(self) -> Executor:
+        if multiprocessing.current_process().daemon:
+            logger.warning(
+                f"⚠️ Processus daemon (worker Celery prefork) : évaluation NSGA-II "
+                f"dans {self.eval_workers} thread(s) au lieu de processus"
+            )
+            return ThreadPoolExecutor(max_workers=self.eval_workers)
+        return ProcessPoolExecutor(
+            max_workers=self.eval_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    async def _run_nsga2(
+        self,
+        genetique: str,
+        population_size: int,
+        n_generations: int,
+        executor: Optional[Executor]
+    ) -> Dict:
+        started = time.perf_counter()
 
         # Create initial population
         population = self.toolbox.population(n=self.population_size)
 
-        # Evaluate initial population
+        # Evaluate initial population (one batch)
         logger.info(f"Evaluating initial population of {len(population)} individuals...")
-        fitnesses = []
-        for ind in population:
-            fitness = await evaluate_wrapper(ind)
-            fitnesses.append(fitness)
-
-        for ind, fit in zip(population, fitnesses):
-            ind.fitness.values = fit
+        await self.evaluate_batch(population, genetique, executor)
 
         # Statistics
         stats = tools.Statistics(lambda ind: ind.fitness.values)
@@ -474,15 +637,9 @@ class MultiObjectiveOptimizer:
                     self.toolbox.mutate(mutant)
                     del mutant.fitness.values
 
-            # Evaluate invalid individuals
+            # Evaluate invalid individuals (one batch per generation)
             invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
-            fitnesses = []
-            for ind in invalid_ind:
-                fitness = await evaluate_wrapper(ind)
-                fitnesses.append(fitness)
-
-            for ind, fit in zip(invalid_ind, fitnesses):
-                ind.fitness.values = fit
+            await self.evaluate_batch(invalid_ind, genetique, executor)
 
             # Replace population
             population[:] = self.toolbox.select(population + offspring, self.population_size)
@@ -491,6 +648,8 @@ class MultiObjectiveOptimizer:
             record = stats.compile(population)
             logbook.record(gen=gen, evals=len(invalid_ind), **record)
 
+        elapsed_s = time.perf_counter() - started
+
         # Extract Pareto front
         pareto_front = tools.sortNondominated(population, len(population), first_front_only=True)[0]
 
@@ -531,6 +690,13 @@ class MultiObjectiveOptimizer:
             "pareto_front_size": len(pareto_solutions),
             "pareto_front": pareto_solutions,
             "best_solution": best_solution,
+            "statistics": {
+                "elapsed_s": round(elapsed_s, 3),
+                "generations_per_s": round(n_generations / elapsed_s, 2) if elapsed_s > 0 else None,
+                "evaluations": self.evaluations,
+                "cache_hits": self.cache_hits,
+                "eval_workers": self.eval_workers
+            },
             "timestamp": datetime.utcnow().isoformat()
         }
 
@@ -46,12 +46,19 @@ class PySRPredictorNumPy:
     EQUATION_COEF_X4 = 64.66     # day normalisé
     EQUATION_INTERCEPT = 304.54
 
-    def __init__(self, scaler_path: Optional[str] = None):
+    def __init__(
+        self,
+        scaler_path: Optional[str] = None,
+        scaler=None,
+        model_version: Optional[str] = None
+    ):
         """
         Initialise le prédicteur NumPy
 
         Args:
             scaler_path: Chemin vers scaler (si None, utilise défaut)
+            scaler: Scaler déjà chargé (registre de modèles) - pas de lecture fichier
+            model_version: Version affichée (défaut: v2.0-numpy)
         """
         base_dir = Path(__file__).parent.parent.parent
 
@@ -59,9 +66,10 @@ class PySRPredictorNumPy:
             scaler_path = base_dir / "models" / "scaler_pysr_v2.pkl"
 
         self.scaler_path = Path(scaler_path)
-        self.scaler = None
-        self.model_version = "v2.0-numpy"
-        self.load_scaler()
+        self.scaler = scaler
+        self.model_version = model_version or "v2.0-numpy"
+        if self.scaler is None:
+            self.load_scaler()
 
     def load_scaler(self):
         """Charge le scaler StandardScaler"""
@@ -237,14 +245,31 @@ class PySRPredictorNumPy:
         }
 
 
+# Nom du scaler dans le registre de modèles (table ai_models)
+REGISTRY_MODEL_NAME = "pysr_scaler_v2"
+
 # Instance singleton
 _numpy_instance = None
 
 
 def get_pysr_predictor_numpy() -> PySRPredictorNumPy:
-    """Retourne instance singleton"""
+    """
+    Retourne instance singleton
+
+    Le scaler actif du registre de modèles est préféré au fichier local ;
+    l'instance est reconstruite (sans I/O) quand la version active change.
+    """
     global _numpy_instance
 
+    from app.services.model_registry import model_registry
+
+    loaded = model_registry.get(REGISTRY_MODEL_NAME)
+    if loaded is not None:
+        if _numpy_instance is None or _numpy_instance.model_version != loaded.version:
+            logger.info(f"PySRPredictorNumPy: scaler registre version {loaded.version}")
+            _numpy_instance = PySRPredictorNumPy(scaler=loaded.artifact, model_version=loaded.version)
+        return _numpy_instance
+
     if _numpy_instance is None:
         logger.info("Initialisation PySRPredictorNumPy")
         _numpy_instance = PySRPredictorNumPy()
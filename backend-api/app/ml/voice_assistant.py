@@ -34,9 +34,55 @@ except ImportError:
     # Fallback pour éviter NameError
     import numpy as np
 
+from app.services.inference_executor import InferenceSaturated, inference_executor
+
 logger = logging.getLogger(__name__)
 
 
+def decode_audio_base64(audio_base64: str) -> np.ndarray:
+    """
+    Décode un audio base64 en numpy array PCM 16kHz mono normalisé
+
+    Formats supportés: MP3, WAV, OGG, M4A, FLAC
+    """
+    if not AUDIO_PROCESSING_AVAILABLE:
+        raise RuntimeError("Audio processing libraries not installed")
+
+    # Decode base64
+    audio_data = base64.b64decode(audio_base64)
+
+    # Load audio
+    audio = AudioSegment.from_file(io.BytesIO(audio_data))
+
+    # Convert to mono 16kHz
+    audio = audio.set_channels(1)
+    audio = audio.set_frame_rate(16000)
+
+    # To numpy array
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+
+    # Normalize to [-1, 1]
+    samples = samples / np.max(np.abs(samples))
+
+    return samples
+
+
+def whisper_confidence(whisper_result: Dict) -> float:
+    """
+    Calcule un score de confiance basé sur les segments Whisper
+
+    Returns:
+        float: Confiance moyenne (0-1)
+    """
+    segments = whisper_result.get("segments", [])
+    if not segments:
+        return 0.5
+
+    # Average of no_speech_prob (inverted)
+    confidences = [1.0 - seg.get("no_speech_prob", 0.5) for seg in segments]
+    return sum(confidences) / len(confidences)
+
+
 class VoiceAssistant:
     """
     Assistant vocal pour saisie de données de gavage
@@ -56,8 +102,8 @@ class VoiceAssistant:
 
     def __init__(self, db_pool: asyncpg.Pool):
         self.db_pool = db_pool
-        self.model: Optional[whisper.Whisper] = None
-        self.model_size = "base"  # Options: tiny, base, small, medium, large
+        # Modèle Whisper chargé dans les processus d'inférence (WHISPER_MODEL_SIZE,
+        # app.services.inference_executor), pas dans le worker uvicorn
 
         if not WHISPER_AVAILABLE:
             logger.error("Whisper is required for Voice Assistant")
@@ -74,28 +120,6 @@ class VoiceAssistant:
             "remarque": r"remarque\s+(.+)",
         }
 
-    def load_model(self, model_size: str = "base"):
-        """
-        Charge le modèle Whisper
-
-        Model sizes:
-        - tiny: 39M params, ~1GB RAM, fastest
-        - base: 74M params, ~1GB RAM, good speed/quality
-        - small: 244M params, ~2GB RAM, better quality
-        - medium: 769M params, ~5GB RAM, high quality
-        - large: 1550M params, ~10GB RAM, best quality
-
-        Args:
-            model_size: Taille du modèle (tiny, base, small, medium, large)
-        """
-        if not WHISPER_AVAILABLE:
-            raise RuntimeError("Whisper is not installed")
-
-        logger.info(f"Loading Whisper model '{model_size}'...")
-        self.model = whisper.load_model(model_size)
-        self.model_size = model_size
-        logger.info(f"Whisper model '{model_size}' loaded successfully")
-
     def decode_audio(self, audio_base64: str) -> np.ndarray:
         """
         Décode un audio base64 en numpy array
@@ -109,26 +133,7 @@ class VoiceAssistant:
         Returns:
             np.ndarray: Audio array
         """
-        if not AUDIO_PROCESSING_AVAILABLE:
-            raise RuntimeError("Audio processing libraries not installed")
-
-        # Decode base64
-        audio_data = base64.b64decode(audio_base64)
-
-        # Load audio
-        audio = AudioSegment.from_file(io.BytesIO(audio_data))
-
-        # Convert to mono 16kHz
-        audio = audio.set_channels(1)
-        audio = audio.set_frame_rate(16000)
-
-        # To numpy array
-        samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
-
-        # Normalize to [-1, 1]
-        samples = samples / np.max(np.abs(samples))
-
-        return samples
+        return decode_audio_base64(audio_base64)
 
     async def transcribe(
         self,
@@ -149,49 +154,18 @@ class VoiceAssistant:
                 "confidence": float,
                 "segments": List[Dict]
             }
-        """
-        if not WHISPER_AVAILABLE:
-            return {
-                "text": "",
-                "language": language,
-                "confidence": 0.0,
-                "error": "Whisper not installed",
-                "segments": []
-            }
 
-        # Load model if not loaded
-        if self.model is None:
-            self.load_model(self.model_size)
+        Note:
+            Exécuté dans le pool d'inférence (un modèle Whisper chaud par
+            processus), jamais dans la boucle asyncio.
 
-        # Decode audio
-        try:
-            audio = self.decode_audio(audio_base64)
-        except Exception as e:
-            return {
-                "text": "",
-                "language": language,
-                "confidence": 0.0,
-                "error": f"Failed to decode audio: {str(e)}",
-                "segments": []
-            }
-
-        # Transcribe
+        Raises:
+            InferenceSaturated: file d'inférence pleine (→ 503)
+        """
         try:
-            result = self.model.transcribe(
-                audio,
-                language=language,
-                task="transcribe",
-                fp16=torch.cuda.is_available()
-            )
-
-            return {
-                "text": result["text"].strip(),
-                "language": result["language"],
-                "confidence": self._calculate_confidence(result),
-                "segments": result.get("segments", []),
-                "error": None
-            }
-
+            return await inference_executor.run("transcribe", audio_base64, language)
+        except InferenceSaturated:
+            raise
         except Exception as e:
             logger.error(f"Transcription failed: {e}")
             return {
@@ -203,22 +177,8 @@ class VoiceAssistant:
             }
 
     def _calculate_confidence(self, whisper_result: Dict) -> float:
-        """
-        Calcule un score de confiance basé sur les segments Whisper
-
-        Args:
-            whisper_result: Résultat de Whisper
-
-        Returns:
-            float: Confiance moyenne (0-1)
-        """
-        segments = whisper_result.get("segments", [])
-        if not segments:
-            return 0.5
-
-        # Average of no_speech_prob (inverted)
-        confidences = [1.0 - seg.get("no_speech_prob", 0.5) for seg in segments]
-        return sum(confidences) / len(confidences)
+        """Calcule un score de confiance basé sur les segments Whisper (0-1)"""
+        return whisper_confidence(whisper_result)
 
     def parse_gavage_command(self, text: str) -> Dict:
         """
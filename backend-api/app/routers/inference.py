@@ -0,0 +1,92 @@
+"""
+API Endpoints pour les jobs d'inférence asynchrones (Whisper, OCR)
+
+Le travail tourne dans le pool de processus d'inférence
+(app/services/inference_executor.py), jamais dans la boucle asyncio :
+- POST /api/inference/jobs/{kind}   → 202 + job_id (503 si file pleine)
+- GET  /api/inference/jobs/{job_id} → statut / résultat (poll)
+- WS   /api/inference/jobs/{job_id}/ws → résultat poussé à la fin du job
+"""
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+import logging
+
+from app.services.inference_executor import InferenceSaturated, inference_executor
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/inference", tags=["Inference Jobs"])
+
+
+class InferenceJobRequest(BaseModel):
+    """Requête de job d'inférence"""
+    payload_base64: str = Field(..., description="Audio (transcribe) ou image (ocr) encodé en base64")
+    lang: Optional[str] = Field(None, description="Langue (défaut: fr pour transcribe, fra pour ocr)")
+
+
+def saturated_exception(e: InferenceSaturated) -> HTTPException:
+    """503 + Retry-After quand la file d'inférence est pleine"""
+    logger.warning(f"Inference rejetée: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="Service d'inférence saturé, réessayer plus tard",
+        headers={"Retry-After": str(e.retry_after_s)}
+    )
+
+
+def _job_view(job: dict) -> dict:
+    return {k: job[k] for k in ("job_id", "kind", "status", "result", "error", "submitted_at", "finished_at")}
+
+
+@router.post("/jobs/{kind}", status_code=202)
+async def submit_job(kind: Literal["transcribe", "ocr"], request: InferenceJobRequest):
+    """
+    Soumet un job de transcription (Whisper) ou d'OCR (Tesseract)
+
+    **Retourne:** job_id, à suivre via GET /api/inference/jobs/{job_id}
+    ou WebSocket /api/inference/jobs/{job_id}/ws
+    """
+    lang = request.lang or ("fr" if kind == "transcribe" else "fra")
+    try:
+        job_id = inference_executor.submit(kind, request.payload_base64, lang)
+    except InferenceSaturated as e:
+        raise saturated_exception(e)
+
+    return {
+        "job_id": job_id,
+        "status": "pending",
+        "poll_url": f"/api/inference/jobs/{job_id}",
+        "websocket_url": f"/api/inference/jobs/{job_id}/ws"
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Statut et résultat d'un job (pending, running, done, error)"""
+    job = inference_executor.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} inconnu ou expiré")
+    return _job_view(job)
+
+
+@router.websocket("/jobs/{job_id}/ws")
+async def job_result_websocket(websocket: WebSocket, job_id: str):
+    """Envoie le résultat du job dès qu'il est terminé, puis ferme"""
+    await websocket.accept()
+    try:
+        job = await inference_executor.wait(job_id)
+        if job is None:
+            await websocket.send_json({"job_id": job_id, "status": "unknown", "error": "Job inconnu ou expiré"})
+        else:
+            await websocket.send_json(_job_view(job))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.get("/stats")
+async def get_inference_stats():
+    """Occupation du pool d'inférence (jobs en cours, rejets 503)"""
+    return inference_executor.get_stats()
@@ -14,6 +14,8 @@ from pydantic import BaseModel, Field
 import asyncpg
 import json
 
+from app.cache.simple_cache import cache_response, invalidate_lot
+
 # ============================================================================
 # ROUTER CONFIGURATION
 # ============================================================================
@@ -777,6 +779,7 @@ async def get_gavage_by_jour(
 # ============================================================================
 
 @router.get("/{lot_id}/courbes/theorique")
+@cache_response(ttl=600, key_prefix="lot_courbe_theo")
 async def get_courbe_theorique(
     lot_id: int,
     request: Request
@@ -803,10 +806,10 @@ async def get_courbe_theorique(
         return {
             "formule_pysr": row['formule_pysr'],
             "points": courbe,
+            # Réponse cachée 10 min : pas d'horodatage de requête dans le payload
             "metadata": {
                 "r2_score": row['r2_score_theorique'],
                 "nombre_echantillons": 0,  # À calculer
-                "date_generation": datetime.now().isoformat()
             }
         }
 
@@ -915,6 +918,7 @@ async def generer_courbe_theorique(
             courbe_json,
             lot_id
         )
+        await invalidate_lot(lot_id)
 
         return {
             "success": True,
@@ -100,6 +100,18 @@ async def get_cache_stats() -> Dict:
     }
 
 
+@router.get("/ingestion")
+async def get_ingestion_stats() -> Dict:
+    """Retourne stats des files d'ingestion temps réel (SQAL /ws/sensors/, gavage /ws/gavage)"""
+    from app.services.gavage_ingestion import gavage_ingestion_pipeline
+    from app.services.sqal_ingestion import sqal_ingestion_queue
+
+    return {
+        'sqal': sqal_ingestion_queue.stats(),
+        'gavage': gavage_ingestion_pipeline.stats()
+    }
+
+
 @router.delete("/cache")
 async def clear_cache() -> Dict:
     """Vide le cache (admin only)"""
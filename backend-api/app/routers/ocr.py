@@ -7,6 +7,8 @@ from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel, Field
 from typing import Optional
 from app.services.ocr_service import ocr_service
+from app.services.inference_executor import InferenceSaturated, inference_executor
+from app.routers.inference import saturated_exception
 import logging
 
 logger = logging.getLogger(__name__)
@@ -70,10 +72,8 @@ async def scan_image(request: OCRImageRequest):
     - confidence: Score de confiance (0-100)
     """
     try:
-        result = ocr_service.extract_text_from_base64(
-            request.image_base64,
-            lang=request.lang
-        )
+        # Tesseract dans le pool d'inférence (hors boucle asyncio)
+        result = await inference_executor.run("ocr", request.image_base64, request.lang)
 
         if not result["success"]:
             raise HTTPException(
@@ -85,6 +85,8 @@ async def scan_image(request: OCRImageRequest):
 
         return result
 
+    except InferenceSaturated as e:
+        raise saturated_exception(e)
     except Exception as e:
         logger.error(f"Erreur OCR scan-image: {str(e)}")
         raise HTTPException(
@@ -130,10 +132,7 @@ async def scan_document(request: OCRImageRequest):
     """
     try:
         # Étape 1: OCR extraction texte
-        ocr_result = ocr_service.extract_text_from_base64(
-            request.image_base64,
-            lang=request.lang
-        )
+        ocr_result = await inference_executor.run("ocr", request.image_base64, request.lang)
 
         if not ocr_result["success"]:
             raise HTTPException(
@@ -179,6 +178,8 @@ async def scan_document(request: OCRImageRequest):
             "ocr_confidence": confidence
         }
 
+    except InferenceSaturated as e:
+        raise saturated_exception(e)
     except Exception as e:
         logger.error(f"Erreur OCR scan-document: {str(e)}")
         raise HTTPException(
@@ -225,7 +226,7 @@ async def upload_file_ocr(
         image_base64 = base64.b64encode(contents).decode('utf-8')
 
         # OCR
-        result = ocr_service.extract_text_from_base64(image_base64, lang=lang)
+        result = await inference_executor.run("ocr", image_base64, lang)
 
         if not result["success"]:
             raise HTTPException(
@@ -237,6 +238,8 @@ async def upload_file_ocr(
 
         return result
 
+    except InferenceSaturated as e:
+        raise saturated_exception(e)
     except Exception as e:
         logger.error(f"Erreur upload-file OCR: {str(e)}")
         raise HTTPException(
@@ -4,7 +4,8 @@ Préfixe: /api/sqal/*
 """
 
 from fastapi import APIRouter, HTTPException, Query, Request
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 from datetime import datetime, timedelta, timezone
 import logging
 
@@ -20,6 +21,7 @@ from app.models.sqal import (
     SensorSampleDB
 )
 from app.services.sqal_service import sqal_service
+from app.services.sqal_samples_query import csv_header, decode_cursor, to_csv, to_ndjson
 
 logger = logging.getLogger(__name__)
 
@@ -190,7 +192,10 @@ async def get_samples(
     start_time: Optional[datetime] = Query(None, description="Début période (ISO 8601)"),
     end_time: Optional[datetime] = Query(None, description="Fin période (ISO 8601)"),
     device_id: Optional[str] = Query(None, description="Filtrer par device"),
-    limit: int = Query(100, ge=1, le=1000, description="Nombre max résultats")
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Nombre max résultats (JSON: défaut 100)"),
+    fields: Literal["scores", "analysis", "raw"] = Query("raw", description="Projection des colonnes"),
+    cursor: Optional[str] = Query(None, description="Curseur de la page suivante (next_cursor)"),
+    format: Literal["json", "ndjson", "csv"] = Query("json", description="json paginé ou export streamé")
 ):
     """
     Échantillons sur une période
@@ -199,27 +204,42 @@ async def get_samples(
         start_time: Début (défaut: 24h avant end_time)
         end_time: Fin (défaut: maintenant)
         device_id: Filtrer par device (optionnel)
-        limit: Max résultats (1-1000)
+        limit: Max résultats (1-1000). En ndjson/csv: toute la période si absent
+        fields: scores (scores/grades) | analysis (+ mesures et analyses) | raw (+ matrices)
+        cursor: Pagination par clé (timestamp, sample_id), renvoyé dans next_cursor
+        format: json (page) | ndjson | csv (streamés, mémoire bornée)
 
     Returns:
-        Liste d'échantillons
+        Liste d'échantillons et next_cursor, ou flux NDJSON/CSV
     """
+    if not end_time:
+        end_time = datetime.utcnow()
+    if not start_time:
+        start_time = end_time - timedelta(days=1)
+
     try:
-        if not end_time:
-            end_time = datetime.utcnow()
-        if not start_time:
-            start_time = end_time - timedelta(days=1)
+        if cursor:
+            decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        samples = await sqal_service.get_samples_period(
+    if format != "json":
+        return _stream_samples_response(start_time, end_time, device_id, fields, cursor, limit, format)
+
+    try:
+        samples, next_cursor = await sqal_service.get_samples_page(
             start_time=start_time,
             end_time=end_time,
             device_id=device_id,
-            limit=limit
+            limit=limit or 100,
+            fields=fields,
+            cursor=cursor
         )
 
         return {
             "samples": samples,
             "count": len(samples),
+            "next_cursor": next_cursor,
             "period": {
                 "start": start_time.isoformat(),
                 "end": end_time.isoformat()
@@ -231,6 +251,29 @@ async def get_samples(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _stream_samples_response(start_time, end_time, device_id, fields, cursor, limit, format) -> StreamingResponse:
+    """Export NDJSON/CSV : un lot du curseur serveur à la fois"""
+
+    async def body():
+        if format == "csv":
+            yield csv_header(fields)
+        try:
+            async for chunk in sqal_service.stream_samples(start_time, end_time, device_id, fields, cursor, limit):
+                yield to_csv(chunk, fields) if format == "csv" else to_ndjson(chunk)
+        except Exception as e:
+            # En-têtes déjà envoyés : on ne peut que couper le flux
+            logger.error(f"Erreur export échantillons ({format}): {e}")
+            raise
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"sqal_samples_{start_time:%Y%m%dT%H%M}_{end_time:%Y%m%dT%H%M}.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.post("/predict")
 async def predict(sample_id: str = Query(..., description="ID du sample (sample_id)")):
     try:
@@ -507,57 +550,11 @@ async def get_dashboard_overview():
         - Distribution grades
         - Alertes actives
         - Top/Bottom devices
+
+    Agrégé en SQL et mis en cache 10s (voir SQALService.get_dashboard_overview)
     """
     try:
-        end_time = datetime.utcnow()
-        start_time_24h = end_time - timedelta(days=1)
-        start_time_7d = end_time - timedelta(days=7)
-
-        # Stats 24h
-        samples_24h = await sqal_service.get_samples_period(
-            start_time=start_time_24h,
-            end_time=end_time,
-            limit=10000
-        )
-
-        total_24h = len(samples_24h)
-        avg_score_24h = (
-            sum(s["fusion_final_score"] for s in samples_24h) / total_24h
-        ) if total_24h > 0 else 0
-        compliance_24h = (
-            sum(1 for s in samples_24h if s["fusion_is_compliant"]) / total_24h * 100
-        ) if total_24h > 0 else 0
-
-        # Distribution grades 7j
-        grade_dist = await sqal_service.get_grade_distribution(
-            start_time=start_time_7d,
-            end_time=end_time
-        )
-
-        # Alertes non acquittées
-        alerts = await sqal_service.get_alerts(
-            start_time=start_time_24h,
-            end_time=end_time,
-            is_acknowledged=False,
-            limit=100
-        )
-
-        # Devices
-        devices = await sqal_service.get_devices()
-
-        return {
-            "stats_24h": {
-                "total_samples": total_24h,
-                "avg_quality_score": round(avg_score_24h, 3),
-                "compliance_rate_pct": round(compliance_24h, 1)
-            },
-            "grade_distribution_7d": grade_dist,
-            "active_alerts": len(alerts),
-            "critical_alerts": len([a for a in alerts if a.severity == "critical"]),
-            "total_devices": len(devices),
-            "active_devices": len([d for d in devices if d.status == "active"]),
-            "timestamp": end_time.isoformat()
-        }
+        return await sqal_service.get_dashboard_overview()
 
     except Exception as e:
         logger.error(f"Erreur dashboard overview: {e}")
@@ -4,14 +4,16 @@ Routes API pour Gestion des Tâches Celery
 Permet de déclencher, monitorer et gérer les tâches asynchrones.
 """
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 from celery.result import AsyncResult
 
 from app.tasks.celery_app import celery_app
 from app.tasks import ml_tasks, export_tasks, notification_tasks, scheduled_tasks
+from app.services.csv_exporter import build_query, stream_csv
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
@@ -31,7 +33,7 @@ class TaskStatusResponse(BaseModel):
     """Réponse statut tâche"""
     task_id: str
     task_name: str
-    status: str  # PENDING, STARTED, SUCCESS, FAILURE, RETRY, REVOKED
+    status: str  # PENDING, STARTED, PROGRESS, SUCCESS, FAILURE, RETRY, REVOKED
     result: Optional[Any] = None
     error: Optional[str] = None
     progress: Optional[int] = None
@@ -440,12 +442,16 @@ async def trigger_site_pdf_export(
 async def trigger_gavage_csv_export(
     lot_id: Optional[int] = None,
     date_debut: Optional[str] = None,
-    date_fin: Optional[str] = None
+    date_fin: Optional[str] = None,
+    fmt: str = Query("csv", regex="^(csv|parquet)$"),
+    gzip: bool = False
 ):
     """
-    Déclenche export CSV données gavage
+    Déclenche export CSV (ou Parquet) données gavage
+
+    Progression: GET /api/tasks/status/{task_id} (status PROGRESS, progress en %)
     """
-    task = export_tasks.export_gavage_data_csv.delay(lot_id, date_debut, date_fin)
+    task = export_tasks.export_gavage_data_csv.delay(lot_id, date_debut, date_fin, fmt, gzip)
     return {
         "status": "submitted",
         "task_id": task.id,
@@ -457,12 +463,16 @@ async def trigger_gavage_csv_export(
 async def trigger_sqal_csv_export(
     lot_id: Optional[int] = None,
     date_debut: Optional[str] = None,
-    date_fin: Optional[str] = None
+    date_fin: Optional[str] = None,
+    fmt: str = Query("csv", regex="^(csv|parquet)$"),
+    gzip: bool = False
 ):
     """
-    Déclenche export CSV données SQAL
+    Déclenche export CSV (ou Parquet) données SQAL
+
+    Progression: GET /api/tasks/status/{task_id} (status PROGRESS, progress en %)
     """
-    task = export_tasks.export_sqal_data_csv.delay(lot_id, date_debut, date_fin)
+    task = export_tasks.export_sqal_data_csv.delay(lot_id, date_debut, date_fin, fmt, gzip)
     return {
         "status": "submitted",
         "task_id": task.id,
@@ -470,6 +480,33 @@ async def trigger_sqal_csv_export(
     }
 
 
+@router.get("/export/stream/{dataset}")
+async def stream_csv_export(
+    request: Request,
+    dataset: Literal["sqal", "gavage", "feedbacks"],
+    lot_id: Optional[int] = None,
+    date_debut: Optional[str] = None,
+    date_fin: Optional[str] = None,
+    gzip: bool = False
+):
+    """
+    Export CSV en flux direct (sans tâche Celery), mémoire bornée
+
+    COPY ... TO STDOUT poussé dans la réponse HTTP au rythme du client.
+    """
+    filters = {"date_debut": date_debut, "date_fin": date_fin}
+    if dataset != "feedbacks":
+        filters["lot_id"] = lot_id
+    sql, args = build_query(dataset, **filters)
+
+    filename = f"{dataset}_export_{datetime.utcnow():%Y%m%d_%H%M%S}.csv" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_csv(request.app.state.db_pool, sql, args, gzip=gzip),
+        media_type="application/gzip" if gzip else "text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.post("/export/blockchain/certificate", response_model=Dict[str, str])
 async def trigger_blockchain_certificate(
     lot_id: int,
@@ -541,6 +578,7 @@ async def get_task_status(task_id: str):
     Statuts possibles:
     - PENDING: Tâche en attente
     - STARTED: Tâche en cours
+    - PROGRESS: Tâche en cours avec progression (exports)
     - SUCCESS: Tâche terminée avec succès
     - FAILURE: Tâche échouée
     - RETRY: Tâche en retry après erreur
@@ -564,11 +602,13 @@ async def get_task_status(task_id: str):
         response["completed_at"] = datetime.utcnow().isoformat()
     elif task.status == "FAILURE":
         response["error"] = str(task.info)
-    elif task.status == "STARTED":
+    elif task.status in ("STARTED", "PROGRESS"):
         response["started_at"] = datetime.utcnow().isoformat()
         # Progress si disponible (via task.update_state)
         if hasattr(task.info, 'get'):
             response["progress"] = task.info.get('progress', None)
+            if task.status == "PROGRESS":
+                response["result"] = task.info  # rows_exported / rows_total
 
     return response
 
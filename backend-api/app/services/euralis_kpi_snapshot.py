@@ -0,0 +1,539 @@
+"""
+Snapshot matérialisé des KPIs du dashboard Euralis
+
+Les endpoints /api/euralis/dashboard/kpis, /dashboard/charts/production et
+/dashboard/charts/itm servent ce snapshot en mémoire (temps constant, aucune
+requête base par écran superviseur) au lieu de ré-agréger lots_gavage à
+chaque affichage.
+
+Rafraîchissement incrémental:
+- notify_doses(site)       : gavage_consumer a écrit des doses_journalieres
+                              → mortalité 24h + alertes critiques (requêtes légères)
+- notify_lot_changed(site) : lot créé / terminé
+                              → agrégats lots, graphiques production et ITM
+                                du seul site (LOT_STATS_BY_SITE_QUERY fusionné)
+- rafraîchissement complet toutes les EURALIS_SNAPSHOT_FULL_REFRESH_S secondes
+  (écritures d'autres sources : imports CSV)
+
+Les notifications sont regroupées : au plus un rafraîchissement toutes les
+EURALIS_SNAPSHOT_MIN_REFRESH_S secondes, quel que soit le débit du consumer.
+Chaque fenêtre regroupée est diffusée aux autres processus (workers uvicorn)
+sur EURALIS_SNAPSHOT_CHANNEL (pg_notify), qui invalident les mêmes parties
+de leur propre snapshot.
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import uuid
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+import asyncpg
+
+from app.core.logging_config import get_logger
+
+logger = get_logger("app.services")
+
+# Fenêtre conservée pour le graphique production (jours)
+PRODUCTION_WINDOW_DAYS = 90
+
+# Invalidations partagées entre processus (LISTEN / pg_notify)
+EURALIS_SNAPSHOT_CHANNEL = "euralis_kpi_snapshot"
+
+
+# ============================================================================
+# REQUÊTES (partagées avec le repli sans snapshot du router)
+# ============================================================================
+
+LOT_STATS_QUERY = """
+    SELECT
+        -- Production avec données SQAL (prioritaire) ou fallback sur ITM
+        COALESCE(
+            (
+                -- MÉTHODE 1: Production calculée depuis mesures SQAL réelles
+                SELECT SUM(s.poids_moyen_g * l2.nb_accroches) / 1000
+                FROM lots_gavage l2
+                JOIN (
+                    SELECT
+                        lot_id,
+                        AVG(poids_foie_estime_g) as poids_moyen_g,
+                        COUNT(*) as nb_mesures
+                    FROM sensor_samples
+                    WHERE poids_foie_estime_g IS NOT NULL
+                    GROUP BY lot_id
+                ) s ON l2.id = s.lot_id
+                WHERE l2.statut IN ('termine', 'abattu')
+            ),
+            -- MÉTHODE 2: Fallback sur estimation via ITM si pas de données SQAL
+            SUM(
+                CASE
+                    WHEN statut IN ('termine', 'abattu')
+                         AND total_corn_real IS NOT NULL
+                         AND itm IS NOT NULL
+                    THEN total_corn_real * itm / 1000
+                    ELSE 0
+                END
+            )
+        ) as production_totale_kg,
+        COUNT(CASE WHEN statut = 'en_cours' THEN 1 END) as nb_lots_actifs,
+        COUNT(CASE WHEN statut IN ('termine', 'abattu') THEN 1 END) as nb_lots_termines,
+        COUNT(DISTINCT gaveur_id) as nb_gaveurs_actifs,
+        AVG(NULLIF(itm, 0)) as itm_moyen_global,
+        AVG(NULLIF(pctg_perte_gavage, 0)) as mortalite_moyenne_globale
+    FROM lots_gavage
+"""
+
+# Agrégats de LOT_STATS_QUERY par site, sous forme additive (sommes + effectifs)
+# pour fusionner les sites recalculés avec les autres ; $1 = sites (NULL = tous)
+LOT_STATS_BY_SITE_QUERY = """
+    WITH lots AS (
+        SELECT * FROM lots_gavage
+        WHERE $1::text[] IS NULL OR site_code = ANY($1::text[])
+    ),
+    sqal AS (
+        SELECT l.site_code, SUM(s.poids_moyen_g * l.nb_accroches) / 1000 as production_sqal_kg
+        FROM lots l
+        JOIN (
+            SELECT lot_id, AVG(poids_foie_estime_g) as poids_moyen_g
+            FROM sensor_samples
+            WHERE poids_foie_estime_g IS NOT NULL
+              AND lot_id IN (SELECT id FROM lots WHERE statut IN ('termine', 'abattu'))
+            GROUP BY lot_id
+        ) s ON l.id = s.lot_id
+        WHERE l.statut IN ('termine', 'abattu')
+        GROUP BY l.site_code
+    )
+    SELECT
+        l.site_code,
+        MAX(q.production_sqal_kg) as production_sqal_kg,
+        SUM(
+            CASE
+                WHEN l.statut IN ('termine', 'abattu')
+                     AND l.total_corn_real IS NOT NULL
+                     AND l.itm IS NOT NULL
+                THEN l.total_corn_real * l.itm / 1000
+                ELSE 0
+            END
+        ) as production_itm_kg,
+        COUNT(CASE WHEN l.statut = 'en_cours' THEN 1 END) as nb_lots_actifs,
+        COUNT(CASE WHEN l.statut IN ('termine', 'abattu') THEN 1 END) as nb_lots_termines,
+        COUNT(DISTINCT l.gaveur_id) as nb_gaveurs_actifs,
+        SUM(NULLIF(l.itm, 0)) as itm_somme,
+        COUNT(NULLIF(l.itm, 0)) as itm_nb,
+        SUM(NULLIF(l.pctg_perte_gavage, 0)) as mortalite_somme,
+        COUNT(NULLIF(l.pctg_perte_gavage, 0)) as mortalite_nb
+    FROM lots l
+    LEFT JOIN sqal q ON q.site_code IS NOT DISTINCT FROM l.site_code
+    GROUP BY l.site_code
+"""
+
+# Mortalité moyenne depuis doses_journalieres (pour les lots actifs)
+MORTALITE_24H_QUERY = """
+    SELECT AVG(dj.taux_mortalite)
+    FROM doses_journalieres dj
+    JOIN lots_gavage l ON dj.lot_id = l.id
+    WHERE l.statut = 'en_cours'
+    AND dj.time > NOW() - INTERVAL '24 hours'
+"""
+
+ALERTES_CRITIQUES_QUERY = """
+    SELECT COUNT(*)
+    FROM alertes_euralis
+    WHERE criticite = 'critique'
+    AND acquittee = false
+    AND time > NOW() - INTERVAL '7 days'
+"""
+
+# $2 = sites (NULL = tous)
+PRODUCTION_CHART_QUERY = """
+    SELECT
+        site_code,
+        DATE(debut_lot) as date,
+        COUNT(*) as nb_lots,
+        SUM(nb_canards_accroches * itm / 1000) as production_kg
+    FROM lots_gavage
+    WHERE debut_lot > NOW() - make_interval(days => $1)
+      AND ($2::text[] IS NULL OR site_code = ANY($2::text[]))
+    GROUP BY site_code, DATE(debut_lot)
+    ORDER BY date DESC, site_code
+"""
+
+ITM_CHART_QUERY = """
+    SELECT
+        site_code,
+        AVG(itm) as itm_moyen,
+        MIN(itm) as itm_min,
+        MAX(itm) as itm_max,
+        STDDEV(itm) as itm_stddev,
+        PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY itm) as q1,
+        PERCENTILE_CONT(0.50) WITHIN GROUP (ORDER BY itm) as median,
+        PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY itm) as q3
+    FROM lots_gavage
+    WHERE itm IS NOT NULL
+      AND ($1::text[] IS NULL OR site_code = ANY($1::text[]))
+    GROUP BY site_code
+    ORDER BY site_code
+"""
+
+
+def merge_lot_stats(by_site: Dict[Optional[str], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Lignes LOT_STATS_BY_SITE_QUERY → agrégats globaux de LOT_STATS_QUERY
+
+    Production SQAL dès qu'un site a des mesures, sinon estimation ITM (même
+    COALESCE que la requête globale) ; un gaveur est rattaché à un seul site.
+    """
+    rows = list(by_site.values())
+
+    def total(key):
+        return sum(float(r[key] or 0) for r in rows)
+
+    def moyenne(somme, nb):
+        n = total(nb)
+        return total(somme) / n if n else None
+
+    sqal = [float(r["production_sqal_kg"]) for r in rows if r["production_sqal_kg"] is not None]
+    return {
+        "production_totale_kg": sum(sqal) if sqal else (total("production_itm_kg") if rows else None),
+        "nb_lots_actifs": int(total("nb_lots_actifs")),
+        "nb_lots_termines": int(total("nb_lots_termines")),
+        "nb_gaveurs_actifs": int(total("nb_gaveurs_actifs")),
+        "itm_moyen_global": moyenne("itm_somme", "itm_nb"),
+        "mortalite_moyenne_globale": moyenne("mortalite_somme", "mortalite_nb"),
+    }
+
+
+def compose_kpis(lot_stats: Dict[str, Any], mortalite_realtime: Optional[float], nb_alertes: Optional[int]) -> Dict[str, Any]:
+    """Assemble la réponse DashboardKPIs depuis les agrégats lots + indicateurs temps réel"""
+    # Utiliser mortalite_realtime si stats.mortalite est NULL
+    mortalite_finale = lot_stats.get('mortalite_moyenne_globale') or mortalite_realtime or 0
+
+    return {
+        "production_totale_kg": lot_stats.get('production_totale_kg') or 0,
+        "nb_lots_actifs": lot_stats.get('nb_lots_actifs') or 0,
+        "nb_lots_termines": lot_stats.get('nb_lots_termines') or 0,
+        "nb_gaveurs_actifs": lot_stats.get('nb_gaveurs_actifs') or 0,
+        "itm_moyen_global": round(lot_stats.get('itm_moyen_global') or 0, 2),
+        "mortalite_moyenne_globale": round(mortalite_finale, 2),
+        "nb_alertes_critiques": nb_alertes or 0
+    }
+
+
+async def compute_kpis(conn: asyncpg.Connection) -> Dict[str, Any]:
+    """KPIs calculés directement en base (repli sans snapshot)"""
+    stats = await conn.fetchrow(LOT_STATS_QUERY)
+    mortalite_realtime = await conn.fetchval(MORTALITE_24H_QUERY)
+    nb_alertes = await conn.fetchval(ALERTES_CRITIQUES_QUERY)
+    return compose_kpis(dict(stats) if stats else {}, mortalite_realtime, nb_alertes)
+
+
+async def compute_production_chart(conn: asyncpg.Connection, periode: int, sites: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    rows = await conn.fetch(PRODUCTION_CHART_QUERY, periode, sites)
+    return [dict(row) for row in rows]
+
+
+async def compute_itm_chart(conn: asyncpg.Connection, sites: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    rows = await conn.fetch(ITM_CHART_QUERY, sites)
+    return [dict(row) for row in rows]
+
+
+# ============================================================================
+# SERVICE
+# ============================================================================
+
+class EuralisKPISnapshotService:
+    """
+    Snapshot en mémoire des KPIs / graphiques Euralis
+
+    Usage:
+        await euralis_kpi_snapshot.start(db_pool)
+        euralis_kpi_snapshot.notify_doses("LL")        # gavage_consumer
+        euralis_kpi_snapshot.get_kpis()                # endpoints (None si pas prêt)
+        await euralis_kpi_snapshot.stop()
+    """
+
+    def __init__(self, min_refresh_interval: float = 2.0, full_refresh_interval: float = 300.0):
+        self.min_refresh_interval = min_refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.pool: Optional[asyncpg.Pool] = None
+
+        # Agrégats matérialisés
+        self._lot_stats_by_site: Dict[Optional[str], Dict[str, Any]] = {}
+        self._lot_stats: Dict[str, Any] = {}
+        self._mortalite_realtime: Optional[float] = None
+        self._nb_alertes: Optional[int] = None
+        self._kpis: Optional[Dict[str, Any]] = None
+        self._production_by_site: Dict[str, List[Dict[str, Any]]] = {}
+        # Trié date DESC, site_code (ordre de la requête) + clés de bisection (-ordinal)
+        self._production_rows: List[Dict[str, Any]] = []
+        self._production_keys: List[int] = []
+        self._itm_by_site: Dict[str, Dict[str, Any]] = {}
+        self._itm_rows: List[Dict[str, Any]] = []
+
+        self.refreshed_at: Optional[datetime] = None
+        self._last_full_refresh = 0.0
+
+        # Notifications en attente (+ celles de ce processus, à diffuser aux autres)
+        self._doses_dirty = False
+        self._dirty_sites: Set[str] = set()
+        self._outgoing_doses = False
+        self._outgoing_sites: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Invalidations inter-processus
+        self._instance_id = uuid.uuid4().hex
+        self._listen_conn: Optional[asyncpg.Connection] = None
+
+        # Statistiques
+        self.full_refreshes = 0
+        self.incremental_refreshes = 0
+        self.notifications_received = 0
+
+    @classmethod
+    def from_env(cls) -> "EuralisKPISnapshotService":
+        return cls(
+            min_refresh_interval=float(os.getenv("EURALIS_SNAPSHOT_MIN_REFRESH_S", "2")),
+            full_refresh_interval=float(os.getenv("EURALIS_SNAPSHOT_FULL_REFRESH_S", "300")),
+        )
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    @property
+    def ready(self) -> bool:
+        return self._kpis is not None
+
+    async def start(self, pool: asyncpg.Pool):
+        """Premier calcul complet puis tâche de rafraîchissement (idempotent)"""
+        if self._task is not None and not self._task.done():
+            return
+        self.pool = pool
+        self._wakeup = asyncio.Event()
+        try:
+            await self.refresh_full()
+        except Exception as e:
+            # Tables absentes / base indisponible : les endpoints utilisent le repli
+            logger.error(f"Snapshot KPIs Euralis: calcul initial impossible: {e}")
+        try:
+            self._listen_conn = await pool.acquire()
+            await self._listen_conn.add_listener(EURALIS_SNAPSHOT_CHANNEL, self._on_notify)
+        except Exception as e:
+            logger.warning(f"Snapshot KPIs Euralis: LISTEN indisponible, rafraîchissement complet seul: {e}")
+            if self._listen_conn is not None:
+                await pool.release(self._listen_conn)
+                self._listen_conn = None
+        self._task = asyncio.create_task(self._run(), name="euralis-kpi-snapshot")
+        logger.info(
+            f"Snapshot KPIs Euralis démarré (min={self.min_refresh_interval}s, "
+            f"complet={self.full_refresh_interval}s)"
+        )
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._listen_conn is not None:
+            try:
+                await self._listen_conn.remove_listener(EURALIS_SNAPSHOT_CHANNEL, self._on_notify)
+            finally:
+                await self.pool.release(self._listen_conn)
+                self._listen_conn = None
+        logger.info("Snapshot KPIs Euralis arrêté")
+
+    # ------------------------------------------------------------------
+    # Notifications (gavage_consumer) — non bloquantes
+    # ------------------------------------------------------------------
+
+    def notify_doses(self, site_code: Optional[str] = None):
+        """Nouvelles lignes doses_journalieres"""
+        self._doses_dirty = True
+        self._outgoing_doses = True
+        self._wake()
+
+    def notify_lot_changed(self, site_code: Optional[str]):
+        """Lot créé ou terminé (statut, ITM, production)"""
+        self._dirty_sites.add(site_code or "*")
+        self._outgoing_sites.add(site_code or "*")
+        self._wake()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        """Callback asyncpg (LISTEN) : invalidations regroupées d'un autre processus"""
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Snapshot KPIs Euralis: notification illisible: {payload!r}")
+            return
+        if message.get("src") == self._instance_id:
+            return
+        self.notifications_received += 1
+        if message.get("doses"):
+            self._doses_dirty = True
+        self._dirty_sites.update(message.get("sites") or [])
+        self._wake()
+
+    async def _broadcast_invalidations(self):
+        """Diffuse les notifications locales de la fenêtre (un pg_notify par fenêtre)"""
+        sites, self._outgoing_sites = self._outgoing_sites, set()
+        doses, self._outgoing_doses = self._outgoing_doses, False
+        if (not sites and not doses) or self._listen_conn is None:
+            return
+        payload = json.dumps({"src": self._instance_id, "doses": doses, "sites": sorted(sites)})
+        try:
+            async with self.pool.acquire() as conn:
+                await conn.execute("SELECT pg_notify($1, $2)", EURALIS_SNAPSHOT_CHANNEL, payload)
+        except Exception as e:
+            logger.warning(f"Snapshot KPIs Euralis: diffusion des invalidations impossible: {e}")
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Lecture (temps constant)
+    # ------------------------------------------------------------------
+
+    @property
+    def stale_after(self) -> Optional[datetime]:
+        """Au-delà, le snapshot n'a pas été rafraîchi comme prévu"""
+        if self.refreshed_at is None:
+            return None
+        return self.refreshed_at + timedelta(seconds=self.full_refresh_interval)
+
+    def get_kpis(self) -> Optional[Dict[str, Any]]:
+        if self._kpis is None:
+            return None
+        return {**self._kpis, "refreshed_at": self.refreshed_at, "stale_after": self.stale_after}
+
+    def get_production_chart(self, periode: int) -> Optional[List[Dict[str, Any]]]:
+        """Lignes des `periode` derniers jours (None si hors fenêtre ou pas prêt)"""
+        if not self.ready or periode > PRODUCTION_WINDOW_DAYS:
+            return None
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=periode)).date()
+        end = bisect.bisect_left(self._production_keys, -cutoff.toordinal())
+        return self._production_rows[:end]
+
+    def get_itm_chart(self) -> Optional[List[Dict[str, Any]]]:
+        if not self.ready:
+            return None
+        return self._itm_rows
+
+    # ------------------------------------------------------------------
+    # Rafraîchissement
+    # ------------------------------------------------------------------
+
+    async def refresh_full(self):
+        async with self.pool.acquire() as conn:
+            lot_stats = await conn.fetch(LOT_STATS_BY_SITE_QUERY, None)
+            self._lot_stats_by_site = {row["site_code"]: dict(row) for row in lot_stats}
+            await self._refresh_realtime(conn)
+            production = await compute_production_chart(conn, PRODUCTION_WINDOW_DAYS)
+            itm = await compute_itm_chart(conn)
+
+        self._production_by_site = {}
+        for row in production:
+            self._production_by_site.setdefault(row["site_code"], []).append(row)
+        self._itm_by_site = {row["site_code"]: row for row in itm}
+        self._publish()
+        self._last_full_refresh = time.monotonic()
+        self.full_refreshes += 1
+
+    async def refresh_incremental(self):
+        """Rafraîchit uniquement ce que les notifications ont invalidé"""
+        sites, self._dirty_sites = self._dirty_sites, set()
+        doses, self._doses_dirty = self._doses_dirty, False
+        if not sites and not doses:
+            return
+        if "*" in sites:
+            await self.refresh_full()
+            return
+
+        async with self.pool.acquire() as conn:
+            if doses:
+                await self._refresh_realtime(conn)
+            if sites:
+                site_list = sorted(sites)
+                lot_stats = await conn.fetch(LOT_STATS_BY_SITE_QUERY, site_list)
+                production = await compute_production_chart(conn, PRODUCTION_WINDOW_DAYS, site_list)
+                itm = await compute_itm_chart(conn, site_list)
+
+                for site in site_list:
+                    self._lot_stats_by_site.pop(site, None)
+                    self._production_by_site.pop(site, None)
+                    self._itm_by_site.pop(site, None)
+                for row in lot_stats:
+                    self._lot_stats_by_site[row["site_code"]] = dict(row)
+                for row in production:
+                    self._production_by_site.setdefault(row["site_code"], []).append(row)
+                for row in itm:
+                    self._itm_by_site[row["site_code"]] = row
+
+        self._publish()
+        self.incremental_refreshes += 1
+
+    async def _refresh_realtime(self, conn: asyncpg.Connection):
+        self._mortalite_realtime = await conn.fetchval(MORTALITE_24H_QUERY)
+        self._nb_alertes = await conn.fetchval(ALERTES_CRITIQUES_QUERY)
+
+    def _publish(self):
+        """Recompose les vues servies (remplacement atomique pour les lecteurs)"""
+        self._lot_stats = merge_lot_stats(self._lot_stats_by_site)
+        self._kpis = compose_kpis(self._lot_stats, self._mortalite_realtime, self._nb_alertes)
+
+        rows = [row for site_rows in self._production_by_site.values() for row in site_rows]
+        rows.sort(key=lambda r: (-r["date"].toordinal(), r["site_code"] or ""))
+        self._production_rows = rows
+        self._production_keys = [-r["date"].toordinal() for r in rows]
+
+        self._itm_rows = [self._itm_by_site[site] for site in sorted(self._itm_by_site, key=lambda s: s or "")]
+        self.refreshed_at = datetime.now(timezone.utc)
+
+    async def _run(self):
+        while True:
+            try:
+                until_full = self.full_refresh_interval - (time.monotonic() - self._last_full_refresh)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, until_full))
+                except asyncio.TimeoutError:
+                    await self.refresh_full()
+                    continue
+
+                # Regroupe les notifications d'une rafale d'écritures
+                await asyncio.sleep(self.min_refresh_interval)
+                self._wakeup.clear()
+                await self._broadcast_invalidations()
+                if time.monotonic() - self._last_full_refresh >= self.full_refresh_interval:
+                    self._dirty_sites.clear()
+                    self._doses_dirty = False
+                    await self.refresh_full()
+                else:
+                    await self.refresh_incremental()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Snapshot KPIs Euralis: erreur de rafraîchissement: {e}")
+                await asyncio.sleep(self.min_refresh_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "refreshed_at": self.refreshed_at.isoformat() if self.refreshed_at else None,
+            "stale_after": self.stale_after.isoformat() if self.stale_after else None,
+            "full_refreshes": self.full_refreshes,
+            "incremental_refreshes": self.incremental_refreshes,
+            "notifications_received": self.notifications_received,
+            "listening": self._listen_conn is not None,
+        }
+
+
+# Instance globale (singleton)
+euralis_kpi_snapshot = EuralisKPISnapshotService.from_env()
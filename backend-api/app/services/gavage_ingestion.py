@@ -0,0 +1,397 @@
+"""
+Pipeline d'ingestion des messages /ws/gavage (simulateur gavage temps réel)
+
+Chaque message met à jour trois tables : lots_gavage (état du lot),
+gavage_data_lots (hypertable) et doses_journalieres (dashboard Euralis).
+Au lieu de trois requêtes par message, les messages en attente sont écrits
+par lots, dans une seule transaction :
+
+1. un upsert lots_gavage multi-lignes (unnest, une ligne par lot) ; les id
+   viennent du cache code_lot → id, l'upsert ne les renvoie (RETURNING) que
+   pour les lots inconnus (plus de sous-requête par ligne)
+2. un INSERT gavage_data_lots multi-lignes
+3. un INSERT doses_journalieres multi-lignes (J-1 exclu)
+
+Les textes SQL sont constants : asyncpg les prépare une fois par connexion
+(statement_cache_size, app.core.db_pool).
+
+Un lot est écrit dès que le précédent est terminé : à faible débit chaque
+message part seul, sans attente ; quand le simulateur tourne en accéléré,
+les messages arrivés pendant une écriture partent ensemble (au plus
+GAVAGE_INGEST_BATCH_SIZE). GAVAGE_INGEST_FLUSH_MS > 0 ajoute une attente
+pour regrouper davantage.
+
+Backpressure : file bornée (GAVAGE_INGEST_QUEUE_MAX), submit() lève
+IngestionQueueFullError après GAVAGE_INGEST_PUT_TIMEOUT_S.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.logging_config import get_logger
+from app.services.sqal_ingestion import IngestionQueueFullError
+
+logger = get_logger("app.services")
+
+
+UPSERT_LOTS_QUERY = """
+    INSERT INTO lots_gavage (
+        code_lot, gaveur_id, site_code, genetique, debut_lot,
+        nb_canards_initial, poids_moyen_actuel, taux_mortalite,
+        jour_actuel, pret_abattage, updated_at
+    )
+    SELECT code_lot, gaveur_id, site_code, genetique, CURRENT_DATE,
+           nb_canards_initial, poids_moyen_actuel, taux_mortalite,
+           jour_actuel, pret_abattage, NOW()
+    FROM unnest(
+        $1::text[], $2::int[], $3::text[], $4::text[], $5::int[],
+        $6::float8[], $7::float8[], $8::int[], $9::bool[]
+    ) AS u(code_lot, gaveur_id, site_code, genetique, nb_canards_initial,
+           poids_moyen_actuel, taux_mortalite, jour_actuel, pret_abattage)
+    ON CONFLICT (code_lot) DO UPDATE SET
+        poids_moyen_actuel = EXCLUDED.poids_moyen_actuel,
+        taux_mortalite = EXCLUDED.taux_mortalite,
+        jour_actuel = EXCLUDED.jour_actuel,
+        pret_abattage = EXCLUDED.pret_abattage,
+        updated_at = NOW()
+"""
+
+# Lots absents du cache : l'upsert renvoie leur id
+UPSERT_LOTS_RETURNING_QUERY = UPSERT_LOTS_QUERY + "    RETURNING id, code_lot\n"
+
+INSERT_GAVAGE_LOTS_QUERY = """
+    INSERT INTO gavage_data_lots (
+        time, lot_gavage_id, jour_gavage, repas,
+        dose_moyenne, dose_theorique, poids_moyen_lot,
+        nb_canards_vivants, nb_canards_morts, taux_mortalite,
+        temperature_stabule, humidite_stabule
+    )
+    SELECT * FROM unnest(
+        $1::timestamptz[], $2::int[], $3::int[], $4::text[],
+        $5::float8[], $6::float8[], $7::float8[],
+        $8::int[], $9::int[], $10::float8[],
+        $11::float8[], $12::float8[]
+    )
+    ON CONFLICT (time, lot_gavage_id, repas) DO UPDATE SET
+        dose_moyenne = EXCLUDED.dose_moyenne,
+        dose_theorique = EXCLUDED.dose_theorique,
+        poids_moyen_lot = EXCLUDED.poids_moyen_lot,
+        nb_canards_vivants = EXCLUDED.nb_canards_vivants,
+        nb_canards_morts = EXCLUDED.nb_canards_morts,
+        taux_mortalite = EXCLUDED.taux_mortalite
+"""
+
+INSERT_DOSES_QUERY = """
+    INSERT INTO doses_journalieres (
+        time, code_lot, jour, moment,
+        dose_theorique, dose_reelle,
+        poids_moyen, nb_vivants, taux_mortalite,
+        temperature, humidite
+    )
+    SELECT * FROM unnest(
+        $1::timestamptz[], $2::text[], $3::int[], $4::text[],
+        $5::float8[], $6::float8[],
+        $7::float8[], $8::int[], $9::float8[],
+        $10::float8[], $11::float8[]
+    )
+    ON CONFLICT (time, code_lot, jour, moment) DO UPDATE SET
+        dose_reelle = EXCLUDED.dose_reelle,
+        poids_moyen = EXCLUDED.poids_moyen,
+        nb_vivants = EXCLUDED.nb_vivants,
+        taux_mortalite = EXCLUDED.taux_mortalite,
+        temperature = EXCLUDED.temperature,
+        humidite = EXCLUDED.humidite
+"""
+
+
+def _colonnes(lignes: Sequence[tuple], nb: int) -> List[list]:
+    """Lignes → un tableau par colonne (paramètres unnest)"""
+    return [list(c) for c in zip(*lignes)] if lignes else [[] for _ in range(nb)]
+
+
+async def save_gavage_batch(conn, messages: Sequence[Any], lot_ids: Dict[str, int]) -> Dict[str, int]:
+    """
+    Écrit des GavageRealtimeMessage en une transaction, trois requêtes au total
+
+    ON CONFLICT ne peut pas toucher deux fois la même ligne dans une requête :
+    un seul upsert par lot (identité du premier message, état du dernier) et
+    une seule ligne par clé de conflit (le dernier message l'emporte, comme
+    l'aurait fait l'enchaînement des upserts unitaires).
+
+    Args:
+        conn: Connexion asyncpg
+        messages: Messages validés, dans l'ordre de réception
+        lot_ids: Cache code_lot → lots_gavage.id, complété par l'upsert
+
+    Returns:
+        code_lot → id des lots du lot écrit
+    """
+    lots: Dict[str, list] = {}
+    gavages: Dict[tuple, tuple] = {}
+    doses: Dict[tuple, tuple] = {}
+
+    for m in messages:
+        ts = datetime.fromisoformat(m.timestamp)
+        etat = [m.poids_moyen, m.taux_mortalite, m.jour, m.pret_abattage or False]
+        if m.code_lot in lots:
+            lots[m.code_lot][5:] = etat
+        else:
+            lots[m.code_lot] = [m.code_lot, m.gaveur_id, m.site, m.genetique,
+                                m.nb_canards_vivants, *etat]  # nb_canards_initial : approximation
+
+        gavages[(ts, m.code_lot, m.moment)] = (
+            ts, m.code_lot, m.jour, m.moment, m.dose_reelle, m.dose_theorique, m.poids_moyen,
+            m.nb_canards_vivants, 0, m.taux_mortalite, m.temperature_stabule, m.humidite_stabule,
+        )
+        if m.jour >= 0:  # Ne pas enregistrer J-1
+            doses[(ts, m.code_lot, m.jour, m.moment)] = (
+                ts, m.code_lot, m.jour, m.moment, m.dose_theorique, m.dose_reelle, m.poids_moyen,
+                m.nb_canards_vivants, m.taux_mortalite, m.temperature_stabule, m.humidite_stabule,
+            )
+
+    params = _colonnes([tuple(l) for l in lots.values()], 9)
+    async with conn.transaction():
+        if all(code in lot_ids for code in lots):
+            await conn.execute(UPSERT_LOTS_QUERY, *params)
+            ids = {code: lot_ids[code] for code in lots}
+        else:
+            rows = await conn.fetch(UPSERT_LOTS_RETURNING_QUERY, *params)
+            ids = {r["code_lot"]: r["id"] for r in rows}
+            lot_ids.update(ids)
+
+        lignes_gavage = [(g[0], ids[g[1]], *g[2:]) for g in gavages.values()]
+        await conn.execute(INSERT_GAVAGE_LOTS_QUERY, *_colonnes(lignes_gavage, 12))
+        if doses:
+            await conn.execute(INSERT_DOSES_QUERY, *_colonnes(list(doses.values()), 11))
+
+    return ids
+
+
+class GavageIngestionPipeline:
+    """
+    File write-behind des messages /ws/gavage, écrits par lots
+
+    Usage:
+        gavage_ingestion_pipeline.set_db_pool(db_pool)
+        await gavage_ingestion_pipeline.start()
+        await gavage_ingestion_pipeline.submit(gavage_data)   # attend l'écriture du lot
+        await gavage_ingestion_pipeline.stop()                # vide la file puis s'arrête
+    """
+
+    def __init__(
+        self,
+        db_pool=None,
+        batch_size: int = 500,
+        flush_interval: float = 0.0,
+        max_queue_size: int = 10000,
+        put_timeout: float = 2.0,
+        lot_cache_max: int = 10000,
+    ):
+        self.db_pool = db_pool
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.max_queue_size = max_queue_size
+        self.put_timeout = put_timeout
+        self.lot_cache_max = lot_cache_max
+
+        # code_lot → lots_gavage.id (les lots ne sont jamais renommés)
+        self.lot_ids: Dict[str, int] = {}
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Statistiques (exposées via stats())
+        self.batches_written = 0
+        self.messages_written = 0
+        self.messages_failed = 0
+        self.rejected_full = 0
+        self.last_flush_ms: float = 0.0
+        self._debit: deque = deque()  # (instant, nb messages écrits) sur la fenêtre de débit
+
+    @classmethod
+    def from_env(cls) -> "GavageIngestionPipeline":
+        return cls(
+            batch_size=int(os.getenv("GAVAGE_INGEST_BATCH_SIZE", "500")),
+            flush_interval=float(os.getenv("GAVAGE_INGEST_FLUSH_MS", "0")) / 1000.0,
+            max_queue_size=int(os.getenv("GAVAGE_INGEST_QUEUE_MAX", "10000")),
+            put_timeout=float(os.getenv("GAVAGE_INGEST_PUT_TIMEOUT_S", "2.0")),
+            lot_cache_max=int(os.getenv("GAVAGE_LOT_CACHE_MAX", "10000")),
+        )
+
+    def set_db_pool(self, pool):
+        """Configure le pool de connexions DB"""
+        self.db_pool = pool
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        """Démarre la tâche d'écriture (idempotent)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run(), name="gavage-ingestion-flush")
+        logger.info(
+            f"Pipeline d'ingestion gavage démarré (batch={self.batch_size}, "
+            f"flush={self.flush_interval * 1000:.0f}ms, max={self.max_queue_size})"
+        )
+
+    async def stop(self):
+        """Écrit les messages encore en file puis arrête la tâche d'écriture"""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        logger.info(f"Pipeline d'ingestion gavage arrêté ({self.messages_written} messages écrits)")
+
+    async def submit(self, gavage_data) -> bool:
+        """
+        Place un message dans la file et attend que son lot soit écrit
+
+        Sans tâche d'écriture active, écrit directement (lot d'un message).
+
+        Returns:
+            True si le message est en base, False sinon
+
+        Raises:
+            IngestionQueueFullError: file pleine au-delà de put_timeout
+        """
+        if not self.running:
+            return (await self._write([gavage_data]))[0]
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put((gavage_data, future)), timeout=self.put_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_full += 1
+            raise IngestionQueueFullError(
+                f"File d'ingestion gavage pleine ({self.max_queue_size} messages en attente)"
+            )
+        return await future
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def messages_per_second(self, window: float = 10.0) -> float:
+        """Débit d'écriture sur les `window` dernières secondes"""
+        now = time.monotonic()
+        while self._debit and self._debit[0][0] < now - window:
+            self._debit.popleft()
+        if not self._debit:
+            return 0.0
+        elapsed = max(now - self._debit[0][0], self.last_flush_ms / 1000, 1e-3)
+        return sum(n for _, n in self._debit) / elapsed
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_size": self.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "batches_written": self.batches_written,
+            "messages_written": self.messages_written,
+            "messages_failed": self.messages_failed,
+            "rejected_full": self.rejected_full,
+            "avg_batch_size": round(self.messages_written / self.batches_written, 1) if self.batches_written else 0.0,
+            "messages_per_second": round(self.messages_per_second(), 1),
+            "last_flush_ms": self.last_flush_ms,
+            "lots_en_cache": len(self.lot_ids),
+        }
+
+    async def _collect_batch(self) -> List[Tuple[Any, asyncio.Future]]:
+        """Bloque sur le premier élément puis prend ce qui est déjà en file (attente flush_interval au plus)"""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            try:
+                results = await self._write([m for m, _ in batch])
+            except Exception as e:
+                # _write renvoie normalement un résultat par message ; filet de sécurité
+                logger.error(f"❌ Écriture ingestion gavage inattendue: {e}", exc_info=True)
+                results = [False] * len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            for (_, future), ok in zip(batch, results):
+                if not future.done():
+                    future.set_result(ok)
+
+    async def _write(self, messages: List[Any]) -> List[bool]:
+        if not self.db_pool:
+            logger.error("Pool de connexion DB non initialisé")
+            self.messages_failed += len(messages)
+            return [False] * len(messages)
+
+        if len(self.lot_ids) > self.lot_cache_max:
+            self.lot_ids.clear()
+
+        start = time.perf_counter()
+        async with self.db_pool.acquire() as conn:
+            try:
+                await save_gavage_batch(conn, messages, self.lot_ids)
+                results = [True] * len(messages)
+                self.batches_written += 1
+            except Exception as e:
+                # Un id en cache peut être périmé (lot supprimé puis recréé)
+                for m in messages:
+                    self.lot_ids.pop(m.code_lot, None)
+                if len(messages) == 1:
+                    logger.error(f"Erreur sauvegarde DB gavage: {e}", exc_info=True)
+                    results = [False]
+                else:
+                    # Un message invalide fait échouer tout le lot : repli unitaire
+                    logger.warning(f"Écriture par lot gavage échouée ({len(messages)} messages), repli unitaire: {e}")
+                    results = []
+                    for m in messages:
+                        try:
+                            await save_gavage_batch(conn, [m], self.lot_ids)
+                            results.append(True)
+                            self.batches_written += 1
+                        except Exception as single_err:
+                            logger.error(f"Erreur sauvegarde DB gavage {m.code_lot}: {single_err}")
+                            results.append(False)
+
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        ok = sum(results)
+        self.messages_written += ok
+        self.messages_failed += len(results) - ok
+        self._debit.append((time.monotonic(), ok))
+
+        logger.debug(f"Flush ingestion gavage: {len(messages)} messages en {self.last_flush_ms:.1f}ms")
+        return results
+
+
+# Instance globale (singleton)
+gavage_ingestion_pipeline = GavageIngestionPipeline.from_env()
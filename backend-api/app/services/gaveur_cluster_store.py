@@ -0,0 +1,306 @@
+"""
+Segmentation K-Means des gaveurs persistée par site
+
+Un modèle (centres, normalisation, ordre des clusters) est entraîné par site
+et stocké dans gaveur_cluster_models ; les affectations sont écrites dans
+gaveurs_clusters (lu aussi par /ml/gaveurs-by-cluster).
+
+Rafraîchissement (refresh_site, Celery refresh_gaveur_clusters_async):
+- gaveurs dont les lots ont changé depuis la dernière passe → affectés au
+  centre le plus proche (GaveurSegmentation.assign_nearest), sans ré-entraînement
+- ré-entraînement complet seulement si le modèle a plus de CLUSTER_REFIT_DAYS
+  jours, ou si la distance moyenne aux centres dépasse CLUSTER_DRIFT_THRESHOLD
+  fois celle mesurée à l'entraînement (dérive)
+
+GET /api/euralis/ml/clusters ne lit que les affectations stockées.
+Schéma : alembic 20261017_0006.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+from app.core.logging_config import get_logger
+
+logger = get_logger("app.services")
+
+CLUSTER_LABELS = ['Excellent', 'Très bon', 'Bon', 'À améliorer', 'Critique']
+
+CLUSTER_DISPLAY = {
+    'Excellent': {
+        'couleur': '#10b981',
+        'description': 'Gaveurs exceptionnels - Performances top tier',
+        'recommandation': 'Partager bonnes pratiques avec autres'
+    },
+    'Très bon': {
+        'couleur': '#3b82f6',
+        'description': 'Excellentes performances générales',
+        'recommandation': 'Viser excellence en optimisant régularité'
+    },
+    'Bon': {
+        'couleur': '#f59e0b',
+        'description': 'Performances correctes, marge de progression',
+        'recommandation': 'Formation continue sur dosage précis'
+    },
+    'À améliorer': {
+        'couleur': '#f97316',
+        'description': 'Nécessite accompagnement rapproché',
+        'recommandation': 'Mentoring par gaveurs excellents'
+    },
+    'Critique': {
+        'couleur': '#ef4444',
+        'description': 'Performances faibles, intervention urgente',
+        'recommandation': 'Formation intensive + suivi quotidien'
+    }
+}
+
+MIN_GAVEURS = 5
+
+# $1 = site, $2 = lots modifiés depuis (NULL = tous les gaveurs)
+GAVEUR_FEATURES_QUERY = """
+    SELECT
+        g.id as gaveur_id,
+        g.site_code,
+        COUNT(l.id) as nb_lots,
+        AVG(l.itm) as itm_moyen,
+        AVG(l.sigma) as sigma_moyen,
+        STDDEV(l.itm) as regularite,
+        AVG(l.pctg_perte_gavage) as mortalite_moyenne
+    FROM gaveurs_euralis g
+    JOIN lots_gavage l ON g.id = l.gaveur_id AND l.itm IS NOT NULL
+    WHERE g.actif = TRUE
+      AND g.site_code = $1
+    GROUP BY g.id, g.site_code
+    HAVING COUNT(l.id) >= 2
+       AND ($2::timestamptz IS NULL OR MAX(GREATEST(l.created_at, l.updated_at)) > $2)
+"""
+
+UPSERT_ASSIGNMENT = """
+    INSERT INTO gaveurs_clusters (
+        gaveur_id, cluster_id, cluster_label, itm_moyen, sigma_moyen,
+        mortalite_moyenne, nb_lots_total, distance_centroide, modele_version, updated_at
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, NOW())
+    ON CONFLICT (gaveur_id) DO UPDATE SET
+        cluster_id = EXCLUDED.cluster_id,
+        cluster_label = EXCLUDED.cluster_label,
+        itm_moyen = EXCLUDED.itm_moyen,
+        sigma_moyen = EXCLUDED.sigma_moyen,
+        mortalite_moyenne = EXCLUDED.mortalite_moyenne,
+        nb_lots_total = EXCLUDED.nb_lots_total,
+        distance_centroide = EXCLUDED.distance_centroide,
+        modele_version = EXCLUDED.modele_version,
+        updated_at = NOW()
+"""
+
+
+def refit_settings() -> Dict[str, float]:
+    return {
+        "refit_days": float(os.getenv("CLUSTER_REFIT_DAYS", "7")),
+        "drift_threshold": float(os.getenv("CLUSTER_DRIFT_THRESHOLD", "1.25")),
+    }
+
+
+def _assignment_record(metrics: Dict[str, Any], rank: int, distance: float, modele_version: str) -> tuple:
+    return (
+        metrics["gaveur_id"],
+        rank,
+        CLUSTER_LABELS[rank],
+        _float(metrics.get("itm_moyen")),
+        _float(metrics.get("sigma_moyen")),
+        _float(metrics.get("mortalite_moyenne")),
+        int(metrics.get("nb_lots") or 0),
+        distance,
+        modele_version,
+    )
+
+
+def _float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _fit(gaveurs: List[Dict[str, Any]]):
+    """Entraînement K-Means (thread dédié : ne bloque pas la boucle asyncio)"""
+    import pandas as pd
+    from app.ml.euralis.gaveur_clustering import GaveurSegmentation
+
+    df = pd.DataFrame(gaveurs).fillna(0)
+    segmenter = GaveurSegmentation(n_clusters=min(len(CLUSTER_LABELS), len(df)))
+    df = segmenter.segment_gaveurs(df)
+    return segmenter, df
+
+
+async def fit_site_model(conn: asyncpg.Connection, site_code: str) -> Optional[str]:
+    """
+    Ré-entraînement complet d'un site : nouveau modèle actif + toutes les affectations
+
+    Returns:
+        modele_version, ou None si moins de MIN_GAVEURS gaveurs avec 2+ lots
+    """
+    gaveurs = [dict(r) for r in await conn.fetch(GAVEUR_FEATURES_QUERY, site_code, None)]
+    if len(gaveurs) < MIN_GAVEURS:
+        return None
+
+    started_at = datetime.now(timezone.utc)
+    segmenter, df = await asyncio.to_thread(_fit, gaveurs)
+    modele_version = started_at.strftime(f"kmeans-{site_code}-%Y%m%dT%H%M%S")
+    baseline = float(df["distance_centroide"].mean())
+
+    records = [
+        _assignment_record(metrics, int(rank), float(distance), modele_version)
+        for metrics, rank, distance in zip(gaveurs, df["cluster_rank"], df["distance_centroide"])
+    ]
+
+    async with conn.transaction():
+        await conn.execute(
+            """
+            INSERT INTO gaveur_cluster_models (
+                site_code, modele_version, state, baseline_distance, n_gaveurs, assigned_until
+            ) VALUES ($1, $2, $3::jsonb, $4, $5, $6)
+            """,
+            site_code, modele_version, json.dumps(segmenter.export_state()),
+            baseline, len(gaveurs), started_at,
+        )
+        await conn.execute(
+            "UPDATE gaveur_cluster_models SET is_active = (modele_version = $2) WHERE site_code = $1",
+            site_code, modele_version,
+        )
+        await conn.executemany(UPSERT_ASSIGNMENT, records)
+
+    logger.info(f"👥 Clustering {site_code}: modèle {modele_version} ({len(records)} gaveurs)")
+    return modele_version
+
+
+async def reassign_changed(conn: asyncpg.Connection, site_code: str, model: Dict[str, Any]) -> int:
+    """Affecte au centre le plus proche les gaveurs dont les lots ont changé"""
+    from app.ml.euralis.gaveur_clustering import GaveurSegmentation
+
+    started_at = datetime.now(timezone.utc)
+    gaveurs = [
+        dict(r) for r in await conn.fetch(GAVEUR_FEATURES_QUERY, site_code, model["assigned_until"])
+    ]
+    if gaveurs:
+        segmenter = GaveurSegmentation.from_state(json.loads(model["state"]))
+        records = [
+            _assignment_record(metrics, rank, distance, model["modele_version"])
+            for metrics, (rank, distance) in zip(gaveurs, segmenter.assign_nearest(gaveurs))
+        ]
+        await conn.executemany(UPSERT_ASSIGNMENT, records)
+
+    await conn.execute(
+        "UPDATE gaveur_cluster_models SET assigned_until = $3 WHERE site_code = $1 AND modele_version = $2",
+        site_code, model["modele_version"], started_at,
+    )
+    return len(gaveurs)
+
+
+async def drift_ratio(conn: asyncpg.Connection, site_code: str, model: Dict[str, Any]) -> float:
+    """Distance moyenne actuelle aux centres / distance à l'entraînement"""
+    current = await conn.fetchval(
+        """
+        SELECT AVG(gc.distance_centroide)
+        FROM gaveurs_clusters gc
+        JOIN gaveurs_euralis g ON g.id = gc.gaveur_id
+        WHERE g.site_code = $1 AND gc.modele_version = $2
+        """,
+        site_code, model["modele_version"],
+    )
+    baseline = model["baseline_distance"]
+    if not current or not baseline:
+        return 1.0
+    return float(current) / float(baseline)
+
+
+async def refresh_site(conn: asyncpg.Connection, site_code: str, force: bool = False) -> Dict[str, Any]:
+    """
+    Affectation incrémentale, ré-entraînement si forcé / planifié / dérive
+
+    Returns:
+        {"site_code", "action": "refit"|"reassign"|"skipped", ...}
+    """
+    settings = refit_settings()
+    model = await conn.fetchrow(
+        "SELECT * FROM gaveur_cluster_models WHERE site_code = $1 AND is_active",
+        site_code,
+    )
+
+    too_old = model is not None and (
+        datetime.now(timezone.utc) - model["created_at"] > timedelta(days=settings["refit_days"])
+    )
+    if force or model is None or too_old:
+        version = await fit_site_model(conn, site_code)
+        return {"site_code": site_code, "action": "refit" if version else "skipped", "modele_version": version}
+
+    model = dict(model)
+    reassigned = await reassign_changed(conn, site_code, model)
+    ratio = await drift_ratio(conn, site_code, model)
+    if ratio > settings["drift_threshold"]:
+        logger.warning(f"⚠️ Dérive clustering {site_code} (x{ratio:.2f}), ré-entraînement")
+        version = await fit_site_model(conn, site_code)
+        return {"site_code": site_code, "action": "refit", "modele_version": version, "drift": ratio}
+
+    return {
+        "site_code": site_code,
+        "action": "reassign",
+        "modele_version": model["modele_version"],
+        "reassigned": reassigned,
+        "drift": ratio,
+    }
+
+
+async def list_sites(conn: asyncpg.Connection) -> List[str]:
+    rows = await conn.fetch("SELECT DISTINCT site_code FROM gaveurs_euralis WHERE actif = TRUE ORDER BY site_code")
+    return [r["site_code"] for r in rows if r["site_code"]]
+
+
+async def get_cluster_profiles(conn: asyncpg.Connection, site_code: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Profils des 5 clusters depuis les affectations stockées (liste vide si aucun modèle)"""
+    rows = await conn.fetch(
+        """
+        SELECT
+            gc.cluster_id,
+            COUNT(*) as nb_gaveurs,
+            AVG(gc.itm_moyen) as itm_moyen,
+            AVG(gc.sigma_moyen) as sigma_moyen,
+            AVG(gc.mortalite_moyenne) as mortalite_moyenne,
+            SUM(gc.nb_lots_total) as total_lots,
+            MAX(gc.modele_version) as modele_version
+        FROM gaveurs_clusters gc
+        JOIN gaveurs_euralis g ON g.id = gc.gaveur_id
+        JOIN gaveur_cluster_models m
+          ON m.site_code = g.site_code AND m.modele_version = gc.modele_version AND m.is_active
+        WHERE g.actif = TRUE
+          AND ($1::text IS NULL OR g.site_code = $1)
+        GROUP BY gc.cluster_id
+        """,
+        site_code,
+    )
+    return format_profiles([dict(r) for r in rows])
+
+
+def format_profiles(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Agrégats par cluster → réponse API (les 5 clusters, vides compris)"""
+    if not rows:
+        return []
+
+    by_rank = {int(r["cluster_id"]): r for r in rows}
+    result = []
+    for rank, label in enumerate(CLUSTER_LABELS):
+        row = by_rank.get(rank, {})
+        config = CLUSTER_DISPLAY[label]
+        result.append({
+            'cluster_id': rank,
+            'nom': label,
+            'nb_gaveurs': int(row.get('nb_gaveurs') or 0),
+            'itm_moyen': round(float(row.get('itm_moyen') or 0), 2),
+            'sigma_moyen': round(float(row.get('sigma_moyen') or 0), 2),
+            'mortalite_moyenne': round(float(row.get('mortalite_moyenne') or 0), 2),
+            'production_totale_kg': float(row.get('total_lots') or 0),  # Total lots dans ce contexte
+            'description': config['description'],
+            'recommandation': config['recommandation'],
+            'couleur': config['couleur'],
+        })
+    return result
@@ -0,0 +1,288 @@
+"""
+Exécuteur d'inférence hors boucle asyncio (Whisper, Tesseract)
+
+La transcription Whisper et l'OCR Tesseract prennent plusieurs secondes de
+CPU : exécutés dans la boucle, ils gèlent tous les WebSockets et requêtes
+HTTP du worker uvicorn. Ils tournent ici dans un pool de processus borné :
+- un modèle Whisper chargé une fois par processus, puis gardé chaud
+- profondeur de file bornée (INFERENCE_QUEUE_MAX jobs en cours ou en attente) ;
+  au-delà, InferenceSaturated → HTTP 503 + Retry-After côté routes
+- API de jobs asynchrones : submit → job_id, puis poll ou WebSocket
+
+Usage:
+    result = await inference_executor.run("ocr", image_base64, "fra")
+    job_id = inference_executor.submit("transcribe", audio_base64, "fr")
+    job = inference_executor.get_job(job_id)      # status, result, error
+    job = await inference_executor.wait(job_id)
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from app.core.logging_config import get_logger
+
+logger = get_logger("app.services")
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_QUEUE_MAX = int(os.getenv("INFERENCE_QUEUE_MAX", str(INFERENCE_WORKERS * 4)))
+INFERENCE_JOB_TTL_S = float(os.getenv("INFERENCE_JOB_TTL_S", "600"))
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")
+INFERENCE_PRELOAD_WHISPER = os.getenv("INFERENCE_PRELOAD_WHISPER", "false").lower() == "true"
+
+
+class InferenceSaturated(Exception):
+    """File d'inférence pleine : la requête doit être rejetée (503)"""
+
+    def __init__(self, inflight: int, limit: int, retry_after_s: int = 5):
+        super().__init__(f"Inference queue saturated ({inflight}/{limit})")
+        self.retry_after_s = retry_after_s
+
+
+# ============================================================================
+# Côté processus worker
+# ============================================================================
+
+_whisper_model = None
+
+
+def _init_worker(preload_whisper: bool):
+    if preload_whisper:
+        _get_whisper_model()
+
+
+def _get_whisper_model():
+    """Modèle Whisper du processus (chargé au premier job, puis réutilisé)"""
+    global _whisper_model
+    if _whisper_model is None:
+        import whisper
+        logger.info(f"Loading Whisper model '{WHISPER_MODEL_SIZE}' in worker {os.getpid()}...")
+        _whisper_model = whisper.load_model(WHISPER_MODEL_SIZE)
+    return _whisper_model
+
+
+def transcribe_job(audio_base64: str, language: str) -> Dict[str, Any]:
+    """Transcription Whisper (format VoiceAssistant.transcribe)"""
+    from app.ml.voice_assistant import WHISPER_AVAILABLE, decode_audio_base64, whisper_confidence
+
+    if not WHISPER_AVAILABLE:
+        return {"text": "", "language": language, "confidence": 0.0, "error": "Whisper not installed", "segments": []}
+
+    try:
+        audio = decode_audio_base64(audio_base64)
+    except Exception as e:
+        return {
+            "text": "", "language": language, "confidence": 0.0,
+            "error": f"Failed to decode audio: {str(e)}", "segments": [],
+        }
+
+    import torch
+    result = _get_whisper_model().transcribe(
+        audio,
+        language=language,
+        task="transcribe",
+        fp16=torch.cuda.is_available()
+    )
+    return {
+        "text": result["text"].strip(),
+        "language": result["language"],
+        "confidence": whisper_confidence(result),
+        "segments": result.get("segments", []),
+        "error": None,
+    }
+
+
+def ocr_job(image_base64: str, lang: str) -> Dict[str, Any]:
+    """OCR Tesseract (format OCRService.extract_text_from_base64)"""
+    from app.services.ocr_service import ocr_service
+    return ocr_service.extract_text_from_base64(image_base64, lang=lang)
+
+
+JOB_KINDS: Dict[str, Callable[..., Any]] = {
+    "transcribe": transcribe_job,
+    "ocr": ocr_job,
+}
+
+
+# ============================================================================
+# Côté boucle asyncio
+# ============================================================================
+
+class InferenceExecutor:
+    """Pool de processus d'inférence avec file bornée et suivi des jobs"""
+
+    def __init__(
+        self,
+        workers: int = INFERENCE_WORKERS,
+        max_queue: int = INFERENCE_QUEUE_MAX,
+        job_ttl_s: float = INFERENCE_JOB_TTL_S,
+        jobs: Optional[Dict[str, Callable[..., Any]]] = None,
+        preload_whisper: bool = INFERENCE_PRELOAD_WHISPER,
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.job_ttl_s = job_ttl_s
+        self.job_kinds = jobs if jobs is not None else JOB_KINDS
+        self.preload_whisper = preload_whisper
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._inflight = 0
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn : pas de fork d'un processus uvicorn multi-thread (torch)
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.preload_whisper,),
+                )
+                logger.info(f"🧠 Inference pool started ({self.workers} process(es), queue max {self.max_queue})")
+            return self._pool
+
+    def _replace_broken_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """
+        Remplace un pool cassé (une seule fois même si plusieurs jobs échouent ensemble)
+
+        Le pool cassé est arrêté sans attente ; s'il a déjà été remplacé par un
+        job concurrent, le nouveau pool est réutilisé tel quel.
+        """
+        with self._pool_lock:
+            if self._pool is broken:
+                logger.warning("⚠️ Inference pool broken, restarting")
+                self._pool = None
+                broken.shutdown(wait=False, cancel_futures=True)
+        return self._get_pool()
+
+    async def shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.get_running_loop().run_in_executor(None, lambda: pool.shutdown(cancel_futures=True))
+            logger.info("🧠 Inference pool stopped")
+
+    def _reserve(self):
+        if self._inflight >= self.max_queue:
+            self.rejected += 1
+            raise InferenceSaturated(self._inflight, self.max_queue)
+        self._inflight += 1
+
+    async def _execute(self, kind: str, *args) -> Any:
+        fn = self.job_kinds[kind]
+        loop = asyncio.get_running_loop()
+        try:
+            pool = self._get_pool()
+            try:
+                return await loop.run_in_executor(pool, fn, *args)
+            except BrokenProcessPool:
+                # Worker tué (OOM...) : pool recréé, job rejoué une fois
+                return await loop.run_in_executor(self._replace_broken_pool(pool), fn, *args)
+        finally:
+            self._inflight -= 1
+            self.completed += 1
+
+    async def run(self, kind: str, *args) -> Any:
+        """
+        Exécute un job et attend son résultat (sans bloquer la boucle)
+
+        Raises:
+            InferenceSaturated: file pleine
+            KeyError: type de job inconnu
+        """
+        if kind not in self.job_kinds:
+            raise KeyError(f"Unknown inference job kind: {kind}")
+        self._reserve()
+        return await self._execute(kind, *args)
+
+    def submit(self, kind: str, *args) -> str:
+        """
+        Lance un job en arrière-plan
+
+        Returns:
+            job_id à interroger via get_job / wait
+
+        Raises:
+            InferenceSaturated: file pleine
+        """
+        if kind not in self.job_kinds:
+            raise KeyError(f"Unknown inference job kind: {kind}")
+        self._purge_expired()
+        self._reserve()
+
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": "pending",
+            "result": None,
+            "error": None,
+            "submitted_at": time.time(),
+            "finished_at": None,
+        }
+        self._tasks[job_id] = asyncio.create_task(self._run_job(job_id, kind, args))
+        return job_id
+
+    async def _run_job(self, job_id: str, kind: str, args: tuple):
+        job = self._jobs[job_id]
+        job["status"] = "running"
+        try:
+            job["result"] = await self._execute(kind, *args)
+            job["status"] = "done"
+        except asyncio.CancelledError:
+            job["status"] = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"❌ Inference job {kind} {job_id} failed: {e}")
+            job["status"] = "error"
+            job["error"] = str(e)
+        finally:
+            job["finished_at"] = time.time()
+            self._tasks.pop(job_id, None)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Attend la fin d'un job (None si inconnu ou expiré)"""
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        return self._jobs.get(job_id)
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.job_ttl_s
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "inflight": self._inflight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "jobs_tracked": len(self._jobs),
+        }
+
+
+# Instance globale (singleton)
+inference_executor = InferenceExecutor()
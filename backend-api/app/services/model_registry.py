@@ -0,0 +1,346 @@
+"""
+Registre de modèles ML versionnés (table ai_models)
+
+Chaque version publiée est un artefact joblib immuable écrit sous
+MODEL_REGISTRY_DIR/<name>/<version>.joblib ; la ligne ai_models porte le
+chemin, la taille et le sha256 dans metadata, et une seule version par nom
+est is_active.
+
+Par processus (worker uvicorn, worker Celery):
+- start(pool) charge une fois les versions actives (tableaux NumPy mappés en
+  mémoire : pages partagées entre workers via le cache disque)
+- activate() / publish() notifient MODEL_REGISTRY_CHANNEL (pg_notify) ; les
+  autres processus rechargent la nouvelle version en tâche de fond puis
+  l'échangent atomiquement
+- une vérification toutes les MODEL_REGISTRY_POLL_S secondes rattrape les
+  notifications perdues (reconnexion, worker démarré entre-temps)
+
+get(name) ne fait aucune I/O : les endpoints d'inférence ne paient jamais le
+chargement d'un modèle.
+
+Usage:
+    await model_registry.publish(pool, "pysr_scaler_v2", "2026-10-17", scaler)
+    loaded = model_registry.get("pysr_scaler_v2")   # LoadedModel ou None
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import asyncpg
+import joblib
+
+from app.core.logging_config import get_logger
+
+logger = get_logger("app.services")
+
+BASE_DIR = Path(__file__).parent.parent.parent
+
+MODEL_REGISTRY_CHANNEL = "ai_models_changed"
+
+ACTIVE_MODELS_QUERY = """
+    SELECT name, version, framework, model_type, metadata
+    FROM ai_models
+    WHERE is_active
+      AND ($1::text[] IS NULL OR name = ANY($1::text[]))
+"""
+
+UPSERT_MODEL_QUERY = """
+    INSERT INTO ai_models (id, name, version, is_active, framework, model_type, metadata, created_at)
+    VALUES ($1, $2, $3, false, $4, $5, $6::jsonb, NOW())
+    ON CONFLICT (name, version) DO UPDATE SET
+        framework = EXCLUDED.framework,
+        model_type = EXCLUDED.model_type,
+        metadata = EXCLUDED.metadata
+"""
+
+MODEL_EXISTS_QUERY = "SELECT true FROM ai_models WHERE name = $1 AND version = $2"
+
+ACTIVATE_MODEL_QUERY = """
+    UPDATE ai_models
+    SET is_active = (version = $2)
+    WHERE name = $1
+"""
+
+
+@dataclass
+class LoadedModel:
+    """Version active chargée en mémoire"""
+    name: str
+    version: str
+    artifact: Any
+    framework: Optional[str] = None
+    model_type: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.time)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _metadata(value) -> Dict[str, Any]:
+    """jsonb → dict (asyncpg renvoie du texte sans codec enregistré)"""
+    if value is None:
+        return {}
+    if isinstance(value, str):
+        return json.loads(value)
+    return dict(value)
+
+
+class ModelRegistry:
+    """
+    Versions actives de ai_models chargées une fois par processus,
+    rechargées sur notification de changement de version
+    """
+
+    def __init__(self, base_dir: str, poll_interval: float = 300.0, mmap: bool = True):
+        self.base_dir = Path(base_dir)
+        self.poll_interval = poll_interval
+        self.mmap = mmap
+        self.pool: Optional[asyncpg.Pool] = None
+
+        self._models: Dict[str, LoadedModel] = {}
+        self._names: Optional[List[str]] = None
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._reloads: set = set()
+
+        # Statistiques
+        self.loads = 0
+        self.swaps = 0
+        self.notifications = 0
+
+    @classmethod
+    def from_env(cls) -> "ModelRegistry":
+        return cls(
+            base_dir=os.getenv("MODEL_REGISTRY_DIR", str(BASE_DIR / "models" / "registry")),
+            poll_interval=float(os.getenv("MODEL_REGISTRY_POLL_S", "300")),
+            mmap=os.getenv("MODEL_REGISTRY_MMAP", "true").lower() == "true",
+        )
+
+    # ------------------------------------------------------------------
+    # Lecture (chemin requête — aucune I/O)
+    # ------------------------------------------------------------------
+
+    def get(self, name: str) -> Optional[LoadedModel]:
+        return self._models.get(name)
+
+    def versions(self) -> Dict[str, str]:
+        return {name: loaded.version for name, loaded in self._models.items()}
+
+    # ------------------------------------------------------------------
+    # Artefacts
+    # ------------------------------------------------------------------
+
+    def artifact_path(self, name: str, version: str) -> Path:
+        return self.base_dir / name / f"{version}.joblib"
+
+    def _write_artifact(self, name: str, version: str, artifact: Any) -> Dict[str, Any]:
+        """Écriture atomique (.part puis rename) ; non compressé pour rester mappable"""
+        path = self.artifact_path(name, version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".part")
+        joblib.dump(artifact, tmp_path)
+        os.replace(tmp_path, path)
+        return {
+            "artifact_path": str(path.relative_to(self.base_dir)),
+            "sha256": _sha256(path),
+            "size_bytes": path.stat().st_size,
+        }
+
+    def _read_artifact(self, metadata: Dict[str, Any]) -> Any:
+        path = self.base_dir / metadata["artifact_path"]
+        expected = metadata.get("sha256")
+        if expected and _sha256(path) != expected:
+            raise ValueError(f"Artefact corrompu (sha256): {path}")
+        return joblib.load(path, mmap_mode="r" if self.mmap else None)
+
+    # ------------------------------------------------------------------
+    # Publication
+    # ------------------------------------------------------------------
+
+    async def publish(
+        self,
+        pool: asyncpg.Pool,
+        name: str,
+        version: str,
+        artifact: Any,
+        framework: Optional[str] = None,
+        model_type: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        activate: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Enregistre une nouvelle version (artefact + ligne ai_models)
+
+        Args:
+            artifact: Objet sérialisable joblib (modèle, scaler, dict...)
+            activate: Active la version et notifie tous les processus
+
+        Returns:
+            metadata enregistrée (artifact_path, sha256, size_bytes, ...)
+        """
+        written = await asyncio.to_thread(self._write_artifact, name, version, artifact)
+        full_metadata = {**(metadata or {}), **written}
+
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    UPSERT_MODEL_QUERY,
+                    uuid.uuid4(), name, version, framework, model_type, json.dumps(full_metadata)
+                )
+                if activate:
+                    await self._activate(conn, name, version)
+
+        logger.info(f"📦 Modèle {name} version {version} publié ({written['size_bytes']} octets)")
+
+        if activate:
+            self._swap(LoadedModel(
+                name=name, version=version, artifact=artifact,
+                framework=framework, model_type=model_type, metadata=full_metadata
+            ))
+        return full_metadata
+
+    async def activate(self, pool: asyncpg.Pool, name: str, version: str):
+        """Active une version existante (rollback compris) et notifie les processus"""
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await self._activate(conn, name, version)
+        await self.refresh([name], pool=pool)
+
+    async def _activate(self, conn, name: str, version: str):
+        if not await conn.fetchval(MODEL_EXISTS_QUERY, name, version):
+            raise ValueError(f"Version inconnue: {name} {version}")
+        await conn.execute(ACTIVATE_MODEL_QUERY, name, version)
+        # Délivrée au COMMIT
+        await conn.execute("SELECT pg_notify($1, $2)", MODEL_REGISTRY_CHANNEL, f"{name}:{version}")
+
+    # ------------------------------------------------------------------
+    # Chargement / rechargement
+    # ------------------------------------------------------------------
+
+    def _swap(self, loaded: LoadedModel):
+        previous = self._models.get(loaded.name)
+        self._models[loaded.name] = loaded
+        if previous is not None and previous.version != loaded.version:
+            self.swaps += 1
+            logger.info(f"🔄 Modèle {loaded.name}: {previous.version} → {loaded.version}")
+
+    async def refresh(self, names: Optional[Iterable[str]] = None, pool: Optional[asyncpg.Pool] = None) -> List[str]:
+        """
+        Charge les versions actives qui diffèrent de celles en mémoire
+
+        Returns:
+            Noms des modèles (re)chargés
+        """
+        pool = pool or self.pool
+        if pool is None:
+            return []
+        names = list(names) if names is not None else self._names
+
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(ACTIVE_MODELS_QUERY, names)
+
+        reloaded = []
+        for row in rows:
+            current = self._models.get(row["name"])
+            if current is not None and current.version == row["version"]:
+                continue
+            metadata = _metadata(row["metadata"])
+            try:
+                artifact = await asyncio.to_thread(self._read_artifact, metadata)
+            except Exception as e:
+                # On garde la version en mémoire plutôt que de servir sans modèle
+                logger.error(f"❌ Chargement {row['name']} {row['version']} impossible: {e}")
+                continue
+            self.loads += 1
+            self._swap(LoadedModel(
+                name=row["name"], version=row["version"], artifact=artifact,
+                framework=row["framework"], model_type=row["model_type"], metadata=metadata
+            ))
+            reloaded.append(row["name"])
+        return reloaded
+
+    def _on_notify(self, connection, pid, channel, payload):
+        """Callback asyncpg (LISTEN) : rechargement en tâche de fond"""
+        self.notifications += 1
+        name = payload.split(":", 1)[0]
+        task = asyncio.get_running_loop().create_task(self.refresh([name]))
+        self._reloads.add(task)
+        task.add_done_callback(self._reloads.discard)
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    async def start(self, pool: asyncpg.Pool, names: Optional[Iterable[str]] = None):
+        """Chargement initial, LISTEN sur le canal, vérification périodique (idempotent)"""
+        if self._task is not None and not self._task.done():
+            return
+        self.pool = pool
+        self._names = list(names) if names is not None else None
+        try:
+            loaded = await self.refresh()
+            logger.info(f"Registre modèles: {len(loaded)} modèle(s) actif(s) chargé(s)")
+        except Exception as e:
+            # Table absente / base indisponible : les prédicteurs utilisent leurs fichiers locaux
+            logger.error(f"Registre modèles: chargement initial impossible: {e}")
+        try:
+            self._listen_conn = await pool.acquire()
+            await self._listen_conn.add_listener(MODEL_REGISTRY_CHANNEL, self._on_notify)
+        except Exception as e:
+            logger.warning(f"Registre modèles: LISTEN indisponible, vérification périodique seule: {e}")
+            if self._listen_conn is not None:
+                await pool.release(self._listen_conn)
+                self._listen_conn = None
+        self._task = asyncio.create_task(self._run(), name="model-registry")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._listen_conn is not None:
+            try:
+                await self._listen_conn.remove_listener(MODEL_REGISTRY_CHANNEL, self._on_notify)
+            finally:
+                await self.pool.release(self._listen_conn)
+                self._listen_conn = None
+        logger.info("Registre modèles arrêté")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Registre modèles: erreur de vérification: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": self.versions(),
+            "loads": self.loads,
+            "swaps": self.swaps,
+            "notifications": self.notifications,
+            "listening": self._listen_conn is not None,
+        }
+
+
+# Instance globale (singleton)
+model_registry = ModelRegistry.from_env()
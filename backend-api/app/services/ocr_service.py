@@ -35,6 +35,35 @@ class OCRService:
         else:
             logger.warning("OCR Service en mode dégradé (Tesseract non disponible)")
 
+    @staticmethod
+    def _ocr_image(image: Image.Image, lang: str) -> Tuple[str, float]:
+        """
+        Texte + confiance moyenne en une seule passe (image_to_data)
+
+        Le texte est reconstruit depuis les mots reconnus (un saut de ligne
+        par ligne Tesseract) au lieu d'un second passage image_to_string.
+
+        Returns:
+            (texte, confiance moyenne 0-100)
+        """
+        config = f'--oem 3 --psm 6 -l {lang}'
+        data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+
+        lines: Dict[Tuple[int, int, int], List[str]] = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            conf = float(data['conf'][i])
+            if conf < 0:
+                continue
+            confidences.append(conf)
+            if word and word.strip():
+                key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+                lines.setdefault(key, []).append(word)
+
+        text = "\n".join(" ".join(words) for words in lines.values())
+        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        return text, avg_confidence
+
     def extract_text_from_base64(self, image_base64: str, lang: str = 'fra') -> Dict:
         """
         Extrait le texte d'une image encodée en base64
@@ -71,14 +100,8 @@ class OCRService:
             # enhancer = ImageEnhance.Contrast(image)
             # image = enhancer.enhance(2)
 
-            # Extraire le texte
-            config = f'--oem 3 --psm 6 -l {lang}'
-            text = pytesseract.image_to_string(image, config=config)
-
-            # Calculer confiance (basique)
-            data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
-            confidences = [int(conf) for conf in data['conf'] if conf != '-1']
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+            # Extraire le texte et la confiance (une seule passe Tesseract)
+            text, avg_confidence = self._ocr_image(image, lang)
 
             logger.info(f"OCR réussi - {len(text)} caractères extraits, confiance {avg_confidence:.1f}%")
 
@@ -122,12 +145,7 @@ class OCRService:
             image = Image.open(image_path)
             image = image.convert('L')
 
-            config = f'--oem 3 --psm 6 -l {lang}'
-            text = pytesseract.image_to_string(image, config=config)
-
-            data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
-            confidences = [int(conf) for conf in data['conf'] if conf != '-1']
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+            text, avg_confidence = self._ocr_image(image, lang)
 
             logger.info(f"OCR fichier {image_path}: {len(text)} caractères, confiance {avg_confidence:.1f}%")
 
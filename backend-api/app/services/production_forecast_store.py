@@ -0,0 +1,195 @@
+"""
+Stockage versionné des prévisions de production Euralis
+
+Les prévisions Prophet/ETS sont calculées hors requête (Celery, nuit) puis
+écrites dans previsions_production : une version (modele_version) par
+exécution, référencée dans forecast_runs. forecast_active_sites donne la
+version active de chaque site (schéma : alembic 20261017_0005), si bien
+qu'un ré-entraînement partiel ne bascule que les sites recalculés.
+GET /api/euralis/ml/forecasts ne fait qu'une lecture indexée des versions
+actives.
+
+Flux:
+    history = await load_daily_history(conn)          # série journalière par site
+    results = fit_sites(history, horizon)             # app.ml.euralis.production_forecasting
+    version = await save_forecast_run(conn, results, horizon)
+    rows = await get_active_forecasts(conn, days=30, site_code="LL")
+"""
+
+import json
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+from app.core.logging_config import get_logger
+
+logger = get_logger("app.services")
+
+# Intervalle de confiance produit par Prophet (interval_width) et par ETS (±1.96σ)
+CONFIDENCE_PCT = 95.0
+
+METHOD_LABELS = {"prophet": "Prophet", "ets": "ETS"}
+
+
+async def load_daily_history(
+    conn: asyncpg.Connection,
+    sites: Optional[List[str]] = None,
+    history_days: int = 730,
+) -> Dict[str, Dict[str, List]]:
+    """
+    Production journalière par site (jours sans lot = 0, jusqu'à hier inclus
+    pour que l'horizon de prévision parte d'aujourd'hui)
+
+    Returns:
+        {site_code: {"dates": [iso...], "values": [kg...]}}
+    """
+    rows = await conn.fetch(
+        """
+        SELECT
+            site_code,
+            DATE(debut_lot) as jour,
+            SUM(nb_canards_accroches * itm / 1000) as production_kg
+        FROM lots_gavage
+        WHERE debut_lot > NOW() - make_interval(days => $1)
+          AND itm IS NOT NULL
+          AND ($2::text[] IS NULL OR site_code = ANY($2::text[]))
+        GROUP BY site_code, DATE(debut_lot)
+        ORDER BY site_code, jour
+        """,
+        history_days,
+        sites,
+    )
+
+    by_site: Dict[str, Dict[date, float]] = {}
+    for row in rows:
+        by_site.setdefault(row["site_code"], {})[row["jour"]] = float(row["production_kg"] or 0)
+
+    history = {}
+    for site, points in by_site.items():
+        start, end = min(points), max(max(points), date.today() - timedelta(days=1))
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        history[site] = {
+            "dates": [d.isoformat() for d in days],
+            "values": [points.get(d, 0.0) for d in days],
+        }
+    return history
+
+
+ACTIVATE_SITES_QUERY = """
+    INSERT INTO forecast_active_sites (site_code, modele_version)
+    SELECT UNNEST($1::text[]), $2
+    ON CONFLICT (site_code) DO UPDATE
+    SET modele_version = EXCLUDED.modele_version, activated_at = NOW()
+"""
+
+ACTIVE_FORECASTS_QUERY = """
+    SELECT
+        p.site_code, p.date_prevision,
+        p.production_foie_kg_prevu, p.production_min, p.production_max,
+        p.confiance_pct, p.methode, p.modele_version
+    FROM forecast_active_sites a
+    JOIN previsions_production p
+      ON p.modele_version = a.modele_version AND p.site_code = a.site_code
+    WHERE p.date_prevision > CURRENT_DATE
+      AND p.date_prevision <= CURRENT_DATE + $1::int
+      AND ($2::text IS NULL OR a.site_code = $2)
+    ORDER BY p.date_prevision, p.site_code
+"""
+
+
+async def save_forecast_run(
+    conn: asyncpg.Connection,
+    results: Dict[str, Dict[str, Any]],
+    horizon_days: int,
+    modele_version: Optional[str] = None,
+) -> str:
+    """
+    Écrit une nouvelle version et l'active pour les sites de `results`
+    (les lecteurs basculent atomiquement ; les autres sites gardent leur version)
+
+    Returns:
+        modele_version de l'exécution
+    """
+    modele_version = modele_version or datetime.utcnow().strftime("fc-%Y%m%dT%H%M%S")
+    records = [
+        (
+            site_code,
+            date.fromisoformat(row["date"]),
+            horizon_days,
+            round(row["yhat"], 2),
+            round(row["lower"], 2),
+            round(row["upper"], 2),
+            CONFIDENCE_PCT,
+            result["method"],
+            modele_version,
+        )
+        for site_code, result in results.items()
+        for row in result["rows"]
+    ]
+
+    async with conn.transaction():
+        await conn.executemany(
+            """
+            INSERT INTO previsions_production (
+                site_code, date_prevision, horizon_jours,
+                production_foie_kg_prevu, production_min, production_max,
+                confiance_pct, methode, modele_version
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+            """,
+            records,
+        )
+        await conn.execute(
+            """
+            INSERT INTO forecast_runs (modele_version, horizon_jours, sites, methodes)
+            VALUES ($1, $2, $3, $4::jsonb)
+            """,
+            modele_version,
+            horizon_days,
+            sorted(results),
+            json.dumps({site: r["method"] for site, r in results.items()}),
+        )
+        await conn.execute(ACTIVATE_SITES_QUERY, sorted(results), modele_version)
+
+    logger.info(f"📈 Prévisions {modele_version} enregistrées ({len(records)} lignes, sites={sorted(results)})")
+    return modele_version
+
+
+async def get_active_forecasts(
+    conn: asyncpg.Connection,
+    days: int,
+    site_code: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Prévisions des `days` prochains jours des versions actives par site (format API)"""
+    rows = await conn.fetch(ACTIVE_FORECASTS_QUERY, days, site_code)
+    return format_forecasts([dict(row) for row in rows], site_code)
+
+
+def format_forecasts(rows: List[Dict[str, Any]], site_code: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Lignes previsions_production → réponse API (somme des sites si site_code absent)"""
+    by_date: "OrderedDict[date, Dict[str, Any]]" = OrderedDict()
+    for row in rows:
+        entry = by_date.setdefault(row["date_prevision"], {
+            "production_kg": 0.0, "lower_bound": 0.0, "upper_bound": 0.0,
+            "confidence": float(row["confiance_pct"] or CONFIDENCE_PCT) / 100,
+            "methods": set(), "modele_version": row["modele_version"],
+        })
+        entry["production_kg"] += float(row["production_foie_kg_prevu"] or 0)
+        entry["lower_bound"] += float(row["production_min"] or 0)
+        entry["upper_bound"] += float(row["production_max"] or 0)
+        entry["methods"].add(row["methode"])
+
+    return [
+        {
+            "date": day.isoformat(),
+            "production_kg": round(entry["production_kg"], 2),
+            "lower_bound": round(entry["lower_bound"], 2),
+            "upper_bound": round(entry["upper_bound"], 2),
+            "confidence": entry["confidence"],
+            "model": "/".join(sorted(METHOD_LABELS.get(m, m) for m in entry["methods"])),
+            "modele_version": entry["modele_version"],
+            "site_code": site_code or "ALL",
+        }
+        for day, entry in by_date.items()
+    ]
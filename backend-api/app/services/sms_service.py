@@ -191,7 +191,38 @@ class SMSService:
         )
         
         return await self.send_sms(notification)
-    
+
+    async def send_alertes_critiques_groupees(
+        self,
+        telephone: str,
+        alertes: list,
+        max_lignes: int = 5
+    ) -> bool:
+        """
+        Un seul SMS pour plusieurs alertes critiques d'un même gaveur
+
+        Args:
+            telephone: Numéro du destinataire
+            alertes: [(canard_id, message), ...]
+            max_lignes: Alertes détaillées dans le SMS (les suivantes sont comptées)
+        """
+        if len(alertes) == 1:
+            canard_id, message = alertes[0]
+            return await self.send_alerte_critique(telephone, canard_id, message)
+
+        lignes = [f"#{canard_id}: {message}" for canard_id, message in alertes[:max_lignes]]
+        if len(alertes) > max_lignes:
+            lignes.append(f"... +{len(alertes) - max_lignes} autre(s)")
+
+        notification = SMSNotification(
+            destinataire=telephone,
+            message=f"🚨 {len(alertes)} ALERTES CRITIQUES:\n" + "\n".join(lignes),
+            type_alerte="critique",
+            priorite=AlerteNiveauEnum.CRITIQUE
+        )
+
+        return await self.send_sms(notification)
+
     async def send_correction_dose(
         self,
         telephone: str,
@@ -0,0 +1,213 @@
+"""
+File d'ingestion write-behind pour les échantillons SQAL
+
+Les SensorDataMessage validés par /ws/sensors/ sont regroupés puis écrits
+par lots (un upsert sqal_devices + un executemany sensor_samples) au lieu
+de trois opérations base par échantillon.
+
+Un lot est écrit dès que:
+- SQAL_INGEST_BATCH_SIZE échantillons sont en attente, ou
+- SQAL_INGEST_FLUSH_MS millisecondes se sont écoulées depuis le premier
+
+Backpressure: la file est bornée (SQAL_INGEST_QUEUE_MAX). Quand elle est
+pleine, submit() attend au plus SQAL_INGEST_PUT_TIMEOUT_S secondes puis lève
+IngestionQueueFullError (le consumer renvoie alors une erreur au simulateur).
+"""
+
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+
+from app.core.logging_config import get_logger
+from app.models.sqal import SensorDataMessage
+from app.services.sqal_service import SQALService, sqal_service
+
+logger = get_logger("app.services")
+
+
+class IngestionQueueFullError(Exception):
+    """Raised when the ingestion queue stays full longer than put_timeout"""
+    pass
+
+
+class SQALIngestionQueue:
+    """
+    File write-behind bornée avec flush par taille ou par latence
+
+    Usage:
+        await sqal_ingestion_queue.start()
+        await sqal_ingestion_queue.submit(sensor_data)   # attend l'écriture du lot
+        await sqal_ingestion_queue.stop()                # vide la file puis s'arrête
+    """
+
+    def __init__(
+        self,
+        service: SQALService,
+        batch_size: int = 200,
+        flush_interval: float = 0.05,
+        max_queue_size: int = 5000,
+        put_timeout: float = 2.0,
+    ):
+        self.service = service
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.max_queue_size = max_queue_size
+        self.put_timeout = put_timeout
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # Statistiques (exposées via stats())
+        self.batches_written = 0
+        self.samples_written = 0
+        self.samples_failed = 0
+        self.rejected_full = 0
+        self.last_flush_ms: float = 0.0
+
+    @classmethod
+    def from_env(cls, service: SQALService) -> "SQALIngestionQueue":
+        return cls(
+            service,
+            batch_size=int(os.getenv("SQAL_INGEST_BATCH_SIZE", "200")),
+            flush_interval=float(os.getenv("SQAL_INGEST_FLUSH_MS", "50")) / 1000.0,
+            max_queue_size=int(os.getenv("SQAL_INGEST_QUEUE_MAX", "5000")),
+            put_timeout=float(os.getenv("SQAL_INGEST_PUT_TIMEOUT_S", "2.0")),
+        )
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self):
+        """Démarre la tâche de flush (idempotent)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.create_task(self._run(), name="sqal-ingestion-flush")
+        logger.info(
+            f"File d'ingestion SQAL démarrée (batch={self.batch_size}, "
+            f"flush={self.flush_interval * 1000:.0f}ms, max={self.max_queue_size})"
+        )
+
+    async def stop(self):
+        """Écrit les échantillons encore en file puis arrête la tâche de flush"""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        logger.info("File d'ingestion SQAL arrêtée")
+
+    async def submit(self, sensor_data: SensorDataMessage) -> bool:
+        """
+        Place un échantillon dans la file et attend que son lot soit écrit
+
+        Plusieurs connexions /ws/sensors/ partagent ainsi le même lot.
+        Sans tâche de flush active, écrit directement (save_sensor_sample).
+
+        Returns:
+            True si l'échantillon est en base, False sinon
+
+        Raises:
+            IngestionQueueFullError: file pleine au-delà de put_timeout
+        """
+        if not self.running:
+            return await self.service.save_sensor_sample(sensor_data)
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            await asyncio.wait_for(self._queue.put((sensor_data, future)), timeout=self.put_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_full += 1
+            raise IngestionQueueFullError(
+                f"File d'ingestion SQAL pleine ({self.max_queue_size} échantillons en attente)"
+            )
+        return await future
+
+    def qsize(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_size": self.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval * 1000,
+            "batches_written": self.batches_written,
+            "samples_written": self.samples_written,
+            "samples_failed": self.samples_failed,
+            "rejected_full": self.rejected_full,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+    async def _collect_batch(self) -> List[Tuple[SensorDataMessage, asyncio.Future]]:
+        """Bloque sur le premier élément puis accumule jusqu'à batch_size ou flush_interval"""
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            # Vide d'abord ce qui est déjà disponible sans attendre
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._flush(batch)
+            except Exception as e:
+                # _flush résout normalement chaque future ; filet de sécurité
+                logger.error(f"❌ Flush ingestion SQAL inattendu: {e}", exc_info=True)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(False)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[Tuple[SensorDataMessage, asyncio.Future]]):
+        samples = [sensor_data for sensor_data, _ in batch]
+        start = time.perf_counter()
+
+        try:
+            await self.service.save_sensor_samples_batch(samples)
+            results = [True] * len(batch)
+            self.batches_written += 1
+        except Exception as e:
+            # Un échantillon invalide fait échouer tout le lot : repli unitaire
+            logger.warning(f"Écriture par lot SQAL échouée ({len(batch)} échantillons), repli unitaire: {e}")
+            results = [await self.service.save_sensor_sample(s) for s in samples]
+
+        self.last_flush_ms = (time.perf_counter() - start) * 1000
+        for (_, future), ok in zip(batch, results):
+            if ok:
+                self.samples_written += 1
+            else:
+                self.samples_failed += 1
+            if not future.done():
+                future.set_result(ok)
+
+        logger.debug(f"Flush ingestion SQAL: {len(batch)} échantillons en {self.last_flush_ms:.1f}ms")
+
+
+# Instance globale (singleton)
+sqal_ingestion_queue = SQALIngestionQueue.from_env(sqal_service)
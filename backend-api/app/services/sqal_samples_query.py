@@ -0,0 +1,193 @@
+"""
+Lecture projetée des échantillons SQAL (sensor_samples)
+
+Trois niveaux de projection (paramètre fields) :
+- scores:   identifiants + scores/grades (graphiques, tableaux)
+- analysis: + mesures scalaires, analyses JSON et métadonnées
+- raw:      + matrices 8x8 VL53L8CH et canaux AS7341 (format historique complet)
+
+Pagination par clé (keyset) sur (timestamp, sample_id) décroissants : le
+curseur opaque renvoyé par une page donne la suivante sans OFFSET, à coût
+constant quelle que soit la profondeur (index idx_sensor_samples_timestamp_sample_id).
+"""
+
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Select, and_, desc, select, tuple_
+
+from app.db.models.sensor_sample import SensorSample
+
+SCORE_FIELDS: Tuple[str, ...] = (
+    "time",
+    "sample_id",
+    "device_id",
+    "lot_id",
+    "vl53l8ch_quality_score",
+    "vl53l8ch_grade",
+    "as7341_quality_score",
+    "as7341_grade",
+    "fusion_final_score",
+    "fusion_final_grade",
+    "fusion_vl53l8ch_score",
+    "fusion_as7341_score",
+    "fusion_is_compliant",
+    "poids_foie_estime_g",
+)
+
+ANALYSIS_FIELDS: Tuple[str, ...] = SCORE_FIELDS + (
+    "vl53l8ch_volume_mm3",
+    "vl53l8ch_avg_height_mm",
+    "vl53l8ch_max_height_mm",
+    "vl53l8ch_min_height_mm",
+    "vl53l8ch_surface_uniformity",
+    "vl53l8ch_bins_analysis",
+    "vl53l8ch_reflectance_analysis",
+    "vl53l8ch_amplitude_consistency",
+    "vl53l8ch_score_breakdown",
+    "vl53l8ch_defects",
+    "as7341_integration_time",
+    "as7341_gain",
+    "as7341_freshness_index",
+    "as7341_fat_quality_index",
+    "as7341_oxidation_index",
+    "as7341_spectral_analysis",
+    "as7341_color_analysis",
+    "as7341_score_breakdown",
+    "as7341_defects",
+    "fusion_defects",
+    "meta_firmware_version",
+    "meta_temperature_c",
+    "meta_humidity_percent",
+    "meta_config_profile",
+    "created_at",
+)
+
+RAW_FIELDS: Tuple[str, ...] = ANALYSIS_FIELDS + (
+    "vl53l8ch_distance_matrix",
+    "vl53l8ch_reflectance_matrix",
+    "vl53l8ch_amplitude_matrix",
+    "vl53l8ch_integration_time",
+    "vl53l8ch_temperature_c",
+    "as7341_channels",
+)
+
+FIELD_SETS: Dict[str, Tuple[str, ...]] = {
+    "scores": SCORE_FIELDS,
+    "analysis": ANALYSIS_FIELDS,
+    "raw": RAW_FIELDS,
+}
+
+# Clés de sortie sans colonne propre
+_COLUMN_ALIASES = {"time": "timestamp"}
+_DERIVED = {"fusion_is_compliant"}
+_ALWAYS_NULL = {"vl53l8ch_integration_time", "vl53l8ch_temperature_c"}
+
+
+def _columns(fields: str) -> List[str]:
+    """Colonnes sensor_samples à lire pour un niveau de projection"""
+    if fields not in FIELD_SETS:
+        raise ValueError(f"fields invalide: {fields} (attendu: {', '.join(FIELD_SETS)})")
+    columns = ["timestamp", "sample_id", "fusion_final_grade"]
+    for key in FIELD_SETS[fields]:
+        if key in _DERIVED or key in _ALWAYS_NULL:
+            continue
+        column = _COLUMN_ALIASES.get(key, key)
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def build_samples_query(
+    fields: str,
+    start_time: datetime,
+    end_time: datetime,
+    device_id: Optional[str] = None,
+    after: Optional[Tuple[datetime, str]] = None,
+    limit: Optional[int] = None,
+) -> Select:
+    """SELECT projeté, trié (timestamp, sample_id) DESC, à partir du curseur `after`"""
+    stmt = (
+        select(*(getattr(SensorSample, c) for c in _columns(fields)))
+        .where(SensorSample.timestamp.between(start_time, end_time))
+        .order_by(desc(SensorSample.timestamp), desc(SensorSample.sample_id))
+    )
+    if device_id:
+        stmt = stmt.where(SensorSample.device_id == device_id)
+    if after is not None:
+        stmt = stmt.where(
+            and_(
+                SensorSample.timestamp <= after[0],
+                tuple_(SensorSample.timestamp, SensorSample.sample_id) < tuple_(*after),
+            )
+        )
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def row_to_dict(row: Any, fields: str) -> Dict[str, Any]:
+    """Ligne projetée → dict au format API (clés dans l'ordre du niveau demandé)"""
+    mapping = row._mapping
+    out: Dict[str, Any] = {}
+    for key in FIELD_SETS[fields]:
+        if key == "fusion_is_compliant":
+            grade = mapping["fusion_final_grade"]
+            out[key] = (grade != "REJECT") if grade else None
+        elif key in _ALWAYS_NULL:
+            out[key] = None
+        else:
+            out[key] = mapping[_COLUMN_ALIASES.get(key, key)]
+    return out
+
+
+def encode_cursor(sample: Dict[str, Any]) -> str:
+    """Curseur opaque (base64url) pointant après `sample`"""
+    payload = json.dumps([sample["time"].isoformat(), sample["sample_id"]])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Curseur → (timestamp, sample_id) ; ValueError si illisible"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, sample_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), str(sample_id)
+    except Exception as e:
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def to_ndjson(samples: Iterable[Dict[str, Any]]) -> str:
+    """Lot d'échantillons → lignes NDJSON"""
+    return "".join(json.dumps(s, default=_json_default, separators=(",", ":")) + "\n" for s in samples)
+
+
+def csv_header(fields: str) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(FIELD_SETS[fields])
+    return buffer.getvalue()
+
+
+def to_csv(samples: Iterable[Dict[str, Any]], fields: str) -> str:
+    """Lot d'échantillons → lignes CSV (colonnes JSON sérialisées en texte)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for s in samples:
+        writer.writerow([
+            json.dumps(v, default=_json_default) if isinstance(v, (dict, list))
+            else v.isoformat() if isinstance(v, datetime)
+            else "" if v is None
+            else v
+            for v in (s[k] for k in FIELD_SETS[fields])
+        ])
+    return buffer.getvalue()
@@ -2,17 +2,23 @@
 Service Layer pour SQAL - Opérations base de données TimescaleDB
 """
 
+import asyncio
 import asyncpg
 import json
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta, timezone
 import logging
 import os
+import time
+import uuid
 
 from app.core.logging_config import get_logger
+from app.cache.simple_cache import get_cache
+from app.services.sqal_samples_query import build_samples_query, decode_cursor, encode_cursor, row_to_dict
+from app.services.sqal_stats_aggregates import fetch_hourly_stats, fetch_period_totals, fetch_site_stats
 
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import case, desc, func, select
+from sqlalchemy import desc, func, select
 
 from app.models.sqal import (
     SensorDataMessage,
@@ -33,6 +39,67 @@ from app.db.models.prediction import Prediction
 
 logger = get_logger("app.services")
 
+# Fenêtre de cache du dashboard overview (alignée sur l'horloge, commune aux appelants)
+OVERVIEW_CACHE_S = int(os.getenv("SQAL_OVERVIEW_CACHE_S", "10"))
+# Lignes par lot lues depuis le curseur serveur (export streamé)
+SAMPLES_STREAM_CHUNK = int(os.getenv("SQAL_SAMPLES_STREAM_CHUNK", "500"))
+
+
+def _grade_value(grade: Any) -> str:
+    """Enum QualityGrade ou str → str"""
+    return str(grade.value) if hasattr(grade, "value") else str(grade)
+
+
+def _extract_config_profile(sensor_data: SensorDataMessage) -> Optional[str]:
+    try:
+        if sensor_data.meta and isinstance(sensor_data.meta, dict):
+            return sensor_data.meta.get("config_profile") or sensor_data.meta.get("meta_config_profile")
+    except Exception:
+        pass
+    return None
+
+
+def _estimate_poids_foie_g(sensor_data: SensorDataMessage) -> Optional[float]:
+    """Masse foie estimée (g) = volume (cm³) × densité 0.947"""
+    try:
+        if sensor_data.vl53l8ch.analysis.volume_mm3 is not None:
+            return round((float(sensor_data.vl53l8ch.analysis.volume_mm3) / 1000.0) * 0.947, 1)
+    except Exception:
+        pass
+    return None
+
+
+def _sensor_sample_row(sensor_data: SensorDataMessage, created_at: datetime) -> tuple:
+    """Tuple d'insertion sensor_samples (ordre = colonnes de save_sensor_samples_batch)"""
+    raw = sensor_data.vl53l8ch.raw
+    analysis = sensor_data.vl53l8ch.analysis
+    channels = sensor_data.as7341.raw if isinstance(sensor_data.as7341.raw, dict) else sensor_data.as7341.raw.to_dict()
+    as_analysis = sensor_data.as7341.analysis
+
+    return (
+        uuid.uuid4(),
+        sensor_data.timestamp,
+        sensor_data.device_id,
+        sensor_data.sample_id,
+        sensor_data.lot_id,
+        json.dumps(raw.distance_matrix),
+        json.dumps(raw.reflectance_matrix),
+        json.dumps(raw.amplitude_matrix),
+        analysis.volume_mm3,
+        analysis.surface_uniformity,
+        analysis.quality_score,
+        _grade_value(analysis.grade),
+        json.dumps(channels),
+        as_analysis.freshness_index,
+        as_analysis.fat_quality_index,
+        as_analysis.oxidation_index,
+        as_analysis.quality_score,
+        sensor_data.fusion.final_score,
+        _grade_value(sensor_data.fusion.final_grade),
+        _estimate_poids_foie_g(sensor_data),
+        created_at,
+    )
+
 
 class SQALService:
     """
@@ -93,12 +160,7 @@ class SQALService:
         try:
             async with self.pool.acquire() as conn:
                 # Ensure device exists to satisfy FK on sensor_samples.device_id
-                config_profile = None
-                try:
-                    if sensor_data.meta and isinstance(sensor_data.meta, dict):
-                        config_profile = sensor_data.meta.get("config_profile") or sensor_data.meta.get("meta_config_profile")
-                except Exception:
-                    config_profile = None
+                config_profile = _extract_config_profile(sensor_data)
 
                 await conn.execute(
                     """
@@ -147,15 +209,10 @@ class SQALService:
                     channels_json = json.dumps(sensor_data.as7341.raw.to_dict())
 
                 # Extract grades
-                vl53_grade = str(sensor_data.vl53l8ch.analysis.grade.value) if hasattr(sensor_data.vl53l8ch.analysis.grade, 'value') else str(sensor_data.vl53l8ch.analysis.grade)
-                fusion_grade = str(sensor_data.fusion.final_grade.value) if hasattr(sensor_data.fusion.final_grade, 'value') else str(sensor_data.fusion.final_grade)
+                vl53_grade = _grade_value(sensor_data.vl53l8ch.analysis.grade)
+                fusion_grade = _grade_value(sensor_data.fusion.final_grade)
 
-                poids_foie_estime_g = None
-                try:
-                    if sensor_data.vl53l8ch.analysis.volume_mm3 is not None:
-                        poids_foie_estime_g = round((float(sensor_data.vl53l8ch.analysis.volume_mm3) / 1000.0) * 0.947, 1)
-                except Exception:
-                    poids_foie_estime_g = None
+                poids_foie_estime_g = _estimate_poids_foie_g(sensor_data)
 
                 try:
                     async with AsyncSessionLocal() as session:
@@ -208,6 +265,113 @@ class SQALService:
             logger.error(f"❌ Erreur sauvegarde échantillon: {e}", exc_info=True)
             return False
 
+    async def save_sensor_samples_batch(self, samples: List[SensorDataMessage]) -> int:
+        """
+        Sauvegarde un lot d'échantillons en un seul aller-retour par table
+
+        - 1 upsert sqal_devices pour tout le lot (un row par device, last_seen max)
+        - 1 executemany INSERT ... ON CONFLICT DO NOTHING sur sensor_samples
+
+        Utilisé par la file d'ingestion write-behind (app.services.sqal_ingestion).
+        Contrairement à save_sensor_sample, lève l'exception en cas d'échec :
+        l'appelant décide du repli (ré-essai unitaire).
+
+        Args:
+            samples: Données capteur validées
+
+        Returns:
+            Nombre d'échantillons transmis à la base
+        """
+        if not samples:
+            return 0
+
+        await self._ensure_pool()
+
+        # Un seul row par device : ON CONFLICT ne peut pas toucher deux fois la même ligne
+        devices: Dict[str, Dict[str, Any]] = {}
+        for s in samples:
+            current = devices.get(s.device_id)
+            if current is None:
+                devices[s.device_id] = {
+                    "firmware_version": s.firmware_version,
+                    "site_code": s.site_code,
+                    "config_profile": _extract_config_profile(s),
+                    "last_seen": s.timestamp,
+                }
+                continue
+            current["firmware_version"] = s.firmware_version or current["firmware_version"]
+            current["site_code"] = s.site_code or current["site_code"]
+            current["config_profile"] = _extract_config_profile(s) or current["config_profile"]
+            if s.timestamp > current["last_seen"]:
+                current["last_seen"] = s.timestamp
+
+        device_ids = list(devices.keys())
+        created_at = datetime.utcnow()
+        rows = [_sensor_sample_row(s, created_at) for s in samples]
+
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    INSERT INTO sqal_devices (
+                        device_id,
+                        device_name,
+                        firmware_version,
+                        site_code,
+                        status,
+                        config_profile,
+                        created_at,
+                        updated_at,
+                        last_seen
+                    )
+                    SELECT d.device_id, NULL, d.firmware_version, d.site_code, 'active',
+                           d.config_profile, NOW(), NOW(), d.last_seen
+                    FROM unnest($1::text[], $2::text[], $3::text[], $4::text[], $5::timestamptz[])
+                         AS d(device_id, firmware_version, site_code, config_profile, last_seen)
+                    ON CONFLICT (device_id) DO UPDATE
+                    SET
+                        firmware_version = COALESCE(EXCLUDED.firmware_version, sqal_devices.firmware_version),
+                        site_code = COALESCE(EXCLUDED.site_code, sqal_devices.site_code),
+                        config_profile = COALESCE(EXCLUDED.config_profile, sqal_devices.config_profile),
+                        status = COALESCE(EXCLUDED.status, sqal_devices.status),
+                        last_seen = GREATEST(COALESCE(sqal_devices.last_seen, EXCLUDED.last_seen), EXCLUDED.last_seen),
+                        updated_at = NOW()
+                    """,
+                    device_ids,
+                    [devices[d]["firmware_version"] for d in device_ids],
+                    [devices[d]["site_code"] for d in device_ids],
+                    [devices[d]["config_profile"] for d in device_ids],
+                    [devices[d]["last_seen"] for d in device_ids],
+                )
+
+                await conn.executemany(
+                    """
+                    INSERT INTO sensor_samples (
+                        id, timestamp, device_id, sample_id, lot_id,
+                        vl53l8ch_distance_matrix, vl53l8ch_reflectance_matrix, vl53l8ch_amplitude_matrix,
+                        vl53l8ch_volume_mm3, vl53l8ch_surface_uniformity, vl53l8ch_quality_score, vl53l8ch_grade,
+                        as7341_channels, as7341_freshness_index, as7341_fat_quality_index,
+                        as7341_oxidation_index, as7341_quality_score,
+                        fusion_final_score, fusion_final_grade,
+                        poids_foie_estime_g, created_at
+                    )
+                    VALUES (
+                        $1, $2, $3, $4, $5,
+                        $6::jsonb, $7::jsonb, $8::jsonb,
+                        $9, $10, $11, $12,
+                        $13::jsonb, $14, $15,
+                        $16, $17,
+                        $18, $19,
+                        $20, $21
+                    )
+                    ON CONFLICT DO NOTHING
+                    """,
+                    rows,
+                )
+
+        logger.debug(f"✅ Lot sauvegardé: {len(rows)} échantillons, {len(device_ids)} devices")
+        return len(rows)
+
     async def create_alert(self, alert: AlertCreate) -> Optional[int]:
         """
         Crée une alerte dans sqal_alerts
@@ -346,7 +510,8 @@ class SQALService:
         start_time: datetime,
         end_time: datetime,
         device_id: Optional[str] = None,
-        limit: int = 1000
+        limit: int = 1000,
+        fields: str = "raw",
     ) -> List[Dict[str, Any]]:
         """
         Récupère les échantillons sur une période
@@ -356,80 +521,73 @@ class SQALService:
             end_time: Fin période
             device_id: Filtrer par device (optionnel)
             limit: Nombre max résultats
+            fields: Projection scores | analysis | raw (défaut: raw, format complet)
 
         Returns:
             Liste de dictionnaires
         """
-        try:
-            async with AsyncSessionLocal() as session:
-                stmt = (
-                    select(SensorSample)
-                    .where(SensorSample.timestamp.between(start_time, end_time))
-                    .order_by(desc(SensorSample.timestamp))
-                    .limit(limit)
-                )
-                if device_id:
-                    stmt = stmt.where(SensorSample.device_id == device_id)
+        samples, _ = await self.get_samples_page(start_time, end_time, device_id, limit, fields)
+        return samples
 
-                samples = (await session.scalars(stmt)).all()
-                results: List[Dict[str, Any]] = []
-                for sample in samples:
-                    results.append(
-                        {
-                            "time": sample.timestamp,
-                            "sample_id": sample.sample_id,
-                            "device_id": sample.device_id,
-                            "lot_id": sample.lot_id,
-                            "vl53l8ch_distance_matrix": sample.vl53l8ch_distance_matrix,
-                            "vl53l8ch_reflectance_matrix": sample.vl53l8ch_reflectance_matrix,
-                            "vl53l8ch_amplitude_matrix": sample.vl53l8ch_amplitude_matrix,
-                            "vl53l8ch_integration_time": None,
-                            "vl53l8ch_temperature_c": None,
-                            "vl53l8ch_volume_mm3": sample.vl53l8ch_volume_mm3,
-                            "vl53l8ch_avg_height_mm": sample.vl53l8ch_avg_height_mm,
-                            "vl53l8ch_max_height_mm": sample.vl53l8ch_max_height_mm,
-                            "vl53l8ch_min_height_mm": sample.vl53l8ch_min_height_mm,
-                            "vl53l8ch_surface_uniformity": sample.vl53l8ch_surface_uniformity,
-                            "vl53l8ch_bins_analysis": sample.vl53l8ch_bins_analysis,
-                            "vl53l8ch_reflectance_analysis": sample.vl53l8ch_reflectance_analysis,
-                            "vl53l8ch_amplitude_consistency": sample.vl53l8ch_amplitude_consistency,
-                            "vl53l8ch_quality_score": sample.vl53l8ch_quality_score,
-                            "vl53l8ch_grade": sample.vl53l8ch_grade,
-                            "vl53l8ch_score_breakdown": sample.vl53l8ch_score_breakdown,
-                            "vl53l8ch_defects": sample.vl53l8ch_defects,
-                            "as7341_channels": sample.as7341_channels,
-                            "as7341_integration_time": sample.as7341_integration_time,
-                            "as7341_gain": sample.as7341_gain,
-                            "as7341_freshness_index": sample.as7341_freshness_index,
-                            "as7341_fat_quality_index": sample.as7341_fat_quality_index,
-                            "as7341_oxidation_index": sample.as7341_oxidation_index,
-                            "as7341_spectral_analysis": sample.as7341_spectral_analysis,
-                            "as7341_color_analysis": sample.as7341_color_analysis,
-                            "as7341_quality_score": sample.as7341_quality_score,
-                            "as7341_grade": sample.as7341_grade,
-                            "as7341_score_breakdown": sample.as7341_score_breakdown,
-                            "as7341_defects": sample.as7341_defects,
-                            "fusion_final_score": sample.fusion_final_score,
-                            "fusion_final_grade": sample.fusion_final_grade,
-                            "fusion_vl53l8ch_score": sample.fusion_vl53l8ch_score,
-                            "fusion_as7341_score": sample.fusion_as7341_score,
-                            "fusion_defects": sample.fusion_defects,
-                            "fusion_is_compliant": (sample.fusion_final_grade != "REJECT") if sample.fusion_final_grade else None,
-                            "meta_firmware_version": sample.meta_firmware_version,
-                            "meta_temperature_c": sample.meta_temperature_c,
-                            "meta_humidity_percent": sample.meta_humidity_percent,
-                            "meta_config_profile": sample.meta_config_profile,
-                            "created_at": sample.created_at,
-                            "poids_foie_estime_g": sample.poids_foie_estime_g,
-                        }
-                    )
+    async def get_samples_page(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        device_id: Optional[str] = None,
+        limit: int = 1000,
+        fields: str = "raw",
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Page d'échantillons projetée, paginée par clé (timestamp, sample_id)
+
+        Args:
+            cursor: Curseur renvoyé par la page précédente (None = plus récents)
+
+        Returns:
+            (échantillons, curseur de la page suivante ou None)
 
-                logger.debug("get_samples_period: ORM sensor_samples")
-                return results
+        Raises:
+            ValueError: fields ou curseur invalide
+        """
+        after = decode_cursor(cursor) if cursor else None
+        # Une ligne de plus pour savoir s'il reste une page
+        stmt = build_samples_query(fields, start_time, end_time, device_id, after, limit + 1)
 
+        try:
+            async with AsyncSessionLocal() as session:
+                rows = (await session.execute(stmt)).all()
         except Exception as e:
             logger.error(f"❌ Erreur récupération échantillons période: {e}")
-            return []
+            return [], None
+
+        samples = [row_to_dict(row, fields) for row in rows[:limit]]
+        next_cursor = encode_cursor(samples[-1]) if len(rows) > limit else None
+        logger.debug(f"get_samples_page: ORM sensor_samples (fields={fields})")
+        return samples, next_cursor
+
+    async def stream_samples(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        device_id: Optional[str] = None,
+        fields: str = "raw",
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Échantillons de la période par lots de SAMPLES_STREAM_CHUNK (curseur serveur)
+
+        La mémoire reste bornée à un lot, quelle que soit la taille de la période
+        (export NDJSON/CSV de /api/sqal/samples).
+        """
+        after = decode_cursor(cursor) if cursor else None
+        stmt = build_samples_query(fields, start_time, end_time, device_id, after, limit)
+
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(stmt.execution_options(yield_per=SAMPLES_STREAM_CHUNK))
+            async for partition in result.partitions():
+                yield [row_to_dict(row, fields) for row in partition]
 
     async def get_hourly_stats(
         self,
@@ -447,63 +605,19 @@ class SQALService:
 
         Returns:
             Liste de statistiques horaires
+
+        Note:
+            Heures matérialisées lues dans le continuous aggregate
+            sensor_samples_hourly, queue récente agrégée à la volée
+            (voir sqal_stats_aggregates.py)
         """
         try:
-            async with AsyncSessionLocal() as session:
-                bucket = func.date_trunc("hour", SensorSample.timestamp).label("bucket")
-
-                stmt = (
-                    select(
-                        bucket,
-                        SensorSample.device_id.label("device_id"),
-                        func.count().label("sample_count"),
-                        func.avg(SensorSample.fusion_final_score).label("avg_quality_score"),
-                        func.sum(case((SensorSample.fusion_final_grade == "A+", 1), else_=0)).label("count_a_plus"),
-                        func.sum(case((SensorSample.fusion_final_grade == "A", 1), else_=0)).label("count_a"),
-                        func.sum(case((SensorSample.fusion_final_grade == "B", 1), else_=0)).label("count_b"),
-                        func.sum(case((SensorSample.fusion_final_grade == "C", 1), else_=0)).label("count_c"),
-                        func.sum(case((SensorSample.fusion_final_grade == "REJECT", 1), else_=0)).label("count_reject"),
-                        func.avg(SensorSample.vl53l8ch_volume_mm3).label("avg_volume_mm3"),
-                        func.avg(SensorSample.as7341_freshness_index).label("avg_freshness_index"),
-                        func.sum(case((SensorSample.fusion_final_grade != "REJECT", 1), else_=0)).label("compliant_count"),
-                    )
-                    .where(SensorSample.timestamp.between(start_time, end_time))
-                    .group_by(bucket, SensorSample.device_id)
-                    .order_by(desc(bucket))
-                )
-
-                if device_id:
-                    stmt = stmt.where(SensorSample.device_id == device_id)
-
-                rows = (await session.execute(stmt)).all()
-
-                logger.info("get_hourly_stats: ORM sensor_samples")
-                logger.debug("get_hourly_stats: ORM sensor_samples")
-
-                results: List[Dict[str, Any]] = []
-                for r in rows:
-                    sample_count = int(r.sample_count or 0)
-                    compliant_count = int(r.compliant_count or 0)
-                    compliance_rate_pct = (compliant_count / sample_count * 100) if sample_count > 0 else 0
-
-                    results.append(
-                        {
-                            "bucket": r.bucket,
-                            "device_id": r.device_id,
-                            "sample_count": sample_count,
-                            "avg_quality_score": float(r.avg_quality_score) if r.avg_quality_score is not None else 0,
-                            "count_a_plus": int(r.count_a_plus or 0),
-                            "count_a": int(r.count_a or 0),
-                            "count_b": int(r.count_b or 0),
-                            "count_c": int(r.count_c or 0),
-                            "count_reject": int(r.count_reject or 0),
-                            "avg_volume_mm3": float(r.avg_volume_mm3) if r.avg_volume_mm3 is not None else 0,
-                            "avg_freshness_index": float(r.avg_freshness_index) if r.avg_freshness_index is not None else 0,
-                            "compliance_rate_pct": compliance_rate_pct,
-                        }
-                    )
+            await self._ensure_pool()
+            async with self.pool.acquire() as conn:
+                results = await fetch_hourly_stats(conn, start_time, end_time, device_id)
 
-                return results
+            logger.debug("get_hourly_stats: sensor_samples_hourly + queue brute")
+            return results
 
         except Exception as e:
             logger.error(f"❌ Erreur récupération stats horaires: {e}")
@@ -525,60 +639,18 @@ class SQALService:
 
         Returns:
             Liste de statistiques par site
+
+        Note:
+            Même découpage agrégat / queue brute que get_hourly_stats,
+            cumulé par jour et site (jointure sqal_devices)
         """
         try:
-            async with AsyncSessionLocal() as session:
-                bucket = func.date_trunc("day", SensorSample.timestamp).label("bucket")
-
-                stmt = (
-                    select(
-                        bucket,
-                        SQALDevice.site_code.label("site_code"),
-                        func.count().label("total_samples"),
-                        func.avg(SensorSample.fusion_final_score).label("avg_quality_score"),
-                        func.sum(case((SensorSample.fusion_final_grade == "A+", 1), else_=0)).label("count_a_plus"),
-                        func.sum(case((SensorSample.fusion_final_grade == "A", 1), else_=0)).label("count_a"),
-                        func.sum(case((SensorSample.fusion_final_grade == "B", 1), else_=0)).label("count_b"),
-                        func.sum(case((SensorSample.fusion_final_grade == "C", 1), else_=0)).label("count_c"),
-                        func.sum(case((SensorSample.fusion_final_grade == "REJECT", 1), else_=0)).label("count_reject"),
-                        func.sum(case((SensorSample.fusion_final_grade != "REJECT", 1), else_=0)).label("compliant_count"),
-                    )
-                    .select_from(SensorSample)
-                    .join(SQALDevice, SQALDevice.device_id == SensorSample.device_id)
-                    .where(SensorSample.timestamp.between(start_time, end_time))
-                    .where(SQALDevice.site_code.is_not(None))
-                    .group_by(bucket, SQALDevice.site_code)
-                    .order_by(desc(bucket), SQALDevice.site_code)
-                )
-
-                if site_code:
-                    stmt = stmt.where(SQALDevice.site_code == site_code)
-
-                rows = (await session.execute(stmt)).all()
-                logger.info("get_site_stats: ORM sensor_samples + sqal_devices")
-
-                results: List[Dict[str, Any]] = []
-                for r in rows:
-                    total_samples = int(r.total_samples or 0)
-                    compliant_count = int(r.compliant_count or 0)
-                    compliance_rate_pct = (compliant_count / total_samples * 100) if total_samples > 0 else 0
-
-                    results.append(
-                        {
-                            "bucket": r.bucket,
-                            "site_code": r.site_code,
-                            "total_samples": total_samples,
-                            "avg_quality_score": float(r.avg_quality_score) if r.avg_quality_score is not None else 0,
-                            "compliance_rate_pct": compliance_rate_pct,
-                            "count_a_plus": int(r.count_a_plus or 0),
-                            "count_a": int(r.count_a or 0),
-                            "count_b": int(r.count_b or 0),
-                            "count_c": int(r.count_c or 0),
-                            "count_reject": int(r.count_reject or 0),
-                        }
-                    )
+            await self._ensure_pool()
+            async with self.pool.acquire() as conn:
+                results = await fetch_site_stats(conn, start_time, end_time, site_code)
 
-                return results
+            logger.debug("get_site_stats: sensor_samples_hourly + queue brute")
+            return results
 
         except Exception as e:
             logger.error(f"❌ Erreur récupération stats sites: {e}")
@@ -946,6 +1018,92 @@ class SQALService:
             logger.error(f"❌ Erreur distribution grades: {e}")
             return {}
 
+    async def _count_open_alerts(self, start_time: datetime, end_time: datetime) -> Dict[str, int]:
+        """Alertes non acquittées sur la période (COUNT en SQL, deux variantes de schéma)"""
+        async with self.pool.acquire() as conn:
+            for column in ("acknowledged", "is_acknowledged"):
+                try:
+                    row = await conn.fetchrow(
+                        f"""
+                        SELECT
+                            COUNT(*) AS active,
+                            COUNT(*) FILTER (WHERE severity = 'critical') AS critical
+                        FROM sqal_alerts
+                        WHERE time BETWEEN $1::timestamptz AND $2::timestamptz
+                          AND {column} = FALSE
+                        """,
+                        start_time,
+                        end_time,
+                    )
+                    return {"active": int(row["active"]), "critical": int(row["critical"])}
+                except asyncpg.UndefinedColumnError:
+                    continue
+        return {"active": 0, "critical": 0}
+
+    async def _count_devices(self) -> Dict[str, int]:
+        async with self.pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT COUNT(*) AS total, COUNT(*) FILTER (WHERE status = 'active') AS active
+                FROM sqal_devices
+                """
+            )
+        return {"total": int(row["total"]), "active": int(row["active"])}
+
+    async def _period_totals(self, start_time: datetime, end_time: datetime) -> Dict[str, Any]:
+        async with self.pool.acquire() as conn:
+            return await fetch_period_totals(conn, start_time, end_time)
+
+    async def _compute_dashboard_overview(self) -> Dict[str, Any]:
+        await self._ensure_pool()
+        end_time = datetime.now(timezone.utc)
+        start_time_24h = end_time - timedelta(days=1)
+        start_time_7d = end_time - timedelta(days=7)
+
+        # Lectures indépendantes : une connexion du pool chacune, en parallèle
+        stats_24h, stats_7d, alerts, devices = await asyncio.gather(
+            self._period_totals(start_time_24h, end_time),
+            self._period_totals(start_time_7d, end_time),
+            self._count_open_alerts(start_time_24h, end_time),
+            self._count_devices(),
+        )
+
+        return {
+            "stats_24h": {
+                "total_samples": stats_24h["total_samples"],
+                "avg_quality_score": round(stats_24h["avg_quality_score"], 3),
+                "compliance_rate_pct": round(stats_24h["compliance_rate_pct"], 1)
+            },
+            "grade_distribution_7d": {
+                "A+": stats_7d["count_a_plus"],
+                "A": stats_7d["count_a"],
+                "B": stats_7d["count_b"],
+                "C": stats_7d["count_c"],
+                "REJECT": stats_7d["count_reject"],
+            },
+            "active_alerts": alerts["active"],
+            "critical_alerts": alerts["critical"],
+            "total_devices": devices["total"],
+            "active_devices": devices["active"],
+            "timestamp": end_time.isoformat()
+        }
+
+    async def get_dashboard_overview(self) -> Dict[str, Any]:
+        """
+        KPIs du dashboard SQAL (24h, grades 7j, alertes ouvertes, devices)
+
+        Agrégats calculés en SQL (sensor_samples_hourly + queue brute, COUNT
+        alertes/devices), lancés en parallèle, et mis en cache par fenêtre de
+        OVERVIEW_CACHE_S secondes : un seul calcul par fenêtre quel que soit
+        le nombre d'appelants (singleflight).
+        """
+        window = int(time.time() // OVERVIEW_CACHE_S)
+        return await get_cache().get_or_compute(
+            f"sqal_dashboard_overview:{window}",
+            self._compute_dashboard_overview,
+            ttl=OVERVIEW_CACHE_S,
+        )
+
     async def predict(self, sample_id: str) -> Dict[str, Any]:
         try:
             async with AsyncSessionLocal() as session:
@@ -0,0 +1,279 @@
+"""
+Statistiques SQAL horaires / par site depuis le continuous aggregate
+
+sensor_samples_hourly (migration 20261017_0001) matérialise, par heure et
+device, des sommes et compteurs fusionnables (pas de moyennes) :
+- buckets entièrement matérialisés (sous le watermark TimescaleDB) → lus
+  dans l'agrégat
+- reste de la période (heures partielles en bornes + queue non encore
+  matérialisée) → agrégé à la volée sur sensor_samples
+Les deux parties sont fusionnées en SQL (UNION ALL + GROUP BY) : le coût d'une
+requête 30/90 jours ne dépend plus du volume brut de l'hypertable.
+
+Sans l'agrégat (PostgreSQL sans TimescaleDB), tout est calculé sur
+sensor_samples, avec le même résultat.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from app.core.logging_config import get_logger
+
+logger = get_logger("app.services")
+
+HOURLY_VIEW = "sensor_samples_hourly"
+BUCKET = timedelta(hours=1)
+
+# Agrégats fusionnables, dans l'ordre des colonnes de sensor_samples_hourly
+_RAW_AGGREGATES = """
+        COUNT(*) AS sample_count,
+        COUNT(*) FILTER (WHERE s.fusion_final_grade = 'A+') AS count_a_plus,
+        COUNT(*) FILTER (WHERE s.fusion_final_grade = 'A') AS count_a,
+        COUNT(*) FILTER (WHERE s.fusion_final_grade = 'B') AS count_b,
+        COUNT(*) FILTER (WHERE s.fusion_final_grade = 'C') AS count_c,
+        COUNT(*) FILTER (WHERE s.fusion_final_grade = 'REJECT') AS count_reject,
+        COUNT(*) FILTER (WHERE s.fusion_final_grade <> 'REJECT') AS compliant_count,
+        SUM(s.fusion_final_score) AS sum_quality_score,
+        COUNT(s.fusion_final_score) AS n_quality_score,
+        SUM(s.vl53l8ch_volume_mm3) AS sum_volume_mm3,
+        COUNT(s.vl53l8ch_volume_mm3) AS n_volume_mm3,
+        SUM(s.as7341_freshness_index) AS sum_freshness_index,
+        COUNT(s.as7341_freshness_index) AS n_freshness_index
+"""
+
+_ROLLUP_AGGREGATES = """
+        SUM(c.sample_count) AS sample_count,
+        SUM(c.count_a_plus) AS count_a_plus,
+        SUM(c.count_a) AS count_a,
+        SUM(c.count_b) AS count_b,
+        SUM(c.count_c) AS count_c,
+        SUM(c.count_reject) AS count_reject,
+        SUM(c.compliant_count) AS compliant_count,
+        SUM(c.sum_quality_score) / NULLIF(SUM(c.n_quality_score), 0) AS avg_quality_score,
+        SUM(c.sum_volume_mm3) / NULLIF(SUM(c.n_volume_mm3), 0) AS avg_volume_mm3,
+        SUM(c.sum_freshness_index) / NULLIF(SUM(c.n_freshness_index), 0) AS avg_freshness_index
+"""
+
+_MATERIALIZED_COLUMNS = """
+        h.sample_count, h.count_a_plus, h.count_a, h.count_b, h.count_c, h.count_reject,
+        h.compliant_count, h.sum_quality_score, h.n_quality_score, h.sum_volume_mm3,
+        h.n_volume_mm3, h.sum_freshness_index, h.n_freshness_index
+"""
+
+# $1/$2 = période demandée, $3/$4 = plage lue dans l'agrégat, $5 = filtre device
+_HOURLY_RAW = f"""
+    SELECT date_trunc('hour', s.timestamp) AS bucket, s.device_id, {_RAW_AGGREGATES}
+    FROM sensor_samples s
+    WHERE s.timestamp BETWEEN $1 AND $2
+      AND NOT (s.timestamp >= $3 AND s.timestamp < $4)
+      AND ($5::text IS NULL OR s.device_id = $5)
+    GROUP BY 1, 2
+"""
+
+_HOURLY_MATERIALIZED = f"""
+    SELECT h.bucket, h.device_id, {_MATERIALIZED_COLUMNS}
+    FROM {HOURLY_VIEW} h
+    WHERE h.bucket >= $3 AND h.bucket < $4
+      AND ($5::text IS NULL OR h.device_id = $5)
+"""
+
+# $5 = filtre site
+_SITE_RAW = f"""
+    SELECT date_trunc('day', s.timestamp) AS bucket, d.site_code, {_RAW_AGGREGATES}
+    FROM sensor_samples s
+    JOIN sqal_devices d ON d.device_id = s.device_id
+    WHERE s.timestamp BETWEEN $1 AND $2
+      AND NOT (s.timestamp >= $3 AND s.timestamp < $4)
+      AND d.site_code IS NOT NULL
+      AND ($5::text IS NULL OR d.site_code = $5)
+    GROUP BY 1, 2
+"""
+
+_SITE_MATERIALIZED = f"""
+    SELECT date_trunc('day', h.bucket) AS bucket, d.site_code, {_MATERIALIZED_COLUMNS}
+    FROM {HOURLY_VIEW} h
+    JOIN sqal_devices d ON d.device_id = h.device_id
+    WHERE h.bucket >= $3 AND h.bucket < $4
+      AND d.site_code IS NOT NULL
+      AND ($5::text IS NULL OR d.site_code = $5)
+"""
+
+
+def _merge_query(raw: str, materialized: Optional[str], key: str, order: str) -> str:
+    parts = [raw] if materialized is None else [materialized, raw]
+    return f"""
+        WITH c AS ({' UNION ALL '.join(parts)})
+        SELECT c.bucket, c.{key}, {_ROLLUP_AGGREGATES}
+        FROM c
+        GROUP BY c.bucket, c.{key}
+        ORDER BY {order}
+    """
+
+
+HOURLY_STATS_QUERY = _merge_query(_HOURLY_RAW, _HOURLY_MATERIALIZED, "device_id", "c.bucket DESC")
+HOURLY_STATS_RAW_QUERY = _merge_query(_HOURLY_RAW, None, "device_id", "c.bucket DESC")
+SITE_STATS_QUERY = _merge_query(_SITE_RAW, _SITE_MATERIALIZED, "site_code", "c.bucket DESC, c.site_code")
+SITE_STATS_RAW_QUERY = _merge_query(_SITE_RAW, None, "site_code", "c.bucket DESC, c.site_code")
+
+# Totaux d'une période (dashboard overview), $5 = filtre device
+_TOTALS_RAW = f"""
+    SELECT {_RAW_AGGREGATES}
+    FROM sensor_samples s
+    WHERE s.timestamp BETWEEN $1 AND $2
+      AND NOT (s.timestamp >= $3 AND s.timestamp < $4)
+      AND ($5::text IS NULL OR s.device_id = $5)
+"""
+
+_TOTALS_MATERIALIZED = f"""
+    SELECT {_MATERIALIZED_COLUMNS}
+    FROM {HOURLY_VIEW} h
+    WHERE h.bucket >= $3 AND h.bucket < $4
+      AND ($5::text IS NULL OR h.device_id = $5)
+"""
+
+PERIOD_TOTALS_QUERY = f"""
+    WITH c AS ({_TOTALS_MATERIALIZED} UNION ALL {_TOTALS_RAW})
+    SELECT {_ROLLUP_AGGREGATES}
+    FROM c
+"""
+PERIOD_TOTALS_RAW_QUERY = f"""
+    WITH c AS ({_TOTALS_RAW})
+    SELECT {_ROLLUP_AGGREGATES}
+    FROM c
+"""
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def materialized_range(
+    start_time: datetime,
+    end_time: datetime,
+    watermark: Optional[datetime],
+) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Heures entières de [start_time, end_time] déjà matérialisées
+
+    Returns:
+        (début, fin exclue) alignés sur l'heure, ou None (tout en brut)
+    """
+    if watermark is None:
+        return None
+    start_time, end_time, watermark = _utc(start_time), _utc(end_time), _utc(watermark)
+
+    first = _floor_hour(start_time)
+    if first < start_time:
+        first += BUCKET
+    last = min(_floor_hour(end_time), _floor_hour(watermark))
+    return (first, last) if first < last else None
+
+
+async def materialized_until(conn: asyncpg.Connection) -> Optional[datetime]:
+    """
+    Watermark de sensor_samples_hourly (None si l'agrégat n'existe pas ou est vide)
+    """
+    if not await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", HOURLY_VIEW):
+        return None
+
+    # Schéma des fonctions internes : _timescaledb_functions (>= 2.12), sinon _timescaledb_internal
+    for schema in ("_timescaledb_functions", "_timescaledb_internal"):
+        try:
+            watermark = await conn.fetchval(
+                f"""
+                SELECT {schema}.to_timestamp({schema}.cagg_watermark(mat_hypertable_id))
+                FROM _timescaledb_catalog.continuous_agg
+                WHERE user_view_name = $1
+                """,
+                HOURLY_VIEW,
+            )
+            break
+        except asyncpg.PostgresError:
+            continue
+    else:
+        watermark = await conn.fetchval(f"SELECT MAX(bucket) + INTERVAL '1 hour' FROM {HOURLY_VIEW}")
+
+    # Agrégat jamais rafraîchi : watermark à -infinity
+    if watermark is None or watermark.year < 1971:
+        return None
+    return _utc(watermark)
+
+
+async def _fetch(conn, query: str, raw_query: str, start_time, end_time, filter_value) -> List[asyncpg.Record]:
+    start_time, end_time = _utc(start_time), _utc(end_time)
+    span = materialized_range(start_time, end_time, await materialized_until(conn))
+    if span is None:
+        return await conn.fetch(raw_query, start_time, end_time, start_time, start_time, filter_value)
+    return await conn.fetch(query, start_time, end_time, span[0], span[1], filter_value)
+
+
+def _counts(r) -> Dict[str, Any]:
+    sample_count = int(r["sample_count"] or 0)
+    compliant_count = int(r["compliant_count"] or 0)
+    return {
+        "avg_quality_score": float(r["avg_quality_score"]) if r["avg_quality_score"] is not None else 0,
+        "compliance_rate_pct": (compliant_count / sample_count * 100) if sample_count > 0 else 0,
+        "count_a_plus": int(r["count_a_plus"] or 0),
+        "count_a": int(r["count_a"] or 0),
+        "count_b": int(r["count_b"] or 0),
+        "count_c": int(r["count_c"] or 0),
+        "count_reject": int(r["count_reject"] or 0),
+    }
+
+
+async def fetch_hourly_stats(
+    conn: asyncpg.Connection,
+    start_time: datetime,
+    end_time: datetime,
+    device_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Stats par heure et device (format SQALService.get_hourly_stats)"""
+    rows = await _fetch(conn, HOURLY_STATS_QUERY, HOURLY_STATS_RAW_QUERY, start_time, end_time, device_id)
+    return [
+        {
+            "bucket": r["bucket"],
+            "device_id": r["device_id"],
+            "sample_count": int(r["sample_count"] or 0),
+            **_counts(r),
+            "avg_volume_mm3": float(r["avg_volume_mm3"]) if r["avg_volume_mm3"] is not None else 0,
+            "avg_freshness_index": float(r["avg_freshness_index"]) if r["avg_freshness_index"] is not None else 0,
+        }
+        for r in rows
+    ]
+
+
+async def fetch_site_stats(
+    conn: asyncpg.Connection,
+    start_time: datetime,
+    end_time: datetime,
+    site_code: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Stats par jour et site (format SQALService.get_site_stats)"""
+    rows = await _fetch(conn, SITE_STATS_QUERY, SITE_STATS_RAW_QUERY, start_time, end_time, site_code)
+    return [
+        {
+            "bucket": r["bucket"],
+            "site_code": r["site_code"],
+            "total_samples": int(r["sample_count"] or 0),
+            **_counts(r),
+        }
+        for r in rows
+    ]
+
+
+async def fetch_period_totals(
+    conn: asyncpg.Connection,
+    start_time: datetime,
+    end_time: datetime,
+    device_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Totaux d'une période en une ligne (nombre, score moyen, conformité, grades)"""
+    rows = await _fetch(conn, PERIOD_TOTALS_QUERY, PERIOD_TOTALS_RAW_QUERY, start_time, end_time, device_id)
+    r = rows[0]
+    return {"total_samples": int(r["sample_count"] or 0), **_counts(r)}
@@ -95,6 +95,37 @@ celery_app.conf.update(
             'schedule': crontab(hour=4, minute=0),
         },
 
+        # Vérification blockchain incrémentale (depuis le dernier checkpoint, toutes les heures)
+        'verify-blockchain-hourly': {
+            'task': 'app.tasks.scheduled_tasks.verify_blockchain_integrity',
+            'schedule': crontab(minute=45),
+        },
+
+        # Audit complet blockchain (dimanche 4h30)
+        'audit-blockchain-weekly': {
+            'task': 'app.tasks.scheduled_tasks.verify_blockchain_integrity',
+            'schedule': crontab(day_of_week=0, hour=4, minute=30),
+            'kwargs': {'complet': True},
+        },
+
+        # Prévisions production Prophet/ETS (tous les jours à 2h30)
+        'forecast-production-nightly': {
+            'task': 'app.tasks.ml_tasks.forecast_production_async',
+            'schedule': crontab(hour=2, minute=30),
+        },
+
+        # Clustering gaveurs : affectation incrémentale + ré-entraînement si dérive (toutes les heures)
+        'refresh-gaveur-clusters-hourly': {
+            'task': 'app.tasks.ml_tasks.refresh_gaveur_clusters_async',
+            'schedule': crontab(minute=15),
+        },
+
+        # Balayage alertes canards en gavage (tous les jours à 3h30)
+        'sweep-alertes-canards-nightly': {
+            'task': 'app.tasks.ml_tasks.sweep_alertes_canards_async',
+            'schedule': crontab(hour=3, minute=30),
+        },
+
         # Détection anomalies toutes les 6h
         'detect-anomalies-periodic': {
             'task': 'app.tasks.ml_tasks.detect_anomalies_periodic',
@@ -109,12 +140,16 @@ celery_app.conf.task_routes = {
     'app.tasks.ml_tasks.train_pysr_async': {'queue': 'ml_heavy'},
     'app.tasks.ml_tasks.train_pysr_multi_async': {'queue': 'ml_heavy'},
     'app.tasks.ml_tasks.optimize_feeding_curve_async': {'queue': 'ml_heavy'},
+    'app.tasks.ml_tasks.optimize_multiobjective_async': {'queue': 'ml_heavy'},
     'app.tasks.ml_tasks.train_prophet_async': {'queue': 'ml_heavy'},
+    'app.tasks.ml_tasks.forecast_production_async': {'queue': 'ml_heavy'},
 
     # Tâches ML légères → queue standard
     'app.tasks.ml_tasks.detect_anomalies_*': {'queue': 'ml_light'},
     'app.tasks.ml_tasks.cluster_gaveurs_async': {'queue': 'ml_light'},
+    'app.tasks.ml_tasks.refresh_gaveur_clusters_async': {'queue': 'ml_light'},
     'app.tasks.ml_tasks.cluster_lots_pred_async': {'queue': 'ml_light'},
+    'app.tasks.ml_tasks.sweep_alertes_canards_async': {'queue': 'ml_light'},
 
     # Exports → queue dédiée
     'app.tasks.export_tasks.*': {'queue': 'exports'},
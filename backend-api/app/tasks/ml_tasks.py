@@ -10,6 +10,7 @@ Entraînements de modèles ML qui peuvent prendre plusieurs minutes/heures:
 """
 
 from app.tasks.celery_app import celery_app
+from app.tasks.worker_runtime import get_pool, run_async
 import logging
 from typing import Dict, Any
 import asyncpg
@@ -60,8 +61,6 @@ def train_pysr_async(
     try:
         logger.info(f"🔬 Starting PySR training (lot_id={lot_id}, genetique={genetique})")
 
-        import asyncio
-
         async def _resolve_foie_objective(
             *,
             resolved_genetique: str | None,
@@ -88,52 +87,49 @@ def train_pysr_async(
                     float(override_w_target if override_w_target is not None else default_w_target),
                 )
 
-            pool = await asyncpg.create_pool(DATABASE_URL)
-            try:
-                async with pool.acquire() as conn:
-                    await conn.execute(
-                        """
-                        CREATE TABLE IF NOT EXISTS foie_objective_policies (
-                            id SERIAL PRIMARY KEY,
-                            genetique TEXT NOT NULL,
-                            site_code VARCHAR(2),
-                            lot_cluster_pred_id INTEGER,
-                            foie_min_g DOUBLE PRECISION NOT NULL,
-                            foie_max_g DOUBLE PRECISION NOT NULL,
-                            foie_target_g DOUBLE PRECISION NOT NULL,
-                            weight_range DOUBLE PRECISION NOT NULL,
-                            weight_target DOUBLE PRECISION NOT NULL,
-                            is_active BOOLEAN NOT NULL DEFAULT TRUE,
-                            valid_from TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                            valid_to TIMESTAMPTZ,
-                            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                            created_by TEXT
-                        );
-                        """
-                    )
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                await conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS foie_objective_policies (
+                        id SERIAL PRIMARY KEY,
+                        genetique TEXT NOT NULL,
+                        site_code VARCHAR(2),
+                        lot_cluster_pred_id INTEGER,
+                        foie_min_g DOUBLE PRECISION NOT NULL,
+                        foie_max_g DOUBLE PRECISION NOT NULL,
+                        foie_target_g DOUBLE PRECISION NOT NULL,
+                        weight_range DOUBLE PRECISION NOT NULL,
+                        weight_target DOUBLE PRECISION NOT NULL,
+                        is_active BOOLEAN NOT NULL DEFAULT TRUE,
+                        valid_from TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                        valid_to TIMESTAMPTZ,
+                        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                        created_by TEXT
+                    );
+                    """
+                )
 
-                    row = await conn.fetchrow(
-                        """
-                        SELECT *
-                        FROM foie_objective_policies
-                        WHERE genetique = $1
-                          AND is_active = TRUE
-                          AND valid_from <= NOW()
-                          AND (valid_to IS NULL OR valid_to > NOW())
-                          AND ($2::varchar IS NULL OR site_code IS NULL OR site_code = $2)
-                          AND ($3::int IS NULL OR lot_cluster_pred_id IS NULL OR lot_cluster_pred_id = $3)
-                        ORDER BY
-                          (site_code IS NOT NULL AND site_code = $2) DESC,
-                          (lot_cluster_pred_id IS NOT NULL AND lot_cluster_pred_id = $3) DESC,
-                          created_at DESC
-                        LIMIT 1
-                        """,
-                        str(resolved_genetique).strip().lower(),
-                        (str(resolved_site_code).strip().upper() if resolved_site_code else None),
-                        (int(resolved_cluster_pred_id) if resolved_cluster_pred_id is not None else None),
-                    )
-            finally:
-                await pool.close()
+                row = await conn.fetchrow(
+                    """
+                    SELECT *
+                    FROM foie_objective_policies
+                    WHERE genetique = $1
+                      AND is_active = TRUE
+                      AND valid_from <= NOW()
+                      AND (valid_to IS NULL OR valid_to > NOW())
+                      AND ($2::varchar IS NULL OR site_code IS NULL OR site_code = $2)
+                      AND ($3::int IS NULL OR lot_cluster_pred_id IS NULL OR lot_cluster_pred_id = $3)
+                    ORDER BY
+                      (site_code IS NOT NULL AND site_code = $2) DESC,
+                      (lot_cluster_pred_id IS NOT NULL AND lot_cluster_pred_id = $3) DESC,
+                      created_at DESC
+                    LIMIT 1
+                    """,
+                    str(resolved_genetique).strip().lower(),
+                    (str(resolved_site_code).strip().upper() if resolved_site_code else None),
+                    (int(resolved_cluster_pred_id) if resolved_cluster_pred_id is not None else None),
+                )
 
             if row:
                 p_min = float(row["foie_min_g"])
@@ -159,43 +155,40 @@ def train_pysr_async(
         async def _infer_segment_from_lot(
             lot_id: int,
         ) -> tuple[str | None, str | None, int | None]:
-            pool = await asyncpg.create_pool(DATABASE_URL)
-            try:
-                async with pool.acquire() as conn:
-                    lot_row = await conn.fetchrow(
-                        "SELECT genetique, site_code FROM lots_gavage WHERE id = $1",
-                        int(lot_id),
-                    )
-                    if not lot_row:
-                        return None, None, None
-
-                    resolved_gen = str(lot_row["genetique"]).strip().lower() if lot_row.get("genetique") else None
-                    resolved_site = str(lot_row["site_code"]).strip().upper() if lot_row.get("site_code") else None
-
-                    run_id = await conn.fetchval(
-                        """
-                        SELECT id
-                        FROM lot_clustering_runs
-                        WHERE clustering_type = 'lot_pred'
-                        ORDER BY created_at DESC
-                        LIMIT 1
-                        """
-                    )
-                    if not run_id:
-                        return resolved_gen, resolved_site, None
-
-                    cluster_id = await conn.fetchval(
-                        """
-                        SELECT cluster_id
-                        FROM lot_clustering_assignments
-                        WHERE run_id = $1 AND lot_id = $2
-                        """,
-                        int(run_id),
-                        int(lot_id),
-                    )
-                    return resolved_gen, resolved_site, (int(cluster_id) if cluster_id is not None else None)
-            finally:
-                await pool.close()
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                lot_row = await conn.fetchrow(
+                    "SELECT genetique, site_code FROM lots_gavage WHERE id = $1",
+                    int(lot_id),
+                )
+                if not lot_row:
+                    return None, None, None
+
+                resolved_gen = str(lot_row["genetique"]).strip().lower() if lot_row.get("genetique") else None
+                resolved_site = str(lot_row["site_code"]).strip().upper() if lot_row.get("site_code") else None
+
+                run_id = await conn.fetchval(
+                    """
+                    SELECT id
+                    FROM lot_clustering_runs
+                    WHERE clustering_type = 'lot_pred'
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                    """
+                )
+                if not run_id:
+                    return resolved_gen, resolved_site, None
+
+                cluster_id = await conn.fetchval(
+                    """
+                    SELECT cluster_id
+                    FROM lot_clustering_assignments
+                    WHERE run_id = $1 AND lot_id = $2
+                    """,
+                    int(run_id),
+                    int(lot_id),
+                )
+                return resolved_gen, resolved_site, (int(cluster_id) if cluster_id is not None else None)
 
         # Import lazy (évite imports inutiles au démarrage)
         from app.ml.symbolic_regression import train_pysr_model
@@ -205,7 +198,7 @@ def train_pysr_async(
         resolved_cluster_pred_id: int | None = None
 
         if lot_id is not None:
-            g, sc, lc = asyncio.run(_infer_segment_from_lot(int(lot_id)))
+            g, sc, lc = run_async(_infer_segment_from_lot(int(lot_id)))
             resolved_genetique = resolved_genetique or g
             resolved_site_code = sc
             resolved_cluster_pred_id = lc
@@ -216,7 +209,7 @@ def train_pysr_async(
          resolved_foie_max,
          resolved_foie_target,
          resolved_w_range,
-         resolved_w_target,) = asyncio.run(
+         resolved_w_target,) = run_async(
             _resolve_foie_objective(
                 resolved_genetique=str(resolved_genetique).strip().lower() if resolved_genetique else None,
                 resolved_site_code=resolved_site_code,
@@ -320,8 +313,6 @@ def train_pysr_multi_async(
             f"(site_codes={site_codes}, seasons={seasons}, cluster_ids={cluster_ids}, premium={require_sqal_premium})"
         )
 
-        import asyncio
-
         from app.ml.symbolic_regression import train_pysr_model
 
         async def _resolve_foie_objective_for_gen(
@@ -340,29 +331,26 @@ def train_pysr_multi_async(
             default_w_range = 0.5
             default_w_target = 0.5
 
-            pool = await asyncpg.create_pool(DATABASE_URL)
-            try:
-                async with pool.acquire() as conn:
-                    row = await conn.fetchrow(
-                        """
-                        SELECT *
-                        FROM foie_objective_policies
-                        WHERE genetique = $1
-                          AND is_active = TRUE
-                          AND valid_from <= NOW()
-                          AND (valid_to IS NULL OR valid_to > NOW())
-                          AND ($2::varchar IS NULL OR site_code IS NULL OR site_code = $2)
-                          AND lot_cluster_pred_id IS NULL
-                        ORDER BY
-                          (site_code IS NOT NULL AND site_code = $2) DESC,
-                          created_at DESC
-                        LIMIT 1
-                        """,
-                        str(resolved_genetique).strip().lower(),
-                        (str(resolved_site_code).strip().upper() if resolved_site_code else None),
-                    )
-            finally:
-                await pool.close()
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                row = await conn.fetchrow(
+                    """
+                    SELECT *
+                    FROM foie_objective_policies
+                    WHERE genetique = $1
+                      AND is_active = TRUE
+                      AND valid_from <= NOW()
+                      AND (valid_to IS NULL OR valid_to > NOW())
+                      AND ($2::varchar IS NULL OR site_code IS NULL OR site_code = $2)
+                      AND lot_cluster_pred_id IS NULL
+                    ORDER BY
+                      (site_code IS NOT NULL AND site_code = $2) DESC,
+                      created_at DESC
+                    LIMIT 1
+                    """,
+                    str(resolved_genetique).strip().lower(),
+                    (str(resolved_site_code).strip().upper() if resolved_site_code else None),
+                )
 
             if row:
                 p_min = float(row["foie_min_g"])
@@ -392,114 +380,111 @@ def train_pysr_multi_async(
             _cluster_ids: list[int] | None,
             _require_sqal_premium: bool,
         ) -> list[str]:
-            pool = await asyncpg.create_pool(DATABASE_URL)
-            try:
-                where_clauses: list[str] = [
-                    "(gdl.dose_moyenne IS NOT NULL)",
-                    "(gdl.poids_moyen_lot IS NOT NULL)",
-                    "(lg.genetique IS NOT NULL)",
-                    "(TRIM(lg.genetique) <> '')",
-                ]
-
-                params: list[object] = []
-                param_idx = 1
-
-                if _site_codes:
-                    where_clauses.append(f"lg.site_code = ANY(${param_idx})")
-                    params.append(_site_codes)
-                    param_idx += 1
-
-                if _min_duree_gavage is not None:
-                    where_clauses.append(
-                        f"COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc) >= ${param_idx}"
-                    )
-                    params.append(int(_min_duree_gavage))
-                    param_idx += 1
+            pool = await get_pool()
+            where_clauses: list[str] = [
+                "(gdl.dose_moyenne IS NOT NULL)",
+                "(gdl.poids_moyen_lot IS NOT NULL)",
+                "(lg.genetique IS NOT NULL)",
+                "(TRIM(lg.genetique) <> '')",
+            ]
+
+            params: list[object] = []
+            param_idx = 1
+
+            if _site_codes:
+                where_clauses.append(f"lg.site_code = ANY(${param_idx})")
+                params.append(_site_codes)
+                param_idx += 1
+
+            if _min_duree_gavage is not None:
+                where_clauses.append(
+                    f"COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc) >= ${param_idx}"
+                )
+                params.append(int(_min_duree_gavage))
+                param_idx += 1
 
-                if _max_duree_gavage is not None:
-                    where_clauses.append(
-                        f"COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc) <= ${param_idx}"
-                    )
-                    params.append(int(_max_duree_gavage))
-                    param_idx += 1
-
-                if _seasons:
-                    where_clauses.append(f"lc.season = ANY(${param_idx})")
-                    params.append([str(s).lower() for s in _seasons])
-                    param_idx += 1
-
-                if _cluster_ids:
-                    where_clauses.append(f"gc.cluster_id = ANY(${param_idx})")
-                    params.append([int(x) for x in _cluster_ids])
-                    param_idx += 1
-
-                if _require_sqal_premium:
-                    resolved_premium = premium_grades or ["A+", "A"]
-                    where_clauses.append(
-                        f"EXISTS (SELECT 1 FROM sensor_samples ss WHERE ss.lot_id = lg.id AND ss.fusion_final_grade = ANY(${param_idx}))"
-                    )
-                    params.append(resolved_premium)
-                    param_idx += 1
-
-                query = """
-                WITH lot_duree AS (
-                    SELECT lot_gavage_id, MAX(jour_gavage) AS duree_gavage_calc
-                    FROM gavage_data_lots
-                    GROUP BY lot_gavage_id
-                ),
-                lots_ctx AS (
-                    SELECT
-                        lg.id AS lot_id,
-                        COALESCE(
+            if _max_duree_gavage is not None:
+                where_clauses.append(
+                    f"COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc) <= ${param_idx}"
+                )
+                params.append(int(_max_duree_gavage))
+                param_idx += 1
+
+            if _seasons:
+                where_clauses.append(f"lc.season = ANY(${param_idx})")
+                params.append([str(s).lower() for s in _seasons])
+                param_idx += 1
+
+            if _cluster_ids:
+                where_clauses.append(f"gc.cluster_id = ANY(${param_idx})")
+                params.append([int(x) for x in _cluster_ids])
+                param_idx += 1
+
+            if _require_sqal_premium:
+                resolved_premium = premium_grades or ["A+", "A"]
+                where_clauses.append(
+                    f"EXISTS (SELECT 1 FROM sensor_samples ss WHERE ss.lot_id = lg.id AND ss.fusion_final_grade = ANY(${param_idx}))"
+                )
+                params.append(resolved_premium)
+                param_idx += 1
+
+            query = """
+            WITH lot_duree AS (
+                SELECT lot_gavage_id, MAX(jour_gavage) AS duree_gavage_calc
+                FROM gavage_data_lots
+                GROUP BY lot_gavage_id
+            ),
+            lots_ctx AS (
+                SELECT
+                    lg.id AS lot_id,
+                    COALESCE(
+                        pa.date_abattage_reelle,
+                        pa.date_abattage_prevue,
+                        (lg.debut_lot + COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc))
+                    ) AS date_abattage,
+                    CASE
+                        WHEN EXTRACT(MONTH FROM COALESCE(
                             pa.date_abattage_reelle,
                             pa.date_abattage_prevue,
                             (lg.debut_lot + COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc))
-                        ) AS date_abattage,
-                        CASE
-                            WHEN EXTRACT(MONTH FROM COALESCE(
-                                pa.date_abattage_reelle,
-                                pa.date_abattage_prevue,
-                                (lg.debut_lot + COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc))
-                            )) IN (12, 1, 2) THEN 'winter'
-                            WHEN EXTRACT(MONTH FROM COALESCE(
-                                pa.date_abattage_reelle,
-                                pa.date_abattage_prevue,
-                                (lg.debut_lot + COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc))
-                            )) IN (3, 4, 5) THEN 'spring'
-                            WHEN EXTRACT(MONTH FROM COALESCE(
-                                pa.date_abattage_reelle,
-                                pa.date_abattage_prevue,
-                                (lg.debut_lot + COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc))
-                            )) IN (6, 7, 8) THEN 'summer'
-                            WHEN EXTRACT(MONTH FROM COALESCE(
-                                pa.date_abattage_reelle,
-                                pa.date_abattage_prevue,
-                                (lg.debut_lot + COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc))
-                            )) IN (9, 10, 11) THEN 'autumn'
-                            ELSE NULL
-                        END AS season
-                    FROM lots_gavage lg
-                    LEFT JOIN lot_duree d ON d.lot_gavage_id = lg.id
-                    LEFT JOIN planning_abattages pa ON pa.lot_id = lg.id
-                )
-                SELECT DISTINCT LOWER(lg.genetique) AS genetique
-                FROM gavage_data_lots gdl
-                JOIN lots_gavage lg ON lg.id = gdl.lot_gavage_id
+                        )) IN (12, 1, 2) THEN 'winter'
+                        WHEN EXTRACT(MONTH FROM COALESCE(
+                            pa.date_abattage_reelle,
+                            pa.date_abattage_prevue,
+                            (lg.debut_lot + COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc))
+                        )) IN (3, 4, 5) THEN 'spring'
+                        WHEN EXTRACT(MONTH FROM COALESCE(
+                            pa.date_abattage_reelle,
+                            pa.date_abattage_prevue,
+                            (lg.debut_lot + COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc))
+                        )) IN (6, 7, 8) THEN 'summer'
+                        WHEN EXTRACT(MONTH FROM COALESCE(
+                            pa.date_abattage_reelle,
+                            pa.date_abattage_prevue,
+                            (lg.debut_lot + COALESCE(lg.duree_gavage_reelle, d.duree_gavage_calc))
+                        )) IN (9, 10, 11) THEN 'autumn'
+                        ELSE NULL
+                    END AS season
+                FROM lots_gavage lg
                 LEFT JOIN lot_duree d ON d.lot_gavage_id = lg.id
-                LEFT JOIN lots_ctx lc ON lc.lot_id = lg.id
-                LEFT JOIN gaveurs_clusters gc ON gc.gaveur_id = lg.gaveur_id
-                WHERE
-                """
-
-                query += " AND ".join(where_clauses)
-                query += " ORDER BY genetique"
-
-                rows = await pool.fetch(query, *params)
-                return [str(r["genetique"]) for r in rows if r.get("genetique")]
-            finally:
-                await pool.close()
-
-        genetiques = asyncio.run(
+                LEFT JOIN planning_abattages pa ON pa.lot_id = lg.id
+            )
+            SELECT DISTINCT LOWER(lg.genetique) AS genetique
+            FROM gavage_data_lots gdl
+            JOIN lots_gavage lg ON lg.id = gdl.lot_gavage_id
+            LEFT JOIN lot_duree d ON d.lot_gavage_id = lg.id
+            LEFT JOIN lots_ctx lc ON lc.lot_id = lg.id
+            LEFT JOIN gaveurs_clusters gc ON gc.gaveur_id = lg.gaveur_id
+            WHERE
+            """
+
+            query += " AND ".join(where_clauses)
+            query += " ORDER BY genetique"
+
+            rows = await pool.fetch(query, *params)
+            return [str(r["genetique"]) for r in rows if r.get("genetique")]
+
+        genetiques = run_async(
             _discover_genetiques(
                 site_codes,
                 min_duree_gavage,
@@ -512,25 +497,25 @@ def train_pysr_multi_async(
 
         if not genetiques:
             diagnostics = {
-                "step_base_no_filters": asyncio.run(
+                "step_base_no_filters": run_async(
                     _discover_genetiques(None, None, None, None, None, False)
                 ),
-                "step_site": asyncio.run(
+                "step_site": run_async(
                     _discover_genetiques(site_codes, None, None, None, None, False)
                 ),
-                "step_site_duration": asyncio.run(
+                "step_site_duration": run_async(
                     _discover_genetiques(site_codes, min_duree_gavage, max_duree_gavage, None, None, False)
                 ),
-                "step_site_duration_season": asyncio.run(
+                "step_site_duration_season": run_async(
                     _discover_genetiques(site_codes, min_duree_gavage, max_duree_gavage, seasons, None, False)
                 ),
-                "step_site_duration_season_cluster": asyncio.run(
+                "step_site_duration_season_cluster": run_async(
                     _discover_genetiques(site_codes, min_duree_gavage, max_duree_gavage, seasons, cluster_ids, False)
                 ),
             }
 
             if require_sqal_premium:
-                diagnostics["step_full_with_premium"] = asyncio.run(
+                diagnostics["step_full_with_premium"] = run_async(
                     _discover_genetiques(
                         site_codes,
                         min_duree_gavage,
@@ -568,7 +553,7 @@ def train_pysr_multi_async(
                  resolved_foie_max,
                  resolved_foie_target,
                  resolved_w_range,
-                 resolved_w_target,) = asyncio.run(
+                 resolved_w_target,) = run_async(
                     _resolve_foie_objective_for_gen(
                         resolved_genetique=str(g).strip().lower(),
                         resolved_site_code=resolved_site_code,
@@ -682,80 +667,207 @@ def optimize_feeding_curve_async(self, lot_id: int) -> Dict[str, Any]:
         raise self.retry(exc=exc, countdown=180)
 
 
-@celery_app.task(bind=True, max_retries=2, time_limit=300)
-def train_prophet_async(self, site_code: str, horizon_days: int = 30) -> Dict[str, Any]:
+@celery_app.task(bind=True, max_retries=1, time_limit=1800)
+def optimize_multiobjective_async(
+    self,
+    genetique: str = "Mulard",
+    population_size: int = 100,
+    n_generations: int = 50,
+    eval_workers: int | None = None,
+) -> Dict[str, Any]:
     """
-    Entraînement Prophet pour prévisions production
+    Optimisation multi-objectifs NSGA-II (poids foie, survie, coût, durée, satisfaction)
 
-    Génère prévisions à 7/30/90 jours pour un site Euralis.
+    Chaque génération est évaluée en un appel vectorisé (cache mémo des
+    génomes) ; eval_workers > 0 répartit les objectifs coûteux sur un
+    pool de processus.
 
     Args:
-        site_code: Code site ('LL', 'LS', 'MT')
-        horizon_days: Horizon prévision (7, 30, 90)
+        genetique: Type génétique
+        population_size: Taille de la population
+        n_generations: Nombre de générations
+        eval_workers: Processus d'évaluation (défaut MOO_EVAL_WORKERS)
 
     Returns:
-        dict: Prévisions avec intervalles de confiance
+        dict: {
+            "status": "success",
+            "pareto_front_size": int,
+            "best_solution": dict,
+            "statistics": {"generations_per_s", "evaluations", "cache_hits", ...}
+        }
     """
     try:
-        logger.info(f"📈 Training Prophet model for site {site_code} - Horizon: {horizon_days}d")
+        from app.ml.multiobjective_optimization import MOO_EVAL_WORKERS, MultiObjectiveOptimizer
 
-        from app.ml.euralis.production_forecasting import train_prophet_model
+        workers = MOO_EVAL_WORKERS if eval_workers is None else eval_workers
 
-        result = train_prophet_model(site_code, horizon_days)
+        logger.info(f"🧬 Starting NSGA-II optimization ({genetique}, {population_size}x{n_generations})")
 
-        logger.info(f"✅ Prophet training completed for site {site_code}")
+        async def _optimize():
+            pool = await get_pool()
+            optimizer = MultiObjectiveOptimizer(pool, eval_workers=workers)
+            return await optimizer.optimize(
+                genetique=genetique,
+                population_size=population_size,
+                n_generations=n_generations
+            )
+
+        result = run_async(_optimize())
+        if result.get("status") != "success":
+            return result
+
+        statistics = result["statistics"]
+        logger.info(
+            f"✅ NSGA-II completed - {result['pareto_front_size']} Pareto solutions, "
+            f"{statistics['generations_per_s']} gen/s"
+        )
 
         return {
             "status": "success",
-            "site_code": site_code,
-            "horizon_days": horizon_days,
-            "forecast": result.get("forecast", []),
-            "confidence_lower": result.get("confidence_lower", []),
-            "confidence_upper": result.get("confidence_upper", []),
-            "trend": result.get("trend", "stable")
+            "genetique": genetique,
+            "population_size": population_size,
+            "n_generations": n_generations,
+            "pareto_front_size": result["pareto_front_size"],
+            "best_solution": result["best_solution"],
+            "statistics": statistics,
+            "generations_per_s": statistics["generations_per_s"]
         }
 
     except Exception as exc:
-        logger.error(f"❌ Prophet training failed for site {site_code}: {exc}", exc_info=True)
+        logger.error(f"❌ NSGA-II optimization failed: {exc}", exc_info=True)
         raise self.retry(exc=exc, countdown=120)
 
 
-@celery_app.task(time_limit=300)
-def cluster_gaveurs_async() -> Dict[str, Any]:
+@celery_app.task(bind=True, max_retries=2, time_limit=1800)
+def forecast_production_async(
+    self,
+    horizon_days: int | None = None,
+    site_codes: list[str] | None = None,
+) -> Dict[str, Any]:
     """
-    Clustering K-Means des gaveurs (5 segments)
+    Prévisions de production Prophet/ETS pour tous les sites Euralis
 
-    Segmente gaveurs en clusters de performance:
-    - Cluster A: Excellence
-    - Cluster B: Haute performance
-    - Cluster C: Performance moyenne
-    - Cluster D: En difficulté
-    - Cluster E: Critique
+    Chaque site est entraîné dans un process séparé (FORECAST_MAX_WORKERS),
+    puis les prévisions + intervalles de confiance sont écrites sous une
+    nouvelle version de previsions_production, activée atomiquement.
+
+    Args:
+        horizon_days: Horizon prévision (défaut FORECAST_HORIZON_DAYS=90)
+        site_codes: Sites à entraîner (défaut: tous)
 
     Returns:
-        dict: Clusters avec statistiques par cluster
+        dict: {"status", "modele_version", "sites": {site: méthode}}
     """
     try:
-        logger.info("📊 Starting K-Means clustering of gaveurs")
+        from app.ml.euralis.production_forecasting import fit_sites
+        from app.services import production_forecast_store as store
+
+        horizon_days = horizon_days or int(os.getenv("FORECAST_HORIZON_DAYS", "90"))
+        history_days = int(os.getenv("FORECAST_HISTORY_DAYS", "730"))
+        max_workers = int(os.getenv("FORECAST_MAX_WORKERS", "3"))
+        logger.info(f"📈 Starting production forecasts (horizon={horizon_days}d, sites={site_codes or 'ALL'})")
+
+        async def _load():
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                return await store.load_daily_history(conn, site_codes, history_days)
+
+        async def _persist(results):
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                return await store.save_forecast_run(conn, results, horizon_days)
 
-        from app.ml.euralis.gaveur_clustering import cluster_gaveurs
+        history = run_async(_load())
+        results = fit_sites(history, horizon_days, max_workers=max_workers)
+        if not results:
+            return {"status": "error", "error": "Historique insuffisant pour tous les sites"}
 
-        result = cluster_gaveurs()
+        modele_version = run_async(_persist(results))
+        methods = {site: r["method"] for site, r in results.items()}
 
-        logger.info(f"✅ Clustering completed - {result.get('nb_clusters', 0)} clusters")
+        logger.info(f"✅ Production forecasts {modele_version} completed: {methods}")
 
         return {
             "status": "success",
-            "nb_clusters": result.get("nb_clusters", 5),
-            "clusters": result.get("clusters", {}),
-            "silhouette_score": result.get("silhouette_score", 0.0)
+            "modele_version": modele_version,
+            "horizon_days": horizon_days,
+            "sites": methods,
         }
 
     except Exception as exc:
-        logger.error(f"❌ Clustering failed: {exc}", exc_info=True)
+        logger.error(f"❌ Production forecasts failed: {exc}", exc_info=True)
+        raise self.retry(exc=exc, countdown=120)
+
+
+@celery_app.task(bind=True, max_retries=2, time_limit=1800)
+def train_prophet_async(self, site_code: str, horizon_days: int = 30) -> Dict[str, Any]:
+    """
+    Entraînement Prophet pour prévisions production d'un site
+
+    Conservé pour compatibilité : délègue à forecast_production_async.
+
+    Args:
+        site_code: Code site ('LL', 'LS', 'MT')
+        horizon_days: Horizon prévision (7, 30, 90)
+
+    Returns:
+        dict: Résultat de forecast_production_async
+    """
+    return forecast_production_async(horizon_days=horizon_days, site_codes=[site_code])
+
+
+@celery_app.task(time_limit=300)
+def refresh_gaveur_clusters_async(site_codes: list[str] | None = None, force: bool = False) -> Dict[str, Any]:
+    """
+    Maintenance incrémentale du clustering K-Means des gaveurs (par site)
+
+    Les gaveurs dont les lots ont changé sont affectés au centre le plus
+    proche du modèle persisté ; ré-entraînement seulement si force, modèle
+    plus vieux que CLUSTER_REFIT_DAYS ou dérive > CLUSTER_DRIFT_THRESHOLD.
+
+    Returns:
+        dict: Action effectuée par site (refit / reassign / skipped)
+    """
+    try:
+        from app.services import gaveur_cluster_store as cluster_store
+
+        async def _refresh():
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                sites = site_codes or await cluster_store.list_sites(conn)
+                return [await cluster_store.refresh_site(conn, site, force=force) for site in sites]
+
+        results = run_async(_refresh())
+        logger.info(f"✅ Gaveur clustering refreshed: {[(r['site_code'], r['action']) for r in results]}")
+
+        return {"status": "success", "sites": results}
+
+    except Exception as exc:
+        logger.error(f"❌ Gaveur clustering refresh failed: {exc}", exc_info=True)
         return {"status": "error", "error": str(exc)}
 
 
+@celery_app.task(time_limit=300)
+def cluster_gaveurs_async() -> Dict[str, Any]:
+    """
+    Clustering K-Means des gaveurs (5 segments)
+
+    Segmente gaveurs en clusters de performance:
+    - Cluster A: Excellent
+    - Cluster B: Très bon
+    - Cluster C: Bon
+    - Cluster D: À améliorer
+    - Cluster E: Critique
+
+    Ré-entraînement complet de tous les sites (refresh_gaveur_clusters_async force=True).
+
+    Returns:
+        dict: Modèle entraîné par site
+    """
+    logger.info("📊 Starting K-Means clustering of gaveurs")
+    return refresh_gaveur_clusters_async(force=True)
+
+
 @celery_app.task(time_limit=300)
 def cluster_lots_pred_async(
     n_clusters: int = 3,
@@ -778,12 +890,8 @@ def cluster_lots_pred_async(
         )
 
         from datetime import datetime
-        import asyncio
-
         from app.ml.euralis.lot_clustering import cluster_lots_pred
 
-        database_url = os.getenv("DATABASE_URL", DATABASE_URL)
-
         async def _ensure_tables(conn: asyncpg.Connection):
             await conn.execute(
                 """
@@ -821,88 +929,90 @@ def cluster_lots_pred_async(
             )
 
         async def _persist(result: Dict[str, Any]) -> int:
-            pool = await asyncpg.create_pool(database_url)
-            try:
-                async with pool.acquire() as conn:
-                    await _ensure_tables(conn)
-
-                    params = {
-                        "n_clusters": n_clusters,
-                        "random_state": random_state,
-                        "n_init": n_init,
-                        "min_lots": min_lots,
-                        "site_codes": site_codes,
-                        "genetique": genetique,
-                        "seasons": seasons,
-                        "min_duree_gavage": min_duree_gavage,
-                        "max_duree_gavage": max_duree_gavage,
-                    }
-                    run_id = await conn.fetchval(
-                        """
-                        INSERT INTO lot_clustering_runs (
-                            clustering_type,
-                            modele_version,
-                            params,
-                            features,
-                            n_clusters,
-                            n_lots,
-                            avg_confidence,
-                            created_at
-                        ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8)
-                        RETURNING id
-                        """,
-                        "lot_pred",
-                        str(result.get("modele_version") or modele_version),
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                await _ensure_tables(conn)
+
+                params = {
+                    "n_clusters": n_clusters,
+                    "random_state": random_state,
+                    "n_init": n_init,
+                    "min_lots": min_lots,
+                    "site_codes": site_codes,
+                    "genetique": genetique,
+                    "seasons": seasons,
+                    "min_duree_gavage": min_duree_gavage,
+                    "max_duree_gavage": max_duree_gavage,
+                }
+                run_id = await conn.fetchval(
+                    """
+                    INSERT INTO lot_clustering_runs (
+                        clustering_type,
+                        modele_version,
                         params,
-                        result.get("features") or [],
-                        int(result.get("n_clusters") or 0),
-                        int(result.get("n_lots") or 0),
-                        float(result.get("avg_confidence") or 0.0),
+                        features,
+                        n_clusters,
+                        n_lots,
+                        avg_confidence,
+                        created_at
+                    ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8)
+                    RETURNING id
+                    """,
+                    "lot_pred",
+                    str(result.get("modele_version") or modele_version),
+                    params,
+                    result.get("features") or [],
+                    int(result.get("n_clusters") or 0),
+                    int(result.get("n_lots") or 0),
+                    float(result.get("avg_confidence") or 0.0),
+                    datetime.utcnow(),
+                )
+
+                upsert = """
+                    INSERT INTO lot_clustering_assignments (
+                        run_id, lot_id, cluster_id, confidence, created_at
+                    ) VALUES ($1,$2,$3,$4,$5)
+                    ON CONFLICT (run_id, lot_id) DO UPDATE SET
+                        cluster_id = EXCLUDED.cluster_id,
+                        confidence = EXCLUDED.confidence,
+                        created_at = EXCLUDED.created_at
+                """
+
+                for a in result.get("assignments", []):
+                    await conn.execute(
+                        upsert,
+                        int(run_id),
+                        int(a["lot_id"]),
+                        int(a["cluster_id"]),
+                        float(a.get("confidence") or 0.0),
                         datetime.utcnow(),
                     )
 
-                    upsert = """
-                        INSERT INTO lot_clustering_assignments (
-                            run_id, lot_id, cluster_id, confidence, created_at
-                        ) VALUES ($1,$2,$3,$4,$5)
-                        ON CONFLICT (run_id, lot_id) DO UPDATE SET
-                            cluster_id = EXCLUDED.cluster_id,
-                            confidence = EXCLUDED.confidence,
-                            created_at = EXCLUDED.created_at
-                    """
+                return int(run_id)
+
+        async def _cluster() -> Dict[str, Any]:
+            pool = await get_pool()
+            return await cluster_lots_pred(
+                pool,
+                n_clusters=n_clusters,
+                random_state=random_state,
+                n_init=n_init,
+                min_lots=min_lots,
+                site_codes=site_codes,
+                genetique=genetique,
+                seasons=seasons,
+                min_duree_gavage=min_duree_gavage,
+                max_duree_gavage=max_duree_gavage,
+                features=features,
+                modele_version=modele_version,
+            )
 
-                    for a in result.get("assignments", []):
-                        await conn.execute(
-                            upsert,
-                            int(run_id),
-                            int(a["lot_id"]),
-                            int(a["cluster_id"]),
-                            float(a.get("confidence") or 0.0),
-                            datetime.utcnow(),
-                        )
-
-                    return int(run_id)
-            finally:
-                await pool.close()
-
-        result = cluster_lots_pred(
-            n_clusters=n_clusters,
-            random_state=random_state,
-            n_init=n_init,
-            min_lots=min_lots,
-            site_codes=site_codes,
-            genetique=genetique,
-            seasons=seasons,
-            min_duree_gavage=min_duree_gavage,
-            max_duree_gavage=max_duree_gavage,
-            features=features,
-            modele_version=modele_version,
-        )
+        result = run_async(_cluster())
 
         if result.get("status") != "success":
             return result
 
-        run_id = asyncio.run(_persist(result))
+        run_id = run_async(_persist(result))
         result["run_id"] = run_id
 
         logger.info(
@@ -935,12 +1045,8 @@ def cluster_lots_refined_j4_async(
         )
 
         from datetime import datetime
-        import asyncio
-
         from app.ml.euralis.lot_clustering import cluster_lots_refined_j4
 
-        database_url = os.getenv("DATABASE_URL", DATABASE_URL)
-
         async def _ensure_tables(conn: asyncpg.Connection):
             await conn.execute(
                 """
@@ -978,83 +1084,85 @@ def cluster_lots_refined_j4_async(
             )
 
         async def _persist(result: Dict[str, Any]) -> int:
-            pool = await asyncpg.create_pool(database_url)
-            try:
-                async with pool.acquire() as conn:
-                    await _ensure_tables(conn)
-
-                    params = {
-                        "n_clusters": n_clusters,
-                        "random_state": random_state,
-                        "n_init": n_init,
-                        "min_lots": min_lots,
-                        "min_days": min_days,
-                        "site_codes": site_codes,
-                        "genetique": genetique,
-                    }
-                    run_id = await conn.fetchval(
-                        """
-                        INSERT INTO lot_clustering_runs (
-                            clustering_type,
-                            modele_version,
-                            params,
-                            features,
-                            n_clusters,
-                            n_lots,
-                            avg_confidence,
-                            created_at
-                        ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8)
-                        RETURNING id
-                        """,
-                        "lot_refined_j4",
-                        str(result.get("modele_version") or modele_version),
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                await _ensure_tables(conn)
+
+                params = {
+                    "n_clusters": n_clusters,
+                    "random_state": random_state,
+                    "n_init": n_init,
+                    "min_lots": min_lots,
+                    "min_days": min_days,
+                    "site_codes": site_codes,
+                    "genetique": genetique,
+                }
+                run_id = await conn.fetchval(
+                    """
+                    INSERT INTO lot_clustering_runs (
+                        clustering_type,
+                        modele_version,
                         params,
-                        result.get("features") or [],
-                        int(result.get("n_clusters") or 0),
-                        int(result.get("n_lots") or 0),
-                        float(result.get("avg_confidence") or 0.0),
+                        features,
+                        n_clusters,
+                        n_lots,
+                        avg_confidence,
+                        created_at
+                    ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8)
+                    RETURNING id
+                    """,
+                    "lot_refined_j4",
+                    str(result.get("modele_version") or modele_version),
+                    params,
+                    result.get("features") or [],
+                    int(result.get("n_clusters") or 0),
+                    int(result.get("n_lots") or 0),
+                    float(result.get("avg_confidence") or 0.0),
+                    datetime.utcnow(),
+                )
+
+                upsert = """
+                    INSERT INTO lot_clustering_assignments (
+                        run_id, lot_id, cluster_id, confidence, created_at
+                    ) VALUES ($1,$2,$3,$4,$5)
+                    ON CONFLICT (run_id, lot_id) DO UPDATE SET
+                        cluster_id = EXCLUDED.cluster_id,
+                        confidence = EXCLUDED.confidence,
+                        created_at = EXCLUDED.created_at
+                """
+
+                for a in result.get("assignments", []):
+                    await conn.execute(
+                        upsert,
+                        int(run_id),
+                        int(a["lot_id"]),
+                        int(a["cluster_id"]),
+                        float(a.get("confidence") or 0.0),
                         datetime.utcnow(),
                     )
 
-                    upsert = """
-                        INSERT INTO lot_clustering_assignments (
-                            run_id, lot_id, cluster_id, confidence, created_at
-                        ) VALUES ($1,$2,$3,$4,$5)
-                        ON CONFLICT (run_id, lot_id) DO UPDATE SET
-                            cluster_id = EXCLUDED.cluster_id,
-                            confidence = EXCLUDED.confidence,
-                            created_at = EXCLUDED.created_at
-                    """
+                return int(run_id)
+
+        async def _cluster() -> Dict[str, Any]:
+            pool = await get_pool()
+            return await cluster_lots_refined_j4(
+                pool,
+                n_clusters=n_clusters,
+                random_state=random_state,
+                n_init=n_init,
+                min_lots=min_lots,
+                min_days=min_days,
+                site_codes=site_codes,
+                genetique=genetique,
+                modele_version=modele_version,
+            )
 
-                    for a in result.get("assignments", []):
-                        await conn.execute(
-                            upsert,
-                            int(run_id),
-                            int(a["lot_id"]),
-                            int(a["cluster_id"]),
-                            float(a.get("confidence") or 0.0),
-                            datetime.utcnow(),
-                        )
-
-                    return int(run_id)
-            finally:
-                await pool.close()
-
-        result = cluster_lots_refined_j4(
-            n_clusters=n_clusters,
-            random_state=random_state,
-            n_init=n_init,
-            min_lots=min_lots,
-            min_days=min_days,
-            site_codes=site_codes,
-            genetique=genetique,
-            modele_version=modele_version,
-        )
+        result = run_async(_cluster())
 
         if result.get("status") != "success":
             return result
 
-        run_id = asyncio.run(_persist(result))
+        run_id = run_async(_persist(result))
         result["run_id"] = run_id
 
         logger.info(
@@ -1146,6 +1254,43 @@ def detect_anomalies_periodic() -> Dict[str, Any]:
         return {"status": "error", "error": str(exc)}
 
 
+@celery_app.task(time_limit=900)
+def sweep_alertes_canards_async(lot_id: int | None = None, gaveur_id: int | None = None) -> Dict[str, Any]:
+    """
+    Balayage des alertes de tous les canards en gavage
+
+    Règles de seuils évaluées en une requête ensembliste, anomalies ML
+    scorées par modèle pré-entraîné par génétique, alertes insérées en lot
+    et SMS critiques regroupés par gaveur. Appelée chaque nuit par Celery Beat.
+
+    Args:
+        lot_id: Limiter à un lot (optionnel)
+        gaveur_id: Limiter à un gaveur (optionnel)
+
+    Returns:
+        dict: Statistiques du balayage (alertes par niveau, SMS, durée)
+    """
+    try:
+        from app.ml.anomaly_detection import get_anomaly_detection
+
+        logger.info("🚨 Alert sweep starting")
+
+        async def _sweep():
+            pool = await get_pool()
+            return await get_anomaly_detection(pool).sweep_alertes(lot_id=lot_id, gaveur_id=gaveur_id)
+
+        stats = run_async(_sweep())
+        logger.info(
+            f"✅ Alert sweep completed - {stats['alertes']} alertes "
+            f"({stats['canards_en_alerte']} canards) in {stats['duree_s']}s"
+        )
+        return {"status": "success", **stats}
+
+    except Exception as exc:
+        logger.error(f"❌ Alert sweep failed: {exc}", exc_info=True)
+        return {"status": "error", "error": str(exc)}
+
+
 @celery_app.task(time_limit=600)
 def optimize_abattage_planning_async(date_debut: str, date_fin: str) -> Dict[str, Any]:
     """
@@ -1190,7 +1335,7 @@ def retrain_all_ml_models_async() -> Dict[str, Any]:
     Workflow complet:
     1. K-Means clustering
     2. Isolation Forest anomalies
-    3. Prophet prévisions (3 sites × 3 horizons)
+    3. Prophet prévisions (3 sites, horizon 90 jours)
 
     Utilisé pour refresh mensuel des modèles.
 
@@ -1210,11 +1355,8 @@ def retrain_all_ml_models_async() -> Dict[str, Any]:
         results['anomalies_LS'] = detect_anomalies_async('LS')
         results['anomalies_MT'] = detect_anomalies_async('MT')
 
-        # 3. Prophet forecasting
-        for site in ['LL', 'LS', 'MT']:
-            for horizon in [7, 30, 90]:
-                key = f'prophet_{site}_{horizon}d'
-                results[key] = train_prophet_async(site, horizon)
+        # 3. Prophet forecasting (tous sites, horizon max : 7/30 jours lus dans la même version)
+        results['forecasts'] = forecast_production_async()
 
         logger.info("✅ Full ML models retraining completed")
 
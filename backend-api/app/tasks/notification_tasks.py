@@ -9,6 +9,7 @@ Envoi de notifications SMS, Email, Alertes qui doivent être déléguées:
 """
 
 from app.tasks.celery_app import celery_app
+from app.tasks.worker_runtime import run_async
 import logging
 from typing import Dict, Any, List
 import os
@@ -196,10 +197,9 @@ def send_anomaly_alert(site_code: str, anomalies: List[Dict[str, Any]]) -> Dict[
         logger.info(f"🚨 Sending anomaly alerts for site {site_code} - {len(anomalies)} anomalies")
 
         # Récupérer contacts site
-        import asyncio
         from app.services.site_contacts import get_site_contacts
 
-        contacts = asyncio.run(get_site_contacts(site_code))
+        contacts = run_async(get_site_contacts(site_code))
 
         if not contacts:
             logger.warning(f"No contacts found for site {site_code}")
@@ -277,11 +277,10 @@ def send_lot_completion_notification(lot_id: int) -> Dict[str, Any]:
     try:
         logger.info(f"🎉 Sending lot completion notification for lot {lot_id}")
 
-        import asyncio
         from app.services.lot_info import get_lot_completion_info
 
         # Récupérer infos lot
-        lot_info = asyncio.run(get_lot_completion_info(lot_id))
+        lot_info = run_async(get_lot_completion_info(lot_id))
 
         if not lot_info:
             return {"status": "error", "message": "Lot not found"}
@@ -342,11 +341,10 @@ def send_daily_summary_reports() -> Dict[str, Any]:
     try:
         logger.info("📅 Sending daily summary reports")
 
-        import asyncio
         from app.services.daily_summary import generate_daily_summaries
 
         # Générer résumés pour chaque site
-        summaries = asyncio.run(generate_daily_summaries())
+        summaries = run_async(generate_daily_summaries())
 
         emails_sent = 0
 
@@ -417,11 +415,10 @@ def send_consumer_feedback_acknowledgment(feedback_id: int) -> Dict[str, Any]:
     try:
         logger.info(f"💌 Sending consumer feedback acknowledgment for feedback {feedback_id}")
 
-        import asyncio
         from app.services.feedback_info import get_feedback_info
 
         # Récupérer infos feedback
-        feedback = asyncio.run(get_feedback_info(feedback_id))
+        feedback = run_async(get_feedback_info(feedback_id))
 
         if not feedback or not feedback.get('consumer_email'):
             return {"status": "warning", "message": "No email provided"}
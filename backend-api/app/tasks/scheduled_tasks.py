@@ -10,10 +10,10 @@ Maintenance automatique, refresh vues matérialisées, cleanup, KPIs:
 """
 
 from app.tasks.celery_app import celery_app
+from app.tasks.worker_runtime import get_pool, run_async
 import logging
 from typing import Dict, Any
 import os
-import asyncpg
 from datetime import datetime, timedelta
 import subprocess
 
@@ -38,36 +38,33 @@ def refresh_continuous_aggregates() -> Dict[str, Any]:
     try:
         logger.info("🔄 Refreshing continuous aggregates")
 
-        import asyncio
-
         async def refresh_all():
-            conn = await asyncpg.connect(DATABASE_URL)
-
-            aggregates = [
-                'gavage_stats_hourly',
-                'gavage_stats_daily',
-                'doses_journalieres_stats',
-                'sqal_quality_hourly',
-                'sqal_quality_daily',
-                'consumer_ratings_daily',
-                'alertes_summary_hourly',
-                'performances_sites'
-            ]
-
-            refreshed = []
-
-            for agg_name in aggregates:
-                try:
-                    await conn.execute(f"CALL refresh_continuous_aggregate('{agg_name}', NULL, NULL)")
-                    refreshed.append(agg_name)
-                    logger.info(f"  ✅ Refreshed: {agg_name}")
-                except Exception as e:
-                    logger.warning(f"  ⚠️ Could not refresh {agg_name}: {e}")
-
-            await conn.close()
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                aggregates = [
+                    'gavage_stats_hourly',
+                    'gavage_stats_daily',
+                    'doses_journalieres_stats',
+                    'sqal_quality_hourly',
+                    'sqal_quality_daily',
+                    'consumer_ratings_daily',
+                    'alertes_summary_hourly',
+                    'performances_sites'
+                ]
+
+                refreshed = []
+
+                for agg_name in aggregates:
+                    try:
+                        await conn.execute(f"CALL refresh_continuous_aggregate('{agg_name}', NULL, NULL)")
+                        refreshed.append(agg_name)
+                        logger.info(f"  ✅ Refreshed: {agg_name}")
+                    except Exception as e:
+                        logger.warning(f"  ⚠️ Could not refresh {agg_name}: {e}")
+
             return refreshed
 
-        refreshed_aggregates = asyncio.run(refresh_all())
+        refreshed_aggregates = run_async(refresh_all())
 
         logger.info(f"✅ Continuous aggregates refresh completed - {len(refreshed_aggregates)}/{8} refreshed")
 
@@ -221,91 +218,88 @@ def calculate_weekly_kpis() -> Dict[str, Any]:
     try:
         logger.info("📊 Calculating weekly KPIs")
 
-        import asyncio
-
         async def calculate_kpis():
-            conn = await asyncpg.connect(DATABASE_URL)
-
-            # Dates (lundi dernier → dimanche)
-            today = datetime.utcnow()
-            date_fin = (today - timedelta(days=today.weekday())).strftime('%Y-%m-%d')
-            date_debut = (datetime.strptime(date_fin, '%Y-%m-%d') - timedelta(days=7)).strftime('%Y-%m-%d')
-
-            sites = ['LL', 'LS', 'MT']
-            kpis = {}
-
-            for site in sites:
-                # KPIs gavage
-                gavage_kpis = await conn.fetchrow("""
-                    SELECT
-                        COUNT(DISTINCT gdl.lot_gavage_id) as nb_lots_actifs,
-                        AVG(gdl.dose_moyenne) as dose_moyenne,
-                        AVG(gdl.poids_moyen_lot) as poids_moyen,
-                        AVG(gdl.taux_mortalite) as taux_mortalite,
-                        COUNT(*) as nb_repas
-                    FROM gavage_data_lots gdl
-                    JOIN lots_gavage lg ON gdl.lot_gavage_id = lg.id
-                    WHERE lg.site_code = $1
-                      AND gdl.time >= $2::timestamp
-                      AND gdl.time < $3::timestamp
-                """, site, date_debut, date_fin)
-
-                # KPIs SQAL
-                sqal_kpis = await conn.fetchrow("""
-                    SELECT
-                        COUNT(*) as nb_samples,
-                        COUNT(DISTINCT lot_id) as nb_lots_inspected,
-                        SUM(CASE WHEN fusion_final_grade IN ('A+', 'A') THEN 1 ELSE 0 END)::float / COUNT(*) * 100 as taux_qualite_a
-                    FROM sensor_samples
-                    WHERE timestamp >= $1::timestamp
-                      AND timestamp < $2::timestamp
-                """, date_debut, date_fin)
-
-                # Alertes
-                alertes_count = await conn.fetchval("""
-                    SELECT COUNT(*)
-                    FROM alertes_euralis
-                    WHERE time >= $1::timestamp
-                      AND time < $2::timestamp
-                """, date_debut, date_fin)
-
-                kpis[site] = {
-                    "gavage": dict(gavage_kpis) if gavage_kpis else {},
-                    "sqal": dict(sqal_kpis) if sqal_kpis else {},
-                    "alertes": alertes_count or 0
-                }
-
-                # Insérer dans table statistiques_globales
-                await conn.execute("""
-                    INSERT INTO statistiques_globales (
-                        site_code,
-                        periode_debut,
-                        periode_fin,
-                        nb_lots,
-                        dose_moyenne,
-                        poids_moyen,
-                        taux_mortalite,
-                        nb_sqal_samples,
-                        taux_qualite_a,
-                        nb_alertes
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                """,
-                    site,
-                    date_debut,
-                    date_fin,
-                    kpis[site]['gavage'].get('nb_lots_actifs', 0),
-                    kpis[site]['gavage'].get('dose_moyenne', 0),
-                    kpis[site]['gavage'].get('poids_moyen', 0),
-                    kpis[site]['gavage'].get('taux_mortalite', 0),
-                    kpis[site]['sqal'].get('nb_samples', 0),
-                    kpis[site]['sqal'].get('taux_qualite_a', 0),
-                    kpis[site]['alertes']
-                )
-
-            await conn.close()
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                # Dates (lundi dernier → dimanche)
+                today = datetime.utcnow()
+                date_fin = (today - timedelta(days=today.weekday())).strftime('%Y-%m-%d')
+                date_debut = (datetime.strptime(date_fin, '%Y-%m-%d') - timedelta(days=7)).strftime('%Y-%m-%d')
+
+                sites = ['LL', 'LS', 'MT']
+                kpis = {}
+
+                for site in sites:
+                    # KPIs gavage
+                    gavage_kpis = await conn.fetchrow("""
+                        SELECT
+                            COUNT(DISTINCT gdl.lot_gavage_id) as nb_lots_actifs,
+                            AVG(gdl.dose_moyenne) as dose_moyenne,
+                            AVG(gdl.poids_moyen_lot) as poids_moyen,
+                            AVG(gdl.taux_mortalite) as taux_mortalite,
+                            COUNT(*) as nb_repas
+                        FROM gavage_data_lots gdl
+                        JOIN lots_gavage lg ON gdl.lot_gavage_id = lg.id
+                        WHERE lg.site_code = $1
+                          AND gdl.time >= $2::timestamp
+                          AND gdl.time < $3::timestamp
+                    """, site, date_debut, date_fin)
+
+                    # KPIs SQAL
+                    sqal_kpis = await conn.fetchrow("""
+                        SELECT
+                            COUNT(*) as nb_samples,
+                            COUNT(DISTINCT lot_id) as nb_lots_inspected,
+                            SUM(CASE WHEN fusion_final_grade IN ('A+', 'A') THEN 1 ELSE 0 END)::float / COUNT(*) * 100 as taux_qualite_a
+                        FROM sensor_samples
+                        WHERE timestamp >= $1::timestamp
+                          AND timestamp < $2::timestamp
+                    """, date_debut, date_fin)
+
+                    # Alertes
+                    alertes_count = await conn.fetchval("""
+                        SELECT COUNT(*)
+                        FROM alertes_euralis
+                        WHERE time >= $1::timestamp
+                          AND time < $2::timestamp
+                    """, date_debut, date_fin)
+
+                    kpis[site] = {
+                        "gavage": dict(gavage_kpis) if gavage_kpis else {},
+                        "sqal": dict(sqal_kpis) if sqal_kpis else {},
+                        "alertes": alertes_count or 0
+                    }
+
+                    # Insérer dans table statistiques_globales
+                    await conn.execute("""
+                        INSERT INTO statistiques_globales (
+                            site_code,
+                            periode_debut,
+                            periode_fin,
+                            nb_lots,
+                            dose_moyenne,
+                            poids_moyen,
+                            taux_mortalite,
+                            nb_sqal_samples,
+                            taux_qualite_a,
+                            nb_alertes
+                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+                    """,
+                        site,
+                        date_debut,
+                        date_fin,
+                        kpis[site]['gavage'].get('nb_lots_actifs', 0),
+                        kpis[site]['gavage'].get('dose_moyenne', 0),
+                        kpis[site]['gavage'].get('poids_moyen', 0),
+                        kpis[site]['gavage'].get('taux_mortalite', 0),
+                        kpis[site]['sqal'].get('nb_samples', 0),
+                        kpis[site]['sqal'].get('taux_qualite_a', 0),
+                        kpis[site]['alertes']
+                    )
+
             return kpis
 
-        weekly_kpis = asyncio.run(calculate_kpis())
+        weekly_kpis = run_async(calculate_kpis())
 
         logger.info(f"✅ Weekly KPIs calculated for {len(weekly_kpis)} sites")
 
@@ -370,35 +364,32 @@ def cleanup_old_sensor_data() -> Dict[str, Any]:
     try:
         logger.info("🗑️ Cleaning up old sensor data (>1 year)")
 
-        import asyncio
-
         async def cleanup():
-            conn = await asyncpg.connect(DATABASE_URL)
-
-            # Vérifier si retention policy existe
-            policy_exists = await conn.fetchval("""
-                SELECT COUNT(*) FROM timescaledb_information.jobs
-                WHERE proc_name = 'policy_retention'
-                  AND hypertable_name = 'sensor_samples'
-            """)
-
-            if not policy_exists:
-                # Créer retention policy (supprimer > 365 jours)
-                await conn.execute("""
-                    SELECT add_retention_policy('sensor_samples', INTERVAL '365 days')
+            pool = await get_pool()
+            async with pool.acquire() as conn:
+                # Vérifier si retention policy existe
+                policy_exists = await conn.fetchval("""
+                    SELECT COUNT(*) FROM timescaledb_information.jobs
+                    WHERE proc_name = 'policy_retention'
+                      AND hypertable_name = 'sensor_samples'
                 """)
-                logger.info("  ✅ Retention policy created for sensor_samples")
 
-            # Compter données supprimées (approximation)
-            deleted_count = await conn.fetchval("""
-                SELECT COUNT(*) FROM sensor_samples
-                WHERE timestamp < NOW() - INTERVAL '365 days'
-            """)
+                if not policy_exists:
+                    # Créer retention policy (supprimer > 365 jours)
+                    await conn.execute("""
+                        SELECT add_retention_policy('sensor_samples', INTERVAL '365 days')
+                    """)
+                    logger.info("  ✅ Retention policy created for sensor_samples")
+
+                # Compter données supprimées (approximation)
+                deleted_count = await conn.fetchval("""
+                    SELECT COUNT(*) FROM sensor_samples
+                    WHERE timestamp < NOW() - INTERVAL '365 days'
+                """)
 
-            await conn.close()
             return deleted_count or 0
 
-        deleted = asyncio.run(cleanup())
+        deleted = run_async(cleanup())
 
         logger.info(f"✅ Old sensor data cleanup completed - {deleted} rows affected")
 
@@ -427,7 +418,6 @@ def health_check_periodic() -> Dict[str, Any]:
     try:
         logger.info("🏥 Running periodic health check")
 
-        import asyncio
         import aiohttp
 
         async def check_health():
@@ -435,9 +425,8 @@ def health_check_periodic() -> Dict[str, Any]:
 
             # Check Database
             try:
-                conn = await asyncpg.connect(DATABASE_URL)
-                await conn.fetchval("SELECT 1")
-                await conn.close()
+                pool = await get_pool()
+                await pool.fetchval("SELECT 1")
                 results['database'] = {'status': 'healthy'}
             except Exception as e:
                 results['database'] = {'status': 'unhealthy', 'error': str(e)}
@@ -463,7 +452,7 @@ def health_check_periodic() -> Dict[str, Any]:
 
             return results
 
-        health_results = asyncio.run(check_health())
+        health_results = run_async(check_health())
 
         all_healthy = all(r.get('status') == 'healthy' for r in health_results.values())
 
@@ -487,3 +476,52 @@ def health_check_periodic() -> Dict[str, Any]:
     except Exception as exc:
         logger.error(f"❌ Health check failed: {exc}", exc_info=True)
         return {"status": "error", "error": str(exc)}
+
+
+@celery_app.task(time_limit=6 * 3600, soft_time_limit=6 * 3600 - 60)
+def verify_blockchain_integrity(complet: bool = False) -> Dict[str, Any]:
+    """
+    Vérification de la blockchain persistée
+
+    Appelée toutes les heures (incrémentale, depuis le dernier checkpoint) et
+    chaque dimanche à 4h30 (audit complet, signatures vérifiées dans un pool
+    de BLOCKCHAIN_VERIFY_WORKERS threads : l'enfant prefork est daemon et ne
+    peut pas créer de processus).
+
+    Args:
+        complet: Audit complet depuis le premier bloc
+
+    Returns:
+        dict: Résultat de ChainVerifier.verifier
+    """
+    try:
+        logger.info(f"🔐 Blockchain {'full audit' if complet else 'incremental verification'}")
+
+        from app.blockchain.verification import ChainVerifier
+
+        async def verify():
+            verifier = ChainVerifier(await get_pool())
+            try:
+                return await verifier.verifier(complet=complet)
+            finally:
+                await verifier.shutdown()
+
+        result = run_async(verify())
+
+        if not result["valide"]:
+            from app.tasks.notification_tasks import send_email_notification
+            send_email_notification.delay(
+                to_email='admin@euralis.com',
+                subject='🚨 Blockchain integrity check failed',
+                body_html=f"<p>{result['nb_erreurs']} erreur(s):</p><pre>{result['erreurs'][:20]}</pre>"
+            )
+
+        return {
+            "status": "success" if result["valide"] else "invalid",
+            **result,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    except Exception as exc:
+        logger.error(f"❌ Blockchain verification failed: {exc}", exc_info=True)
+        return {"status": "error", "error": str(exc)}
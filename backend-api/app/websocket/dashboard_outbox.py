@@ -0,0 +1,216 @@
+"""
+File sortante bornée par dashboard (/ws/realtime/)
+
+Chaque dashboard connecté possède une DashboardOutbox vidée par sa propre
+tâche d'écriture. Le producteur (sensors_consumer, gavage_consumer) ne fait
+qu'enfiler la trame déjà encodée : il n'attend jamais un navigateur lent.
+
+Politiques de débordement (REALTIME_OVERFLOW_POLICY):
+- drop_oldest: la trame la plus ancienne est supprimée
+- coalesce:    une trame en attente pour le même device est remplacée par la
+               plus récente ; si la file reste pleine, drop_oldest
+- disconnect:  le dashboard est déconnecté (code 1013, réessayer plus tard)
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from fastapi import WebSocket
+import logging
+
+try:
+    from app.core.metrics import (
+        record_outbox_dropped,
+        record_outbox_depth_change,
+        record_outbox_disconnect,
+        record_outbox_send_latency,
+    )
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_COALESCE = "coalesce"
+POLICY_DISCONNECT = "disconnect"
+OVERFLOW_POLICIES = (POLICY_DROP_OLDEST, POLICY_COALESCE, POLICY_DISCONNECT)
+
+
+def default_outbox_settings() -> Dict[str, object]:
+    """Paramètres depuis l'environnement (politique inconnue → coalesce)"""
+    policy = os.getenv("REALTIME_OVERFLOW_POLICY", POLICY_COALESCE).strip().lower()
+    if policy not in OVERFLOW_POLICIES:
+        logger.warning(f"REALTIME_OVERFLOW_POLICY inconnue: {policy}, utilisation de {POLICY_COALESCE}")
+        policy = POLICY_COALESCE
+    return {
+        "maxsize": int(os.getenv("REALTIME_OUTBOX_MAXSIZE", "100")),
+        "policy": policy,
+    }
+
+
+class DashboardOutbox:
+    """
+    File sortante d'un dashboard + tâche d'écriture dédiée
+
+    Usage:
+        outbox = DashboardOutbox(websocket, on_failure=broadcaster.disconnect)
+        outbox.start()
+        outbox.enqueue(payload, key=device_id)   # non bloquant
+        outbox.close()
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        maxsize: int = 100,
+        policy: str = POLICY_COALESCE,
+        send_timeout: float = 2.0,
+        on_failure: Optional[Callable[[WebSocket], None]] = None,
+    ):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique de débordement inconnue: {policy}")
+
+        self.websocket = websocket
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+
+        # Entrée = [key, payload, enqueued_at] (liste pour remplacement en place)
+        self._queue: Deque[List] = deque()
+        self._pending_by_key: Dict[str, List] = {}
+        self._wakeup = asyncio.Event()
+        self._overflowed = False
+        self._closed = False
+        self._writer: Optional[asyncio.Task] = None
+        # Profondeur déjà comptée dans la jauge globale
+        self._reported_depth = 0
+
+        self.sent = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def start(self):
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run(), name="dashboard-outbox-writer")
+
+    def close(self):
+        """Arrête la tâche d'écriture et libère les trames en attente"""
+        if self._closed:
+            return
+        self._closed = True
+        self._set_depth(0)
+        self._pending_by_key.clear()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    def enqueue(self, payload: str, key: Optional[str] = None) -> bool:
+        """
+        Enfile une trame encodée sans jamais attendre le client
+
+        Args:
+            payload: Trame JSON déjà encodée (partagée entre dashboards)
+            key: Clé de coalescence (device_id) ; None = jamais coalescée
+
+        Returns:
+            True si la trame est en file, False si rejetée (outbox fermée / débordement)
+        """
+        if self._closed or self._overflowed:
+            return False
+
+        now = time.perf_counter()
+
+        if self.policy == POLICY_COALESCE and key is not None:
+            pending = self._pending_by_key.get(key)
+            if pending is not None:
+                # Remplace la trame en attente du même device, garde sa position
+                pending[1] = payload
+                self._count_drop("coalesced")
+                return True
+
+        if len(self._queue) >= self.maxsize:
+            if self.policy == POLICY_DISCONNECT:
+                self._overflowed = True
+                self._count_drop("overflow_disconnect")
+                self._wakeup.set()
+                return False
+            self._drop_oldest()
+
+        entry = [key, payload, now]
+        self._queue.append(entry)
+        if self.policy == POLICY_COALESCE and key is not None:
+            self._pending_by_key[key] = entry
+        self._set_depth(len(self._queue))
+        self._wakeup.set()
+        return True
+
+    def _drop_oldest(self):
+        oldest = self._queue.popleft()
+        if self._pending_by_key.get(oldest[0]) is oldest:
+            del self._pending_by_key[oldest[0]]
+        self._count_drop("oldest")
+
+    def _count_drop(self, reason: str):
+        self.dropped += 1
+        if METRICS_AVAILABLE:
+            record_outbox_dropped(self.policy, reason)
+
+    def _set_depth(self, depth: int):
+        """Met à jour la jauge globale (somme des profondeurs de toutes les outbox)"""
+        previous = self._reported_depth
+        self._reported_depth = depth
+        if METRICS_AVAILABLE and depth != previous:
+            record_outbox_depth_change(depth - previous)
+
+    async def _run(self):
+        try:
+            while not self._closed:
+                if not self._queue and not self._overflowed:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                if self._overflowed:
+                    await self._fail("overflow", close_code=1013)
+                    return
+
+                entry = self._queue.popleft()
+                key, payload, enqueued_at = entry
+                if self._pending_by_key.get(key) is entry:
+                    del self._pending_by_key[key]
+                self._set_depth(len(self._queue))
+
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(payload), timeout=self.send_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Dashboard trop lent (> {self.send_timeout}s), déconnexion")
+                    await self._fail("timeout")
+                    return
+                except Exception as e:
+                    logger.error(f"Erreur broadcast vers dashboard: {e}")
+                    await self._fail("error")
+                    return
+
+                self.sent += 1
+                if METRICS_AVAILABLE:
+                    record_outbox_send_latency(time.perf_counter() - enqueued_at)
+        except asyncio.CancelledError:
+            pass
+
+    async def _fail(self, reason: str, close_code: Optional[int] = None):
+        if METRICS_AVAILABLE:
+            record_outbox_disconnect(reason)
+        self.close()
+        if close_code is not None:
+            try:
+                await self.websocket.close(code=close_code, reason="Dashboard trop lent")
+            except Exception:
+                pass
+        if self.on_failure is not None:
+            self.on_failure(self.websocket)
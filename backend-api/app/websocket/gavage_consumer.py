@@ -8,9 +8,13 @@ from typing import Set, Optional
 import asyncio
 import json
 import logging
+import os
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+from app.services.gavage_ingestion import gavage_ingestion_pipeline
+from app.services.sqal_ingestion import IngestionQueueFullError
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,18 +61,32 @@ class GavageConsumer:
     Flux:
     1. Simulateur → WebSocket /ws/gavage
     2. Validation Pydantic (GavageRealtimeMessage)
-    3. Sauvegarde TimescaleDB (gavage_data + lots_gavage)
-    4. Broadcast aux frontends (gaveurs + euralis)
-    5. Synchronisation SQAL si lot terminé
+    3. Sauvegarde TimescaleDB (lots_gavage + gavage_data_lots + doses_journalieres)
+       via le pipeline d'ingestion par lots
+    4. ACK au simulateur
+    5. En tâche de fond : broadcast aux frontends (gaveurs + euralis) et
+       synchronisation SQAL si lot terminé
+
+    Les messages d'une même connexion sont traités en parallèle
+    (GAVAGE_WS_MAX_IN_FLIGHT au plus) pour qu'ils partagent un lot d'écriture.
     """
 
-    def __init__(self, db_pool=None):
+    def __init__(self, db_pool=None, max_in_flight: Optional[int] = None):
         self.active_connections: Set[WebSocket] = set()
         self.db_pool = db_pool
+        # Écritures regroupées entre toutes les connexions (démarré dans main.py lifespan)
+        self.ingestion = gavage_ingestion_pipeline
+        if db_pool is not None and self.ingestion.db_pool is None:
+            self.ingestion.set_db_pool(db_pool)
+        self.max_in_flight = max(1, max_in_flight or int(os.getenv("GAVAGE_WS_MAX_IN_FLIGHT", "64")))
+        # Broadcasts / triggers SQAL en cours (référence gardée jusqu'à la fin)
+        self._background: Set[asyncio.Task] = set()
 
     def set_db_pool(self, pool):
         """Configure le pool de connexions DB"""
         self.db_pool = pool
+        if self.ingestion.db_pool is None:
+            self.ingestion.set_db_pool(pool)
 
     async def connect(self, websocket: WebSocket):
         """Accepte une nouvelle connexion simulateur"""
@@ -95,13 +113,19 @@ class GavageConsumer:
         Args:
             websocket: WebSocket du simulateur
         """
+        en_vol: Set[asyncio.Task] = set()
+        slots = asyncio.Semaphore(self.max_in_flight)
         try:
             while True:
                 # Reçoit message JSON du simulateur
                 data = await websocket.receive_json()
 
-                # Traite le message
-                await self._process_gavage_message(data, websocket)
+                # Traite le message sans bloquer la réception du suivant
+                await slots.acquire()
+                task = asyncio.create_task(self._process_gavage_message(data, websocket))
+                en_vol.add(task)
+                task.add_done_callback(en_vol.discard)
+                task.add_done_callback(lambda _: slots.release())
 
         except WebSocketDisconnect:
             self.disconnect(websocket)
@@ -115,6 +139,30 @@ class GavageConsumer:
             except:
                 pass
 
+        finally:
+            # Le simulateur ferme la connexion juste après l'envoi : les
+            # messages reçus sont quand même écrits
+            if en_vol:
+                await asyncio.gather(*en_vol, return_exceptions=True)
+
+    async def _send(self, websocket: WebSocket, payload: dict):
+        """Envoie ACK / NACK ; la connexion peut déjà être fermée par le simulateur"""
+        try:
+            await websocket.send_json(payload)
+        except Exception as e:
+            logger.debug(f"Réponse non envoyée au simulateur gavage: {e}")
+
+    def _in_background(self, coro):
+        """Lance un traitement hors du chemin de l'ACK"""
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def drain_background(self):
+        """Attend les broadcasts / triggers SQAL en cours (arrêt, tests)"""
+        if self._background:
+            await asyncio.gather(*list(self._background), return_exceptions=True)
+
     async def _process_gavage_message(self, data: dict, websocket: WebSocket):
         """
         Traite un message de données gavage
@@ -131,20 +179,25 @@ class GavageConsumer:
                 f"{gavage_data.moment} - Dose: {gavage_data.dose_reelle}g"
             )
 
-            # 2. SAUVEGARDE TIMESCALEDB
-            saved = await self._save_to_database(gavage_data)
+            # 2. SAUVEGARDE TIMESCALEDB (pipeline d'ingestion, écriture par lots)
+            try:
+                saved = await self._save_to_database(gavage_data)
+            except IngestionQueueFullError as full_err:
+                logger.warning(f"Backpressure ingestion gavage: {full_err}")
+                raise
             if not saved:
                 raise Exception("Échec sauvegarde TimescaleDB")
+            self._notify_kpi_snapshot(gavage_data)
 
-            # 3. BROADCAST AUX FRONTENDS (gaveurs + euralis)
-            await self._broadcast_to_frontends(gavage_data)
+            # 3. BROADCAST AUX FRONTENDS (gaveurs + euralis) - hors chemin de l'ACK
+            self._in_background(self._broadcast_to_frontends(gavage_data))
 
-            # 4. SYNCHRONISATION SQAL SI LOT TERMINÉ
+            # 4. SYNCHRONISATION SQAL SI LOT TERMINÉ - hors chemin de l'ACK
             if gavage_data.pret_abattage:
-                await self._trigger_sqal_quality_control(gavage_data)
+                self._in_background(self._trigger_sqal_quality_control(gavage_data))
 
             # 5. ACK AU SIMULATEUR
-            await websocket.send_json({
+            await self._send(websocket, {
                 "type": "ack",
                 "code_lot": gavage_data.code_lot,
                 "jour": gavage_data.jour,
@@ -169,7 +222,7 @@ class GavageConsumer:
             logger.error(f"Erreur traitement message gavage: {e}", exc_info=True)
 
             # NACK au simulateur
-            await websocket.send_json({
+            await self._send(websocket, {
                 "type": "error",
                 "timestamp": datetime.utcnow().isoformat(),
                 "error": str(e),
@@ -180,9 +233,9 @@ class GavageConsumer:
         """
         Sauvegarde les données dans TimescaleDB
 
-        Tables mises à jour:
+        Tables mises à jour (une transaction, voir app.services.gavage_ingestion):
         1. lots_gavage - Informations du lot
-        2. gavage_data - Données de gavage (hypertable)
+        2. gavage_data_lots - Données de gavage au niveau lot (hypertable)
         3. doses_journalieres - Doses par jour (hypertable Euralis)
 
         Args:
@@ -190,108 +243,25 @@ class GavageConsumer:
 
         Returns:
             True si succès, False sinon
+
+        Raises:
+            IngestionQueueFullError: file d'ingestion pleine
         """
-        if not self.db_pool:
+        if not self.ingestion.db_pool:
             logger.error("Pool de connexion DB non initialisé")
             return False
 
-        try:
-            async with self.db_pool.acquire() as conn:
-                # 1. UPSERT LOT (créer ou mettre à jour)
-                await conn.execute("""
-                    INSERT INTO lots_gavage (
-                        code_lot, gaveur_id, site_code, genetique, debut_lot,
-                        nb_canards_initial, poids_moyen_actuel, taux_mortalite,
-                        jour_actuel, pret_abattage, updated_at
-                    ) VALUES ($1, $2, $3, $4, CURRENT_DATE, $5, $6, $7, $8, $9, NOW())
-                    ON CONFLICT (code_lot) DO UPDATE SET
-                        poids_moyen_actuel = EXCLUDED.poids_moyen_actuel,
-                        taux_mortalite = EXCLUDED.taux_mortalite,
-                        jour_actuel = EXCLUDED.jour_actuel,
-                        pret_abattage = EXCLUDED.pret_abattage,
-                        updated_at = NOW()
-                """,
-                    gavage_data.code_lot,
-                    gavage_data.gaveur_id,
-                    gavage_data.site,
-                    gavage_data.genetique,
-                    gavage_data.nb_canards_vivants,  # Approximation
-                    gavage_data.poids_moyen,
-                    gavage_data.taux_mortalite,
-                    gavage_data.jour,
-                    gavage_data.pret_abattage or False
-                )
-
-                # 2. INSERT GAVAGE_DATA_LOTS (hypertable time-series au niveau LOT)
-                # Insertion directe dans gavage_data_lots car on travaille au niveau LOT, pas canards individuels
-                await conn.execute("""
-                    INSERT INTO gavage_data_lots (
-                        time, lot_gavage_id, jour_gavage, repas,
-                        dose_moyenne, dose_theorique, poids_moyen_lot,
-                        nb_canards_vivants, nb_canards_morts, taux_mortalite,
-                        temperature_stabule, humidite_stabule
-                    ) VALUES (
-                        $1,
-                        (SELECT id FROM lots_gavage WHERE code_lot = $2),
-                        $3, $4, $5, $6, $7, $8, $9, $10, $11, $12
-                    )
-                    ON CONFLICT (time, lot_gavage_id, repas) DO UPDATE SET
-                        dose_moyenne = EXCLUDED.dose_moyenne,
-                        dose_theorique = EXCLUDED.dose_theorique,
-                        poids_moyen_lot = EXCLUDED.poids_moyen_lot,
-                        nb_canards_vivants = EXCLUDED.nb_canards_vivants,
-                        nb_canards_morts = EXCLUDED.nb_canards_morts,
-                        taux_mortalite = EXCLUDED.taux_mortalite
-                """,
-                    datetime.fromisoformat(gavage_data.timestamp),
-                    gavage_data.code_lot,
-                    gavage_data.jour,
-                    gavage_data.moment,  # 'matin' ou 'soir'
-                    gavage_data.dose_reelle,
-                    gavage_data.dose_theorique,
-                    gavage_data.poids_moyen,
-                    gavage_data.nb_canards_vivants,  # FIX: Utiliser le bon nom de champ
-                    0,  # nb_morts: Calculé via taux_mortalite * nb_total
-                    gavage_data.taux_mortalite,
-                    gavage_data.temperature_stabule,
-                    gavage_data.humidite_stabule
-                )
+        return await self.ingestion.submit(gavage_data)
 
-                # 3. INSERT DOSES_JOURNALIERES (pour Euralis dashboard)
-                if gavage_data.jour >= 0:  # Ne pas enregistrer J-1
-                    await conn.execute("""
-                        INSERT INTO doses_journalieres (
-                            time, code_lot, jour, moment,
-                            dose_theorique, dose_reelle,
-                            poids_moyen, nb_vivants, taux_mortalite,
-                            temperature, humidite
-                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
-                        ON CONFLICT (time, code_lot, jour, moment) DO UPDATE SET
-                            dose_reelle = EXCLUDED.dose_reelle,
-                            poids_moyen = EXCLUDED.poids_moyen,
-                            nb_vivants = EXCLUDED.nb_vivants,
-                            taux_mortalite = EXCLUDED.taux_mortalite,
-                            temperature = EXCLUDED.temperature,
-                            humidite = EXCLUDED.humidite
-                    """,
-                        datetime.fromisoformat(gavage_data.timestamp),
-                        gavage_data.code_lot,
-                        gavage_data.jour,
-                        gavage_data.moment,
-                        gavage_data.dose_theorique,
-                        gavage_data.dose_reelle,
-                        gavage_data.poids_moyen,
-                        gavage_data.nb_canards_vivants,
-                        gavage_data.taux_mortalite,
-                        gavage_data.temperature_stabule,
-                        gavage_data.humidite_stabule
-                    )
-
-            return True
+    def _notify_kpi_snapshot(self, gavage_data: GavageRealtimeMessage):
+        """Invalide les parties du snapshot KPIs Euralis touchées par ce message"""
+        from app.services.euralis_kpi_snapshot import euralis_kpi_snapshot
 
-        except Exception as e:
-            logger.error(f"Erreur sauvegarde DB gavage: {e}", exc_info=True)
-            return False
+        if gavage_data.jour >= 0:
+            euralis_kpi_snapshot.notify_doses(gavage_data.site)
+        # Nouveau lot (J-1/J0) ou lot terminé : statut / ITM / production changent
+        if gavage_data.jour <= 0 or gavage_data.pret_abattage:
+            euralis_kpi_snapshot.notify_lot_changed(gavage_data.site)
 
     async def _broadcast_to_frontends(self, gavage_data: GavageRealtimeMessage):
         """
@@ -4,17 +4,40 @@ Endpoint: /ws/realtime/
 """
 
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Set, Dict, Any
+from typing import Set, Dict, Any, Iterable, Optional
 import asyncio
 import json
 import logging
+import os
 from datetime import datetime
 
 from app.models.sqal import SensorDataMessage
+from app.websocket.dashboard_outbox import DashboardOutbox, default_outbox_settings
+
+# orjson (optionnel) : encodage ~5-10x plus rapide que json.dumps
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 
+def encode_message(message: Dict[str, Any]) -> str:
+    """
+    Encode un message dashboard une seule fois (partagé entre tous les clients)
+
+    Les dashboards font JSON.parse(event.data) : on envoie une trame texte.
+    """
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass  # type non supporté par orjson → repli json
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
 class RealtimeBroadcaster:
     """
     Gestionnaire WebSocket pour broadcast temps réel vers dashboards
@@ -22,13 +45,42 @@ class RealtimeBroadcaster:
     Flux:
     1. Dashboards connectés → /ws/realtime/
     2. Réception données depuis sensors_consumer
-    3. Broadcast à tous les dashboards connectés
+    3. Broadcast aux dashboards abonnés (index device_id / site_code)
     4. Gestion déconnexions/reconnexions
+
+    Fan-out:
+    - chaque message est construit et encodé une seule fois, puis la même
+      chaîne est déposée dans l'outbox bornée de chaque destinataire
+      (DashboardOutbox) : le producteur n'attend jamais un dashboard lent
+    - chaque outbox est vidée par sa propre tâche d'écriture ; un envoi qui
+      dépasse send_timeout (REALTIME_SEND_TIMEOUT_S) déconnecte le dashboard
+    - débordement selon REALTIME_OVERFLOW_POLICY (drop_oldest / coalesce par
+      device / disconnect), taille REALTIME_OUTBOX_MAXSIZE
+    - un dashboard filtré sur un device ne fait partie que de l'index de ce
+      device : le trafic des autres devices n'est ni construit ni encodé pour lui
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        send_timeout: Optional[float] = None,
+        outbox_maxsize: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+    ):
         self.active_connections: Set[WebSocket] = set()
         self.connection_metadata: Dict[WebSocket, Dict[str, Any]] = {}
+        self.send_timeout = send_timeout if send_timeout is not None else float(
+            os.getenv("REALTIME_SEND_TIMEOUT_S", "2.0")
+        )
+
+        settings = default_outbox_settings()
+        self.outbox_maxsize = outbox_maxsize if outbox_maxsize is not None else settings["maxsize"]
+        self.overflow_policy = overflow_policy or settings["policy"]
+        self.outboxes: Dict[WebSocket, DashboardOutbox] = {}
+
+        # Index des abonnements (voir _index_subscription)
+        self._unfiltered: Set[WebSocket] = set()
+        self._by_device: Dict[str, Set[WebSocket]] = {}
+        self._by_site: Dict[str, Set[WebSocket]] = {}
 
     async def connect(self, websocket: WebSocket, client_info: Dict[str, Any] = None):
         """
@@ -44,6 +96,17 @@ class RealtimeBroadcaster:
         # Stocke métadonnées
         self.connection_metadata[websocket] = client_info or {}
         self.connection_metadata[websocket]["connected_at"] = datetime.utcnow()
+        self._index_subscription(websocket)
+
+        outbox = DashboardOutbox(
+            websocket,
+            maxsize=self.outbox_maxsize,
+            policy=self.overflow_policy,
+            send_timeout=self.send_timeout,
+            on_failure=self.disconnect,
+        )
+        self.outboxes[websocket] = outbox
+        outbox.start()
 
         logger.info(
             f"Dashboard connecté. Total: {len(self.active_connections)} | "
@@ -63,10 +126,75 @@ class RealtimeBroadcaster:
 
     def disconnect(self, websocket: WebSocket):
         """Déconnecte un dashboard"""
+        if websocket not in self.active_connections:
+            return
+        outbox = self.outboxes.pop(websocket, None)
+        if outbox is not None:
+            outbox.close()
+        self._unindex_subscription(websocket)
         self.active_connections.discard(websocket)
         self.connection_metadata.pop(websocket, None)
         logger.info(f"Dashboard déconnecté. Total: {len(self.active_connections)}")
 
+    # ------------------------------------------------------------------
+    # Index des abonnements
+    # ------------------------------------------------------------------
+
+    def _index_subscription(self, websocket: WebSocket):
+        """
+        Range un dashboard dans l'index selon ses filtres
+
+        - filtre device_id → _by_device[device_id] (site_code vérifié à l'envoi)
+        - filtre site_code seul → _by_site[site_code]
+        - sinon → _unfiltered
+        """
+        filters = self.connection_metadata.get(websocket, {}).get("filters") or {}
+        device_id = filters.get("device_id")
+        site_code = filters.get("site_code")
+
+        if device_id:
+            self._by_device.setdefault(device_id, set()).add(websocket)
+        elif site_code:
+            self._by_site.setdefault(site_code, set()).add(websocket)
+        else:
+            self._unfiltered.add(websocket)
+
+    def _unindex_subscription(self, websocket: WebSocket):
+        self._unfiltered.discard(websocket)
+        for index in (self._by_device, self._by_site):
+            for key in [k for k, subscribers in index.items() if websocket in subscribers]:
+                index[key].discard(websocket)
+                if not index[key]:
+                    del index[key]
+
+    def _candidates(self, device_id: Optional[str], site_code: Optional[str]) -> Set[WebSocket]:
+        """Dashboards potentiellement intéressés par un device/site (avant filtres fins)"""
+        candidates = set(self._unfiltered)
+        if device_id is not None:
+            candidates |= self._by_device.get(device_id, set())
+        if site_code is not None:
+            candidates |= self._by_site.get(site_code, set())
+        return candidates
+
+    def _fan_out(self, recipients: Iterable[WebSocket], message: Dict[str, Any], key: Optional[str] = None) -> int:
+        """
+        Encode une fois et dépose la trame dans l'outbox de chaque destinataire
+
+        Args:
+            recipients: Dashboards destinataires
+            message: Message à diffuser
+            key: Clé de coalescence (device_id) pour la politique "coalesce"
+
+        Returns:
+            Nombre de dashboards ayant accepté la trame
+        """
+        recipients = [ws for ws in recipients if ws in self.outboxes]
+        if not recipients:
+            return 0
+
+        payload = encode_message(message)
+        return sum(1 for ws in recipients if self.outboxes[ws].enqueue(payload, key=key))
+
     async def listen(self, websocket: WebSocket):
         """
         Boucle d'écoute pour un dashboard (heartbeat, subscriptions, etc.)
@@ -131,7 +259,9 @@ class RealtimeBroadcaster:
         elif msg_type == "subscribe":
             # Mise à jour filtres abonnement
             filters = data.get("filters", {})
+            self._unindex_subscription(websocket)
             self.connection_metadata[websocket]["filters"] = filters
+            self._index_subscription(websocket)
             logger.info(f"Dashboard abonné à: {filters}")
 
             await websocket.send_json({
@@ -142,7 +272,9 @@ class RealtimeBroadcaster:
 
         elif msg_type == "unsubscribe":
             # Supprime filtres
+            self._unindex_subscription(websocket)
             self.connection_metadata[websocket].pop("filters", None)
+            self._index_subscription(websocket)
             logger.info("Dashboard désabonné des filtres")
 
             await websocket.send_json({
@@ -168,6 +300,24 @@ class RealtimeBroadcaster:
             logger.debug("Aucun dashboard connecté, skip broadcast")
             return
 
+        recipients = [
+            ws for ws in self._candidates(sensor_data.device_id, sensor_data.site_code)
+            if self._should_send_to_client(ws, sensor_data)
+        ]
+        if not recipients:
+            logger.debug(f"Aucun dashboard abonné à {sensor_data.device_id}, skip broadcast")
+            return
+
+        sensor_update_msg = self._build_sensor_update(sensor_data, original_data)
+        sent = self._fan_out(recipients, sensor_update_msg, key=sensor_data.device_id)
+
+        logger.info(
+            f"📡 Broadcast à {sent}/{len(self.active_connections)} dashboards | "
+            f"Sample: {sensor_data.sample_id} | Grade: {sensor_data.fusion.final_grade}"
+        )
+
+    def _build_sensor_update(self, sensor_data: SensorDataMessage, original_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Construit le message 'sensor_update' (une fois par échantillon)"""
         # Extraire données détaillées depuis original_data si disponible
         # Note: adapted_data a une structure imbriquée {"raw": {...}, "analysis": {...}}
         # Les données détaillées (bins_analysis, etc.) sont dans "analysis"
@@ -293,28 +443,7 @@ class RealtimeBroadcaster:
             }
         }
 
-        # Broadcast à tous les dashboards (avec filtres)
-        disconnected = set()
-
-        for websocket in self.active_connections:
-            # Vérifie filtres abonnement
-            if not self._should_send_to_client(websocket, sensor_data):
-                continue
-
-            try:
-                await websocket.send_json(sensor_update_msg)
-            except Exception as e:
-                logger.error(f"Erreur broadcast vers dashboard: {e}")
-                disconnected.add(websocket)
-
-        # Nettoie connexions mortes
-        for ws in disconnected:
-            self.disconnect(ws)
-
-        logger.info(
-            f"📡 Broadcast à {len(self.active_connections)} dashboards | "
-            f"Sample: {sensor_data.sample_id} | Grade: {sensor_data.fusion.final_grade}"
-        )
+        return sensor_update_msg
 
     def _should_send_to_client(self, websocket: WebSocket, sensor_data: SensorDataMessage) -> bool:
         """
@@ -346,7 +475,8 @@ class RealtimeBroadcaster:
         if "min_grade" in filters:
             grade_order = {"A+": 5, "A": 4, "B": 3, "C": 2, "REJECT": 1}
             min_grade = filters["min_grade"]
-            if grade_order.get(sensor_data.fusion.final_grade, 0) < grade_order.get(min_grade, 0):
+            final_grade = getattr(sensor_data.fusion.final_grade, "value", sensor_data.fusion.final_grade)
+            if grade_order.get(final_grade, 0) < grade_order.get(min_grade, 0):
                 return False
 
         return True
@@ -392,19 +522,9 @@ class RealtimeBroadcaster:
             "data": alert_data
         }
 
-        disconnected = set()
-
-        for websocket in self.active_connections:
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                logger.error(f"Erreur broadcast alerte: {e}")
-                disconnected.add(websocket)
-
-        for ws in disconnected:
-            self.disconnect(ws)
+        sent = self._fan_out(self.active_connections, message)
 
-        logger.info(f"🚨 Alerte broadcastée à {len(self.active_connections)} dashboards")
+        logger.info(f"🚨 Alerte broadcastée à {sent} dashboards")
 
     async def broadcast_gavage_data(self, gavage_message: Dict[str, Any]):
         """
@@ -417,29 +537,16 @@ class RealtimeBroadcaster:
             logger.debug("Aucun dashboard connecté pour gavage, skip broadcast")
             return
 
-        disconnected = set()
-
-        for websocket in self.active_connections:
-            # Vérifie si le dashboard veut les données gavage (via filtres)
-            metadata = self.connection_metadata.get(websocket, {})
-            filters = metadata.get("filters", {})
-
-            # Si filtre spécifie "sqal_only", skip gavage
-            if filters.get("data_type") == "sqal_only":
-                continue
-
-            try:
-                await websocket.send_json(gavage_message)
-            except Exception as e:
-                logger.error(f"Erreur broadcast gavage: {e}")
-                disconnected.add(websocket)
+        # Si filtre spécifie "sqal_only", skip gavage
+        recipients = [
+            ws for ws in self.active_connections
+            if (self.connection_metadata.get(ws, {}).get("filters") or {}).get("data_type") != "sqal_only"
+        ]
 
-        # Nettoie connexions mortes
-        for ws in disconnected:
-            self.disconnect(ws)
+        sent = self._fan_out(recipients, gavage_message)
 
         logger.debug(
-            f"📡 Gavage broadcast à {len(self.active_connections)} dashboards | "
+            f"📡 Gavage broadcast à {sent} dashboards | "
             f"Lot: {gavage_message.get('data', {}).get('code_lot', 'N/A')}"
         )
 
@@ -17,6 +17,8 @@ from app.models.sqal import (
     QualityGrade
 )
 from app.services.sqal_service import sqal_service  # Use global singleton instead of SQALService class
+from app.services.sqal_ingestion import sqal_ingestion_queue, IngestionQueueFullError
+from app.websocket.sqal_payload_adapter import adapt_simulator_payload
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +30,7 @@ class SensorsConsumer:
     Flux:
     1. Simulateur → WebSocket /ws/sensors/
     2. Validation Pydantic (SensorDataMessage)
-    3. Sauvegarde TimescaleDB (sensor_samples)
+    3. Sauvegarde TimescaleDB (sensor_samples) via la file d'ingestion par lots
     4. Génération alertes si qualité < seuils
     5. Broadcast aux dashboards via realtime_broadcaster
     """
@@ -37,6 +39,8 @@ class SensorsConsumer:
         self.active_connections: Set[WebSocket] = set()
         # Use global singleton service (initialized in main.py startup)
         self.service = sqal_service
+        # Écritures regroupées entre toutes les connexions (démarrée dans main.py lifespan)
+        self.ingestion = sqal_ingestion_queue
 
     async def connect(self, websocket: WebSocket):
         """Accepte une nouvelle connexion simulateur"""
@@ -86,26 +90,10 @@ class SensorsConsumer:
     def _adapt_simulator_data(self, data: dict) -> dict:
         """
         Adapte les données du simulateur vers le format Pydantic attendu
+        (structure plate simulateur → raw/analysis imbriqués)
 
-        Le simulateur envoie une structure plate :
-        {
-            "vl53l8ch": {"timestamp": ..., "stats": ..., "quality_score": ..., "distance_matrix": ...},
-            "as7341": {"channels": {...}, "quality_score": ..., "freshness_index": ...},
-            "fusion": {"final_score": ..., "final_grade": ...}
-        }
-
-        Pydantic attend une structure imbriquée :
-        {
-            "vl53l8ch": {
-                "raw": {"distance_matrix": ..., "reflectance_matrix": ..., "amplitude_matrix": ...},
-                "analysis": {"quality_score": ..., "volume_mm3": ..., "surface_uniformity": ..., ...}
-            },
-            "as7341": {
-                "raw": {"F1_415nm": ..., "F2_445nm": ..., ...} (10 channels directement),
-                "analysis": {"quality_score": ..., "freshness_index": ..., "oxidation_index": ...}
-            },
-            "fusion": {"final_score": ..., "final_grade": ..., "is_compliant": ...}
-        }
+        Voir app.websocket.sqal_payload_adapter.adapt_simulator_payload
+        (matrices VL53L8CH et histogrammes CNH convertis en une opération NumPy).
 
         Args:
             data: Données brutes du simulateur
@@ -113,139 +101,7 @@ class SensorsConsumer:
         Returns:
             Données adaptées au format Pydantic
         """
-        adapted = data.copy()
-
-        # Adaptation VL53L8CH : Séparer raw et analysis
-        if "vl53l8ch" in data and isinstance(data["vl53l8ch"], dict):
-            vl53_data = data["vl53l8ch"]
-
-            # Champs qui vont dans "raw" (matrices 8x8)
-            raw_fields = ["distance_matrix", "reflectance_matrix", "amplitude_matrix", "status_matrix", "ambient_matrix"]
-
-            raw_data = {}
-            for k in raw_fields:
-                if k in vl53_data:
-                    matrix = vl53_data[k]
-                    # Convert float matrices to int (simulator sends floats, Pydantic expects ints)
-                    # AND clamp values to valid ranges
-                    if isinstance(matrix, list) and len(matrix) > 0 and isinstance(matrix[0], list):
-                        if k == "distance_matrix":
-                            # Distance: 0-4000mm
-                            raw_data[k] = [[max(0, min(4000, int(round(val)))) if isinstance(val, (int, float)) else val for val in row] for row in matrix]
-                        elif k == "reflectance_matrix":
-                            # Reflectance: 0-255
-                            raw_data[k] = [[max(0, min(255, int(round(val)))) if isinstance(val, (int, float)) else val for val in row] for row in matrix]
-                        elif k == "amplitude_matrix":
-                            # Amplitude: 0-4095 (avoid saturation that makes the map constant)
-                            raw_data[k] = [[max(0, min(4095, int(round(val)))) if isinstance(val, (int, float)) else val for val in row] for row in matrix]
-                        elif k == "status_matrix":
-                            # Status: 0-255
-                            raw_data[k] = [[max(0, min(255, int(round(val)))) if isinstance(val, (int, float)) else val for val in row] for row in matrix]
-                        elif k == "ambient_matrix":
-                            # Ambient: 0-4095
-                            raw_data[k] = [[max(0, min(4095, int(round(val)))) if isinstance(val, (int, float)) else val for val in row] for row in matrix]
-                        else:
-                            raw_data[k] = [[int(round(val)) if isinstance(val, (int, float)) else val for val in row] for row in matrix]
-                    else:
-                        raw_data[k] = matrix
-
-            # Tous les autres champs vont dans "analysis"
-            analysis_data = {k: v for k, v in vl53_data.items() if k not in raw_fields}
-
-            # Ensure avg/std distance are present for dashboards
-            # If simulator/analyzer did not provide them, compute from raw distance matrix
-            try:
-                if (analysis_data.get("avg_distance_mm") is None) and ("distance_matrix" in raw_data) and raw_data.get("distance_matrix"):
-                    vals = [v for row in raw_data["distance_matrix"] for v in row if isinstance(v, (int, float))]
-                    if vals:
-                        mean = sum(vals) / len(vals)
-                        var = sum((v - mean) ** 2 for v in vals) / len(vals)
-                        analysis_data["avg_distance_mm"] = float(mean)
-                        analysis_data["std_distance_mm"] = float(var ** 0.5)
-            except Exception:
-                # Never fail ingestion due to optional derived metrics
-                pass
-
-            # Normaliser le grade : "REJET" → "REJECT", enlever les suffixes
-            if "grade" in analysis_data:
-                grade_str = str(analysis_data["grade"]).upper()
-                if "REJET" in grade_str or "REJECT" in grade_str:
-                    analysis_data["grade"] = "REJECT"
-                elif "A+" in grade_str:
-                    analysis_data["grade"] = "A+"
-                elif "A" in grade_str:
-                    analysis_data["grade"] = "A"
-                elif "B" in grade_str:
-                    analysis_data["grade"] = "B"
-                elif "C" in grade_str:
-                    analysis_data["grade"] = "C"
-
-            adapted["vl53l8ch"] = {
-                "raw": raw_data,
-                "analysis": analysis_data
-            }
-
-        # Adaptation AS7341 : Séparer raw et analysis
-        if "as7341" in data and isinstance(data["as7341"], dict):
-            as7341_data = data["as7341"]
-
-            # AS7341RawData attend directement les 10 canaux (F1_415nm, F2_445nm, ..., Clear, NIR)
-            # Le simulateur les envoie dans un dict "channels"
-            raw_data = {}
-            if "channels" in as7341_data and isinstance(as7341_data["channels"], dict):
-                # Les channels sont déjà au bon format (F1_415nm, F2_445nm, etc.)
-                raw_data = as7341_data["channels"]
-
-            # Champs qui vont dans "analysis"
-            # Exclure: channels, integration_time, gain (ce sont des métadonnées raw)
-            exclude_from_analysis = ["channels", "integration_time", "gain"]
-            analysis_data = {k: v for k, v in as7341_data.items() if k not in exclude_from_analysis}
-
-            # Normaliser le grade AS7341
-            if "grade" in analysis_data:
-                grade_str = str(analysis_data["grade"]).upper()
-                if "REJET" in grade_str or "REJECT" in grade_str:
-                    analysis_data["grade"] = "REJECT"
-                elif "A+" in grade_str:
-                    analysis_data["grade"] = "A+"
-                elif "A" in grade_str:
-                    analysis_data["grade"] = "A"
-                elif "B" in grade_str:
-                    analysis_data["grade"] = "B"
-                elif "C" in grade_str:
-                    analysis_data["grade"] = "C"
-
-            adapted["as7341"] = {
-                "raw": raw_data,
-                "analysis": analysis_data
-            }
-
-        # Fusion : Vérifier que les champs requis sont présents
-        if "fusion" in data and isinstance(data["fusion"], dict):
-            fusion_data = data["fusion"]
-
-            # Normaliser le grade fusion
-            if "final_grade" in fusion_data:
-                grade_str = str(fusion_data["final_grade"]).upper()
-                if "REJET" in grade_str or "REJECT" in grade_str:
-                    fusion_data["final_grade"] = "REJECT"
-                elif "A+" in grade_str:
-                    fusion_data["final_grade"] = "A+"
-                elif "A" in grade_str:
-                    fusion_data["final_grade"] = "A"
-                elif "B" in grade_str:
-                    fusion_data["final_grade"] = "B"
-                elif "C" in grade_str:
-                    fusion_data["final_grade"] = "C"
-
-            # Assurer que is_compliant est présent (requis par Pydantic)
-            if "is_compliant" not in fusion_data:
-                # is_compliant = True si final_grade != REJECT
-                fusion_data["is_compliant"] = fusion_data.get("final_grade") not in ["REJECT", "REJET"]
-
-            adapted["fusion"] = fusion_data
-
-        return adapted
+        return adapt_simulator_payload(data)
 
     async def _process_sensor_message(self, data: dict, websocket: WebSocket):
         """
@@ -294,11 +150,14 @@ class SensorsConsumer:
                 if candidate and len(candidate) == 2 and candidate.isalpha():
                     sensor_data.site_code = candidate
 
-            # 2. SAUVEGARDE TIMESCALEDB
+            # 2. SAUVEGARDE TIMESCALEDB (file write-behind, écriture par lots)
             try:
-                saved = await self.service.save_sensor_sample(sensor_data)
+                saved = await self.ingestion.submit(sensor_data)
                 if not saved:
                     raise Exception("Échec sauvegarde TimescaleDB (save_sensor_sample returned False)")
+            except IngestionQueueFullError as full_err:
+                logger.warning(f"Backpressure ingestion SQAL: {full_err}")
+                raise
             except Exception as save_err:
                 logger.error(f"Erreur détaillée sauvegarde: {save_err}", exc_info=True)
                 raise Exception(f"Échec sauvegarde TimescaleDB: {str(save_err)}")
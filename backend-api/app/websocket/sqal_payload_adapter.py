@@ -0,0 +1,248 @@
+"""
+Adaptation des payloads simulateur SQAL vers le format Pydantic (SensorDataMessage)
+
+Étape vectorisée NumPy utilisée par SensorsConsumer:
+- toutes les matrices VL53L8CH de même forme sont empilées en un seul tableau
+  (k, H, W), arrondies et bornées en une opération avec une table de bornes
+  par champ (VL53L8CH_CLAMP_RANGES)
+- moyenne / écart-type distance calculés sur le tableau
+- normalisation des grades via table mise en cache
+
+Le chemin élément par élément (vectorized=False) est conservé comme repli pour
+les matrices non numériques / irrégulières et comme référence de benchmark
+(scripts/benchmark_sqal_adaptation.py).
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Bornes (min, max) par matrice VL53L8CH
+VL53L8CH_CLAMP_RANGES: Dict[str, Tuple[int, int]] = {
+    "distance_matrix": (0, 4000),      # mm
+    "reflectance_matrix": (0, 255),
+    "amplitude_matrix": (0, 4095),     # évite la saturation qui rend la carte constante
+    "status_matrix": (0, 255),
+    "ambient_matrix": (0, 4095),
+}
+
+# Champs qui vont dans "raw" (matrices 8x8) ; le reste va dans "analysis"
+VL53L8CH_RAW_FIELDS = tuple(VL53L8CH_CLAMP_RANGES.keys())
+
+# Métadonnées raw AS7341 exclues de "analysis"
+AS7341_NON_ANALYSIS_FIELDS = ("channels", "integration_time", "gain")
+
+
+@lru_cache(maxsize=256)
+def _normalize_grade_str(grade_str: str) -> Optional[str]:
+    if "REJET" in grade_str or "REJECT" in grade_str:
+        return "REJECT"
+    if "A+" in grade_str:
+        return "A+"
+    if "A" in grade_str:
+        return "A"
+    if "B" in grade_str:
+        return "B"
+    if "C" in grade_str:
+        return "C"
+    return None
+
+
+def normalize_grade(grade: Any) -> Any:
+    """Normalise un grade simulateur : "REJET" → "REJECT", suffixes retirés ; inchangé si inconnu"""
+    normalized = _normalize_grade_str(str(grade).upper())
+    return normalized if normalized is not None else grade
+
+
+def _is_matrix(value: Any) -> bool:
+    return isinstance(value, list) and len(value) > 0 and isinstance(value[0], list)
+
+
+def _clamp_matrix_legacy(matrix: List[List[Any]], bounds: Optional[Tuple[int, int]]) -> List[List[Any]]:
+    """Chemin élément par élément (valeurs non numériques laissées telles quelles)"""
+    if bounds is None:
+        return [[int(round(val)) if isinstance(val, (int, float)) else val for val in row] for row in matrix]
+    lo, hi = bounds
+    return [[max(lo, min(hi, int(round(val)))) if isinstance(val, (int, float)) else val for val in row] for row in matrix]
+
+
+def _clamp_stack(matrices: List[Any], bounds: List[Tuple[int, int]]) -> Optional[np.ndarray]:
+    """
+    Arrondit et borne k matrices de même forme en une opération
+
+    Returns:
+        Tableau int64 (k, ...) ou None si les matrices ne sont pas empilables
+    """
+    try:
+        stack = np.asarray(matrices, dtype=np.float64)
+    except (ValueError, TypeError):
+        return None
+    if stack.ndim < 2 or not np.isfinite(stack).all():
+        return None
+
+    # Bornes (k, 1, 1, ...) diffusées sur chaque matrice
+    shape = (len(bounds),) + (1,) * (stack.ndim - 1)
+    lo = np.array([b[0] for b in bounds], dtype=np.float64).reshape(shape)
+    hi = np.array([b[1] for b in bounds], dtype=np.float64).reshape(shape)
+    return np.clip(np.rint(stack), lo, hi).astype(np.int64)
+
+
+def adapt_vl53l8ch_matrices(vl53_data: Dict[str, Any], vectorized: bool = True) -> Tuple[Dict[str, Any], Optional[np.ndarray]]:
+    """
+    Convertit les matrices raw VL53L8CH (float → int bornés)
+
+    Returns:
+        (raw_data, distance) où distance est le tableau bornés des distances
+        (None si absent ou chemin legacy)
+    """
+    raw_data: Dict[str, Any] = {}
+    distance: Optional[np.ndarray] = None
+
+    pending: Dict[str, Any] = {}
+    for k in VL53L8CH_RAW_FIELDS:
+        if k not in vl53_data:
+            continue
+        matrix = vl53_data[k]
+        if _is_matrix(matrix):
+            pending[k] = matrix
+        else:
+            raw_data[k] = matrix
+
+    if not pending:
+        return raw_data, None
+
+    if not vectorized:
+        for k, matrix in pending.items():
+            raw_data[k] = _clamp_matrix_legacy(matrix, VL53L8CH_CLAMP_RANGES.get(k))
+        return raw_data, None
+
+    # Regroupe par forme : en pratique toutes les matrices sont HxW → un seul tableau
+    groups: Dict[Tuple[int, ...], List[str]] = {}
+    for k, matrix in pending.items():
+        shape = (len(matrix), len(matrix[0]))
+        groups.setdefault(shape, []).append(k)
+
+    for keys in groups.values():
+        stack = _clamp_stack([pending[k] for k in keys], [VL53L8CH_CLAMP_RANGES[k] for k in keys])
+        if stack is None:
+            for k in keys:
+                raw_data[k] = _clamp_matrix_legacy(pending[k], VL53L8CH_CLAMP_RANGES.get(k))
+            continue
+        for idx, k in enumerate(keys):
+            raw_data[k] = stack[idx].tolist()
+            if k == "distance_matrix":
+                distance = stack[idx]
+
+    return raw_data, distance
+
+
+def _distance_stats(raw_distance: Any, distance: Optional[np.ndarray]) -> Optional[Tuple[float, float]]:
+    if distance is not None:
+        if distance.size == 0:
+            return None
+        return float(distance.mean()), float(distance.std())
+
+    vals = [v for row in raw_distance for v in row if isinstance(v, (int, float))]
+    if not vals:
+        return None
+    mean = sum(vals) / len(vals)
+    var = sum((v - mean) ** 2 for v in vals) / len(vals)
+    return float(mean), float(var ** 0.5)
+
+
+def adapt_simulator_payload(data: dict, vectorized: bool = True) -> dict:
+    """
+    Adapte les données du simulateur vers le format Pydantic attendu
+
+    Le simulateur envoie une structure plate :
+    {
+        "vl53l8ch": {"timestamp": ..., "stats": ..., "quality_score": ..., "distance_matrix": ...},
+        "as7341": {"channels": {...}, "quality_score": ..., "freshness_index": ...},
+        "fusion": {"final_score": ..., "final_grade": ...}
+    }
+
+    Pydantic attend une structure imbriquée :
+    {
+        "vl53l8ch": {
+            "raw": {"distance_matrix": ..., "reflectance_matrix": ..., "amplitude_matrix": ...},
+            "analysis": {"quality_score": ..., "volume_mm3": ..., "surface_uniformity": ..., ...}
+        },
+        "as7341": {
+            "raw": {"F1_415nm": ..., "F2_445nm": ..., ...} (10 channels directement),
+            "analysis": {"quality_score": ..., "freshness_index": ..., "oxidation_index": ...}
+        },
+        "fusion": {"final_score": ..., "final_grade": ..., "is_compliant": ...}
+    }
+
+    Args:
+        data: Données brutes du simulateur
+        vectorized: False pour le chemin élément par élément (benchmark / repli)
+
+    Returns:
+        Données adaptées au format Pydantic
+    """
+    adapted = data.copy()
+
+    # Adaptation VL53L8CH : Séparer raw et analysis
+    if "vl53l8ch" in data and isinstance(data["vl53l8ch"], dict):
+        vl53_data = data["vl53l8ch"]
+
+        raw_data, distance = adapt_vl53l8ch_matrices(vl53_data, vectorized=vectorized)
+
+        # Tous les autres champs vont dans "analysis"
+        analysis_data = {k: v for k, v in vl53_data.items() if k not in VL53L8CH_RAW_FIELDS}
+
+        # Ensure avg/std distance are present for dashboards
+        # If simulator/analyzer did not provide them, compute from raw distance matrix
+        try:
+            if (analysis_data.get("avg_distance_mm") is None) and raw_data.get("distance_matrix"):
+                stats = _distance_stats(raw_data["distance_matrix"], distance)
+                if stats is not None:
+                    analysis_data["avg_distance_mm"], analysis_data["std_distance_mm"] = stats
+        except Exception:
+            # Never fail ingestion due to optional derived metrics
+            pass
+
+        if "grade" in analysis_data:
+            analysis_data["grade"] = normalize_grade(analysis_data["grade"])
+
+        adapted["vl53l8ch"] = {
+            "raw": raw_data,
+            "analysis": analysis_data
+        }
+
+    # Adaptation AS7341 : Séparer raw et analysis
+    if "as7341" in data and isinstance(data["as7341"], dict):
+        as7341_data = data["as7341"]
+
+        # AS7341RawData attend directement les 10 canaux (F1_415nm, ..., Clear, NIR),
+        # le simulateur les envoie dans un dict "channels"
+        raw_data = {}
+        if "channels" in as7341_data and isinstance(as7341_data["channels"], dict):
+            raw_data = as7341_data["channels"]
+
+        analysis_data = {k: v for k, v in as7341_data.items() if k not in AS7341_NON_ANALYSIS_FIELDS}
+
+        if "grade" in analysis_data:
+            analysis_data["grade"] = normalize_grade(analysis_data["grade"])
+
+        adapted["as7341"] = {
+            "raw": raw_data,
+            "analysis": analysis_data
+        }
+
+    # Fusion : Vérifier que les champs requis sont présents
+    if "fusion" in data and isinstance(data["fusion"], dict):
+        fusion_data = data["fusion"]
+
+        if "final_grade" in fusion_data:
+            fusion_data["final_grade"] = normalize_grade(fusion_data["final_grade"])
+
+        # is_compliant requis par Pydantic : True si final_grade != REJECT
+        if "is_compliant" not in fusion_data:
+            fusion_data["is_compliant"] = fusion_data.get("final_grade") not in ["REJECT", "REJET"]
+
+        adapted["fusion"] = fusion_data
+
+    return adapted
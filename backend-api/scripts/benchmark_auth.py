@@ -0,0 +1,81 @@
+"""
+Benchmark - Coût d'authentification Keycloak par requête
+
+Démarre un Keycloak local de substitution (scripts/keycloak_stub.py, avec
+latence réseau simulée) et mesure le coût moyen de validation d'un token :
+- legacy: keycloak_openid.public_key() (HTTP synchrone) + RS256 à chaque requête
+- jwks:   clé lue dans le cache JWKS par kid + RS256 (cache de tokens désactivé)
+- cached: jwks + cache des tokens déjà vérifiés (polling dashboard)
+
+Usage:
+    python scripts/benchmark_auth.py [--requests 2000] [--users 20] [--latency-ms 2]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Ajouter app au path
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from jose import jwt
+from keycloak import KeycloakOpenID
+
+from app.auth import keycloak
+from app.auth.jwks import JWKSKeyProvider, VerifiedTokenCache
+from scripts.keycloak_stub import KeycloakStub
+
+
+async def run_legacy(stub: KeycloakStub, tokens, n: int) -> float:
+    client = KeycloakOpenID(server_url=stub.url, client_id="backend-api", realm_name=stub.realm)
+    started = time.perf_counter()
+    for i in range(n):
+        public_key = f"-----BEGIN PUBLIC KEY-----\n{client.public_key()}\n-----END PUBLIC KEY-----"
+        payload = jwt.decode(tokens[i % len(tokens)], public_key, algorithms=["RS256"], options={"verify_aud": False})
+        keycloak._verify_token_claims(payload)
+    return time.perf_counter() - started
+
+
+async def run_provider(stub: KeycloakStub, tokens, n: int, token_cache_size: int) -> float:
+    keycloak.jwks_provider = JWKSKeyProvider(stub.jwks_url)
+    keycloak.verified_tokens = VerifiedTokenCache(max_size=token_cache_size)
+    await keycloak.jwks_provider.refresh()
+    try:
+        started = time.perf_counter()
+        for i in range(n):
+            await keycloak.decode_keycloak_token(tokens[i % len(tokens)])
+        return time.perf_counter() - started
+    finally:
+        await keycloak.jwks_provider.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20, help="tokens distincts (dashboards)")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="latence simulée de Keycloak")
+    args = parser.parse_args()
+
+    with KeycloakStub(latency_s=args.latency_ms / 1000) as stub:
+        keycloak.EXPECTED_ISSUER = stub.issuer
+        tokens = [stub.issue_token({"preferred_username": f"gaveur{i}"}, ttl_s=3600) for i in range(args.users)]
+
+        print("=" * 70)
+        print(f"{args.requests} requêtes, {args.users} tokens, latence Keycloak {args.latency_ms} ms")
+        print(f"{'Mode':<10}{'µs/requête':>14}{'appels Keycloak':>20}")
+        for mode in ("legacy", "jwks", "cached"):
+            before = sum(stub.requests.values())
+            if mode == "legacy":
+                elapsed = await run_legacy(stub, tokens, args.requests)
+            else:
+                elapsed = await run_provider(stub, tokens, args.requests, 0 if mode == "jwks" else 10000)
+            calls = sum(stub.requests.values()) - before
+            print(f"{mode:<10}{elapsed / args.requests * 1e6:>14.1f}{calls:>20}")
+        print("=" * 70)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,279 @@
+"""
+Benchmark - Débit /ws/gavage sous le simulateur gavage_realtime accéléré
+
+Rejoue le trafic de simulators/gavage_realtime (--nb-lots lots, un gavage
+matin + soir par jour simulé, une connexion WebSocket par message, jour réel
+= 86400 / --acceleration secondes) et mesure les messages/s acquittés :
+
+- legacy:   3 requêtes séquentielles par message (sous-requête code_lot → id),
+            broadcast attendu avant l'ACK
+- pipeline: GavageConsumer + GavageIngestionPipeline (écriture par lots en une
+            transaction, cache des id de lot, broadcast hors chemin de l'ACK)
+
+Sans --database-url, la base est simulée (pool de --pool-size connexions,
+--query-ms par requête + --row-us par ligne) : le gain mesuré est celui des
+allers-retours évités, pas celui de PostgreSQL.
+
+Usage:
+    python scripts/benchmark_gavage_ingestion.py [--nb-lots 200] [--jours 14] [--acceleration 100000000]
+    python scripts/benchmark_gavage_ingestion.py --database-url postgresql://...
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Ajouter app au path
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import asyncpg
+from fastapi import WebSocketDisconnect
+
+from app.services.gavage_ingestion import GavageIngestionPipeline
+from app.websocket.gavage_consumer import GavageConsumer, GavageRealtimeMessage
+from app.websocket.realtime_broadcaster import realtime_broadcaster
+
+# Écriture par message de l'implémentation précédente (GavageConsumer._save_to_database)
+LEGACY_QUERIES = (
+    """
+    INSERT INTO lots_gavage (
+        code_lot, gaveur_id, site_code, genetique, debut_lot,
+        nb_canards_initial, poids_moyen_actuel, taux_mortalite,
+        jour_actuel, pret_abattage, updated_at
+    ) VALUES ($1, $2, $3, $4, CURRENT_DATE, $5, $6, $7, $8, $9, NOW())
+    ON CONFLICT (code_lot) DO UPDATE SET
+        poids_moyen_actuel = EXCLUDED.poids_moyen_actuel,
+        taux_mortalite = EXCLUDED.taux_mortalite,
+        jour_actuel = EXCLUDED.jour_actuel,
+        pret_abattage = EXCLUDED.pret_abattage,
+        updated_at = NOW()
+    """,
+    """
+    INSERT INTO gavage_data_lots (
+        time, lot_gavage_id, jour_gavage, repas,
+        dose_moyenne, dose_theorique, poids_moyen_lot,
+        nb_canards_vivants, nb_canards_morts, taux_mortalite,
+        temperature_stabule, humidite_stabule
+    ) VALUES ($1, (SELECT id FROM lots_gavage WHERE code_lot = $2), $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+    ON CONFLICT (time, lot_gavage_id, repas) DO UPDATE SET
+        dose_moyenne = EXCLUDED.dose_moyenne,
+        dose_theorique = EXCLUDED.dose_theorique,
+        poids_moyen_lot = EXCLUDED.poids_moyen_lot,
+        nb_canards_vivants = EXCLUDED.nb_canards_vivants,
+        nb_canards_morts = EXCLUDED.nb_canards_morts,
+        taux_mortalite = EXCLUDED.taux_mortalite
+    """,
+    """
+    INSERT INTO doses_journalieres (
+        time, code_lot, jour, moment, dose_theorique, dose_reelle,
+        poids_moyen, nb_vivants, taux_mortalite, temperature, humidite
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+    ON CONFLICT (time, code_lot, jour, moment) DO UPDATE SET
+        dose_reelle = EXCLUDED.dose_reelle,
+        poids_moyen = EXCLUDED.poids_moyen,
+        nb_vivants = EXCLUDED.nb_vivants,
+        taux_mortalite = EXCLUDED.taux_mortalite,
+        temperature = EXCLUDED.temperature,
+        humidite = EXCLUDED.humidite
+    """,
+)
+
+
+class SimulatedConnection:
+    """Une requête = query_ms + row_us par ligne transmise (tableaux unnest)"""
+
+    def __init__(self, query_s: float, row_s: float):
+        self.query_s = query_s
+        self.row_s = row_s
+
+    def _cost(self, args) -> float:
+        rows = len(args[0]) if args and isinstance(args[0], list) else 1
+        return self.query_s + self.row_s * rows
+
+    def transaction(self):
+        conn = self
+
+        class _Tx:
+            async def __aenter__(self):
+                await asyncio.sleep(conn.query_s)  # BEGIN
+
+            async def __aexit__(self, *exc):
+                await asyncio.sleep(conn.query_s)  # COMMIT
+                return False
+
+        return _Tx()
+
+    async def execute(self, query, *args):
+        await asyncio.sleep(self._cost(args))
+
+    async def fetch(self, query, *args):
+        await asyncio.sleep(self._cost(args))
+        return [{"id": i + 1, "code_lot": code} for i, code in enumerate(args[0])]
+
+
+class SimulatedPool:
+    def __init__(self, size: int, query_s: float, row_s: float):
+        self._slots = asyncio.Semaphore(size)
+        self._conn = SimulatedConnection(query_s, row_s)
+
+    def acquire(self):
+        pool = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                await pool._slots.acquire()
+                return pool._conn
+
+            async def __aexit__(self, *exc):
+                pool._slots.release()
+                return False
+
+        return _Ctx()
+
+
+class SimulatorWebSocket:
+    """Connexion du simulateur : un message puis fermeture"""
+
+    def __init__(self, message: dict, acks: list):
+        self.message = message
+        self.acks = acks
+
+    async def receive_json(self):
+        if self.message is None:
+            raise WebSocketDisconnect()
+        message, self.message = self.message, None
+        return message
+
+    async def send_json(self, payload):
+        if payload.get("type") == "ack":
+            self.acks.append(time.perf_counter())
+
+
+def simulator_rounds(nb_lots: int, jours: int):
+    """Messages des gavages matin/soir, comme GavageSimulator.effectuer_gavages"""
+    rng = random.Random(42)
+    lots = [
+        {"code_lot": f"{site}2610{i:04d}", "gaveur_id": 1 + i % 5, "site": site,
+         "genetique": rng.choice(["Mulard", "Mulard", "Mulard", "Barbarie", "Pékin"]),
+         "vivants": rng.randint(45, 55), "poids": 4400.0}
+        for i, site in ((i, ("LL", "LS", "MT")[i % 3]) for i in range(nb_lots))
+    ]
+    t0 = datetime(2026, 10, 1, 8, 0, 0)
+    for jour in range(jours):
+        for moment, heure in (("matin", 0), ("soir", 10)):
+            messages = []
+            for lot in lots:
+                lot["poids"] += rng.uniform(40, 90)
+                dose = 250.0 + 20 * jour
+                messages.append({
+                    "code_lot": lot["code_lot"], "gaveur_id": lot["gaveur_id"], "gaveur_nom": "Bench",
+                    "site": lot["site"], "genetique": lot["genetique"], "jour": jour, "moment": moment,
+                    "dose_theorique": dose, "dose_reelle": round(dose * rng.uniform(0.95, 1.05), 1),
+                    "poids_moyen": round(lot["poids"], 1), "nb_canards_vivants": lot["vivants"],
+                    "taux_mortalite": 1.0, "temperature_stabule": 21.0, "humidite_stabule": 65.0,
+                    "timestamp": (t0 + timedelta(days=jour, hours=heure)).isoformat(),
+                    "pret_abattage": jour == jours - 1 and moment == "soir",
+                })
+            yield messages
+
+
+async def legacy_process(pool, data: dict, ws, broadcast_s: float):
+    """Ancien _process_gavage_message : 3 requêtes, broadcast, puis ACK"""
+    m = GavageRealtimeMessage(**data)
+    ts = datetime.fromisoformat(m.timestamp)
+    async with pool.acquire() as conn:
+        await conn.execute(LEGACY_QUERIES[0], m.code_lot, m.gaveur_id, m.site, m.genetique,
+                           m.nb_canards_vivants, m.poids_moyen, m.taux_mortalite, m.jour, m.pret_abattage or False)
+        await conn.execute(LEGACY_QUERIES[1], ts, m.code_lot, m.jour, m.moment, m.dose_reelle, m.dose_theorique,
+                           m.poids_moyen, m.nb_canards_vivants, 0, m.taux_mortalite,
+                           m.temperature_stabule, m.humidite_stabule)
+        if m.jour >= 0:
+            await conn.execute(LEGACY_QUERIES[2], ts, m.code_lot, m.jour, m.moment, m.dose_theorique,
+                               m.dose_reelle, m.poids_moyen, m.nb_canards_vivants, m.taux_mortalite,
+                               m.temperature_stabule, m.humidite_stabule)
+    await asyncio.sleep(broadcast_s)
+    await ws.send_json({"type": "ack"})
+
+
+async def run_mode(mode: str, args) -> dict:
+    if args.database_url:
+        pool = await asyncpg.create_pool(args.database_url, min_size=args.pool_size, max_size=args.pool_size)
+    else:
+        pool = SimulatedPool(args.pool_size, args.query_ms / 1000, args.row_us / 1e6)
+
+    broadcast_s = args.broadcast_ms / 1000
+
+    async def broadcast(message):
+        await asyncio.sleep(broadcast_s)
+
+    realtime_broadcaster.broadcast_gavage_data = broadcast
+
+    pipeline = GavageIngestionPipeline(pool, batch_size=args.batch_size)
+    consumer = GavageConsumer()
+    consumer.ingestion = pipeline
+    consumer._notify_kpi_snapshot = lambda gavage_data: None
+    consumer._trigger_sqal_quality_control = broadcast
+    if mode == "pipeline":
+        await pipeline.start()
+
+    acks, connexions = [], []
+    demi_journee = 86400 / args.acceleration / 2
+    started = time.perf_counter()
+    for messages in simulator_rounds(args.nb_lots, args.jours):
+        for data in messages:
+            ws = SimulatorWebSocket(data, acks)
+            if mode == "pipeline":
+                connexions.append(asyncio.create_task(consumer.receive_gavage_data(ws)))
+            else:
+                connexions.append(asyncio.create_task(legacy_process(pool, ws.message, ws, broadcast_s)))
+            await asyncio.sleep(0)  # connect + send du simulateur
+        await asyncio.sleep(demi_journee)
+    await asyncio.gather(*connexions)
+    elapsed = (max(acks) if acks else time.perf_counter()) - started
+
+    if mode == "pipeline":
+        await pipeline.stop()
+        await consumer.drain_background()
+        print(f"  pipeline: {pipeline.stats()}")
+    if args.database_url:
+        await pool.close()
+    return {"messages": len(acks), "elapsed": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nb-lots", type=int, default=200)
+    parser.add_argument("--jours", type=int, default=14)
+    parser.add_argument("--acceleration", type=float, default=100_000_000, help="comme gavage_realtime --acceleration")
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--query-ms", type=float, default=1.0, help="latence simulée par requête")
+    parser.add_argument("--row-us", type=float, default=20.0, help="coût simulé par ligne écrite")
+    parser.add_argument("--broadcast-ms", type=float, default=2.0, help="durée simulée du broadcast")
+    parser.add_argument("--database-url", default=None, help="base réelle (sinon simulée)")
+    parser.add_argument("--verbose", action="store_true", help="garder les logs INFO par message")
+    args = parser.parse_args()
+    if not args.verbose:
+        # L'implémentation legacy rejouée ici ne journalise pas : comparaison à coût de log égal
+        logging.disable(logging.INFO)
+
+    print("=" * 70)
+    target = "base réelle" if args.database_url else f"simulée (requête {args.query_ms} ms, ligne {args.row_us} µs)"
+    total = args.nb_lots * args.jours * 2
+    print(f"{total} messages gavage ({args.nb_lots} lots × {args.jours} j), ×{args.acceleration:g}, {target}")
+    results = {mode: asyncio.run(run_mode(mode, args)) for mode in ("legacy", "pipeline")}
+    print(f"{'Mode':<12}{'messages':>10}{'durée (s)':>12}{'msg/s':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<12}{r['messages']:>10}{r['elapsed']:>12.2f}{r['messages'] / r['elapsed']:>12.0f}")
+    print(f"Gain: {results['legacy']['elapsed'] / results['pipeline']['elapsed']:.1f}x")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
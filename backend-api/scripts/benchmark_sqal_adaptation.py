@@ -0,0 +1,98 @@
+"""
+Micro-benchmark - Adaptation payload SQAL (SensorsConsumer._adapt_simulator_data)
+
+Compare le coût par message:
+- legacy: list comprehensions Python élément par élément
+- numpy:  une opération vectorisée pour toutes les matrices VL53L8CH
+
+Résolutions: 8x8 (VL53L8CH), 16x16 et 32x32.
+
+Usage:
+    python scripts/benchmark_sqal_adaptation.py [--iterations 2000]
+"""
+
+import argparse
+import copy
+import random
+import sys
+import timeit
+from pathlib import Path
+
+# Ajouter app au path
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from app.websocket.sqal_payload_adapter import adapt_simulator_payload
+
+
+def make_payload(resolution: int) -> dict:
+    """Payload plat tel qu'envoyé par le simulateur (valeurs float, hors bornes parfois)"""
+    def matrix(lo: float, hi: float):
+        return [[random.uniform(lo, hi) for _ in range(resolution)] for _ in range(resolution)]
+
+    vl53 = {
+        "distance_matrix": matrix(-20.0, 4100.0),
+        "reflectance_matrix": matrix(0.0, 300.0),
+        "amplitude_matrix": matrix(0.0, 5000.0),
+        "status_matrix": matrix(0.0, 255.0),
+        "ambient_matrix": matrix(0.0, 4200.0),
+        "volume_mm3": 650000.0,
+        "surface_uniformity": 0.9,
+        "quality_score": 0.88,
+        "grade": "A (premium)",
+    }
+
+    return {
+        "sample_id": "BENCH",
+        "device_id": "ESP32_LL_01",
+        "timestamp": "2026-01-01T00:00:00",
+        "vl53l8ch": vl53,
+        "as7341": {
+            "channels": {"F1_415nm": 1, "F2_445nm": 1, "F3_480nm": 1, "F4_515nm": 1, "F5_555nm": 1,
+                         "F6_590nm": 1, "F7_630nm": 1, "F8_680nm": 1, "Clear": 1, "NIR": 1},
+            "freshness_index": 0.9, "fat_quality_index": 0.9, "oxidation_index": 0.1,
+            "quality_score": 0.9, "grade": "A",
+        },
+        "fusion": {"final_score": 0.9, "final_grade": "REJET"},
+    }
+
+
+def bench(payload: dict, vectorized: bool, iterations: int) -> float:
+    """Coût moyen par message en microsecondes"""
+    # fusion est modifié en place par l'adaptation → copie fraîche par message
+    payloads = [copy.deepcopy(payload) for _ in range(iterations)]
+    it = iter(payloads)
+    total = timeit.timeit(lambda: adapt_simulator_payload(next(it), vectorized=vectorized), number=iterations)
+    return total / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    random.seed(42)
+
+    print("=" * 70)
+    print("BENCHMARK ADAPTATION PAYLOAD SQAL (µs / message)")
+    print("=" * 70)
+    print(f"{'Cas':<24}{'legacy':>12}{'numpy':>12}{'speedup':>12}")
+
+    for resolution in (8, 16, 32):
+        payload = make_payload(resolution)
+
+        # Sanity check : mêmes matrices raw dans les deux chemins
+        legacy_out = adapt_simulator_payload(copy.deepcopy(payload), vectorized=False)
+        numpy_out = adapt_simulator_payload(copy.deepcopy(payload), vectorized=True)
+        assert legacy_out["vl53l8ch"]["raw"] == numpy_out["vl53l8ch"]["raw"]
+
+        legacy_us = bench(payload, False, args.iterations)
+        numpy_us = bench(payload, True, args.iterations)
+        label = f"{resolution}x{resolution}"
+        print(f"{label:<24}{legacy_us:>12.1f}{numpy_us:>12.1f}{legacy_us / numpy_us:>11.1f}x")
+
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
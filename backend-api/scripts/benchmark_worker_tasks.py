@@ -0,0 +1,128 @@
+"""
+Benchmark - Surcoût par tâche Celery courte (generate_qr_code_async)
+
+Compare, pour N exécutions de generate_qr_code_async :
+- legacy:     asyncio.run() + asyncpg.connect() / close() à chaque tâche
+- persistent: boucle + pool du worker (app.tasks.worker_runtime)
+
+Sans --database-url, la base est simulée (connexion avec latence
+--connect-ms, requête avec latence --query-ms) : le surcoût mesuré est celui
+de la boucle et de l'établissement de connexion, pas celui de PostgreSQL.
+
+Usage:
+    python scripts/benchmark_worker_tasks.py [--tasks 500] [--connect-ms 8] [--query-ms 1]
+    python scripts/benchmark_worker_tasks.py --database-url postgresql://... --lot-id 1 --sample-id S1
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Ajouter app au path
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import asyncpg
+
+from app.tasks import worker_runtime as runtime_module
+from app.tasks.export_tasks import generate_qr_code_async
+from app.tasks.worker_runtime import WorkerRuntime
+
+QR_QUERY = "SELECT * FROM register_consumer_product($1, $2, $3)"
+
+
+class SimulatedConnection:
+    def __init__(self, query_s: float):
+        self.query_s = query_s
+
+    async def fetchrow(self, query, *args):
+        await asyncio.sleep(self.query_s)
+        return {"product_id": f"P-{args[0]}", "qr_code": f"SQAL-{args[0]}-{args[1]}-{args[2]}" + "0" * 48}
+
+    async def close(self):
+        await asyncio.sleep(0)
+
+
+class SimulatedPool(SimulatedConnection):
+    def get_size(self):
+        return 1
+
+
+def make_connect(args):
+    if args.database_url:
+        return lambda: asyncpg.connect(args.database_url)
+
+    async def connect():
+        await asyncio.sleep(args.connect_ms / 1000)
+        return SimulatedConnection(args.query_ms / 1000)
+    return connect
+
+
+def make_pool_factory(args):
+    if args.database_url:
+        return asyncpg.create_pool
+
+    async def create_pool(dsn, min_size, max_size):
+        await asyncio.sleep(args.connect_ms / 1000 * min_size)
+        return SimulatedPool(args.query_ms / 1000)
+    return create_pool
+
+
+def run_legacy(args) -> float:
+    """Reproduit l'ancienne implémentation de generate_qr_code_async"""
+    connect = make_connect(args)
+
+    async def generate_qr():
+        conn = await connect()
+        result = await conn.fetchrow(QR_QUERY, args.lot_id, args.sample_id, args.site_code)
+        await conn.close()
+        return result
+
+    started = time.perf_counter()
+    for _ in range(args.tasks):
+        asyncio.run(generate_qr())
+    return time.perf_counter() - started
+
+
+def run_persistent(args) -> float:
+    runtime = WorkerRuntime(database_url=args.database_url, pool_factory=make_pool_factory(args))
+    runtime_module.worker_runtime = runtime
+    runtime.start()  # worker_process_init
+    try:
+        started = time.perf_counter()
+        for _ in range(args.tasks):
+            generate_qr_code_async.run(args.lot_id, args.sample_id, args.site_code)
+        return time.perf_counter() - started
+    finally:
+        print(f"  runtime: {runtime.stats()}")
+        runtime.stop()  # worker_process_shutdown
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--connect-ms", type=float, default=8.0, help="latence simulée connexion + auth")
+    parser.add_argument("--query-ms", type=float, default=1.0, help="latence simulée register_consumer_product")
+    parser.add_argument("--database-url", default=None, help="base réelle (sinon simulée)")
+    parser.add_argument("--lot-id", type=int, default=1)
+    parser.add_argument("--sample-id", default="BENCH-1")
+    parser.add_argument("--site-code", default="LL")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    target = "base réelle" if args.database_url else f"simulée (connect {args.connect_ms} ms, requête {args.query_ms} ms)"
+    print(f"{args.tasks} × generate_qr_code_async, {target}")
+    results = {}
+    for mode, runner in (("legacy", run_legacy), ("persistent", run_persistent)):
+        results[mode] = runner(args)
+    print(f"{'Mode':<12}{'ms/tâche':>12}")
+    for mode, elapsed in results.items():
+        print(f"{mode:<12}{elapsed / args.tasks * 1e3:>12.2f}")
+    print(f"Gain: {results['legacy'] / results['persistent']:.1f}x")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
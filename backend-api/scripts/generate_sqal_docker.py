@@ -146,7 +146,7 @@ async def generate_sqal_for_lot(conn, lot_id, code_lot, itm, sigma, nb_samples):
                 $9, $10, $11,
                 $12, $13, $14, $15
             )
-            ON CONFLICT (sample_id) DO NOTHING
+            ON CONFLICT DO NOTHING
             """,
             sample_date,
             sample_id,
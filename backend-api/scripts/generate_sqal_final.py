@@ -149,7 +149,7 @@ async def main():
                         $16, $17,
                         $18, $19
                     )
-                    ON CONFLICT (sample_id) DO NOTHING
+                    ON CONFLICT DO NOTHING
                 """,
                     sample_time, sample_id, device_id, lot_id,
                     json.dumps(distance_matrix), json.dumps(reflectance_matrix), json.dumps(amplitude_matrix),
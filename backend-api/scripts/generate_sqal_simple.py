@@ -145,7 +145,7 @@ async def main():
                         $9, $10, $11,
                         $12, $13, $14, $15
                     )
-                    ON CONFLICT (sample_id) DO NOTHING
+                    ON CONFLICT DO NOTHING
                 """,
                     sample_date,
                     sample_id,
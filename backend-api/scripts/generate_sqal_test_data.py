@@ -356,7 +356,7 @@ async def insert_sqal_samples(conn: asyncpg.Connection, samples: List[Dict[str,
             $27,
             $28, $29, $30, $31
         )
-        ON CONFLICT (sample_id) DO NOTHING
+        ON CONFLICT DO NOTHING
     """
 
     inserted = 0
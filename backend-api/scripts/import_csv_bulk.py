@@ -0,0 +1,484 @@
+"""
+Import en masse (COPY) de l'historique CSV Euralis
+
+Même résultat que scripts/import_csv_real_data.py, sans un aller-retour par
+jour de gavage :
+1. chaque fichier est parsé (processus séparés) en tableaux colonnes :
+   lots + jours (feedTarget_N / feedCornReal_N dépliés, layout CSR
+   day_offsets[i]:day_offsets[i+1] = jours du lot i)
+2. par paquet de lots : COPY dans des tables de staging temporaires,
+   puis fusion ensembliste (INSERT ... SELECT ... ON CONFLICT DO NOTHING)
+   dans gaveurs, lots et gavage_lot_quotidien
+3. chaque paquet validé est inscrit dans import_checkpoints (même
+   transaction) : une relance reprend là où l'import s'est arrêté
+
+Usage:
+    python scripts/import_csv_bulk.py                          # CSV par défaut
+    python scripts/import_csv_bulk.py data/2023 data/2024 --jobs 4
+    python scripts/import_csv_bulk.py data/ --dry-run          # parse seul
+    python scripts/import_csv_bulk.py data/ --force            # ignorer les checkpoints
+"""
+
+import argparse
+import asyncio
+import csv
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ajouter backend-api au path
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import asyncpg
+
+from scripts.import_csv_real_data import (
+    CSV_PATH,
+    DATABASE_URL,
+    get_site,
+    get_souche,
+    parse_date,
+    parse_decimal,
+    parse_int,
+)
+
+# Fix Windows encoding
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+MAX_JOURS = 30  # CHECK jour_gavage <= 30
+
+# (colonne, type SQL) des tables de staging
+LOT_COLUMNS: List[Tuple[str, str]] = [
+    ("code_lot", "TEXT"),
+    ("gaveur", "TEXT"),
+    ("site_origine", "TEXT"),
+    ("souche", "TEXT"),
+    ("nombre_canards", "INTEGER"),
+    ("date_debut", "DATE"),
+    ("duree", "INTEGER"),
+    ("poids_initial", "INTEGER"),
+    ("poids_final", "INTEGER"),
+    ("itm", "NUMERIC"),
+    ("sigma", "NUMERIC"),
+    ("total_corn", "NUMERIC"),
+    ("nb_meg", "INTEGER"),
+    ("poids_foie", "NUMERIC"),
+]
+
+DAY_COLUMNS: List[Tuple[str, str]] = [
+    ("code_lot", "TEXT"),
+    ("date_gavage", "DATE"),
+    ("jour", "INTEGER"),
+    ("dose_reelle", "NUMERIC"),
+    ("dose_theorique", "NUMERIC"),
+]
+
+CHECKPOINT_DDL = """
+    CREATE TABLE IF NOT EXISTS import_checkpoints (
+        file_sha256 TEXT NOT NULL,
+        chunk INTEGER NOT NULL,
+        source TEXT NOT NULL,
+        lots_staged INTEGER NOT NULL,
+        days_staged INTEGER NOT NULL,
+        imported_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (file_sha256, chunk)
+    )
+"""
+
+# ON CONFLICT (email) : deux paquets chargés en parallèle peuvent porter le
+# même nouveau gaveur ; le NOT EXISTS seul ne voit pas l'insert non commité
+# de l'autre transaction (gaveurs_email_key → UniqueViolationError)
+MERGE_GAVEURS_SQL = """
+    INSERT INTO gaveurs (nom, prenom, email, telephone, adresse, actif, created_at)
+    SELECT n.nom, '', lower(replace(n.nom, ' ', '.')) || '@euralis.fr', '', '', true, NOW()
+    FROM (SELECT DISTINCT unnest($1::text[]) AS nom) n
+    WHERE NOT EXISTS (SELECT 1 FROM gaveurs g WHERE g.nom = n.nom)
+    ORDER BY n.nom
+    ON CONFLICT (email) DO NOTHING
+"""
+
+# Lots historiques = terminés ; ORDER BY code_lot : ordre de verrouillage
+# identique entre fichiers ingérés en parallèle (pas de deadlock)
+MERGE_LOTS_SQL = """
+    INSERT INTO lots (
+        code_lot, gaveur_id, site_origine, souche,
+        nombre_canards, date_debut_gavage, date_fin_prevue,
+        duree_gavage_prevue, poids_moyen_initial, poids_moyen_actuel, poids_moyen_final,
+        itm, sigma, total_corn_real_g, nb_meg, poids_foie_moyen_g, statut, created_at
+    )
+    SELECT DISTINCT ON (s.code_lot)
+        s.code_lot, g.id, s.site_origine, s.souche,
+        s.nombre_canards, s.date_debut, s.date_debut + s.duree,
+        s.duree, s.poids_initial, s.poids_initial, s.poids_final,
+        s.itm, s.sigma, s.total_corn, s.nb_meg, s.poids_foie, 'termine', NOW()
+    FROM stage_lots s
+    JOIN LATERAL (
+        SELECT id FROM gaveurs WHERE nom = s.gaveur ORDER BY id LIMIT 1
+    ) g ON true
+    ORDER BY s.code_lot
+    ON CONFLICT (code_lot) DO NOTHING
+"""
+
+# Répartition matin/soir 50/50, écart et valeurs par défaut identiques à
+# import_gavage_history (import_csv_real_data.py)
+MERGE_DAYS_SQL = """
+    INSERT INTO gavage_lot_quotidien (
+        lot_id, date_gavage, jour_gavage,
+        dose_matin_g, dose_soir_g, dose_totale_jour_g,
+        dose_theorique_g, ecart_dose_pct,
+        nb_canards_peses, poids_moyen_mesure_g,
+        temperature_stabule_c, humidite_stabule_pct,
+        suit_courbe_theorique, created_at
+    )
+    SELECT
+        l.id, d.date_gavage, d.jour,
+        COALESCE(d.dose_reelle, d.dose_theorique, 0) * 0.5,
+        COALESCE(d.dose_reelle, d.dose_theorique, 0) * 0.5,
+        COALESCE(d.dose_reelle, d.dose_theorique),
+        d.dose_theorique,
+        CASE WHEN COALESCE(d.dose_theorique, 0) <> 0
+             THEN (COALESCE(d.dose_reelle, 0) - d.dose_theorique) / d.dose_theorique * 100
+             ELSE 0 END,
+        10, 4500 + d.jour * 150,
+        22, 65,
+        CASE WHEN COALESCE(d.dose_theorique, 0) <> 0
+             THEN abs(COALESCE(d.dose_reelle, 0) - d.dose_theorique) < 20
+             ELSE true END,
+        NOW()
+    FROM stage_days d
+    JOIN lots l ON l.code_lot = d.code_lot
+    ORDER BY l.id, d.date_gavage
+    ON CONFLICT (lot_id, date_gavage) DO NOTHING
+"""
+
+
+# ============================================================================
+# Parsing (CSV large → colonnes)
+# ============================================================================
+
+def _empty_columns(columns: List[Tuple[str, str]]) -> Dict[str, list]:
+    return {name: [] for name, _ in columns}
+
+
+def parse_rows(rows) -> Dict[str, Any]:
+    """
+    Déplie les lignes CSV (un lot par ligne) en tableaux colonnes
+
+    Returns:
+        {"lots": {col: [...]}, "days": {col: [...]},
+         "day_offsets": [0, n1, n1+n2, ...], "skipped": [code_lot, ...]}
+    """
+    lots = _empty_columns(LOT_COLUMNS)
+    days = _empty_columns(DAY_COLUMNS)
+    day_offsets = [0]
+    skipped: List[str] = []
+
+    for idx, row in enumerate(rows, 1):
+        code_lot = row.get("Code_lot") or row.get("CodeLot") or f"UNKNOWN_{idx}"
+        date_debut = parse_date(row.get("Debut_du_lot"))
+        if not date_debut:
+            skipped.append(code_lot)
+            continue
+        date_debut = date_debut.date()
+
+        duree = parse_int(row.get("duree_gavage")) or parse_int(row.get("Duree_du_lot")) or 11
+        itm = parse_decimal(row.get("ITM"))
+        dose_totale = parse_decimal(row.get("total_cornReal")) or parse_decimal(row.get("QteTotalTest"))
+
+        if dose_totale and itm:
+            poids_final = 4500 + int(float(dose_totale) / float(itm) * 0.15)
+        else:
+            poids_final = 6500
+
+        lots["code_lot"].append(code_lot)
+        lots["gaveur"].append(row.get("Gaveur") or "INCONNU")
+        lots["site_origine"].append(get_site(row.get("GEO") or "BRETAGNE"))
+        lots["souche"].append(get_souche(row.get("Souche") or ""))
+        lots["nombre_canards"].append(parse_int(row.get("Quantite_accrochee")) or 1000)
+        lots["date_debut"].append(date_debut)
+        lots["duree"].append(duree)
+        lots["poids_initial"].append(4500)
+        lots["poids_final"].append(poids_final)
+        lots["itm"].append(itm)
+        lots["sigma"].append(parse_decimal(row.get("Sigma")))
+        lots["total_corn"].append(dose_totale)
+        lots["nb_meg"].append(parse_int(row.get("Nb_MEG")) or 0)
+        lots["poids_foie"].append(parse_decimal(row.get("Poids_de_foies_moyen")))
+
+        for jour in range(1, min(duree, MAX_JOURS) + 1):
+            dose_reelle = parse_decimal(row.get(f"feedCornReal_{jour}"))
+            dose_theorique = parse_decimal(row.get(f"feedTarget_{jour}"))
+            if dose_reelle is None and dose_theorique is None:
+                continue
+            days["code_lot"].append(code_lot)
+            days["date_gavage"].append(date_debut + timedelta(days=jour - 1))
+            days["jour"].append(jour)
+            days["dose_reelle"].append(dose_reelle)
+            days["dose_theorique"].append(dose_theorique)
+
+        day_offsets.append(len(days["jour"]))
+
+    return {"lots": lots, "days": days, "day_offsets": day_offsets, "skipped": skipped}
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def parse_file(path: str) -> Dict[str, Any]:
+    """Parse un fichier CSV Euralis (';', latin-1) ; exécuté dans un processus worker"""
+    start = time.perf_counter()
+    with open(path, "r", encoding="latin-1", newline="") as f:
+        parsed = parse_rows(csv.DictReader(f, delimiter=";"))
+    parsed["path"] = path
+    parsed["sha256"] = file_sha256(path)
+    parsed["parse_s"] = time.perf_counter() - start
+    return parsed
+
+
+def iter_chunks(parsed: Dict[str, Any], chunk_lots: int):
+    """
+    Découpe un fichier parsé en paquets de `chunk_lots` lots
+
+    Yields:
+        (chunk_index, lot_records, day_records) prêts pour copy_records_to_table
+    """
+    lots, days, offsets = parsed["lots"], parsed["days"], parsed["day_offsets"]
+    nb_lots = len(lots["code_lot"])
+    lot_names = [name for name, _ in LOT_COLUMNS]
+    day_names = [name for name, _ in DAY_COLUMNS]
+
+    for chunk, a in enumerate(range(0, nb_lots, chunk_lots)):
+        b = min(a + chunk_lots, nb_lots)
+        lot_records = list(zip(*(lots[name][a:b] for name in lot_names)))
+        day_records = list(zip(*(days[name][offsets[a]:offsets[b]] for name in day_names)))
+        yield chunk, lot_records, day_records
+
+
+def discover_csv(paths: List[str]) -> List[str]:
+    """Fichiers .csv des chemins donnés (dossiers parcourus récursivement)"""
+    files: List[str] = []
+    for p in paths:
+        path = Path(p)
+        if path.is_dir():
+            files.extend(str(f) for f in sorted(path.rglob("*.csv")))
+        elif path.exists():
+            files.append(str(path))
+        else:
+            print(f"⚠️  Chemin introuvable: {p}")
+    return files
+
+
+# ============================================================================
+# Chargement (COPY + fusion ensembliste)
+# ============================================================================
+
+def _staging_ddl(table: str, columns: List[Tuple[str, str]]) -> str:
+    cols = ", ".join(f"{name} {sql_type}" for name, sql_type in columns)
+    return f"CREATE TEMP TABLE {table} ({cols}) ON COMMIT DROP"
+
+
+def _rowcount(status: str) -> int:
+    """'INSERT 0 42' → 42"""
+    try:
+        return int(status.split()[-1])
+    except (ValueError, IndexError):
+        return 0
+
+
+async def load_chunk(
+    pool: asyncpg.Pool,
+    source: str,
+    sha256: str,
+    chunk: int,
+    lot_records: List[tuple],
+    day_records: List[tuple],
+    retries: int = 3,
+) -> Tuple[int, int]:
+    """
+    COPY d'un paquet dans le staging puis fusion, checkpoint dans la même transaction
+
+    Returns:
+        (lots insérés, jours insérés)
+    """
+    gaveurs = sorted({record[1] for record in lot_records})
+
+    for attempt in range(1, retries + 1):
+        try:
+            async with pool.acquire() as conn:
+                # Gaveurs : idempotent, transaction courte à part
+                await conn.execute(MERGE_GAVEURS_SQL, gaveurs)
+
+                async with conn.transaction():
+                    await conn.execute(_staging_ddl("stage_lots", LOT_COLUMNS))
+                    await conn.execute(_staging_ddl("stage_days", DAY_COLUMNS))
+                    await conn.copy_records_to_table(
+                        "stage_lots", records=lot_records, columns=[n for n, _ in LOT_COLUMNS]
+                    )
+                    await conn.copy_records_to_table(
+                        "stage_days", records=day_records, columns=[n for n, _ in DAY_COLUMNS]
+                    )
+                    lots_inserted = _rowcount(await conn.execute(MERGE_LOTS_SQL))
+                    days_inserted = _rowcount(await conn.execute(MERGE_DAYS_SQL))
+                    await conn.execute(
+                        """
+                        INSERT INTO import_checkpoints (file_sha256, chunk, source, lots_staged, days_staged)
+                        VALUES ($1, $2, $3, $4, $5)
+                        ON CONFLICT (file_sha256, chunk) DO NOTHING
+                        """,
+                        sha256, chunk, source, len(lot_records), len(day_records)
+                    )
+                return lots_inserted, days_inserted
+
+        except asyncpg.exceptions.DeadlockDetectedError:
+            if attempt == retries:
+                raise
+            print(f"⚠️  Deadlock {source}#{chunk}, nouvelle tentative ({attempt}/{retries})")
+            await asyncio.sleep(0.1 * attempt)
+
+
+async def load_file(
+    pool: asyncpg.Pool,
+    parsed: Dict[str, Any],
+    chunk_lots: int,
+    done_chunks: set,
+    semaphore: asyncio.Semaphore,
+) -> Dict[str, int]:
+    """Charge les paquets non encore checkpointés d'un fichier"""
+    stats = {"lots_staged": 0, "days_staged": 0, "lots_inserted": 0, "days_inserted": 0, "chunks_skipped": 0}
+
+    for chunk, lot_records, day_records in iter_chunks(parsed, chunk_lots):
+        if chunk in done_chunks:
+            stats["chunks_skipped"] += 1
+            continue
+        async with semaphore:
+            lots_inserted, days_inserted = await load_chunk(
+                pool, parsed["path"], parsed["sha256"], chunk, lot_records, day_records
+            )
+        stats["lots_staged"] += len(lot_records)
+        stats["days_staged"] += len(day_records)
+        stats["lots_inserted"] += lots_inserted
+        stats["days_inserted"] += days_inserted
+
+    print(
+        f"✅ {parsed['path']}: {stats['lots_inserted']}/{stats['lots_staged']} lots, "
+        f"{stats['days_inserted']}/{stats['days_staged']} jours insérés"
+        + (f" ({stats['chunks_skipped']} paquet(s) déjà importé(s))" if stats["chunks_skipped"] else "")
+    )
+    return stats
+
+
+async def main(
+    paths: List[str],
+    jobs: int = 4,
+    chunk_lots: int = 500,
+    dry_run: bool = False,
+    force: bool = False,
+):
+    """
+    Script principal d'import en masse
+    """
+    print("=" * 80)
+    print("IMPORT EN MASSE CSV → BASE DE DONNÉES (COPY)")
+    print("=" * 80)
+    print()
+
+    files = discover_csv(paths)
+    if not files:
+        print("❌ Aucun fichier CSV à importer")
+        return
+
+    started = time.perf_counter()
+
+    # Parsing parallèle (CPU) : un processus par fichier
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as executor:
+        parsed_files = await asyncio.gather(*(loop.run_in_executor(executor, parse_file, f) for f in files))
+
+    parse_s = time.perf_counter() - started
+    total_lots = sum(len(p["lots"]["code_lot"]) for p in parsed_files)
+    total_days = sum(len(p["days"]["jour"]) for p in parsed_files)
+    for p in parsed_files:
+        print(f"📂 {p['path']}: {len(p['lots']['code_lot'])} lots, {len(p['days']['jour'])} jours"
+              f" ({len(p['skipped'])} skip) en {p['parse_s']:.2f}s")
+    print(f"\n📋 Parsing: {total_lots + total_days} lignes en {parse_s:.2f}s "
+          f"({(total_lots + total_days) / max(parse_s, 1e-9):,.0f} lignes/s)\n")
+
+    if dry_run:
+        print("⚠️  MODE DRY-RUN: Aucune insertion en base")
+        return
+
+    # Fichiers au contenu identique (data/2023 vs data/2024) chargés une seule fois
+    unique: Dict[str, Dict[str, Any]] = {}
+    for p in parsed_files:
+        if p["sha256"] in unique:
+            print(f"⚠️  {p['path']} identique à {unique[p['sha256']]['path']}, skip")
+            continue
+        unique[p["sha256"]] = p
+
+    try:
+        pool = await asyncpg.create_pool(DATABASE_URL, min_size=1, max_size=jobs)
+        print(f"🔌 Connexion DB: OK ({jobs} connexion(s))\n")
+    except Exception as e:
+        print(f"❌ Erreur connexion DB: {e}")
+        return
+
+    try:
+        await pool.execute(CHECKPOINT_DDL)
+
+        done: Dict[str, set] = {sha: set() for sha in unique}
+        if not force:
+            for record in await pool.fetch(
+                "SELECT file_sha256, chunk FROM import_checkpoints WHERE file_sha256 = ANY($1::text[])",
+                list(unique)
+            ):
+                done[record["file_sha256"]].add(record["chunk"])
+
+        load_started = time.perf_counter()
+        semaphore = asyncio.Semaphore(jobs)
+        results = await asyncio.gather(*(
+            load_file(pool, p, chunk_lots, done[sha], semaphore) for sha, p in unique.items()
+        ))
+        load_s = time.perf_counter() - load_started
+    finally:
+        await pool.close()
+
+    staged = sum(r["lots_staged"] + r["days_staged"] for r in results)
+    inserted_lots = sum(r["lots_inserted"] for r in results)
+    inserted_days = sum(r["days_inserted"] for r in results)
+    total_s = time.perf_counter() - started
+
+    print()
+    print("=" * 80)
+    print("RÉSUMÉ IMPORT")
+    print("=" * 80)
+    print(f"✅ Lots insérés: {inserted_lots}")
+    print(f"✅ Jours de gavage insérés: {inserted_days}")
+    print(f"📊 Chargement: {staged} lignes en {load_s:.2f}s ({staged / max(load_s, 1e-9):,.0f} lignes/s)")
+    print(f"⏱️  Total: {total_s:.2f}s ({(total_lots + total_days) / max(total_s, 1e-9):,.0f} lignes/s)")
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Import en masse (COPY) des CSV Euralis")
+    parser.add_argument("paths", nargs="*", default=[CSV_PATH], help="Fichiers ou dossiers CSV")
+    parser.add_argument("--jobs", type=int, default=4, help="Fichiers parsés / paquets chargés en parallèle")
+    parser.add_argument("--chunk-lots", type=int, default=500, help="Lots par transaction (unité de reprise)")
+    parser.add_argument("--dry-run", action="store_true", help="Parser seulement, sans insertion")
+    parser.add_argument("--force", action="store_true", help="Ignorer les checkpoints existants")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = _parse_args()
+    asyncio.run(main(args.paths, args.jobs, args.chunk_lots, args.dry_run, args.force))
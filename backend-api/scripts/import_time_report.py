@@ -0,0 +1,83 @@
+"""
+Rapport de temps d'import au démarrage (python -X importtime)
+
+Importe un module dans un interpréteur neuf et affiche les modules les plus
+coûteux (temps cumulé), ainsi que les piles ML lourdes chargées alors
+qu'elles devraient être différées (app.core.lazy_modules).
+
+Usage:
+    python scripts/import_time_report.py                     # app.main
+    python scripts/import_time_report.py app.api.advanced_routes --top 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+BASE_DIR = Path(__file__).parent.parent
+
+# Ne doivent pas être importés au démarrage de l'API
+HEAVY_MODULES = ("tensorflow", "torch", "whisper", "deap", "prophet", "pysr", "keras")
+
+
+class ImportTiming(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTiming]:
+    """Lignes 'import time: self | cumulative | module' de -X importtime"""
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # en-tête
+        timings.append(ImportTiming(parts[2].strip(), int(parts[0]), int(parts[1])))
+    return timings
+
+
+def measure(module: str, env: Optional[Dict[str, str]] = None) -> List[ImportTiming]:
+    """Importe module dans un sous-processus et renvoie les temps d'import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(BASE_DIR),
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} a échoué:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def heavy_loaded(timings: List[ImportTiming]) -> List[str]:
+    """Piles lourdes (paquets racine) présentes dans les imports"""
+    return sorted({t.module for t in timings if t.module in HEAVY_MODULES})
+
+
+def total_us(timings: List[ImportTiming], module: str) -> int:
+    return next((t.cumulative_us for t in timings if t.module == module), 0)
+
+
+def main(module: str, top: int):
+    timings = measure(module)
+    print(f"⏱️  import {module}: {total_us(timings, module) / 1e6:.2f}s")
+    for t in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        print(f"  {t.cumulative_us / 1e3:10.1f} ms  {t.module}")
+    heavy = heavy_loaded(timings)
+    print(f"Piles lourdes chargées: {', '.join(heavy) if heavy else 'aucune'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temps d'import au démarrage (-X importtime)")
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    main(args.module, args.top)
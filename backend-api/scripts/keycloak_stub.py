@@ -0,0 +1,145 @@
+"""
+Keycloak local de substitution (realm + JWKS) pour tests et benchmarks
+
+Sert, sur 127.0.0.1 (port libre), les deux endpoints lus par le backend :
+- GET /realms/<realm>                                   → public_key (python-keycloak)
+- GET /realms/<realm>/protocol/openid-connect/certs      → JWKS (app/auth/jwks.py)
+
+et signe des tokens RS256 avec ses propres clés (rotation possible).
+
+Usage:
+    with KeycloakStub(realm="gaveurs-production") as stub:
+        token = stub.issue_token({"preferred_username": "jdupont"})
+        stub.jwks_url, stub.requests["certs"]
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+
+def _generate_key() -> Tuple[str, str, Dict[str, Any]]:
+    """(kid, PEM privée, JWK publique)"""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    kid = uuid.uuid4().hex[:16]
+    public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+    public_jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return kid, private_pem, public_jwk
+
+
+class KeycloakStub:
+    """Realm Keycloak minimal servi dans un thread"""
+
+    def __init__(self, realm: str = "gaveurs-production", host: str = "127.0.0.1", latency_s: float = 0.0):
+        self.realm = realm
+        self.latency_s = latency_s
+        self._keys: List[Tuple[str, str, Dict[str, Any]]] = [_generate_key()]
+        self.requests = {"realm": 0, "certs": 0}
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if stub.latency_s:
+                    time.sleep(stub.latency_s)
+                if self.path == f"/realms/{stub.realm}":
+                    stub.requests["realm"] += 1
+                    body = {"realm": stub.realm, "public_key": stub.public_key_b64()}
+                elif self.path == f"/realms/{stub.realm}/protocol/openid-connect/certs":
+                    stub.requests["certs"] += 1
+                    body = {"keys": [public for _, _, public in stub._keys]}
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                payload = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, 0), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def issuer(self) -> str:
+        return f"{self.url}/realms/{self.realm}"
+
+    @property
+    def jwks_url(self) -> str:
+        return f"{self.issuer}/protocol/openid-connect/certs"
+
+    @property
+    def current_kid(self) -> str:
+        return self._keys[-1][0]
+
+    def public_key_b64(self) -> str:
+        """Clé publique active au format renvoyé par Keycloak (DER base64, sans en-têtes PEM)"""
+        pem = jwk.construct(self._keys[-1][2], "RS256").to_pem().decode()
+        return "".join(line for line in pem.splitlines() if "-----" not in line)
+
+    def rotate(self) -> str:
+        """Ajoute une nouvelle clé de signature (l'ancienne reste publiée)"""
+        self._keys.append(_generate_key())
+        return self.current_kid
+
+    def issue_token(
+        self,
+        claims: Dict[str, Any],
+        ttl_s: int = 300,
+        kid: Optional[str] = None,
+        issuer: Optional[str] = None,
+    ) -> str:
+        """Token RS256 signé par la clé `kid` (défaut: clé active)"""
+        now = int(time.time())
+        kid = kid or self.current_kid
+        private_pem = next((pem for k, pem, _ in self._keys if k == kid), self._keys[-1][1])
+        payload = {
+            "iss": issuer or self.issuer,
+            "iat": now,
+            "exp": now + ttl_s,
+            "sub": str(uuid.uuid4()),
+            "realm_access": {"roles": ["gaveur"]},
+            **claims,
+        }
+        return jwt.encode(payload, private_pem, algorithm="RS256", headers={"kid": kid})
+
+    def start(self) -> "KeycloakStub":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "KeycloakStub":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,189 @@
+"""
+Unit Tests - Moteur d'alertes ensembliste
+Tests des règles de seuils, des modèles ML par génétique et de l'envoi groupé
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.ml import anomaly_detection
+from app.ml.anomaly_detection import (
+    ALERT_RULES_QUERY,
+    INSERT_ALERTES_QUERY,
+    ML_TRAINING_QUERY,
+    ML_WINDOW_QUERY,
+    SEUILS_DEFAUT,
+    AnomalyDetectionEngine,
+    evaluer_regles,
+)
+from app.models.schemas import AlerteNiveauEnum
+
+NOW = datetime(2026, 10, 17, tzinfo=timezone.utc)
+
+
+def _window_rows(canard_id: int, genetique: str, n: int = 5):
+    return [
+        {
+            "canard_id": canard_id, "genetique": genetique, "time": NOW - timedelta(hours=12 * i),
+            "dose_matin": 300.0 + i, "dose_soir": 320.0, "poids_matin": 5000.0 + 60 * i,
+            "poids_soir": 5060.0 + 60 * i, "temperature_stabule": 21.0,
+            "humidite_stabule": 65.0, "gain_journalier": 60.0,
+        }
+        for i in range(n)
+    ]
+
+
+def _training_rows(n: int = 200, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "dose_matin": rng.normal(300, 20), "dose_soir": rng.normal(320, 20),
+            "poids_matin": rng.normal(5000, 300), "poids_soir": rng.normal(5060, 300),
+            "temperature_stabule": rng.normal(21, 1), "humidite_stabule": rng.normal(65, 3),
+            "gain_journalier": rng.normal(60, 10),
+        }
+        for _ in range(n)
+    ]
+
+
+class FakeConnection:
+    def __init__(self, rules=None, window=None, training=None):
+        self.rules = rules or []
+        self.window = window or []
+        self.training = training or []
+        self.queries = []
+        self.executed = []
+
+    async def fetch(self, query, *args):
+        self.queries.append((query, args))
+        if query == ALERT_RULES_QUERY:
+            return self.rules
+        if query == ML_WINDOW_QUERY:
+            return self.window
+        if query == ML_TRAINING_QUERY:
+            return self.training
+        if query == INSERT_ALERTES_QUERY:
+            return [{"id": 100 + i, "time": NOW} for i in range(len(args[0]))]
+        raise AssertionError(query)
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+
+
+class FakeAcquire:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self):
+        return FakeAcquire(self.conn)
+
+
+@pytest.mark.unit
+class TestAlertEngine:
+    """Tests unitaires pour app.ml.anomaly_detection"""
+
+    def test_01_rules_from_window_row(self):
+        """Test 1: Une ligne de la requête fenêtrée produit les mêmes alertes que les anciens _check_*"""
+        alertes = evaluer_regles({
+            "variation": -160.0,
+            "gain_moyen": 40.0,
+            "temperature": 29.0,
+            "humidite": 80.0,
+            "dose_reelle_totale": 400.0,
+            "dose_theo_totale": 800.0,
+        }, SEUILS_DEFAUT)
+
+        par_type = {a["type"]: a for a in alertes}
+        assert set(par_type) == {
+            "perte_poids_critique", "gain_poids_faible", "temperature_critique",
+            "humidite_hors_zone", "refus_alimentaire"
+        }
+        assert par_type["perte_poids_critique"]["niveau"] == AlerteNiveauEnum.CRITIQUE
+        assert par_type["refus_alimentaire"]["valeur_mesuree"] == 50.0
+        assert par_type["temperature_critique"]["valeur_seuil"] == "15.0-28.0"
+
+        assert evaluer_regles({"variation": 60.0, "gain_moyen": 70.0, "temperature": 21.0,
+                               "humidite": 65.0, "dose_reelle_totale": 800.0,
+                               "dose_theo_totale": 800.0}, SEUILS_DEFAUT) == []
+        assert evaluer_regles({"dose_theo_totale": 0}, SEUILS_DEFAUT) == []
+
+    @pytest.mark.asyncio
+    async def test_02_one_model_per_genetique(self):
+        """Test 2: Deux requêtes pour tout le parc, un modèle entraîné une fois par génétique"""
+        window = _window_rows(1, "mulard") + _window_rows(2, "mulard") + _window_rows(3, "barbarie")
+        window += _window_rows(4, "mulard", n=2)  # < 3 mesures : ignoré
+        conn = FakeConnection(
+            rules=[{"canard_id": 1, "gaveur_id": 7, "genetique": "mulard", "telephone": "+33600000001",
+                    "variation": -200.0, "gain_moyen": None, "temperature": None, "humidite": None,
+                    "dose_reelle_totale": None, "dose_theo_totale": None}],
+            window=window,
+            training=_training_rows(),
+        )
+        engine = AnomalyDetectionEngine(FakePool(conn))
+
+        alertes = await engine.evaluer_alertes()
+        assert [q for q, _ in conn.queries].count(ALERT_RULES_QUERY) == 1
+        trained = sorted(args[0] for q, args in conn.queries if q == ML_TRAINING_QUERY)
+        assert trained == ["barbarie", "mulard"]
+        assert alertes[0]["type"] == "perte_poids_critique"
+        assert alertes[0]["telephone"] == "+33600000001"
+        assert all(a["canard_id"] != 4 for a in alertes)
+
+        conn.queries.clear()
+        await engine.evaluer_alertes()
+        assert not any(q == ML_TRAINING_QUERY for q, _ in conn.queries)
+
+        anomalies = await engine.detect_anomalies_canard(1, window_days=3)
+        assert all(a["type"] == "anomalie_ml" for a in anomalies)
+        window_args = [args for q, args in conn.queries if q == ML_WINDOW_QUERY][-1]
+        assert window_args[:2] == (3, [1])
+
+    @pytest.mark.asyncio
+    async def test_03_bulk_insert_and_grouped_sms(self, monkeypatch):
+        """Test 3: Une insertion, un SMS par gaveur pour ses alertes critiques, une mise à jour"""
+        sent = []
+
+        async def fake_grouped(telephone, alertes, max_lignes=5):
+            sent.append((telephone, alertes))
+            return True
+
+        monkeypatch.setattr(anomaly_detection.sms_service, "send_alertes_critiques_groupees", fake_grouped)
+        conn = FakeConnection()
+        engine = AnomalyDetectionEngine(FakePool(conn))
+
+        def alerte(canard_id, telephone, niveau, seuil):
+            return {"canard_id": canard_id, "telephone": telephone, "type": "t", "niveau": niveau,
+                    "message": f"m{canard_id}", "valeur_mesuree": 1.0, "valeur_seuil": seuil}
+
+        alertes = [
+            alerte(1, "+331", AlerteNiveauEnum.CRITIQUE, -150),
+            alerte(2, "+331", AlerteNiveauEnum.CRITIQUE, "15.0-28.0"),
+            alerte(3, "+332", AlerteNiveauEnum.IMPORTANT, -80),
+            alerte(4, "+332", AlerteNiveauEnum.CRITIQUE, None),
+            alerte(5, None, AlerteNiveauEnum.CRITIQUE, None),
+        ]
+        result = await engine.dispatch_alertes(alertes)
+
+        inserts = [args for q, args in conn.queries if q == INSERT_ALERTES_QUERY]
+        assert len(inserts) == 1
+        assert inserts[0][0] == [1, 2, 3, 4, 5]
+        assert inserts[0][1] == ["critique", "critique", "important", "critique", "critique"]
+        assert inserts[0][5] == [-150.0, None, -80.0, None, None]
+
+        assert sorted(sent) == [("+331", [(1, "m1"), (2, "m2")]), ("+332", [(4, "m4")])]
+        assert len(conn.executed) == 1
+        assert sorted(conn.executed[0][1][0]) == [100, 101, 103]
+        assert result == {"alertes_enregistrees": 5, "sms_envoyes": 2}
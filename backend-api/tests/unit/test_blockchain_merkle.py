@@ -0,0 +1,206 @@
+"""
+Unit Tests - Blocs signés par lot (arbre de Merkle)
+Tests de app.blockchain.merkle et du mode batch de GaveursBlockchain
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from Crypto.PublicKey import RSA
+
+from app.blockchain import blockchain_service, verification
+from app.blockchain.blockchain_service import Block, GaveursBlockchain
+from app.blockchain.merkle import construire_arbre, racine_depuis_preuve, verifier_preuve
+from app.blockchain.verification import ChainVerifier
+
+KEYS = {gaveur_id: RSA.generate(1024) for gaveur_id in (1, 2)}
+
+
+class FakeConnection:
+    """Table blockchain + blockchain_merkle_batches en mémoire"""
+
+    def __init__(self):
+        self.blocks = []
+        self.batches = {}
+        self.transactions = 0
+        self.block_inserts = 0
+
+    def transaction(self):
+        conn = self
+
+        class _Tx:
+            async def __aenter__(self):
+                conn.transactions += 1
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Tx()
+
+    async def fetch(self, query, *args):
+        if "INSERT INTO blockchain_merkle_batches" in query:
+            rows = []
+            for gaveur_id, root, signature, nb in zip(*args):
+                batch_id = len(self.batches) + 1
+                self.batches[batch_id] = {"root": root, "signature": signature, "nb": nb}
+                rows.append({"id": batch_id, "merkle_root": root})
+            return rows
+        if query is verification.BLOCKS_PAGE_QUERY:
+            ts, index, limit, lag_s = args
+            hashes = {r["hash_actuel"] for r in self.blocks}
+            ordered = [
+                {**r, "hash_predecesseur": r["hash_precedent"] if r["hash_precedent"] in hashes else None}
+                for r in sorted(self.blocks, key=lambda r: (r["timestamp"], r["index"]))
+            ]
+            return [r for r in ordered if ts is None or (r["timestamp"], r["index"]) > (ts, index)][:limit]
+        if query is verification.PUBLIC_KEYS_QUERY:
+            return [{"id": g, "cle_publique_blockchain": KEYS[g].publickey().export_key().decode()} for g in args[0]]
+        raise AssertionError(f"Requête inattendue: {query}")
+
+    async def execute(self, query, *args):
+        assert "unnest" in query, "le mode batch doit insérer le lot en une requête"
+        self.block_inserts += 1
+        for (index, ts, type_evt, canard_id, gaveur_id, abattoir_id, donnees,
+             hash_prec, hash_actuel, batch_id, proof) in zip(*args):
+            self.blocks.append({
+                "index": index, "timestamp": ts.replace(tzinfo=timezone.utc), "type_evenement": type_evt,
+                "canard_id": canard_id, "gaveur_id": gaveur_id, "abattoir_id": abattoir_id,
+                "donnees": donnees, "hash_precedent": hash_prec, "hash_actuel": hash_actuel,
+                "signature_numerique": "", "merkle_batch_id": batch_id, "merkle_proof": proof,
+                "merkle_root": self.batches[batch_id]["root"],
+                "merkle_signature": self.batches[batch_id]["signature"],
+            })
+
+    async def fetchrow(self, query, *args):
+        if query is verification.LATEST_CHECKPOINT_QUERY:
+            return None
+        if query is verification.INSERT_CHECKPOINT_QUERY:
+            return {"id": 1, "created_at": datetime.now(timezone.utc)}
+        if "WHERE b.hash_actuel = $1" in query:
+            return next((r for r in self.blocks if r["hash_actuel"] == args[0]), None)
+        raise AssertionError(f"Requête inattendue: {query}")
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    def acquire(self):
+        pool = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                return pool.conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+def make_chain(pool, **kwargs) -> GaveursBlockchain:
+    """Chaîne initialisée : genesis signé individuellement, déjà en table"""
+    chain = GaveursBlockchain(pool, **kwargs)
+    chain.cles_gaveurs = {g: {"private": k, "public": k.publickey()} for g, k in KEYS.items()}
+    genesis = Block(0, datetime.utcnow(), "genesis", 0, 1, {"version": "test"}, "0")
+    genesis.signer_bloc(KEYS[1])
+    chain.chaine.append(genesis)
+    chain.initialise = True
+    pool.conn.blocks.append({
+        **genesis.to_dict(), "timestamp": genesis.timestamp.replace(tzinfo=timezone.utc),
+        "donnees": json.dumps(genesis.donnees), "merkle_batch_id": None, "merkle_signature": None,
+    })
+    return chain
+
+
+@pytest.mark.unit
+@pytest.mark.blockchain
+@pytest.mark.asyncio
+class TestBlockchainMerkle:
+    """Tests unitaires pour le mode batch Merkle"""
+
+    async def test_01_merkle_proofs(self):
+        """Test 1: Chaque feuille prouvée vers la racine, toute altération rejetée"""
+        hashes = [f"{i:064x}" for i in range(1, 18)]
+        for n in range(1, len(hashes) + 1):
+            racine, preuves = construire_arbre(hashes[:n])
+            assert all(verifier_preuve(h, p, racine) for h, p in zip(hashes[:n], preuves))
+            assert max(len(p) for p in preuves) <= max(1, (n - 1).bit_length())
+
+        racine, preuves = construire_arbre(hashes)
+        assert not verifier_preuve(hashes[1], preuves[0], racine)        # mauvaise feuille
+        altere = [[c, f"{int(h, 16) ^ 1:064x}"] for c, h in preuves[3]]
+        assert not verifier_preuve(hashes[3], altere, racine)           # frère modifié
+        assert not verifier_preuve(hashes[3], preuves[3], hashes[0])    # autre racine
+        assert not verifier_preuve(hashes[3], [["X", "zz"]], racine)    # preuve malformée
+        assert construire_arbre(list(reversed(hashes)))[0] != racine
+        # Un lot d'un seul bloc : la racine est la feuille
+        assert racine_depuis_preuve(hashes[0], []) == construire_arbre(hashes[:1])[0]
+
+    async def test_02_group_commit(self, monkeypatch):
+        """Test 2: Événements concurrents → une signature par gaveur, un INSERT multi-lignes"""
+        signatures = []
+        real_signer = blockchain_service.signer_racine
+        monkeypatch.setattr(blockchain_service, "signer_racine",
+                            lambda racine, cle: signatures.append(racine) or real_signer(racine, cle))
+
+        pool = FakePool()
+        chain = make_chain(pool, batch_window_ms=20, batch_max=1000)
+
+        blocs = await asyncio.gather(*(
+            chain.ajouter_evenement_gavage(canard_id=100 + i % 5, gaveur_id=1 + i % 2,
+                                           donnees_gavage={"dose_matin": 200 + i, "dose_soir": 210})
+            for i in range(40)
+        ))
+        assert len(signatures) == 2 and chain.lots_enregistres == 1
+        assert pool.conn.transactions == 1 and pool.conn.block_inserts == 1
+        assert len(pool.conn.blocks) == 41 and len(pool.conn.batches) == 2
+        assert [b.index for b in blocs] == list(range(1, 41))
+        assert all(b.verifier_signature(KEYS[b.gaveur_id].publickey()) for b in blocs)
+        assert not blocs[0].verifier_signature(KEYS[2].publickey())
+        assert (await chain.verifier_integrite_chaine())["valide"]
+
+        # Lot plein : vidé sans attendre la fenêtre
+        chain = make_chain(FakePool(), batch_window_ms=60_000, batch_max=3)
+        await asyncio.wait_for(asyncio.gather(*(
+            chain.ajouter_evenement_pesee(canard_id=101, gaveur_id=1, poids=4200.0 + i, session="matin")
+            for i in range(3)
+        )), timeout=5)
+        assert chain.lots_enregistres == 1
+
+        # Mode désactivé : signature individuelle, comme avant
+        chain = make_chain(FakePool(), batch_window_ms=0)
+        chain._sauvegarder_bloc = lambda bloc: asyncio.sleep(0)
+        bloc = await chain.ajouter_evenement_gavage(canard_id=101, gaveur_id=1, donnees_gavage={"dose_matin": 1})
+        assert bloc.merkle_root is None and bloc.verifier_signature(KEYS[1].publickey())
+
+    async def test_03_persisted_batches_verified_per_event(self):
+        """Test 3: Audit de la chaîne persistée et vérification produit par preuve Merkle"""
+        pool = FakePool()
+        chain = make_chain(pool, batch_window_ms=10)
+        await asyncio.gather(*(
+            chain.ajouter_evenement_consumer_product(
+                product_id=f"PROD_{i:03d}", lot_id=7, gaveur_id=1 + i % 2,
+                donnees_produit={"site_code": "LL", "sqal_grade": "A"},
+            )
+            for i in range(12)
+        ))
+
+        verifier = ChainVerifier(pool, workers=0, batch_size=5, secret="s")
+        result = await verifier.verifier(complet=True)
+        assert result["valide"] and result["blocs_verifies"] == 13
+        assert result["signatures_non_verifiables"] == 0
+
+        produit = next(r for r in pool.conn.blocks if r["index"] == 5)
+        result = await chain.verifier_product_blockchain(produit["hash_actuel"])
+        assert result["valid"] and result["merkle"]["root"] == produit["merkle_root"]
+        assert verifier_preuve(produit["hash_actuel"], result["merkle"]["proof"], result["merkle"]["root"])
+
+        # Preuve remplacée : le produit n'est plus rattaché au lot signé
+        produit["merkle_proof"] = json.dumps([["D", "0" * 64]])
+        result = await chain.verifier_product_blockchain(produit["hash_actuel"])
+        assert not result["valid"] and "Merkle" in result["error"]
+        result = await verifier.verifier(complet=True)
+        assert result["erreurs"] == ["Bloc 5: Preuve Merkle invalide"]
@@ -0,0 +1,294 @@
+"""
+Unit Tests - Vérification incrémentale de la blockchain
+Tests de ChainVerifier : checkpoints signés, détection d'altérations, pool de processus, plage d'un canard
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from Crypto.PublicKey import RSA
+
+from app.blockchain import verification
+from app.blockchain.blockchain_service import Block, GaveursBlockchain
+from app.blockchain.verification import ChainVerifier
+
+KEYS = {gaveur_id: RSA.generate(1024) for gaveur_id in (1, 2)}
+T0 = datetime.utcnow().replace(microsecond=0) - timedelta(days=30)  # blocs plus vieux que le délai de validation
+
+
+def make_blocks(n, start=0, precedent="0", t0=T0):
+    """Blocs signés au format de la table blockchain (timestamp UTC aware)"""
+    rows = []
+    for i in range(start, start + n):
+        gaveur_id = 1 + i % 2
+        bloc = Block(
+            index=i,
+            timestamp=t0 + timedelta(minutes=i),
+            type_evenement="genesis" if i == 0 else "gavage",
+            canard_id=0 if i == 0 else 100 + i % 3,
+            gaveur_id=gaveur_id,
+            donnees={"dose_matin": 200 + i, "dose_soir": 210 + i},
+            hash_precedent=precedent,
+        )
+        bloc.signer_bloc(KEYS[gaveur_id])
+        precedent = bloc.hash_actuel
+        rows.append({
+            "index": bloc.index,
+            "timestamp": bloc.timestamp.replace(tzinfo=timezone.utc),
+            "type_evenement": bloc.type_evenement,
+            "canard_id": bloc.canard_id,
+            "gaveur_id": bloc.gaveur_id,
+            "abattoir_id": None,
+            "donnees": json.dumps(bloc.donnees),
+            "hash_precedent": bloc.hash_precedent,
+            "hash_actuel": bloc.hash_actuel,
+            "signature_numerique": bloc.signature_numerique,
+            "merkle_proof": None,
+            "merkle_root": None,
+            "merkle_signature": None,
+        })
+    return rows
+
+
+class FakeConnection:
+    """Tables blockchain / blockchain_checkpoints / gaveurs en mémoire"""
+
+    def __init__(self):
+        self.blocks = []
+        self.checkpoints = []
+        self.pages = 0
+
+    def _ordered(self):
+        """Blocs dans l'ordre (timestamp, index), avec le hash de leur prédécesseur (LATERAL)"""
+        hashes = {r["hash_actuel"] for r in self.blocks}
+        return [
+            {**r, "hash_predecesseur": r["hash_precedent"] if r["hash_precedent"] in hashes else None}
+            for r in sorted(self.blocks, key=lambda r: (r["timestamp"], r["index"]))
+        ]
+
+    async def fetch(self, query, *args):
+        if query is verification.BLOCKS_PAGE_QUERY:
+            self.pages += 1
+            ts, index, limit, lag_s = args
+            horizon = datetime.now(timezone.utc) - timedelta(seconds=lag_s)
+            rows = [r for r in self._ordered() if (ts is None or (r["timestamp"], r["index"]) > (ts, index))
+                    and r["timestamp"] <= horizon]
+            return rows[:limit]
+        if query is verification.PUBLIC_KEYS_QUERY:
+            return [{"id": g, "cle_publique_blockchain": KEYS[g].publickey().export_key().decode()}
+                    for g in args[0] if g in KEYS]
+        if query is verification.CANARD_BLOCKS_QUERY:
+            canard_id, index_min, index_max = args
+            return [
+                r for r in self._ordered()
+                if r["canard_id"] == canard_id
+                and (index_min is None or r["index"] >= index_min)
+                and (index_max is None or r["index"] <= index_max)
+            ]
+        raise AssertionError(f"Requête inattendue: {query}")
+
+    async def fetchrow(self, query, *args):
+        if query is verification.LATEST_CHECKPOINT_QUERY:
+            return self.checkpoints[-1] if self.checkpoints else None
+        if query is verification.INSERT_CHECKPOINT_QUERY:
+            columns = ("hauteur", "dernier_timestamp", "dernier_index", "dernier_hash", "hash_cumul",
+                       "signature", "complet", "blocs_verifies", "duree_s")
+            row = {"id": len(self.checkpoints) + 1, "created_at": datetime.now(timezone.utc), **dict(zip(columns, args))}
+            self.checkpoints.append(row)
+            return row
+        raise AssertionError(f"Requête inattendue: {query}")
+
+    async def fetchval(self, query, *args):
+        assert query is verification.BLOCK_HASH_QUERY
+        return next((r["hash_actuel"] for r in self.blocks if (r["timestamp"], r["index"]) == args), None)
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    def acquire(self):
+        pool = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                return pool.conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+@pytest.mark.unit
+@pytest.mark.blockchain
+@pytest.mark.asyncio
+class TestBlockchainVerification:
+    """Tests unitaires pour app.blockchain.verification"""
+
+    async def test_01_incremental_from_signed_checkpoint(self):
+        """Test 1: Audit → checkpoint signé ; reprise sur les seuls nouveaux blocs ; checkpoint falsifié ignoré"""
+        pool = FakePool()
+        pool.conn.blocks = make_blocks(30)
+        verifier = ChainVerifier(pool, workers=0, batch_size=7, secret="test-secret")
+
+        result = await verifier.verifier()
+        assert result["valide"] and result["blocs_verifies"] == 30 and result["segments"] == 1
+        assert result["checkpoint"]["hauteur"] == 30 and pool.conn.pages == 5
+
+        # Nouveaux blocs + segment ouvert par un genesis après redémarrage
+        pool.conn.blocks += make_blocks(5, start=30, precedent=pool.conn.blocks[-1]["hash_actuel"])
+        pool.conn.blocks += make_blocks(3, start=0, t0=T0 + timedelta(days=1))
+        pool.conn.pages = 0
+
+        result = await verifier.verifier()
+        assert result["valide"] and result["depuis_checkpoint"]
+        assert result["nouveaux_blocs_verifies"] == 8 and result["blocs_verifies"] == 38
+        assert result["segments"] == 1 and pool.conn.pages == 2
+        assert pool.conn.checkpoints[-1]["hauteur"] == 38
+
+        # Rien de nouveau : pas de checkpoint supplémentaire
+        result = await verifier.verifier()
+        assert result["valide"] and result["nouveaux_blocs_verifies"] == 0 and result["checkpoint"] is None
+
+        # Checkpoint signé avec une autre clé → reprise impossible, vérification depuis le début
+        forged = ChainVerifier(pool, workers=0, batch_size=7, secret="autre-secret")
+        result = await forged.verifier()
+        assert not result["depuis_checkpoint"] and result["nouveaux_blocs_verifies"] == 38
+
+        # Sans secret : checkpoints existants ignorés, aucun nouveau checkpoint écrit
+        nb_checkpoints = len(pool.conn.checkpoints)
+        sans_secret = ChainVerifier(pool, workers=0, batch_size=7, secret="")
+        result = await sans_secret.verifier()
+        assert result["valide"] and not result["depuis_checkpoint"] and result["nouveaux_blocs_verifies"] == 38
+        assert result["checkpoint"] is None and len(pool.conn.checkpoints) == nb_checkpoints
+
+    async def test_02_tampering_detected(self):
+        """Test 2: Altération avant checkpoint vue par l'audit complet, pas de checkpoint si erreurs"""
+        pool = FakePool()
+        pool.conn.blocks = make_blocks(20)
+        verifier = ChainVerifier(pool, workers=0, batch_size=6, secret="test-secret")
+        assert (await verifier.verifier())["valide"]
+
+        # Données modifiées sans recalcul du hash + signature d'un autre gaveur
+        pool.conn.blocks[4]["donnees"] = json.dumps({"dose_matin": 999, "dose_soir": 214})
+        pool.conn.blocks[9]["signature_numerique"] = pool.conn.blocks[10]["signature_numerique"]
+
+        assert (await verifier.verifier())["valide"]  # incrémentale : rien de nouveau
+        result = await verifier.verifier(complet=True)
+        assert not result["valide"] and result["nb_erreurs"] == 2
+        assert result["erreurs"] == ["Bloc 4: Hash actuel invalide", "Bloc 9: Signature invalide"]
+        assert result["checkpoint"] is None and len(pool.conn.checkpoints) == 1
+
+        # Bloc d'ancrage supprimé → la reprise est refusée
+        pool.conn.blocks.pop()
+        result = await verifier.verifier()
+        assert not result["valide"] and "ancrage" in result["erreurs"][0]
+
+        # Chaîne en mémoire : seuls les blocs ajoutés depuis la dernière vérification sont relus
+        chain = GaveursBlockchain(db_pool=None)
+        chain.cles_gaveurs = {g: {"private": k, "public": k.publickey()} for g, k in KEYS.items()}
+        precedent = "0"
+        for i in range(6):
+            bloc = Block(i, T0 + timedelta(minutes=i), "gavage", 101, 1, {"dose": i}, precedent)
+            bloc.signer_bloc(KEYS[1])
+            chain.chaine.append(bloc)
+            precedent = bloc.hash_actuel
+        assert (await chain.verifier_integrite_chaine())["nouveaux_blocs_verifies"] == 5
+        chain.chaine[2].donnees = {"dose": 42}
+        assert (await chain.verifier_integrite_chaine())["valide"]
+        result = await chain.verifier_integrite_chaine(complet=True)
+        assert result["erreurs"] == ["Bloc 2: Hash actuel invalide"]
+
+    @pytest.mark.slow
+    async def test_03_process_pool_and_canard_range(self):
+        """Test 3: Audit en pool de processus = audit en thread ; plage d'un canard vérifiée seule"""
+        pool = FakePool()
+        pool.conn.blocks = make_blocks(60)
+        pool.conn.blocks[31]["donnees"] = json.dumps({"dose_matin": 0, "dose_soir": 0})
+
+        in_thread = await ChainVerifier(pool, workers=0, batch_size=8, secret="s").verifier(complet=True)
+        verifier = ChainVerifier(pool, workers=2, batch_size=8, secret="s")
+        try:
+            in_pool = await verifier.verifier(complet=True)
+            assert in_pool["erreurs"] == in_thread["erreurs"] == ["Bloc 31: Hash actuel invalide"]
+            assert in_pool["blocs_verifies"] == 60
+
+            # Canard 101 : blocs 1, 4, 7, ... ; le bloc 31 est hors de la plage [40, 59]
+            result = await verifier.verifier_canard(101, index_min=40, index_max=59)
+            assert result["valide"] and result["blocs_verifies"] == 7
+            result = await verifier.verifier_canard(101, index_min=25)
+            assert result["erreurs"] == ["Bloc 31: Hash actuel invalide"]
+            assert result["couvert_par_checkpoint"] is False
+        finally:
+            await verifier.shutdown()
+
+    async def test_04_interleaved_worker_chains(self):
+        """Test 4: Chaînes de plusieurs workers entrelacées dans la table ; bloc supprimé détecté"""
+        pool = FakePool()
+        chaine_a = make_blocks(20)
+        chaine_b = make_blocks(20, t0=T0 + timedelta(seconds=30))  # 2e worker uvicorn
+        pool.conn.blocks = chaine_a + chaine_b
+        verifier = ChainVerifier(pool, workers=0, batch_size=6, secret="test-secret")
+
+        result = await verifier.verifier()
+        assert result["valide"] and result["erreurs"] == []
+        assert result["blocs_verifies"] == 40 and result["segments"] == 2
+        assert result["checkpoint"]["hauteur"] == 40
+
+        # Historique d'un canard : chaque bloc raccordé au prédécesseur de sa propre chaîne
+        result = await verifier.verifier_canard(101, index_min=4, index_max=13)
+        assert result["valide"] and result["blocs_verifies"] == 8  # blocs 4, 7, 10, 13 des deux chaînes
+
+        # Bloc supprimé au milieu de la 2e chaîne : le suivant n'a plus de prédécesseur
+        pool.conn.blocks.remove(chaine_b[10])
+        result = await verifier.verifier(complet=True)
+        assert not result["valide"] and result["erreurs"][0] == "Bloc 11: Chaînage rompu"
+        assert result["nb_erreurs"] == 2 and "plus courte" in result["erreurs"][1]
+
+    async def test_05_daemon_process_uses_threads(self, monkeypatch):
+        """Test 5: Enfant daemon (Celery prefork) : pool de threads au lieu de processus, même résultat"""
+        from concurrent.futures import ThreadPoolExecutor
+        from types import SimpleNamespace
+
+        monkeypatch.setattr(verification.multiprocessing, "current_process", lambda: SimpleNamespace(daemon=True))
+        pool = FakePool()
+        pool.conn.blocks = make_blocks(20)
+        verifier = ChainVerifier(pool, workers=2, batch_size=6, secret="s")
+        try:
+            result = await verifier.verifier(complet=True)
+            assert isinstance(verifier._executor, ThreadPoolExecutor)
+            assert result["valide"] and result["blocs_verifies"] == 20
+        finally:
+            await verifier.shutdown()
+
+    async def test_06_late_commit_not_skipped(self):
+        """Test 6: Bloc validé après un bloc plus récent d'un autre worker : jamais sous un checkpoint"""
+        now = datetime.utcnow()
+        anciens = make_blocks(10)
+        # X (worker 1) horodaté avant Y (genesis du worker 2) mais validé après lui
+        x = make_blocks(1, start=10, precedent=anciens[-1]["hash_actuel"], t0=now - timedelta(minutes=10, seconds=30))
+        y = make_blocks(1, t0=now - timedelta(seconds=10))
+
+        # Sans délai de validation, le checkpoint passe Y et X n'est jamais vérifié
+        pool = FakePool()
+        pool.conn.blocks = anciens + y
+        sans_delai = ChainVerifier(pool, workers=0, batch_size=4, secret="s", commit_lag_s=0)
+        assert (await sans_delai.verifier())["checkpoint"]["hauteur"] == 11
+        pool.conn.blocks += x
+        assert (await sans_delai.verifier())["nouveaux_blocs_verifies"] == 0
+        assert "historique différent" in (await sans_delai.verifier(complet=True))["erreurs"][0]
+
+        # Avec BLOCKCHAIN_VERIFY_COMMIT_LAG_S, les blocs récents attendent la passe suivante
+        pool = FakePool()
+        pool.conn.blocks = anciens + y
+        result = await ChainVerifier(pool, workers=0, batch_size=4, secret="s", commit_lag_s=300).verifier()
+        assert result["checkpoint"]["hauteur"] == 10
+        pool.conn.blocks += x
+
+        plus_tard = ChainVerifier(pool, workers=0, batch_size=4, secret="s", commit_lag_s=0)
+        result = await plus_tard.verifier()
+        assert result["valide"] and result["nouveaux_blocs_verifies"] == 2 and result["blocs_verifies"] == 12
+        result = await plus_tard.verifier(complet=True)
+        assert result["valide"] and result["blocs_verifies"] == 12
@@ -0,0 +1,128 @@
+"""
+Unit Tests - Moteur d'export en flux
+Tests des requêtes sans plafond, de l'écriture CSV/gzip par COPY et du flux HTTP borné
+"""
+
+import asyncio
+import gzip
+import os
+
+import pytest
+
+from app.services import csv_exporter
+from app.services.csv_exporter import build_query, export_to_file, stream_csv
+
+HEADER = b"timestamp;sample_id;lot_id\n"
+
+
+def _chunks(nb_rows: int, rows_per_chunk: int = 100):
+    """Blocs COPY : en-tête puis lignes CSV"""
+    yield HEADER
+    for start in range(0, nb_rows, rows_per_chunk):
+        stop = min(start + rows_per_chunk, nb_rows)
+        yield b"".join(
+            f"2026-10-17 00:00:{i % 60:02d}+00;S-{i};42\n".encode() for i in range(start, stop)
+        )
+
+
+class FakeConnection:
+    """copy_from_query pousse des blocs vers output, comme asyncpg"""
+
+    def __init__(self, nb_rows: int, fail_after: int = None):
+        self.nb_rows = nb_rows
+        self.fail_after = fail_after
+        self.copies = []
+        self.pushed = 0
+
+    async def fetchval(self, sql, *args):
+        return self.nb_rows
+
+    async def copy_from_query(self, sql, *args, output, format, delimiter, header, timeout):
+        self.copies.append((sql, args, format, delimiter, header))
+        for n, chunk in enumerate(_chunks(self.nb_rows)):
+            if self.fail_after is not None and n > self.fail_after:
+                raise ConnectionError("connection lost")
+            await output(chunk)
+            self.pushed += 1
+
+    async def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.released = 0
+
+    async def acquire(self, timeout=None):
+        return self.conn
+
+    async def release(self, conn):
+        self.released += 1
+
+
+@pytest.mark.unit
+class TestCsvExporter:
+    """Tests unitaires pour app.services.csv_exporter"""
+
+    def test_01_queries_have_no_row_cap(self):
+        """Test 1: Plus de LIMIT 200000, filtres numérotés, None ignorés"""
+        sql, args = build_query("sqal", lot_id=42, date_debut=None, date_fin="2026-10-17")
+        assert "LIMIT" not in sql.upper()
+        assert "lot_id = $1" in sql
+        assert "timestamp < $2::timestamptz" in sql
+        assert args == [42, "2026-10-17"]
+
+        sql, args = build_query("feedbacks")
+        assert "WHERE" not in sql and args == []
+
+        with pytest.raises(ValueError):
+            build_query("lots", lot_ids=[])
+        with pytest.raises(ValueError):
+            build_query("everything")
+
+    @pytest.mark.asyncio
+    async def test_02_csv_gzip_file_with_progress(self, tmp_path, monkeypatch):
+        """Test 2: COPY écrit en flux dans un .csv.gz, progression rapportée, pas de fichier partiel"""
+        monkeypatch.setenv("EXPORTS_DIR", str(tmp_path))
+        progress = []
+        conn = FakeConnection(nb_rows=1000)
+
+        sql, args = build_query("sqal", lot_id=42)
+        result = await export_to_file(
+            sql, args, "sqal_export", gzip=True,
+            progress=lambda rows, total: progress.append((rows, total)), conn=conn
+        )
+
+        assert result["rows"] == 1000
+        assert result["path"].endswith(".csv.gz")
+        with gzip.open(result["path"], "rb") as f:
+            content = f.read()
+        assert content.startswith(HEADER)
+        assert content.count(b"\n") == 1001
+        assert conn.copies[0][2:] == ("csv", ";", True)
+        assert progress[-1] == (1000, 1000)
+        assert [rows for rows, _ in progress] == sorted(rows for rows, _ in progress)
+
+        failing = FakeConnection(nb_rows=1000, fail_after=3)
+        with pytest.raises(ConnectionError):
+            await export_to_file(sql, args, "sqal_export", conn=failing)
+        assert os.listdir(os.path.join(tmp_path, "csv")) == [os.path.basename(result["path"])]
+
+    @pytest.mark.asyncio
+    async def test_03_http_stream_is_bounded(self, monkeypatch):
+        """Test 3: Flux HTTP gzip identique au COPY, file bornée quand le client lit lentement"""
+        monkeypatch.setattr(csv_exporter, "EXPORT_STREAM_QUEUE", 2)
+        conn = FakeConnection(nb_rows=2000)
+        pool = FakePool(conn)
+        sql, args = build_query("gavage")
+
+        stream = stream_csv(pool, sql, args, gzip=True)
+        first = await stream.__anext__()
+        await asyncio.sleep(0.05)
+        # Le producteur est bloqué : au plus la file + un bloc en cours
+        assert conn.pushed <= 2 + 2
+        parts = [first] + [part async for part in stream]
+
+        assert gzip.decompress(b"".join(parts)) == b"".join(_chunks(2000))
+        assert pool.released == 1
@@ -0,0 +1,87 @@
+"""
+Unit Tests - Shared DB pool dependency
+Tests de pooled_connection / acquire_connection (libération, timeout 503, configuration)
+"""
+
+import asyncio
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.db_pool import acquire_connection, acquire_timeout_for, pool_settings, pooled_connection
+
+
+class FakePool:
+    """Pool asyncpg minimal : max_size connexions, acquire bloquant quand saturé"""
+
+    def __init__(self, max_size: int = 2):
+        self.max_size = max_size
+        self.in_use = 0
+        self.acquired = 0
+        self.released = 0
+        self._free = asyncio.Semaphore(max_size)
+
+    async def acquire(self, timeout=None):
+        await asyncio.wait_for(self._free.acquire(), timeout=timeout)
+        self.in_use += 1
+        self.acquired += 1
+        return object()
+
+    async def release(self, conn):
+        self.in_use -= 1
+        self.released += 1
+        self._free.release()
+
+    def get_size(self):
+        return self.max_size
+
+    def get_idle_size(self):
+        return self.max_size - self.in_use
+
+    def get_max_size(self):
+        return self.max_size
+
+
+@pytest.mark.unit
+class TestDBPool:
+    """Tests unitaires pour app.core.db_pool"""
+
+    def test_01_dependency_borrows_and_releases(self):
+        """Test 1: Chaque requête emprunte puis rend une connexion du pool partagé"""
+        app = FastAPI()
+        app.state.db_pool = FakePool()
+        get_db_connection = pooled_connection("euralis")
+
+        @app.get("/kpis")
+        async def kpis(conn=Depends(get_db_connection)):
+            return {"ok": conn is not None}
+
+        client = TestClient(app)
+        for _ in range(5):
+            assert client.get("/kpis").json() == {"ok": True}
+
+        assert app.state.db_pool.acquired == 5
+        assert app.state.db_pool.released == 5
+
+    @pytest.mark.asyncio
+    async def test_02_saturated_pool_returns_503(self):
+        """Test 2: Pool saturé au-delà du timeout → HTTP 503 avec Retry-After"""
+        pool = FakePool(max_size=1)
+        async with acquire_connection(pool, "euralis", timeout=1.0):
+            with pytest.raises(HTTPException) as exc:
+                async with acquire_connection(pool, "euralis", timeout=0.01):
+                    pass
+
+        assert exc.value.status_code == 503
+        assert exc.value.headers["Retry-After"] == "1"
+        assert pool.in_use == 0
+
+    def test_03_settings_from_env(self, monkeypatch):
+        """Test 3: Timeout par router puis global ; statement cache configurable"""
+        monkeypatch.setenv("DB_ACQUIRE_TIMEOUT_S", "4")
+        monkeypatch.setenv("DB_ACQUIRE_TIMEOUT_COURBES_S", "1.5")
+        monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "0")
+
+        assert acquire_timeout_for("courbes") == 1.5
+        assert acquire_timeout_for("euralis") == 4.0
+        assert pool_settings()["statement_cache_size"] == 0
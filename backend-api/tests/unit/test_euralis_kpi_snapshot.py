@@ -0,0 +1,183 @@
+"""
+Unit Tests - Euralis KPI snapshot
+Tests du snapshot matérialisé (lecture sans base, rafraîchissement incrémental par site)
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.euralis_kpi_snapshot import (
+    ALERTES_CRITIQUES_QUERY,
+    EURALIS_SNAPSHOT_CHANNEL,
+    ITM_CHART_QUERY,
+    LOT_STATS_BY_SITE_QUERY,
+    MORTALITE_24H_QUERY,
+    PRODUCTION_CHART_QUERY,
+    EuralisKPISnapshotService,
+)
+
+
+def _day(offset: int):
+    return (datetime.now(timezone.utc) - timedelta(days=offset)).date()
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    async def execute(self, query, *args):
+        self.db.notifications.append(args)
+
+    async def fetchval(self, query, *args):
+        self.db.queries.append(query)
+        return {MORTALITE_24H_QUERY: self.db.mortalite, ALERTES_CRITIQUES_QUERY: self.db.alertes}[query]
+
+    async def fetch(self, query, *args):
+        self.db.queries.append(query)
+        sites = args[-1]
+        rows = {
+            LOT_STATS_BY_SITE_QUERY: self.db.lot_stats,
+            PRODUCTION_CHART_QUERY: self.db.production,
+            ITM_CHART_QUERY: self.db.itm,
+        }[query]
+        return [r for r in rows if sites is None or r["site_code"] in sites]
+
+
+class FakePool:
+    """Base en mémoire : lots, doses, alertes"""
+
+    def __init__(self):
+        self.queries = []
+        self.notifications = []
+        self.lot_stats = [
+            {"site_code": "LL", "production_sqal_kg": None, "production_itm_kg": 700.0, "nb_lots_actifs": 3,
+             "nb_lots_termines": 6, "nb_gaveurs_actifs": 4, "itm_somme": 61.824, "itm_nb": 4,
+             "mortalite_somme": None, "mortalite_nb": 0},
+            {"site_code": "LS", "production_sqal_kg": None, "production_itm_kg": 500.0, "nb_lots_actifs": 1,
+             "nb_lots_termines": 4, "nb_gaveurs_actifs": 2, "itm_somme": 30.912, "itm_nb": 2,
+             "mortalite_somme": None, "mortalite_nb": 0},
+        ]
+        self.mortalite = 1.234
+        self.alertes = 2
+        self.production = [
+            {"site_code": "LL", "date": _day(1), "nb_lots": 1, "production_kg": 100.0},
+            {"site_code": "LS", "date": _day(5), "nb_lots": 2, "production_kg": 250.0},
+            {"site_code": "MT", "date": _day(40), "nb_lots": 1, "production_kg": 90.0},
+        ]
+        self.itm = [
+            {"site_code": "LL", "itm_moyen": 15.0},
+            {"site_code": "LS", "itm_moyen": 16.0},
+        ]
+
+    def acquire(self):
+        pool = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                return FakeConnection(pool)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestEuralisKPISnapshot:
+    """Tests unitaires pour EuralisKPISnapshotService"""
+
+    async def test_01_reads_served_without_queries(self):
+        """Test 1: Après le calcul complet, les lectures ne touchent plus la base"""
+        pool = FakePool()
+        snapshot = EuralisKPISnapshotService(full_refresh_interval=300)
+        assert snapshot.get_kpis() is None
+
+        snapshot.pool = pool
+        await snapshot.refresh_full()
+        executed = len(pool.queries)
+
+        kpis = snapshot.get_kpis()
+        assert kpis["production_totale_kg"] == 1200.0 and kpis["nb_lots_actifs"] == 4
+        assert kpis["itm_moyen_global"] == 15.46
+        assert kpis["mortalite_moyenne_globale"] == 1.23  # repli sur doses 24h
+        assert kpis["nb_alertes_critiques"] == 2
+        assert kpis["stale_after"] == kpis["refreshed_at"] + timedelta(seconds=300)
+        assert [r["site_code"] for r in snapshot.get_production_chart(30)] == ["LL", "LS"]
+        assert snapshot.get_production_chart(365) is None  # hors fenêtre → repli base
+        assert [r["site_code"] for r in snapshot.get_itm_chart()] == ["LL", "LS"]
+        assert len(pool.queries) == executed
+
+    async def test_02_doses_refresh_only_realtime_indicators(self):
+        """Test 2: notify_doses ne relance que mortalité 24h + alertes"""
+        pool = FakePool()
+        snapshot = EuralisKPISnapshotService()
+        snapshot.pool = pool
+        await snapshot.refresh_full()
+        pool.queries.clear()
+        pool.alertes = 5
+
+        snapshot.notify_doses("LL")
+        await snapshot.refresh_incremental()
+
+        assert pool.queries == [MORTALITE_24H_QUERY, ALERTES_CRITIQUES_QUERY]
+        assert snapshot.get_kpis()["nb_alertes_critiques"] == 5
+
+    async def test_03_lot_change_recomputes_only_dirty_site(self):
+        """Test 3: notify_lot_changed remplace les lignes du seul site concerné"""
+        pool = FakePool()
+        snapshot = EuralisKPISnapshotService()
+        snapshot.pool = pool
+        await snapshot.refresh_full()
+
+        pool.production[0] = {"site_code": "LL", "date": _day(0), "nb_lots": 3, "production_kg": 300.0}
+        pool.production[1] = {"site_code": "LS", "date": _day(5), "nb_lots": 9, "production_kg": 999.0}
+        pool.lot_stats[0] = {**pool.lot_stats[0], "production_sqal_kg": 800.0, "nb_lots_actifs": 5}
+        pool.lot_stats[1] = {**pool.lot_stats[1], "nb_lots_actifs": 50}
+        pool.queries.clear()
+        snapshot.notify_lot_changed("LL")
+        await snapshot.refresh_incremental()
+
+        # Agrégats lots du seul site LL, fusionnés avec ceux de LS déjà en mémoire
+        assert pool.queries == [LOT_STATS_BY_SITE_QUERY, PRODUCTION_CHART_QUERY, ITM_CHART_QUERY]
+        kpis = snapshot.get_kpis()
+        assert kpis["nb_lots_actifs"] == 6 and kpis["production_totale_kg"] == 800.0
+
+        rows = {r["site_code"]: r for r in snapshot.get_production_chart(90)}
+        assert rows["LL"]["production_kg"] == 300.0
+        assert rows["LS"]["production_kg"] == 250.0  # site non notifié : inchangé
+        assert rows["MT"]["production_kg"] == 90.0
+        assert snapshot.full_refreshes == 1
+        assert snapshot.incremental_refreshes == 1
+
+    async def test_04_invalidations_shared_between_workers(self):
+        """Test 4: Fenêtre de notifications diffusée (pg_notify) et appliquée par les autres processus"""
+        pool = FakePool()
+        worker_a, worker_b = EuralisKPISnapshotService(), EuralisKPISnapshotService()
+        for snapshot in (worker_a, worker_b):
+            snapshot.pool = pool
+            snapshot._listen_conn = object()  # LISTEN actif
+            await snapshot.refresh_full()
+
+        worker_a.notify_doses("LL")
+        worker_a.notify_lot_changed("LL")
+        worker_a.notify_lot_changed("MT")
+        await worker_a._broadcast_invalidations()
+        await worker_a._broadcast_invalidations()  # rien de nouveau : pas de second pg_notify
+
+        assert len(pool.notifications) == 1
+        channel, payload = pool.notifications[0]
+        assert channel == EURALIS_SNAPSHOT_CHANNEL
+
+        # Le processus émetteur ignore sa propre notification
+        worker_a._on_notify(None, 1, channel, payload)
+        worker_b._on_notify(None, 1, channel, payload)
+        assert worker_a.notifications_received == 0
+        assert worker_b._dirty_sites == {"LL", "MT"} and worker_b._doses_dirty
+
+        pool.queries.clear()
+        await worker_b.refresh_incremental()
+        assert LOT_STATS_BY_SITE_QUERY in pool.queries and MORTALITE_24H_QUERY in pool.queries
+        await worker_b._broadcast_invalidations()
+        assert pool.notifications == [(channel, payload)]  # pas de rediffusion
@@ -105,6 +105,155 @@ class TestProductionForecasting:
 
         print("✅ Test 4: Validation horizons OK")
 
+    def test_05_ets_forecast_intervals(self):
+        """Test 5: ETS (repli sans Prophet) - horizon complet, bornes encadrant la prévision"""
+        try:
+            from app.ml.euralis.production_forecasting import ets_forecast
+        except ImportError as e:
+            pytest.skip(f"ML modules not installed: {e}")
+
+        values = 300 + 2 * np.arange(60) + np.random.RandomState(0).normal(0, 10, 60)
+        result = ets_forecast(values, 30)
+
+        assert len(result['yhat']) == 30
+        assert np.all(result['lower'] <= result['yhat'])
+        assert np.all(result['yhat'] <= result['upper'])
+        # Intervalle qui s'élargit avec l'horizon
+        assert result['upper'][-1] - result['lower'][-1] > result['upper'][0] - result['lower'][0]
+        print("✅ Test 5: Prévision ETS OK")
+
+    def test_06_fit_sites_and_format(self):
+        """Test 6: Entraînement multi-sites puis agrégation au format API"""
+        try:
+            from app.ml.euralis.production_forecasting import fit_sites
+        except ImportError as e:
+            pytest.skip(f"ML modules not installed: {e}")
+        from app.services.production_forecast_store import format_forecasts
+
+        dates = [(datetime(2026, 1, 1) + timedelta(days=i)).date().isoformat() for i in range(20)]
+        history = {
+            'LL': {'dates': dates, 'values': [100.0] * 20},
+            'LS': {'dates': dates, 'values': [200.0] * 20},
+            'MT': {'dates': dates[:5], 'values': [50.0] * 5},  # historique insuffisant
+        }
+
+        results = fit_sites(history, 7, max_workers=1)
+        assert sorted(results) == ['LL', 'LS']
+        assert all(r['method'] == 'ets' for r in results.values())  # < 30 jours → ETS
+
+        rows = [
+            {
+                'site_code': site, 'date_prevision': datetime.fromisoformat(row['date']).date(),
+                'production_foie_kg_prevu': row['yhat'], 'production_min': row['lower'],
+                'production_max': row['upper'], 'confiance_pct': 95.0,
+                'methode': r['method'], 'modele_version': 'fc-test',
+            }
+            for site, r in results.items() for row in r['rows']
+        ]
+        forecasts = format_forecasts(rows)
+
+        assert len(forecasts) == 7
+        assert forecasts[0]['date'] == '2026-01-21'
+        assert forecasts[0]['production_kg'] == pytest.approx(300.0, abs=0.5)
+        assert forecasts[0]['site_code'] == 'ALL'
+        assert forecasts[0]['model'] == 'ETS'
+        print("✅ Test 6: Prévisions multi-sites OK")
+
+    @pytest.mark.asyncio
+    async def test_07_single_site_run_keeps_other_sites_active(self):
+        """Test 7: Ré-entraînement d'un seul site après un run tous sites - les autres restent actifs"""
+        from app.services import production_forecast_store as store
+
+        class FakeConnection:
+            """previsions_production + forecast_active_sites simulées"""
+
+            def __init__(self):
+                self.previsions = []
+                self.active = {}
+
+            def transaction(self):
+                class _Tx:
+                    async def __aenter__(self):
+                        pass
+
+                    async def __aexit__(self, *exc):
+                        return False
+
+                return _Tx()
+
+            async def executemany(self, query, records):
+                self.previsions.extend(records)
+
+            async def execute(self, query, *args):
+                if query is store.ACTIVATE_SITES_QUERY:
+                    self.active.update({site: args[1] for site in args[0]})
+
+            async def fetch(self, query, days, site_code):
+                assert query is store.ACTIVE_FORECASTS_QUERY
+                rows = [
+                    dict(zip(('site_code', 'date_prevision', 'horizon_jours', 'production_foie_kg_prevu',
+                              'production_min', 'production_max', 'confiance_pct', 'methode',
+                              'modele_version'), r))
+                    for r in self.previsions
+                    if self.active.get(r[0]) == r[8] and site_code in (None, r[0])
+                ]
+                return sorted(rows, key=lambda r: (r['date_prevision'], r['site_code']))
+
+        def run(values):
+            day = (datetime.now() + timedelta(days=1)).date().isoformat()
+            return {
+                site: {'method': 'ets', 'rows': [{'date': day, 'yhat': v, 'lower': v - 10, 'upper': v + 10}]}
+                for site, v in values.items()
+            }
+
+        conn = FakeConnection()
+        await store.save_forecast_run(conn, run({'LL': 100.0, 'LS': 200.0, 'MT': 50.0}), 7, 'fc-all')
+        await store.save_forecast_run(conn, run({'LL': 120.0}), 7, 'fc-ll')
+        forecasts = await store.get_active_forecasts(conn, 7)
+
+        assert conn.active == {'LL': 'fc-ll', 'LS': 'fc-all', 'MT': 'fc-all'}
+        assert len(forecasts) == 1
+        assert forecasts[0]['production_kg'] == pytest.approx(370.0)  # 120 (LL) + 200 + 50
+        print("✅ Test 7: Version active par site OK")
+
+    @pytest.mark.asyncio
+    async def test_08_force_refresh_fits_only_requested_site(self, monkeypatch):
+        """Test 8: force_refresh avec site_code - seul ce site est chargé, entraîné et enregistré"""
+        import sys
+        from types import SimpleNamespace
+        from app.config.ml_config import ml_config
+        from app.routers import euralis
+        from app.services import production_forecast_store as store
+
+        calls = {}
+
+        async def load_daily_history(conn, sites, history_days):
+            calls['sites'] = sites
+            return {site: {'dates': [], 'values': []} for site in sites}
+
+        def fit_sites(history, horizon_days, max_workers=None):
+            calls['fitted'] = sorted(history)
+            return {site: {'method': 'ets', 'rows': []} for site in history}
+
+        async def save_forecast_run(conn, results, horizon_days):
+            calls['saved'] = sorted(results)
+
+        async def get_active_forecasts(conn, days, site_code):
+            return [{'date': '2026-10-18', 'site_code': site_code}]
+
+        monkeypatch.setattr(type(ml_config), "ML_MODE", "realtime")
+        monkeypatch.setattr(type(ml_config), "ALLOW_FORCE_REFRESH", True)
+        monkeypatch.setattr(store, "load_daily_history", load_daily_history)
+        monkeypatch.setattr(store, "save_forecast_run", save_forecast_run)
+        monkeypatch.setattr(store, "get_active_forecasts", get_active_forecasts)
+        monkeypatch.setitem(sys.modules, "app.ml.euralis.production_forecasting", SimpleNamespace(fit_sites=fit_sites))
+
+        forecasts = await euralis.get_production_forecasts(days=30, site_code="LS", force_refresh=True, conn=None)
+
+        assert calls == {'sites': ['LS'], 'fitted': ['LS'], 'saved': ['LS']}
+        assert forecasts[0]['site_code'] == 'LS'
+        print("✅ Test 8: Rafraîchissement forcé d'un seul site OK")
+
 
 @pytest.mark.unit
 @pytest.mark.ml
@@ -156,6 +305,125 @@ class TestGaveurClustering:
         assert n_clusters < 10  # Reasonable limit
         print("✅ Test 4: Nombre de clusters validé OK")
 
+    def test_05_persisted_model_assigns_nearest_centroid(self):
+        """Test 5: Modèle rechargé (état JSON) → même cluster que l'entraînement, sans refit"""
+        import json
+        try:
+            from app.ml.euralis.gaveur_clustering import GaveurSegmentation
+        except ImportError as e:
+            pytest.skip(f"ML modules not installed: {e}")
+
+        rng = np.random.RandomState(42)
+        gaveurs = pd.DataFrame({
+            'gaveur_id': range(1, 41),
+            'itm_moyen': rng.uniform(12, 18, 40),
+            'sigma_moyen': rng.uniform(1.5, 3.5, 40),
+            'mortalite_moyenne': rng.uniform(1, 7, 40),
+            'nb_lots': rng.randint(3, 20, 40),
+            'regularite': rng.uniform(0.5, 2.5, 40),
+        })
+        segmenter = GaveurSegmentation(n_clusters=5)
+        clustered = segmenter.segment_gaveurs(gaveurs.copy())
+
+        reloaded = GaveurSegmentation.from_state(json.loads(json.dumps(segmenter.export_state())))
+        assignments = reloaded.assign_nearest(gaveurs.to_dict('records'))
+
+        assert [rank for rank, _ in assignments] == clustered['cluster_rank'].tolist()
+        assert np.allclose([d for _, d in assignments], clustered['distance_centroide'])
+        # Rang 0 = meilleur ITM moyen
+        best = clustered.groupby('cluster_rank')['itm_moyen'].mean()
+        assert best.idxmax() == 0
+        assert reloaded.predict_cluster(gaveurs.iloc[0].to_dict()) == clustered['cluster'].iloc[0]
+        print("✅ Test 5: Affectation incrémentale OK")
+
+    def test_06_format_profiles(self):
+        """Test 6: Profils servis depuis les affectations stockées (5 clusters)"""
+        from app.services.gaveur_cluster_store import format_profiles
+
+        profiles = format_profiles([
+            {'cluster_id': 0, 'nb_gaveurs': 4, 'itm_moyen': 16.2, 'sigma_moyen': 2.1,
+             'mortalite_moyenne': 1.5, 'total_lots': 30},
+            {'cluster_id': 3, 'nb_gaveurs': 2, 'itm_moyen': 13.0, 'sigma_moyen': 3.0,
+             'mortalite_moyenne': 5.0, 'total_lots': 8},
+        ])
+
+        assert [p['nom'] for p in profiles] == ['Excellent', 'Très bon', 'Bon', 'À améliorer', 'Critique']
+        assert profiles[0]['nb_gaveurs'] == 4
+        assert profiles[1]['nb_gaveurs'] == 0
+        assert profiles[3]['couleur'] == '#f97316'
+        assert format_profiles([]) == []
+        print("✅ Test 6: Profils clusters OK")
+
+    @pytest.mark.asyncio
+    async def test_07_endpoint_without_model_enqueues_refresh(self, monkeypatch):
+        """Test 7: Sans modèle, GET /ml/clusters lance la tâche Celery (une fois) sans ré-entraîner"""
+        from app.routers import euralis
+        from app.services import gaveur_cluster_store
+        from app.tasks.ml_tasks import refresh_gaveur_clusters_async
+
+        async def no_profiles(conn, site_code):
+            return []
+
+        async def no_refit(*args, **kwargs):
+            raise AssertionError("refit sur la requête")
+
+        queued = []
+        monkeypatch.setattr(euralis, "_read_cluster_profiles", no_profiles)
+        monkeypatch.setattr(euralis, "_cluster_refresh_requested_at", {})
+        monkeypatch.setattr(gaveur_cluster_store, "refresh_site", no_refit)
+        monkeypatch.setattr(refresh_gaveur_clusters_async, "delay", lambda **kw: queued.append(kw))
+
+        class FakeConnection:
+            async def fetchrow(self, query, *args):
+                return {'nb_gaveurs': 3, 'itm_moyen': 15.0}
+
+        responses = [
+            await euralis.get_gaveur_clusters(site_code="LL", force_refresh=False, conn=FakeConnection())
+            for _ in range(3)
+        ]
+
+        assert queued == [{'site_codes': ['LL'], 'force': False}]
+        assert responses[0][0]['nom'] == 'Tous gaveurs' and responses[0][0]['nb_gaveurs'] == 3
+        print("✅ Test 7: Clustering différé à Celery OK")
+
+    @pytest.mark.asyncio
+    async def test_08_lot_clustering_uses_given_pool(self):
+        """Test 8: Clustering des lots sur le pool fourni (pas de pool ni de boucle créés)"""
+        try:
+            from app.ml.euralis.lot_clustering import cluster_lots_pred, cluster_lots_refined_j4
+        except ImportError as e:
+            pytest.skip(f"ML modules not installed: {e}")
+
+        rng = np.random.RandomState(0)
+        feats = ['itm', 'sigma', 'pctg_perte_gavage', 'total_corn_real', 'nb_meg', 'duree_gavage']
+        refined = ['dose_reelle_j1', 'dose_reelle_j2', 'dose_reelle_j3', 'dose_reelle_j4',
+                   'delta_j1', 'delta_j2', 'delta_j3', 'delta_j4', 'delta_cum_j4', 'delta_abs_mean_j4']
+
+        class FakePool:
+            def __init__(self):
+                self.queries = []
+
+            async def fetch(self, query, *args):
+                self.queries.append(args)
+                return [
+                    {'lot_id': i, 'genetique': 'mulard', 'site_code': 'LL',
+                     **{f: float(v) for f, v in zip(feats + refined, rng.uniform(0, 10, 16))}}
+                    for i in range(1, 25)
+                ]
+
+            async def close(self):
+                raise AssertionError("le pool appartient à l'appelant")
+
+        pool = FakePool()
+        pred = await cluster_lots_pred(pool, n_clusters=3, site_codes=['ll'])
+        j4 = await cluster_lots_refined_j4(pool, n_clusters=3)
+
+        assert pred['status'] == 'success' and pred['n_lots'] == 24
+        assert sum(pred['clusters'].values()) == 24
+        assert j4['status'] == 'success' and j4['features'] == refined
+        assert pool.queries == [(['LL'],), ()]
+        print("✅ Test 8: Clustering des lots sur pool partagé OK")
+
 
 @pytest.mark.unit
 @pytest.mark.ml
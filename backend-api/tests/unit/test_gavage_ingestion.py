@@ -0,0 +1,205 @@
+"""
+Unit Tests - Gavage Ingestion Pipeline
+Tests du pipeline /ws/gavage (écriture par lots, cache code_lot → id, ACK avant broadcast)
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.services import gavage_ingestion
+from app.services.gavage_ingestion import GavageIngestionPipeline, save_gavage_batch
+from app.websocket.gavage_consumer import GavageConsumer, GavageRealtimeMessage
+
+T0 = datetime(2026, 10, 1, 8, 0, 0)
+
+
+def _make_message(i: int, code_lot: str = "LL2610001", jour: int = 3, **overrides) -> dict:
+    data = {
+        "code_lot": code_lot, "gaveur_id": 1, "gaveur_nom": "Jean Martin", "site": "LL",
+        "genetique": "Mulard", "jour": jour, "moment": "matin" if i % 2 == 0 else "soir",
+        "dose_theorique": 300.0, "dose_reelle": 295.0 + i, "poids_moyen": 4500.0 + i,
+        "nb_canards_vivants": 50, "taux_mortalite": 1.5, "temperature_stabule": 21.0,
+        "humidite_stabule": 65.0, "timestamp": (T0 + timedelta(hours=12 * i)).isoformat(),
+    }
+    data.update(overrides)
+    return data
+
+
+class FakeConnection:
+    """Enregistre les requêtes ; lots_gavage simulé par un dict code_lot → id"""
+
+    def __init__(self, lots=None, delay: float = 0.0):
+        self.lots = dict(lots or {})
+        self.delay = delay
+        self.calls = []
+        self.transactions = 0
+
+    def transaction(self):
+        conn = self
+
+        class _Tx:
+            async def __aenter__(self):
+                conn.transactions += 1
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Tx()
+
+    def _upsert(self, codes):
+        for code in codes:
+            self.lots.setdefault(code, 100 + len(self.lots))
+
+    async def fetch(self, query, *args):
+        assert query is gavage_ingestion.UPSERT_LOTS_RETURNING_QUERY
+        await asyncio.sleep(self.delay)
+        self.calls.append(("lots_returning", args))
+        self._upsert(args[0])
+        return [{"id": self.lots[code], "code_lot": code} for code in args[0]]
+
+    async def execute(self, query, *args):
+        await asyncio.sleep(self.delay)
+        if query is gavage_ingestion.UPSERT_LOTS_QUERY:
+            self.calls.append(("lots", args))
+            self._upsert(args[0])
+        elif query is gavage_ingestion.INSERT_GAVAGE_LOTS_QUERY:
+            if None in args[0]:
+                raise ValueError("time NULL")
+            self.calls.append(("gavage", args))
+        elif query is gavage_ingestion.INSERT_DOSES_QUERY:
+            self.calls.append(("doses", args))
+        else:
+            raise AssertionError(f"Requête inattendue: {query}")
+
+
+class FakePool:
+    def __init__(self, conn: FakeConnection):
+        self.conn = conn
+
+    def acquire(self):
+        pool = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                return pool.conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+class FakeWebSocket:
+    """Simulateur : envoie ses messages puis ferme la connexion"""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+
+    async def receive_json(self):
+        await asyncio.sleep(0)
+        if not self.messages:
+            raise WebSocketDisconnect()
+        return self.messages.pop(0)
+
+    async def send_json(self, payload):
+        self.sent.append(payload)
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestGavageIngestion:
+    """Tests unitaires pour GavageIngestionPipeline et GavageConsumer"""
+
+    async def test_01_batch_write_and_lot_cache(self):
+        """Test 1: Un lot = 3 requêtes en une transaction ; id des lots depuis le cache"""
+        conn = FakeConnection(lots={"LS2610002": 7})
+        messages = [GavageRealtimeMessage(**_make_message(i)) for i in range(4)]
+        messages += [
+            GavageRealtimeMessage(**_make_message(0, code_lot="LS2610002", jour=-1)),
+            # Même (time, lot, repas) que le message 3 : le dernier l'emporte
+            GavageRealtimeMessage(**_make_message(3, poids_moyen=4999.0)),
+        ]
+        cache = {}
+        ids = await save_gavage_batch(conn, messages, cache)
+
+        assert ids == {"LL2610001": 101, "LS2610002": 7} and cache == ids
+        assert conn.transactions == 1 and [c[0] for c in conn.calls] == ["lots_returning", "gavage", "doses"]
+        lots_args, gavage_args, doses_args = (c[1] for c in conn.calls)
+        assert lots_args[0] == ["LL2610001", "LS2610002"]
+        assert lots_args[5] == [4999.0, 4500.0]                 # état du dernier message du lot
+        assert gavage_args[1] == [101, 101, 101, 101, 7] and gavage_args[6][3] == 4999.0
+        assert doses_args[1] == ["LL2610001"] * 4               # J-1 exclu des doses
+
+        # Lots connus : upsert sans RETURNING, id lus dans le cache
+        conn.calls.clear()
+        await save_gavage_batch(conn, messages[:2], cache)
+        assert [c[0] for c in conn.calls] == ["lots", "gavage", "doses"]
+
+    async def test_02_pipeline_groups_messages_and_isolates_failures(self):
+        """Test 2: Soumissions concurrentes regroupées ; message invalide isolé par repli unitaire"""
+        conn = FakeConnection(delay=0.01)
+        pipeline = GavageIngestionPipeline(FakePool(conn), batch_size=50)
+        await pipeline.start()
+
+        first = asyncio.ensure_future(pipeline.submit(GavageRealtimeMessage(**_make_message(0))))
+        await asyncio.sleep(0.005)  # écriture du premier message en cours
+        results = await asyncio.gather(first, *(
+            pipeline.submit(GavageRealtimeMessage(**_make_message(i, code_lot=f"LL26100{i % 3}")))
+            for i in range(1, 40)
+        ))
+        assert all(results)
+        # Le premier part seul, les suivants arrivés pendant son écriture partent ensemble
+        assert pipeline.batches_written == 2 and pipeline.messages_written == 40
+        assert pipeline.stats()["messages_per_second"] > 0
+
+        bad = GavageRealtimeMessage(**_make_message(1))
+        bad.timestamp = "pas une date"
+        results = await asyncio.gather(*(pipeline.submit(m) for m in (
+            GavageRealtimeMessage(**_make_message(5)), bad, GavageRealtimeMessage(**_make_message(6)),
+        )))
+        await pipeline.stop()
+        assert results == [True, False, True]
+        assert pipeline.messages_failed == 1 and pipeline.qsize() == 0
+
+    async def test_03_consumer_acks_before_broadcast(self, monkeypatch):
+        """Test 3: Messages d'une connexion traités en parallèle ; ACK sans attendre broadcast ni SQAL"""
+        from app.websocket.realtime_broadcaster import realtime_broadcaster
+
+        release = asyncio.Event()
+        broadcasts = []
+
+        async def slow_broadcast(message):
+            await release.wait()
+            broadcasts.append(message["data"]["code_lot"])
+
+        monkeypatch.setattr(realtime_broadcaster, "broadcast_gavage_data", slow_broadcast)
+
+        conn = FakeConnection(delay=0.005)
+        pipeline = GavageIngestionPipeline(FakePool(conn), batch_size=100)
+        consumer = GavageConsumer(max_in_flight=16)
+        consumer.ingestion = pipeline
+        consumer._notify_kpi_snapshot = lambda gavage_data: None
+        sqal_triggers = []
+
+        async def trigger(gavage_data):
+            sqal_triggers.append(gavage_data.code_lot)
+
+        consumer._trigger_sqal_quality_control = trigger
+        await pipeline.start()
+
+        ws = FakeWebSocket([_make_message(i, pret_abattage=(i == 19)) for i in range(20)] + [{"code_lot": "X"}])
+        await asyncio.wait_for(consumer.receive_gavage_data(ws), timeout=5)
+
+        acks = [m for m in ws.sent if m["type"] == "ack"]
+        assert len(acks) == 20 and [m["type"] for m in ws.sent].count("error") == 1
+        assert pipeline.batches_written < 20             # messages de la connexion regroupés
+        assert broadcasts == []                          # ACK envoyés, broadcasts encore en attente
+
+        release.set()
+        await consumer.drain_background()
+        await pipeline.stop()
+        assert len(broadcasts) == 20 and sqal_triggers == ["LL2610001"]
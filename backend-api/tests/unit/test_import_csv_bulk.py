@@ -0,0 +1,106 @@
+"""
+Unit Tests - Import en masse de l'historique CSV Euralis
+Tests du dépliage colonnes (feedTarget_N / feedCornReal_N) et du découpage en paquets
+"""
+
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from scripts.import_csv_bulk import (
+    DAY_COLUMNS,
+    LOT_COLUMNS,
+    MERGE_DAYS_SQL,
+    MERGE_LOTS_SQL,
+    iter_chunks,
+    parse_file,
+    parse_rows,
+)
+
+
+def _row(code_lot: str, doses, **extra) -> dict:
+    row = {
+        "CodeLot": code_lot,
+        "Code_lot": code_lot,
+        "Debut_du_lot": "05/01/2024",
+        "duree_gavage": str(len(doses)),
+        "Gaveur": "CAZUC Pierre",
+        "GEO": "BRETAGNE",
+        "Souche": "CF80* - M15 V2E SFM",
+        "ITM": "14,5",
+        "total_cornReal": "8420",
+    }
+    for jour, (target, real) in enumerate(doses, 1):
+        row[f"feedTarget_{jour}"] = target
+        row[f"feedCornReal_{jour}"] = real
+    row.update(extra)
+    return row
+
+
+@pytest.mark.unit
+class TestImportCsvBulk:
+    """Tests unitaires pour scripts/import_csv_bulk.py"""
+
+    def test_01_wide_row_unfolds_to_columns(self):
+        """Test 1: Une ligne large → un lot + un jour par feedTarget_N/feedCornReal_N renseigné"""
+        parsed = parse_rows([
+            _row("LL001", [("200", "198"), ("220", "220"), ("", ""), ("260", "")]),
+            _row("LL002", [("200", "202")], Debut_du_lot=""),
+        ])
+
+        lots, days = parsed["lots"], parsed["days"]
+        assert set(lots) == {name for name, _ in LOT_COLUMNS}
+        assert set(days) == {name for name, _ in DAY_COLUMNS}
+        assert lots["code_lot"] == ["LL001"]
+        assert lots["date_debut"] == [date(2024, 1, 5)]
+        assert lots["souche"] == ["mulard"]
+        assert lots["site_origine"] == ["Bretagne"]
+        assert lots["itm"] == [Decimal("14.5")]
+        assert parsed["skipped"] == ["LL002"]
+
+        # J3 vide ignoré, J4 sans dose réelle gardé (théorique seule)
+        assert days["jour"] == [1, 2, 4]
+        assert days["date_gavage"] == [date(2024, 1, 5), date(2024, 1, 6), date(2024, 1, 8)]
+        assert days["dose_reelle"] == [Decimal("198"), Decimal("220"), None]
+        assert days["dose_theorique"][2] == Decimal("260")
+        assert parsed["day_offsets"] == [0, 3]
+
+    def test_02_chunks_keep_days_with_their_lot(self):
+        """Test 2: Découpage en paquets via day_offsets, jours rattachés à leur lot"""
+        parsed = parse_rows([
+            _row(f"LL{i:03d}", [("200", "200")] * (i + 1)) for i in range(5)
+        ])
+
+        chunks = list(iter_chunks(parsed, chunk_lots=2))
+        assert [c for c, _, _ in chunks] == [0, 1, 2]
+        assert [len(lots) for _, lots, _ in chunks] == [2, 2, 1]
+        assert [len(days) for _, _, days in chunks] == [1 + 2, 3 + 4, 5]
+
+        for _, lot_records, day_records in chunks:
+            assert len(lot_records[0]) == len(LOT_COLUMNS)
+            assert len(day_records[0]) == len(DAY_COLUMNS)
+            assert {d[0] for d in day_records} == {lot[0] for lot in lot_records}
+
+        # Fusion ensembliste idempotente (relance sans doublon)
+        assert "ON CONFLICT (code_lot) DO NOTHING" in MERGE_LOTS_SQL
+        assert "ON CONFLICT (lot_id, date_gavage) DO NOTHING" in MERGE_DAYS_SQL
+
+    def test_03_parse_file_real_layout(self, tmp_path):
+        """Test 3: Fichier ';' latin-1, checksum stable pour les checkpoints"""
+        header = ["CodeLot", "feedTarget_1", "feedCornReal_1", "feedTarget_2", "feedCornReal_2",
+                  "duree_gavage", "Gaveur", "Debut_du_lot", "Souche", "Code_lot"]
+        lines = [
+            ";".join(header),
+            ";".join(["LL4801665", "200", "198", "220", "220", "2", "LE MÉNÉ", "05/01/2024", "PKL", "LL4801665"]),
+        ]
+        path = tmp_path / "Pretraite.csv"
+        path.write_bytes("\n".join(lines).encode("latin-1"))
+
+        parsed = parse_file(str(path))
+        again = parse_file(str(path))
+
+        assert parsed["lots"]["gaveur"] == ["LE MÉNÉ"]
+        assert parsed["lots"]["souche"] == ["pekin"]
+        assert parsed["days"]["jour"] == [1, 2]
+        assert parsed["sha256"] == again["sha256"]
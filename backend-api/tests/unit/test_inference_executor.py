@@ -0,0 +1,85 @@
+"""
+Unit Tests - Exécuteur d'inférence hors boucle (Whisper/Tesseract)
+Tests de la file bornée (503), de l'API de jobs et de la non-obstruction de la boucle
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services.inference_executor import InferenceExecutor, InferenceSaturated
+
+
+@pytest.fixture
+async def executor():
+    executor = InferenceExecutor(workers=1, max_queue=2, jobs={"sleep": time.sleep, "pow": pow})
+    yield executor
+    await executor.shutdown()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestInferenceExecutor:
+    """Tests unitaires pour app.services.inference_executor"""
+
+    async def test_01_event_loop_stays_responsive(self, executor):
+        """Test 1: Un job CPU long ne bloque pas la boucle asyncio"""
+        await executor.run("pow", 2, 10)  # démarrage du processus worker
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await executor.run("sleep", 0.5)
+        task.cancel()
+
+        assert ticks >= 20
+        assert await executor.run("pow", 3, 4) == 81
+
+    async def test_02_saturated_queue_rejects(self, executor):
+        """Test 2: Au-delà de max_queue jobs en cours, InferenceSaturated (→ 503)"""
+        first = executor.submit("sleep", 0.3)
+        second = executor.submit("sleep", 0.3)
+
+        with pytest.raises(InferenceSaturated):
+            await executor.run("pow", 2, 2)
+        with pytest.raises(InferenceSaturated):
+            executor.submit("sleep", 0.1)
+        assert executor.get_stats()["rejected"] == 2
+
+        await executor.wait(first)
+        await executor.wait(second)
+        assert executor.get_stats()["inflight"] == 0
+        assert await executor.run("pow", 2, 3) == 8
+
+    async def test_03_job_api_poll_and_errors(self, executor):
+        """Test 3: submit → pending/running → done (résultat) ou error (message)"""
+        job_id = executor.submit("pow", 2, 5)
+        assert executor.get_job(job_id)["status"] in ("pending", "running")
+
+        job = await executor.wait(job_id, timeout=30)
+        assert job["status"] == "done" and job["result"] == 32
+
+        failing = executor.submit("pow", "a", 2)
+        job = await executor.wait(failing, timeout=30)
+        assert job["status"] == "error" and job["error"]
+
+        with pytest.raises(KeyError):
+            executor.submit("unknown")
+        assert executor.get_job("missing") is None
+
+    async def test_04_broken_pool_replaced_once(self, executor):
+        """Test 4: Pool cassé arrêté puis remplacé une seule fois malgré des échecs concurrents"""
+        broken = executor._get_pool()
+        replacement = executor._replace_broken_pool(broken)
+        assert replacement is not broken and broken._shutdown_thread
+
+        # Second job qui échoue sur le même pool cassé : pas de nouveau pool
+        assert executor._replace_broken_pool(broken) is replacement
+        assert await executor.run("pow", 2, 4) == 16
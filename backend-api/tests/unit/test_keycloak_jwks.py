@@ -0,0 +1,94 @@
+"""
+Unit Tests - Keycloak JWKS provider & verified token cache
+Run against a local stand-in Keycloak realm (scripts/keycloak_stub.py)
+"""
+
+import asyncio
+import time
+
+import pytest
+from jose import JWTError
+
+from app.auth import keycloak
+from app.auth.jwks import JWKSKeyProvider, UnknownSigningKey, VerifiedTokenCache
+from scripts.keycloak_stub import KeycloakStub
+
+
+@pytest.fixture
+def keycloak_stub():
+    with KeycloakStub() as stub:
+        yield stub
+
+
+@pytest.fixture
+async def stub_realm(keycloak_stub, monkeypatch):
+    """app.auth.keycloak pointed at the stand-in realm"""
+    provider = JWKSKeyProvider(keycloak_stub.jwks_url, min_refetch_interval=60)
+    monkeypatch.setattr(keycloak, "jwks_provider", provider)
+    monkeypatch.setattr(keycloak, "verified_tokens", VerifiedTokenCache(max_size=100))
+    monkeypatch.setattr(keycloak, "EXPECTED_ISSUER", keycloak_stub.issuer)
+    yield keycloak_stub
+    await provider.stop()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestKeycloakJWKS:
+    """Tests unitaires pour app.auth.jwks et decode_keycloak_token"""
+
+    async def test_01_keys_fetched_once_and_tokens_cached(self, stub_realm):
+        """Test 1: JWKS lu une seule fois, tokens déjà vérifiés servis depuis le cache"""
+        tokens = [stub_realm.issue_token({"preferred_username": f"gaveur{i}"}) for i in range(3)]
+
+        # Requêtes concurrentes à froid : un seul fetch JWKS partagé
+        payloads = await asyncio.gather(*(keycloak.decode_keycloak_token(t) for t in tokens * 10))
+        assert [p["preferred_username"] for p in payloads[:3]] == ["gaveur0", "gaveur1", "gaveur2"]
+        assert stub_realm.requests["certs"] == 1
+        assert stub_realm.requests["realm"] == 0  # plus d'appel public_key()
+
+        # Polling : plus de vérification RS256, payload servi depuis le cache
+        hits = keycloak.verified_tokens.hits
+        for token in tokens * 10:
+            await keycloak.decode_keycloak_token(token)
+        assert keycloak.verified_tokens.hits - hits == 30
+        assert stub_realm.requests["certs"] == 1
+
+    async def test_02_unknown_kid_refetch_is_rate_limited(self, stub_realm):
+        """Test 2: Rotation → un refetch sur kid inconnu ; kid forgé → pas de nouvel appel"""
+        first = stub_realm.issue_token({"preferred_username": "jdupont"})
+        await keycloak.decode_keycloak_token(first)
+
+        keycloak.jwks_provider.min_refetch_interval = 0
+        stub_realm.rotate()
+        rotated = stub_realm.issue_token({"preferred_username": "jdupont"})
+        assert (await keycloak.decode_keycloak_token(rotated))["preferred_username"] == "jdupont"
+        assert stub_realm.requests["certs"] == 2
+
+        keycloak.jwks_provider.min_refetch_interval = 60
+        forged = stub_realm.issue_token({"preferred_username": "x"}, kid="forged-kid")
+        for _ in range(5):
+            with pytest.raises(UnknownSigningKey):
+                await keycloak.decode_keycloak_token(forged)
+        assert stub_realm.requests["certs"] == 2
+
+    async def test_03_invalid_tokens_rejected_and_cache_bounded(self, stub_realm):
+        """Test 3: Issuer/expiration invalides rejetés et jamais mis en cache ; cache LRU borné"""
+        other_issuer = stub_realm.issue_token({"preferred_username": "x"}, issuer="http://evil/realms/x")
+        with pytest.raises(Exception) as exc_info:
+            await keycloak.decode_keycloak_token(other_issuer)
+        assert getattr(exc_info.value, "status_code", None) == 401
+
+        expired = stub_realm.issue_token({"preferred_username": "x"}, ttl_s=-10)
+        with pytest.raises(JWTError):
+            await keycloak.decode_keycloak_token(expired)
+        assert len(keycloak.verified_tokens) == 0
+
+        cache = VerifiedTokenCache(max_size=2)
+        now = time.time()
+        cache.set("a", {"exp": now + 60})
+        cache.set("b", {"exp": now + 60})
+        cache.get("a")
+        cache.set("c", {"exp": now + 60})
+        assert cache.get("b") is None and cache.get("a") is not None
+        cache.set("d", {"exp": now - 1})
+        assert cache.get("d") is None
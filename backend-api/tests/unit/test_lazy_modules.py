@@ -0,0 +1,73 @@
+"""
+Unit Tests - Chargement différé des piles ML
+Tests du benchmark de démarrage (-X importtime), de LazyModule et du pré-chargement
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+from app.core import lazy_modules
+from app.core.lazy_modules import LazyModule, prewarm, prewarm_names_from_env
+from scripts.import_time_report import heavy_loaded, measure, parse_importtime, total_us
+
+# Budget d'import de app.main (secondes) : garde-fou contre un retour des imports lourds
+STARTUP_IMPORT_BUDGET_S = float(os.getenv("STARTUP_IMPORT_BUDGET_S", "8"))
+
+
+@pytest.mark.unit
+class TestLazyModules:
+    """Tests unitaires pour app.core.lazy_modules"""
+
+    @pytest.mark.slow
+    def test_01_startup_import_benchmark(self):
+        """Test 1: import app.main sans TensorFlow / torch / Whisper / DEAP / Prophet, sous le budget"""
+        sample = (
+            "import time:     self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   prophet.forecaster\n"
+            "import time:       300 |        420 | prophet\n"
+        )
+        timings = parse_importtime(sample)
+        assert heavy_loaded(timings) == ["prophet"]
+        assert total_us(timings, "prophet") == 420
+
+        timings = measure("app.main")
+        assert heavy_loaded(timings) == []
+        assert not any(t.module.startswith(("app.ml.computer_vision", "app.ml.voice_assistant",
+                                            "app.ml.analytics_engine", "app.ml.multiobjective_optimization"))
+                       for t in timings)
+        assert total_us(timings, "app.main") / 1e6 < STARTUP_IMPORT_BUDGET_S
+
+    @pytest.mark.asyncio
+    async def test_02_lazy_module_loads_once_off_loop(self):
+        """Test 2: Premier accès importe dans un thread, accès concurrents = un seul import"""
+        sys.modules.pop("colorsys", None)
+        lazy = LazyModule("colorsys")
+        assert not lazy.loaded
+
+        modules = await asyncio.gather(*(lazy.aget() for _ in range(5)))
+        assert all(m is modules[0] for m in modules)
+        assert lazy.loaded and lazy.load_time_s is not None
+        assert lazy.get() is modules[0]
+        assert modules[0].rgb_to_hsv(1, 0, 0)[0] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_03_prewarm_from_env(self, monkeypatch):
+        """Test 3: ML_PREWARM sélectionne les piles ; un échec d'import est journalisé, pas levé"""
+        monkeypatch.setenv("ML_PREWARM", "")
+        assert prewarm_names_from_env() == []
+        monkeypatch.setenv("ML_PREWARM", "all")
+        assert prewarm_names_from_env() == list(lazy_modules.ML_STACKS)
+        monkeypatch.setenv("ML_PREWARM", "analytics, inconnue ,voice")
+        assert prewarm_names_from_env() == ["analytics", "voice"]
+
+        monkeypatch.setattr(lazy_modules, "ML_STACKS", {
+            "ok": LazyModule("json"),
+            "missing": LazyModule("app.ml.module_inexistant"),
+        })
+        results = await prewarm()
+        assert results["ok"] is not None
+        assert results["missing"] is None
+        assert lazy_modules.stats()["ok"]["loaded"] is True
@@ -0,0 +1,171 @@
+"""
+Unit Tests - Registre de modèles ML (ai_models)
+Tests de la publication versionnée, du rechargement sur notification et du prédicteur PySR
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from app.ml import pysr_predictor_numpy
+from app.services.model_registry import (
+    ACTIVATE_MODEL_QUERY,
+    ACTIVE_MODELS_QUERY,
+    MODEL_EXISTS_QUERY,
+    MODEL_REGISTRY_CHANNEL,
+    UPSERT_MODEL_QUERY,
+    ModelRegistry,
+)
+
+
+class FakeTransaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    """Table ai_models en mémoire, pg_notify enregistrés"""
+
+    def __init__(self):
+        self.rows = {}
+        self.notified = []
+        self.active_fetches = 0
+
+    def transaction(self):
+        return FakeTransaction()
+
+    async def execute(self, query, *args):
+        if query == UPSERT_MODEL_QUERY:
+            _, name, version, framework, model_type, metadata = args
+            previous = self.rows.get((name, version), {})
+            self.rows[(name, version)] = {
+                "name": name, "version": version, "framework": framework, "model_type": model_type,
+                "metadata": metadata, "is_active": previous.get("is_active", False),
+            }
+        elif query == ACTIVATE_MODEL_QUERY:
+            name, version = args
+            for (n, v), row in self.rows.items():
+                if n == name:
+                    row["is_active"] = v == version
+        elif "pg_notify" in query:
+            self.notified.append(args)
+        else:
+            raise AssertionError(query)
+        return "OK"
+
+    async def fetchval(self, query, *args):
+        assert query == MODEL_EXISTS_QUERY
+        return True if tuple(args) in self.rows else None
+
+    async def fetch(self, query, names):
+        assert query == ACTIVE_MODELS_QUERY
+        self.active_fetches += 1
+        return [
+            row for row in self.rows.values()
+            if row["is_active"] and (names is None or row["name"] in names)
+        ]
+
+
+class FakeAcquire:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    def acquire(self):
+        return FakeAcquire(self.conn)
+
+
+def _scaler(shift: float) -> StandardScaler:
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(50, 5)) * [10, 50, 500, 2, 4] + [90 + shift, 400, 7600, 14, 7]
+    return StandardScaler().fit(X)
+
+
+@pytest.mark.unit
+class TestModelRegistry:
+    """Tests unitaires pour app.services.model_registry"""
+
+    @pytest.mark.asyncio
+    async def test_01_publish_versioned_artifact(self, tmp_path):
+        """Test 1: Artefact versionné sur disque, une seule version active, notification émise"""
+        pool = FakePool()
+        registry = ModelRegistry(str(tmp_path))
+
+        meta_v1 = await registry.publish(pool, "pysr_scaler_v2", "v1", _scaler(0), model_type="scaler")
+        meta_v2 = await registry.publish(pool, "pysr_scaler_v2", "v2", _scaler(5), model_type="scaler")
+
+        assert (tmp_path / meta_v1["artifact_path"]).exists()
+        assert meta_v2["artifact_path"] == "pysr_scaler_v2/v2.joblib"
+        assert len(meta_v2["sha256"]) == 64
+        assert not list(tmp_path.rglob("*.part"))
+        actives = [v for (n, v), row in pool.conn.rows.items() if row["is_active"]]
+        assert actives == ["v2"]
+        assert pool.conn.notified[-1] == (MODEL_REGISTRY_CHANNEL, "pysr_scaler_v2:v2")
+        assert registry.get("pysr_scaler_v2").version == "v2"
+
+        with pytest.raises(ValueError):
+            await registry.activate(pool, "pysr_scaler_v2", "v9")
+
+    @pytest.mark.asyncio
+    async def test_02_notification_hot_swaps_other_process(self, tmp_path):
+        """Test 2: Un autre processus recharge une fois la nouvelle version sur notification"""
+        pool = FakePool()
+        publisher = ModelRegistry(str(tmp_path))
+        await publisher.publish(pool, "feedback_satisfaction", "v1", {"weights": np.arange(1000.0)})
+
+        worker = ModelRegistry(str(tmp_path))
+        worker.pool = pool
+        assert await worker.refresh() == ["feedback_satisfaction"]
+        assert isinstance(worker.get("feedback_satisfaction").artifact["weights"], np.memmap)
+        assert await worker.refresh() == []
+
+        await publisher.publish(pool, "feedback_satisfaction", "v2", {"weights": np.arange(10.0)})
+        worker._on_notify(None, 1, MODEL_REGISTRY_CHANNEL, "feedback_satisfaction:v2")
+        await asyncio.gather(*list(worker._reloads))
+
+        loaded = worker.get("feedback_satisfaction")
+        assert loaded.version == "v2"
+        assert loaded.artifact["weights"].shape == (10,)
+        assert worker.loads == 2 and worker.swaps == 1
+
+        # Artefact altéré : la version en mémoire est conservée
+        await publisher.publish(pool, "feedback_satisfaction", "v3", {"weights": np.zeros(3)})
+        (tmp_path / "feedback_satisfaction" / "v3.joblib").write_bytes(b"corrupted")
+        assert await worker.refresh() == []
+        assert worker.get("feedback_satisfaction").version == "v2"
+
+    @pytest.mark.asyncio
+    async def test_03_pysr_predictor_uses_registry(self, tmp_path, monkeypatch):
+        """Test 3: Prédicteur PySR construit depuis le scaler actif, sans fichier, reconstruit au changement"""
+        registry = ModelRegistry(str(tmp_path))
+        monkeypatch.setattr("app.services.model_registry.model_registry", registry)
+        monkeypatch.setattr(pysr_predictor_numpy, "_numpy_instance", None)
+        pool = FakePool()
+
+        await registry.publish(pool, pysr_predictor_numpy.REGISTRY_MODEL_NAME, "v1", _scaler(0))
+        predictor = pysr_predictor_numpy.get_pysr_predictor_numpy()
+        assert predictor.model_version == "v1"
+        assert pysr_predictor_numpy.get_pysr_predictor_numpy() is predictor
+        doses = predictor.predict_nutrition_curve(90, 400.0, 7600.0, 14)
+        assert len(doses) == 14
+
+        await registry.publish(pool, pysr_predictor_numpy.REGISTRY_MODEL_NAME, "v2", _scaler(5))
+        swapped = pysr_predictor_numpy.get_pysr_predictor_numpy()
+        assert swapped is not predictor and swapped.model_version == "v2"
+        assert json.loads(pool.conn.rows[("pysr_scaler_v2", "v2")]["metadata"])["size_bytes"] > 0
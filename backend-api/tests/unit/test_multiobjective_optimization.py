@@ -0,0 +1,155 @@
+"""
+Unit Tests - Optimisation multi-objectifs NSGA-II
+Tests de l'évaluation vectorisée, du cache mémo et du pool d'évaluation
+"""
+
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.ml.multiobjective_optimization import (
+    DEAP_AVAILABLE,
+    MultiObjectiveOptimizer,
+    evaluate_population,
+)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, query, *args):
+        self.executed.append(args)
+
+
+class FakeAcquire:
+    def __init__(self, conn):
+        self.conn = conn
+
+    async def __aenter__(self):
+        return self.conn
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    def acquire(self):
+        return FakeAcquire(self.conn)
+
+
+class Individual(list):
+    """Individu minimal (list + fitness.values) hors DEAP"""
+
+    def __init__(self, values):
+        super().__init__(values)
+        self.fitness = type("Fitness", (), {"values": ()})()
+
+
+def _random_genomes(n: int, seed: int = 7) -> np.ndarray:
+    rng = random.Random(seed)
+    return np.array([
+        [rng.uniform(200, 600), rng.uniform(200, 600), rng.uniform(18, 24),
+         rng.uniform(50, 80), rng.uniform(10, 18), rng.uniform(2, 3)]
+        for _ in range(n)
+    ])
+
+
+@pytest.mark.unit
+class TestMultiObjectiveOptimizer:
+    """Tests unitaires pour app.ml.multiobjective_optimization"""
+
+    @pytest.mark.asyncio
+    async def test_01_batch_matches_individual_evaluation(self):
+        """Test 1: evaluate_population (NumPy) == evaluate_individual (scalaire) sur toutes les branches"""
+        optimizer = MultiObjectiveOptimizer(FakePool())
+        genomes = _random_genomes(200)
+
+        for genetique in ("Mulard", "Barbarie", "Pekin", "Inconnue"):
+            batch = evaluate_population(genomes, genetique)
+            assert batch.shape == (200, 5)
+            scalar = np.array([
+                await optimizer.evaluate_individual(list(g), genetique) for g in genomes
+            ])
+            np.testing.assert_allclose(batch, scalar, rtol=1e-12, atol=1e-12)
+
+    @pytest.mark.asyncio
+    async def test_02_memo_and_process_pool(self):
+        """Test 2: Génomes déjà vus non ré-évalués ; pool de processus = même résultat"""
+        calls = []
+
+        def counting_objective(genomes, genetique):
+            calls.append(len(genomes))
+            return evaluate_population(genomes, genetique)
+
+        optimizer = MultiObjectiveOptimizer(FakePool(), objective_fn=counting_objective)
+        genomes = _random_genomes(10)
+        population = [Individual(g) for g in genomes] + [Individual(genomes[0]), Individual(genomes[1])]
+
+        await optimizer.evaluate_batch(population, "Mulard")
+        assert calls == [10]
+        assert optimizer.evaluations == 10
+        assert optimizer.cache_hits == 2
+        assert population[10].fitness.values == population[0].fitness.values
+
+        await optimizer.evaluate_batch([Individual(g) for g in genomes], "Mulard")
+        assert calls == [10]
+        assert optimizer.cache_hits == 12
+
+        pooled = MultiObjectiveOptimizer(FakePool(), eval_workers=2)
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as executor:
+            scores = await pooled._score_genomes(genomes, "Mulard", executor)
+        np.testing.assert_allclose(scores, evaluate_population(genomes, "Mulard"))
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not DEAP_AVAILABLE, reason="DEAP not installed")
+    async def test_03_optimize_one_batch_per_generation(self):
+        """Test 3: optimize() évalue une génération par appel et rapporte les générations/s"""
+        calls = []
+
+        def counting_objective(genomes, genetique):
+            calls.append(len(genomes))
+            return evaluate_population(genomes, genetique)
+
+        pool = FakePool()
+        optimizer = MultiObjectiveOptimizer(pool, objective_fn=counting_objective)
+        result = await optimizer.optimize(genetique="Mulard", population_size=40, n_generations=8)
+
+        assert result["status"] == "success"
+        assert result["pareto_front_size"] >= 1
+        assert len(calls) <= 8 + 1
+        assert calls[0] == 40
+        assert sum(calls) == optimizer.evaluations
+
+        stats = result["statistics"]
+        assert stats["generations_per_s"] > 0
+        assert stats["evaluations"] + stats["cache_hits"] >= 40
+        assert len(pool.conn.executed) == 1
+
+    @pytest.mark.asyncio
+    async def test_04_daemon_process_uses_threads(self, monkeypatch):
+        """Test 4: Enfant daemon (Celery prefork) : pool de threads au lieu de processus, même résultat"""
+        from concurrent.futures import ThreadPoolExecutor
+        from types import SimpleNamespace
+
+        from app.ml import multiobjective_optimization
+
+        monkeypatch.setattr(
+            multiobjective_optimization.multiprocessing, "current_process", lambda: SimpleNamespace(daemon=True)
+        )
+        optimizer = MultiObjectiveOptimizer(FakePool(), eval_workers=2)
+        genomes = _random_genomes(10)
+
+        executor = optimizer._make_executor()
+        try:
+            assert isinstance(executor, ThreadPoolExecutor)
+            scores = await optimizer._score_genomes(genomes, "Mulard", executor)
+        finally:
+            executor.shutdown()
+        np.testing.assert_allclose(scores, evaluate_population(genomes, "Mulard"))
@@ -0,0 +1,221 @@
+"""
+Unit Tests - Realtime Broadcaster
+Tests du fan-out /ws/realtime/ (encodage unique, index d'abonnements, timeouts,
+outbox bornées par dashboard)
+"""
+
+import asyncio
+import json
+import pytest
+from datetime import datetime, timezone
+
+from app.models.sqal import SensorDataMessage
+from app.websocket import realtime_broadcaster as broadcaster_module
+from app.websocket.dashboard_outbox import DashboardOutbox
+from app.websocket.realtime_broadcaster import RealtimeBroadcaster
+
+
+def _sensor_data(device_id: str, site_code: str = "LL") -> SensorDataMessage:
+    matrix = [[100] * 8 for _ in range(8)]
+    return SensorDataMessage(
+        sample_id=f"SAMPLE_{device_id}",
+        device_id=device_id,
+        site_code=site_code,
+        timestamp=datetime.now(timezone.utc),
+        vl53l8ch={
+            "raw": {"distance_matrix": matrix, "reflectance_matrix": matrix, "amplitude_matrix": matrix},
+            "analysis": {"volume_mm3": 650000.0, "surface_uniformity": 0.9, "quality_score": 0.9, "grade": "A+"},
+        },
+        as7341={
+            "raw": {
+                "F1_415nm": 1, "F2_445nm": 1, "F3_480nm": 1, "F4_515nm": 1, "F5_555nm": 1,
+                "F6_590nm": 1, "F7_630nm": 1, "F8_680nm": 1, "Clear": 1, "NIR": 1,
+            },
+            "analysis": {"freshness_index": 0.9, "fat_quality_index": 0.9, "oxidation_index": 0.1, "quality_score": 0.9},
+        },
+        fusion={"final_score": 0.9, "final_grade": "A+", "is_compliant": True},
+    )
+
+
+class FakeWebSocket:
+    """WebSocket minimal : enregistre les trames texte envoyées"""
+
+    def __init__(self, delay: float = 0.0):
+        self.sent = []
+        self.delay = delay
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        self.sent.append(json.loads(json.dumps(data, default=str)))
+
+    async def send_text(self, data: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(data))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.close_code = code
+
+
+async def _drain(broadcaster: RealtimeBroadcaster):
+    """Laisse les tâches d'écriture vider les outbox"""
+    await asyncio.sleep(0.01)
+
+
+async def _connect(broadcaster: RealtimeBroadcaster, websocket: FakeWebSocket, filters: dict = None):
+    await broadcaster.connect(websocket, {"client_type": "dashboard"})
+    if filters is not None:
+        await broadcaster._handle_dashboard_message(websocket, {"type": "subscribe", "filters": filters})
+    websocket.sent.clear()
+
+
+@pytest.fixture(autouse=True)
+def _no_latest_sample(monkeypatch):
+    """Pas d'accès base au connect()"""
+    async def _noop(self, websocket):
+        return None
+    monkeypatch.setattr(RealtimeBroadcaster, "_send_latest_sample", _noop)
+
+
+@pytest.mark.unit
+@pytest.mark.websocket
+@pytest.mark.asyncio
+class TestRealtimeBroadcaster:
+    """Tests unitaires pour RealtimeBroadcaster"""
+
+    async def test_01_device_filter_routes_only_matching_traffic(self):
+        """Test 1: Un dashboard filtré sur un device ne reçoit que ce device"""
+        broadcaster = RealtimeBroadcaster()
+        all_ws, dev1_ws, site_ws = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await _connect(broadcaster, all_ws)
+        await _connect(broadcaster, dev1_ws, {"device_id": "ESP32_LL_01"})
+        await _connect(broadcaster, site_ws, {"site_code": "MT"})
+
+        await broadcaster.broadcast_sensor_data(_sensor_data("ESP32_LL_01", "LL"), {})
+        await broadcaster.broadcast_sensor_data(_sensor_data("ESP32_LL_02", "LL"), {})
+        await broadcaster.broadcast_sensor_data(_sensor_data("ESP32_MT_01", "MT"), {})
+        await _drain(broadcaster)
+
+        assert [m["device_id"] for m in all_ws.sent] == ["ESP32_LL_01", "ESP32_LL_02", "ESP32_MT_01"]
+        assert [m["device_id"] for m in dev1_ws.sent] == ["ESP32_LL_01"]
+        assert [m["device_id"] for m in site_ws.sent] == ["ESP32_MT_01"]
+
+    async def test_02_message_encoded_once(self, monkeypatch):
+        """Test 2: Encodage unique par message, quel que soit le nombre de clients"""
+        broadcaster = RealtimeBroadcaster()
+        clients = [FakeWebSocket() for _ in range(5)]
+        for ws in clients:
+            await _connect(broadcaster, ws)
+
+        calls = []
+        original = broadcaster_module.encode_message
+        monkeypatch.setattr(broadcaster_module, "encode_message", lambda m: calls.append(1) or original(m))
+
+        await broadcaster.broadcast_sensor_data(_sensor_data("ESP32_LL_01"), {})
+        await _drain(broadcaster)
+
+        assert len(calls) == 1
+        assert all(ws.sent[0]["type"] == "sensor_update" for ws in clients)
+        assert clients[0].sent[0]["fusion"]["final_grade"] == "A+"
+
+    async def test_03_no_subscriber_skips_encoding(self, monkeypatch):
+        """Test 3: Aucun abonné au device → message ni construit ni encodé"""
+        broadcaster = RealtimeBroadcaster()
+        await _connect(broadcaster, FakeWebSocket(), {"device_id": "ESP32_LL_01"})
+
+        calls = []
+        monkeypatch.setattr(broadcaster_module, "encode_message", lambda m: calls.append(1) or "{}")
+
+        await broadcaster.broadcast_sensor_data(_sensor_data("ESP32_LL_99"), {})
+
+        assert calls == []
+
+    async def test_04_slow_client_timed_out_and_disconnected(self):
+        """Test 4: Un client lent est déconnecté sans bloquer le producteur ni les autres"""
+        broadcaster = RealtimeBroadcaster(send_timeout=0.05)
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=1.0)
+        await _connect(broadcaster, fast)
+        await _connect(broadcaster, slow)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await broadcaster.broadcast_sensor_data(_sensor_data("ESP32_LL_01"), {})
+        assert loop.time() - start < 0.05
+
+        await asyncio.sleep(0.2)
+
+        assert len(fast.sent) == 1
+        assert slow not in broadcaster.active_connections
+        assert slow not in broadcaster._unfiltered
+        assert slow not in broadcaster.outboxes
+
+    async def test_05_unsubscribe_moves_back_to_unfiltered(self):
+        """Test 5: unsubscribe ré-indexe le dashboard"""
+        broadcaster = RealtimeBroadcaster()
+        ws = FakeWebSocket()
+        await _connect(broadcaster, ws, {"device_id": "ESP32_LL_01"})
+        assert "ESP32_LL_01" in broadcaster._by_device
+
+        await broadcaster._handle_dashboard_message(ws, {"type": "unsubscribe"})
+
+        assert "ESP32_LL_01" not in broadcaster._by_device
+        assert ws in broadcaster._unfiltered
+
+
+@pytest.mark.unit
+@pytest.mark.websocket
+@pytest.mark.asyncio
+class TestDashboardOutbox:
+    """Tests unitaires pour DashboardOutbox (politiques de débordement)"""
+
+    async def test_01_coalesce_keeps_latest_per_device(self):
+        """Test 1: coalesce → une seule trame en attente par device, la plus récente"""
+        outbox = DashboardOutbox(FakeWebSocket(), maxsize=10, policy="coalesce")
+
+        for i in range(3):
+            assert outbox.enqueue(json.dumps({"device_id": "D1", "seq": i}), key="D1")
+        outbox.enqueue(json.dumps({"device_id": "D2", "seq": 0}), key="D2")
+        outbox.enqueue(json.dumps({"type": "alert"}))
+
+        assert len(outbox) == 3
+        assert outbox.dropped == 2
+
+        outbox.start()
+        await asyncio.sleep(0.01)
+        sent = outbox.websocket.sent
+        assert sent[0] == {"device_id": "D1", "seq": 2}
+        assert sent[1]["device_id"] == "D2"
+        outbox.close()
+
+    async def test_02_drop_oldest_bounds_queue(self):
+        """Test 2: drop_oldest → file bornée, les trames récentes sont conservées"""
+        outbox = DashboardOutbox(FakeWebSocket(), maxsize=2, policy="drop_oldest")
+
+        for i in range(5):
+            outbox.enqueue(json.dumps({"seq": i}), key="D1")
+
+        assert len(outbox) == 2
+        assert outbox.dropped == 3
+
+        outbox.start()
+        await asyncio.sleep(0.01)
+        assert [m["seq"] for m in outbox.websocket.sent] == [3, 4]
+        outbox.close()
+
+    async def test_03_disconnect_policy_closes_client(self):
+        """Test 3: disconnect → fermeture 1013 et rappel on_failure au débordement"""
+        failed = []
+        ws = FakeWebSocket(delay=1.0)
+        outbox = DashboardOutbox(ws, maxsize=1, policy="disconnect", on_failure=failed.append)
+
+        assert outbox.enqueue("{}")
+        assert not outbox.enqueue("{}")
+        outbox.start()
+        await asyncio.sleep(0.01)
+
+        assert ws.close_code == 1013
+        assert failed == [ws]
+        assert not outbox.enqueue("{}")
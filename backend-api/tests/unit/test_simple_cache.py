@@ -0,0 +1,119 @@
+"""
+Unit Tests - SimpleCache
+Tests du cache LRU/TTL en mémoire (récence, expiration, octets, singleflight, tags)
+"""
+
+import asyncio
+import pytest
+
+from app.cache import simple_cache
+from app.cache.simple_cache import SimpleCache, cache_response
+
+
+@pytest.mark.unit
+class TestSimpleCache:
+    """Tests unitaires pour SimpleCache"""
+
+    def test_01_get_refreshes_recency(self):
+        """Test 1: Éviction LRU réelle (get rafraîchit la récence)"""
+        cache = SimpleCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_02_lazy_expiry(self, monkeypatch):
+        """Test 2: Entrées expirées purgées au set() suivant via le tas"""
+        now = [1000.0]
+        monkeypatch.setattr(simple_cache.time, "monotonic", lambda: now[0])
+        cache = SimpleCache(max_size=10)
+        cache.set("short", 1, ttl=5)
+        cache.set("long", 2, ttl=60)
+
+        now[0] += 10
+        cache.set("other", 3)
+
+        assert "short" not in cache.cache
+        assert cache.get("long") == 2
+        assert cache.get_stats()["expirations"] == 1
+
+    def test_03_byte_limit(self):
+        """Test 3: Limite en octets → éviction LRU jusqu'à repasser sous la limite"""
+        cache = SimpleCache(max_size=100, max_bytes=20_000)
+        for i in range(10):
+            cache.set(f"k{i}", "x" * 4_000)
+
+        assert cache.total_bytes <= 20_000
+        assert cache.get("k9") is not None
+        assert cache.get("k0") is None
+
+    def test_04_tag_invalidation(self):
+        """Test 4: invalidate_tag supprime toutes les entrées d'un lot"""
+        cache = SimpleCache()
+        cache.set("courbe_theo:1", "a", tags=["lot_id:1"])
+        cache.set("lot_courbe_theo:1", "b", tags=["lot_id:1"])
+        cache.set("courbe_theo:2", "c", tags=["lot_id:2"])
+
+        assert cache.invalidate_tag("lot_id:1") == 2
+        assert cache.get("courbe_theo:1") is None
+        assert cache.get("courbe_theo:2") == "c"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestCacheResponse:
+    """Tests unitaires pour get_or_compute / cache_response"""
+
+    async def test_01_singleflight(self):
+        """Test 1: 20 requêtes concurrentes sur une clé manquante → un seul calcul"""
+        cache = SimpleCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"points": [1, 2, 3]}
+
+        results = await asyncio.gather(*(cache.get_or_compute("k", loader) for _ in range(20)))
+
+        assert len(calls) == 1
+        assert all(r == {"points": [1, 2, 3]} for r in results)
+        assert cache.get_stats()["singleflight_waits"] == 19
+
+    async def test_02_decorator_invalidated_by_lot(self, monkeypatch):
+        """Test 2: cache_response tague par lot_id ; invalidate_lot force le recalcul"""
+        monkeypatch.setattr(simple_cache, "_cache_instance", SimpleCache())
+        calls = []
+
+        @cache_response(ttl=60, key_prefix="courbe_theo")
+        async def get_courbe(lot_id: int, request=None):
+            calls.append(lot_id)
+            return {"lot_id": lot_id, "version": len(calls)}
+
+        assert (await get_courbe(7, request=object()))["version"] == 1
+        assert (await get_courbe(lot_id=7))["version"] == 1
+        assert len(calls) == 1
+
+        assert await simple_cache.invalidate_lot(7) == 1
+        assert (await get_courbe(7))["version"] == 2
+
+    async def test_03_loader_error_not_cached(self):
+        """Test 3: Exception propagée à tous les appelants, rien n'est mis en cache"""
+        cache = SimpleCache()
+
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(cache.get_or_compute("k", loader) for _ in range(3)), return_exceptions=True
+        )
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert "k" not in cache.cache
@@ -0,0 +1,129 @@
+"""
+Unit Tests - SQAL Ingestion Queue
+Tests de la file write-behind (regroupement, repli unitaire, backpressure)
+"""
+
+import pytest
+import asyncio
+from datetime import datetime, timezone
+
+from app.models.sqal import SensorDataMessage
+from app.services.sqal_ingestion import SQALIngestionQueue, IngestionQueueFullError
+
+
+def _make_sample(i: int, device_id: str = "ESP32_LL_01") -> SensorDataMessage:
+    matrix = [[100] * 8 for _ in range(8)]
+    return SensorDataMessage(
+        sample_id=f"SAMPLE_{i}",
+        device_id=device_id,
+        timestamp=datetime.now(timezone.utc),
+        vl53l8ch={
+            "raw": {"distance_matrix": matrix, "reflectance_matrix": matrix, "amplitude_matrix": matrix},
+            "analysis": {"volume_mm3": 650000.0, "surface_uniformity": 0.9, "quality_score": 0.9, "grade": "A"},
+        },
+        as7341={
+            "raw": {
+                "F1_415nm": 1, "F2_445nm": 1, "F3_480nm": 1, "F4_515nm": 1, "F5_555nm": 1,
+                "F6_590nm": 1, "F7_630nm": 1, "F8_680nm": 1, "Clear": 1, "NIR": 1,
+            },
+            "analysis": {"freshness_index": 0.9, "fat_quality_index": 0.9, "oxidation_index": 0.1, "quality_score": 0.9},
+        },
+        fusion={"final_score": 0.9, "final_grade": "A", "is_compliant": True},
+    )
+
+
+class FakeSQALService:
+    """Remplace SQALService : enregistre les lots au lieu d'écrire en base"""
+
+    def __init__(self, fail_batch: bool = False, block: asyncio.Event = None):
+        self.batches = []
+        self.single_writes = []
+        self.fail_batch = fail_batch
+        self.block = block
+
+    async def save_sensor_samples_batch(self, samples):
+        if self.block is not None:
+            await self.block.wait()
+        if self.fail_batch:
+            raise RuntimeError("batch failed")
+        self.batches.append([s.sample_id for s in samples])
+        return len(samples)
+
+    async def save_sensor_sample(self, sensor_data):
+        self.single_writes.append(sensor_data.sample_id)
+        return sensor_data.sample_id != "SAMPLE_BAD"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSQALIngestionQueue:
+    """Tests unitaires pour SQALIngestionQueue"""
+
+    async def test_01_concurrent_submits_share_one_batch(self):
+        """Test 1: Des soumissions concurrentes sont écrites en un seul lot"""
+        service = FakeSQALService()
+        queue = SQALIngestionQueue(service, batch_size=50, flush_interval=0.05)
+        await queue.start()
+
+        results = await asyncio.gather(*(queue.submit(_make_sample(i)) for i in range(20)))
+        await queue.stop()
+
+        assert all(results)
+        assert len(service.batches) == 1
+        assert len(service.batches[0]) == 20
+        assert queue.samples_written == 20
+
+    async def test_02_batch_size_caps_each_flush(self):
+        """Test 2: Un lot ne dépasse jamais batch_size"""
+        service = FakeSQALService()
+        queue = SQALIngestionQueue(service, batch_size=8, flush_interval=0.05)
+        await queue.start()
+
+        await asyncio.gather(*(queue.submit(_make_sample(i)) for i in range(20)))
+        await queue.stop()
+
+        assert [len(b) for b in service.batches] == [8, 8, 4]
+
+    async def test_03_batch_failure_falls_back_to_single_writes(self):
+        """Test 3: Échec du lot → repli unitaire, seul l'échantillon invalide échoue"""
+        service = FakeSQALService(fail_batch=True)
+        queue = SQALIngestionQueue(service, batch_size=10, flush_interval=0.01)
+        await queue.start()
+
+        samples = [_make_sample(1), _make_sample(2)]
+        bad = _make_sample(3)
+        bad.sample_id = "SAMPLE_BAD"
+        results = await asyncio.gather(*(queue.submit(s) for s in samples + [bad]))
+        await queue.stop()
+
+        assert results == [True, True, False]
+        assert len(service.single_writes) == 3
+        assert queue.samples_failed == 1
+
+    async def test_04_backpressure_when_queue_full(self):
+        """Test 4: File pleine → IngestionQueueFullError après put_timeout"""
+        block = asyncio.Event()
+        service = FakeSQALService(block=block)
+        queue = SQALIngestionQueue(service, batch_size=1, flush_interval=0.0, max_queue_size=1, put_timeout=0.05)
+        await queue.start()
+
+        # 1er échantillon bloqué dans le flush, 2e occupe l'unique place de la file
+        pending = [asyncio.create_task(queue.submit(_make_sample(i))) for i in range(2)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(IngestionQueueFullError):
+            await queue.submit(_make_sample(99))
+        assert queue.rejected_full == 1
+
+        block.set()
+        assert all(await asyncio.gather(*pending))
+        await queue.stop()
+
+    async def test_05_submit_without_worker_writes_directly(self):
+        """Test 5: Sans tâche de flush, submit écrit directement"""
+        service = FakeSQALService()
+        queue = SQALIngestionQueue(service)
+
+        assert await queue.submit(_make_sample(1)) is True
+        assert service.single_writes == ["SAMPLE_1"]
+        assert service.batches == []
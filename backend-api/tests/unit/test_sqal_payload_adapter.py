@@ -0,0 +1,105 @@
+"""
+Unit Tests - SQAL Payload Adapter
+Tests de l'adaptation vectorisée des payloads simulateur (VL53L8CH, grades)
+"""
+
+import copy
+import pytest
+
+from app.models.sqal import SensorDataMessage
+from app.websocket.sqal_payload_adapter import adapt_simulator_payload, normalize_grade
+
+
+def _payload(resolution: int = 8) -> dict:
+    def matrix(value: float):
+        return [[value + i + j * 0.5 for i in range(resolution)] for j in range(resolution)]
+
+    return {
+        "sample_id": "SAMPLE_1",
+        "device_id": "ESP32_LL_01",
+        "timestamp": "2026-01-01T00:00:00",
+        "vl53l8ch": {
+            "distance_matrix": matrix(3995.4),
+            "reflectance_matrix": matrix(-3.6),
+            "amplitude_matrix": matrix(4090.5),
+            "volume_mm3": 650000.0,
+            "surface_uniformity": 0.9,
+            "quality_score": 0.88,
+            "grade": "a+ premium",
+        },
+        "as7341": {
+            "channels": {"F1_415nm": 1, "F2_445nm": 1, "F3_480nm": 1, "F4_515nm": 1, "F5_555nm": 1,
+                         "F6_590nm": 1, "F7_630nm": 1, "F8_680nm": 1, "Clear": 1, "NIR": 1},
+            "freshness_index": 0.9, "fat_quality_index": 0.9, "oxidation_index": 0.1,
+            "quality_score": 0.9, "grade": "B",
+            "integration_time": 100,
+        },
+        "fusion": {"final_score": 0.9, "final_grade": "REJET"},
+    }
+
+
+@pytest.mark.unit
+class TestSQALPayloadAdapter:
+    """Tests unitaires pour adapt_simulator_payload"""
+
+    @pytest.mark.parametrize("resolution", [8, 16, 32])
+    def test_01_numpy_matches_legacy(self, resolution):
+        """Test 1: Chemin NumPy identique au chemin élément par élément"""
+        payload = _payload(resolution)
+        legacy = adapt_simulator_payload(copy.deepcopy(payload), vectorized=False)
+        vectorized = adapt_simulator_payload(copy.deepcopy(payload), vectorized=True)
+
+        assert vectorized["vl53l8ch"]["raw"] == legacy["vl53l8ch"]["raw"]
+        assert vectorized["vl53l8ch"]["analysis"]["avg_distance_mm"] == pytest.approx(
+            legacy["vl53l8ch"]["analysis"]["avg_distance_mm"]
+        )
+        assert vectorized["vl53l8ch"]["analysis"]["std_distance_mm"] == pytest.approx(
+            legacy["vl53l8ch"]["analysis"]["std_distance_mm"]
+        )
+
+    def test_02_clamp_tables_applied(self):
+        """Test 2: Bornes par champ et conversion en int"""
+        raw = adapt_simulator_payload(_payload())["vl53l8ch"]["raw"]
+
+        assert max(max(row) for row in raw["distance_matrix"]) == 4000
+        assert min(min(row) for row in raw["reflectance_matrix"]) == 0
+        assert max(max(row) for row in raw["amplitude_matrix"]) == 4095
+        assert all(isinstance(v, int) for row in raw["distance_matrix"] for v in row)
+
+    def test_03_cnh_bins_not_processed(self):
+        """Test 3: Histogrammes CNH non traités (champ ignoré par SensorDataMessage)"""
+        payload = _payload()
+        bins = [[-4.2, 10.6, 70000.0] for _ in range(32)]
+        payload["vl53l8ch"]["bins_matrix"] = bins
+
+        adapted = adapt_simulator_payload(payload)
+
+        assert adapted["vl53l8ch"]["analysis"]["bins_matrix"] is bins
+        assert "bins_matrix" not in SensorDataMessage(**adapted).vl53l8ch.analysis.model_dump()
+
+    def test_04_ragged_matrix_falls_back(self):
+        """Test 4: Matrice irrégulière → repli élément par élément sans exception"""
+        payload = _payload()
+        payload["vl53l8ch"]["status_matrix"] = [[1.2, 2.6], [3.1]]
+
+        raw = adapt_simulator_payload(payload)["vl53l8ch"]["raw"]
+
+        assert raw["status_matrix"] == [[1, 3], [3]]
+
+    def test_05_grades_normalized(self):
+        """Test 5: Normalisation des grades"""
+        adapted = adapt_simulator_payload(_payload())
+
+        assert adapted["vl53l8ch"]["analysis"]["grade"] == "A+"
+        assert adapted["as7341"]["analysis"]["grade"] == "B"
+        assert "integration_time" not in adapted["as7341"]["analysis"]
+        assert adapted["fusion"]["final_grade"] == "REJECT"
+        assert adapted["fusion"]["is_compliant"] is False
+        assert normalize_grade("unknown") == "unknown"
+
+    def test_06_adapted_payload_validates(self):
+        """Test 6: Le payload adapté passe la validation Pydantic"""
+        sensor_data = SensorDataMessage(**adapt_simulator_payload(_payload()))
+
+        assert sensor_data.fusion.final_grade == "REJECT"
+        assert sensor_data.vl53l8ch.analysis.avg_distance_mm is not None
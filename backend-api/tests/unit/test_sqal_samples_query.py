@@ -0,0 +1,90 @@
+"""
+Unit Tests - Lecture projetée des échantillons SQAL
+Tests des projections, de la pagination par clé et des formats d'export
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.sqal_samples_query import (
+    FIELD_SETS,
+    build_samples_query,
+    csv_header,
+    decode_cursor,
+    encode_cursor,
+    row_to_dict,
+    to_csv,
+    to_ndjson,
+)
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+END = datetime(2026, 10, 8, tzinfo=timezone.utc)
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def _row(**values):
+    return SimpleNamespace(_mapping=values)
+
+
+@pytest.mark.unit
+class TestSQALSamplesQuery:
+    """Tests unitaires pour app.services.sqal_samples_query"""
+
+    def test_01_scores_projection_skips_heavy_columns(self):
+        """Test 1: fields=scores ne lit ni matrices ni JSON spectral, raw garde le format complet"""
+        scores_sql = _sql(build_samples_query("scores", START, END))
+        raw_sql = _sql(build_samples_query("raw", START, END))
+
+        assert "fusion_final_score" in scores_sql
+        assert "distance_matrix" not in scores_sql
+        assert "as7341_spectral_analysis" not in scores_sql
+        assert "vl53l8ch_distance_matrix" in raw_sql
+        assert set(FIELD_SETS["scores"]) < set(FIELD_SETS["analysis"]) < set(FIELD_SETS["raw"])
+        assert len(FIELD_SETS["raw"]) == 45
+
+        with pytest.raises(ValueError):
+            build_samples_query("everything", START, END)
+
+    def test_02_keyset_cursor_roundtrip(self):
+        """Test 2: Curseur opaque → condition (timestamp, sample_id) < (...), sans OFFSET"""
+        sample = {"time": datetime(2026, 10, 3, 12, 0, 5, tzinfo=timezone.utc), "sample_id": "S-42"}
+        cursor = encode_cursor(sample)
+        assert decode_cursor(cursor) == (sample["time"], "S-42")
+
+        sql = _sql(build_samples_query("scores", START, END, "ESP32_LL_01", decode_cursor(cursor), 101))
+        assert "(sensor_samples.timestamp, sensor_samples.sample_id) <" in sql
+        assert "ORDER BY sensor_samples.timestamp DESC, sensor_samples.sample_id DESC" in sql
+        assert "OFFSET" not in sql
+
+        with pytest.raises(ValueError):
+            decode_cursor("pas-un-curseur")
+
+    def test_03_rows_to_api_and_export_formats(self):
+        """Test 3: Conformité dérivée du grade, export NDJSON/CSV ligne à ligne"""
+        row = _row(
+            timestamp=START, sample_id="S-1", device_id="ESP32_LL_01", lot_id=7,
+            vl53l8ch_quality_score=0.9, vl53l8ch_grade="A", as7341_quality_score=0.8, as7341_grade="A",
+            fusion_final_score=0.85, fusion_final_grade="REJECT", fusion_vl53l8ch_score=0.9,
+            fusion_as7341_score=0.8, poids_foie_estime_g=612.3,
+        )
+        sample = row_to_dict(row, "scores")
+        assert list(sample) == list(FIELD_SETS["scores"])
+        assert sample["time"] == START
+        assert sample["fusion_is_compliant"] is False
+
+        line = json.loads(to_ndjson([sample]))
+        assert line["time"] == START.isoformat()
+
+        rows = list(csv.reader(io.StringIO(csv_header("scores") + to_csv([sample], "scores"))))
+        assert rows[0] == list(FIELD_SETS["scores"])
+        assert rows[1][rows[0].index("sample_id")] == "S-1"
+        assert len(rows) == 2
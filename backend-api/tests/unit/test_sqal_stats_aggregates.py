@@ -0,0 +1,152 @@
+"""
+Unit Tests - SQAL stats (continuous aggregate + queue brute)
+Tests du découpage période matérialisée / queue et du choix de requête
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import sqal_stats_aggregates as aggregates
+from app.services.sqal_stats_aggregates import materialized_range
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class FakeConnection:
+    """Catalogue TimescaleDB minimal : vue présente ou non, watermark"""
+
+    def __init__(self, view_exists: bool, watermark=None):
+        self.view_exists = view_exists
+        self.watermark = watermark
+        self.fetched = []
+
+    async def fetchval(self, query, *args):
+        if "to_regclass" in query:
+            return self.view_exists
+        return self.watermark
+
+    async def fetch(self, query, *args):
+        self.fetched.append((query, args))
+        return [{
+            "bucket": _utc(2026, 10, 1, 10), "device_id": "ESP32_LL_01", "site_code": "LL",
+            "sample_count": 4, "compliant_count": 3, "avg_quality_score": 0.8,
+            "count_a_plus": 1, "count_a": 1, "count_b": 1, "count_c": 0, "count_reject": 1,
+            "avg_volume_mm3": None, "avg_freshness_index": 0.5,
+        }]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSQALStatsAggregates:
+    """Tests unitaires pour app.services.sqal_stats_aggregates"""
+
+    async def test_01_materialized_range_whole_hours_below_watermark(self):
+        """Test 1: Seules les heures entières de la période et sous le watermark sont lues dans l'agrégat"""
+        start, end = _utc(2026, 9, 1, 10, 20), _utc(2026, 10, 1, 9, 45)
+
+        assert materialized_range(start, end, _utc(2026, 10, 1, 8, 0)) == (
+            _utc(2026, 9, 1, 11), _utc(2026, 10, 1, 8)
+        )
+        # Watermark au-delà de la période : s'arrête à la dernière heure entière
+        assert materialized_range(start, end, _utc(2026, 10, 2)) == (_utc(2026, 9, 1, 11), _utc(2026, 10, 1, 9))
+        # Période plus courte qu'une heure ou agrégat vide : tout en brut
+        assert materialized_range(_utc(2026, 10, 1, 9, 5), end, _utc(2026, 10, 2)) is None
+        assert materialized_range(start, end, None) is None
+        # Dates naïves (utcnow) traitées comme UTC
+        assert materialized_range(datetime(2026, 9, 1, 10), datetime(2026, 9, 1, 12), datetime(2026, 9, 2)) == (
+            _utc(2026, 9, 1, 10), _utc(2026, 9, 1, 12)
+        )
+
+    async def test_02_uses_aggregate_and_tail_when_materialized(self):
+        """Test 2: Agrégat présent → requête fusionnée avec la plage matérialisée"""
+        conn = FakeConnection(view_exists=True, watermark=_utc(2026, 10, 1, 6))
+        stats = await aggregates.fetch_hourly_stats(conn, _utc(2026, 9, 1), _utc(2026, 10, 1, 9, 30), "ESP32_LL_01")
+
+        query, args = conn.fetched[0]
+        assert query == aggregates.HOURLY_STATS_QUERY
+        assert args[2:] == (_utc(2026, 9, 1), _utc(2026, 10, 1, 6), "ESP32_LL_01")
+        assert stats[0]["compliance_rate_pct"] == 75.0
+        assert stats[0]["avg_volume_mm3"] == 0
+
+    async def test_03_raw_only_without_aggregate(self):
+        """Test 3: Sans TimescaleDB (vue absente) → requête brute seule, même format"""
+        conn = FakeConnection(view_exists=False)
+        stats = await aggregates.fetch_site_stats(conn, _utc(2026, 9, 1), _utc(2026, 10, 1), "LL")
+
+        query, args = conn.fetched[0]
+        assert query == aggregates.SITE_STATS_RAW_QUERY
+        assert "sensor_samples_hourly" not in query
+        assert args[2] == args[3]  # plage matérialisée vide
+        assert stats[0]["total_samples"] == 4
+        assert stats[0]["site_code"] == "LL"
+
+    async def test_04_period_totals_single_row(self):
+        """Test 4: Totaux de période (dashboard) en une seule ligne agrégée"""
+        conn = FakeConnection(view_exists=True, watermark=_utc(2026, 10, 1, 6))
+        totals = await aggregates.fetch_period_totals(conn, _utc(2026, 9, 30, 9, 30), _utc(2026, 10, 1, 9, 30))
+
+        query, args = conn.fetched[0]
+        assert query == aggregates.PERIOD_TOTALS_QUERY
+        assert args[2:4] == (_utc(2026, 9, 30, 10), _utc(2026, 10, 1, 6))
+        assert totals == {
+            "total_samples": 4, "avg_quality_score": 0.8, "compliance_rate_pct": 75.0,
+            "count_a_plus": 1, "count_a": 1, "count_b": 1, "count_c": 0, "count_reject": 1,
+        }
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self):
+        pool = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                return pool.conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+class OverviewConnection(FakeConnection):
+    async def fetchrow(self, query, *args):
+        self.fetched.append((query, args))
+        if "sqal_alerts" in query:
+            return {"active": 3, "critical": 1}
+        return {"total": 5, "active": 4}
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestSQALDashboardOverview:
+    """Tests unitaires pour SQALService.get_dashboard_overview"""
+
+    async def test_01_overview_computed_once_per_window(self):
+        """Test 1: KPIs agrégés en SQL, un seul calcul pour des appels concurrents"""
+        import asyncio
+
+        from app.cache.simple_cache import get_cache
+        from app.services.sqal_service import SQALService
+
+        get_cache().clear()
+        conn = OverviewConnection(view_exists=False)
+        service = SQALService()
+        service.pool = FakePool(conn)
+
+        results = await asyncio.gather(*(service.get_dashboard_overview() for _ in range(5)))
+
+        assert all(r is results[0] for r in results)
+        # 2 totaux (24h, 7j) + alertes + devices, aucune ligne brute rapatriée
+        assert len(conn.fetched) == 4
+        overview = results[0]
+        assert overview["stats_24h"] == {"total_samples": 4, "avg_quality_score": 0.8, "compliance_rate_pct": 75.0}
+        assert overview["grade_distribution_7d"] == {"A+": 1, "A": 1, "B": 1, "C": 0, "REJECT": 1}
+        assert (overview["active_alerts"], overview["critical_alerts"]) == (3, 1)
+        assert (overview["total_devices"], overview["active_devices"]) == (5, 4)
+        get_cache().clear()
@@ -0,0 +1,151 @@
+"""
+Unit Tests - CacheManager (L1 in-process + L2 Redis)
+Tests du cache à deux niveaux (promotion L2→L1, invalidation inter-workers, mode dégradé)
+"""
+
+import fnmatch
+import json
+import pytest
+
+from app.cache.simple_cache import SimpleCache
+from app.core import cache as cache_module
+from app.core.cache import CacheManager
+
+
+class FakeRedis:
+    """Redis minimal en mémoire partagé entre plusieurs CacheManager (= workers)"""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.sets = {}
+        self.published = []
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    async def ttl(self, key):
+        return self.ttls.get(key, -2)
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    async def expire(self, key, ttl):
+        return True
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.sets.pop(key, None)
+
+    async def publish(self, channel, message):
+        self.published.append(json.loads(message))
+
+    async def scan_iter(self, match):
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.calls.append((name, args))
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+def _worker(redis=None) -> CacheManager:
+    manager = CacheManager(l1=SimpleCache(), l1_ttl=30)
+    if redis is not None:
+        manager.redis = redis
+        manager._connected = True
+    return manager
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestTieredCache:
+    """Tests unitaires pour CacheManager L1 + L2"""
+
+    async def test_01_l1_only_without_redis(self):
+        """Test 1: Sans Redis, les getters typés fonctionnent en L1 seul"""
+        manager = _worker()
+        assert await manager.get_dashboard_metrics() is None
+
+        await manager.set_dashboard_metrics({"total": 3})
+
+        assert await manager.get_dashboard_metrics() == {"total": 3}
+        await manager.invalidate_pattern("dashboard:*")
+        assert await manager.get_dashboard_metrics() is None
+
+    async def test_02_l2_hit_promoted_to_l1(self):
+        """Test 2: Valeur écrite par un worker lue en L2 par un autre puis servie en L1"""
+        redis = FakeRedis()
+        worker_a, worker_b = _worker(redis), _worker(redis)
+
+        await worker_a.set_device_stats("ESP32_LL_01", {"samples": 10}, ttl=900)
+        assert "device:ESP32_LL_01:stats" not in worker_b.l1.cache
+
+        assert await worker_b.get_device_stats("ESP32_LL_01") == {"samples": 10}
+        assert worker_b.l1.get("device:ESP32_LL_01:stats") == {"samples": 10}
+
+    async def test_03_invalidation_evicts_l1_in_other_workers(self):
+        """Test 3: invalidate_device publie l'événement ; les autres workers vident leur L1"""
+        redis = FakeRedis()
+        worker_a, worker_b = _worker(redis), _worker(redis)
+        await worker_a.set_device_stats("ESP32_LL_01", {"samples": 10})
+        await worker_b.get_device_stats("ESP32_LL_01")
+
+        await worker_a.invalidate_device("ESP32_LL_01")
+        event = redis.published[-1]
+
+        assert worker_a._apply_invalidation(event) == 0  # propre événement ignoré
+        assert worker_b._apply_invalidation(event) == 1
+        assert await worker_b.get_device_stats("ESP32_LL_01") is None
+
+    async def test_04_tag_invalidation_and_tier_metrics(self, monkeypatch):
+        """Test 4: Tags supprimés dans Redis ; métriques hit/miss par niveau"""
+        recorded = []
+        monkeypatch.setattr(cache_module, "METRICS_AVAILABLE", True)
+        monkeypatch.setattr(
+            cache_module, "record_cache_operation",
+            lambda op, key, hit, duration, tier: recorded.append((tier, key, hit)),
+        )
+        redis = FakeRedis()
+        worker_a, worker_b = _worker(redis), _worker(redis)
+
+        async def loader():
+            return {"points": [1, 2]}
+
+        await worker_a.get_or_compute("courbe_theo:7", loader, ttl=600, tags=["lot_id:7"])
+        assert await worker_b.get_or_compute("courbe_theo:7", loader, tags=["lot_id:7"]) == {"points": [1, 2]}
+        assert ("l1", "courbe_theo", False) in recorded
+        assert ("l2", "courbe_theo", True) in recorded
+
+        await worker_a.invalidate_tag("lot_id:7")
+
+        assert "courbe_theo:7" not in redis.data
+        assert worker_b._apply_invalidation(redis.published[-1]) == 1
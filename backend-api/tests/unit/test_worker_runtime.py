@@ -0,0 +1,134 @@
+"""
+Unit Tests - Boucle et pool persistants des workers Celery
+Tests de WorkerRuntime : réutilisation boucle/pool, surcoût par tâche, garde-fous
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.tasks.worker_runtime import WorkerRuntime
+
+
+class FakePool:
+    """Pool asyncpg factice"""
+
+    def __init__(self):
+        self.closed = False
+
+    async def fetchval(self, query, *args):
+        return 1
+
+    async def close(self):
+        self.closed = True
+
+    def get_size(self):
+        return 1
+
+
+def make_factory(connect_s: float = 0.0):
+    created = []
+
+    async def factory(dsn, min_size, max_size):
+        await asyncio.sleep(connect_s)
+        pool = FakePool()
+        created.append((dsn, min_size, max_size, pool))
+        return pool
+    return factory, created
+
+
+@pytest.mark.unit
+class TestWorkerRuntime:
+    """Tests unitaires pour app.tasks.worker_runtime"""
+
+    def test_01_reuses_loop_and_pool(self):
+        """Test 1: Une boucle et un pool par processus, fermés à l'arrêt"""
+        factory, created = make_factory()
+        runtime = WorkerRuntime(database_url="postgresql://test", pool_min_size=1, pool_max_size=3,
+                                pool_factory=factory)
+
+        async def task():
+            pool = await runtime.get_pool()
+            return asyncio.get_running_loop(), pool, await pool.fetchval("SELECT 1")
+
+        try:
+            results = [runtime.run(task()) for _ in range(20)]
+            assert len({id(loop) for loop, _, _ in results}) == 1
+            assert len({id(pool) for _, pool, _ in results}) == 1
+            assert all(value == 1 for _, _, value in results)
+            assert created[0][:3] == ("postgresql://test", 1, 3)
+            assert runtime.stats()["pool_creations"] == 1 and runtime.stats()["runs"] == 20
+        finally:
+            runtime.stop()
+
+        assert created[0][3].closed
+        assert not runtime.running
+
+    def test_02_per_task_overhead_below_asyncio_run(self):
+        """Test 2: Surcoût par tâche courte inférieur à asyncio.run() + connexion neuve"""
+        connect_s = 0.005
+        n = 40
+
+        async def legacy_task(factory):
+            pool = await factory("postgresql://test", min_size=1, max_size=1)
+            try:
+                return await pool.fetchval("SELECT 1")
+            finally:
+                await pool.close()
+
+        factory, _ = make_factory(connect_s)
+        started = time.perf_counter()
+        for _ in range(n):
+            asyncio.run(legacy_task(factory))
+        legacy = time.perf_counter() - started
+
+        factory, created = make_factory(connect_s)
+        runtime = WorkerRuntime(database_url="postgresql://test", pool_factory=factory)
+
+        async def task():
+            return await (await runtime.get_pool()).fetchval("SELECT 1")
+
+        try:
+            runtime.start()
+            started = time.perf_counter()
+            for _ in range(n):
+                assert runtime.run(task()) == 1
+            persistent = time.perf_counter() - started
+        finally:
+            runtime.stop()
+
+        assert len(created) == 1
+        assert persistent < legacy / 2
+
+    def test_03_guards_and_fork_restart(self):
+        """Test 3: Appel depuis la boucle refusé, timeout annule, nouveau pid = nouvelle boucle"""
+        factory, created = make_factory()
+        runtime = WorkerRuntime(database_url="postgresql://test", pool_factory=factory)
+
+        async def nested():
+            return runtime.run(asyncio.sleep(0))
+
+        async def slow():
+            await asyncio.sleep(5)
+
+        try:
+            with pytest.raises(RuntimeError):
+                runtime.run(nested())
+            with pytest.raises(TimeoutError):
+                runtime.run(slow(), timeout=0.05)
+
+            runtime.run(runtime.get_pool())
+            first_loop, first_thread = runtime.loop, runtime._thread
+
+            # Processus enfant après fork : la boucle héritée n'a pas de thread
+            runtime._pid = -1
+            assert not runtime.running
+            runtime.run(runtime.get_pool())
+            assert runtime.loop is not first_loop
+            assert len(created) == 2
+        finally:
+            runtime.stop()
+            first_loop.call_soon_threadsafe(first_loop.stop)
+            first_thread.join(5)
+            first_loop.close()